@@ -102,6 +102,76 @@ MATCH_THRESHOLD = float(os.getenv('MATCH_THRESHOLD', 0.7))
 DETECTION_INTERVAL = float(os.getenv('DETECTION_INTERVAL', 0.01))
 SIGN_CHECK_FREQUENCY = 3
 
+# 引擎模式: 'loop' = 單線程主循環, 'pipeline' = 截圖/檢測/決策/按鍵 分階段線程,
+#          'async' = asyncio 事件循環（長時間行為為協程，紅點偵測/被動技能持續運作）,
+#          'multi' = 多開模式（一個程序驅動所有 WINDOW_NAME 視窗，共用模板與工作線程池，按鍵以 PostMessage 送到各自視窗）
+ENGINE_MODE = os.getenv('ENGINE_MODE', 'loop')
+PIPELINE_DETECTION_WORKERS = int(os.getenv('PIPELINE_DETECTION_WORKERS', 1))
+ASYNC_ENGINE_BLOCKING_WORKERS = int(os.getenv('ASYNC_ENGINE_BLOCKING_WORKERS', 4))
+# 幀預算排程器：週期性子系統（被動技能、斷層檢測、繩索檢測、統計）每幀可用的時間預算（毫秒）
+SCHEDULER_FRAME_BUDGET_MS = float(os.getenv('SCHEDULER_FRAME_BUDGET_MS', 6.0))
+# 多開模式：共用的檢測工作線程數；設定重播來源（圖片資料夾或影片檔）時改用重播，按鍵只記錄不送出
+MULTI_CLIENT_WORKERS = int(os.getenv('MULTI_CLIENT_WORKERS', 4))
+MULTI_CLIENT_REPLAY_SOURCES = []
+# 無介面常駐模式（run_daemon.py）：本機 JSON-RPC 控制埠；設定 DAEMON_TOKEN 時每個請求都必須附上相同的 token
+DAEMON_HOST = os.getenv('DAEMON_HOST', '127.0.0.1')
+DAEMON_PORT = int(os.getenv('DAEMON_PORT', 8765))
+DAEMON_TOKEN = os.getenv('DAEMON_TOKEN', '')
+# 畫面錄製：依序存成編號圖片，錄製的資料夾可直接作為多開模式的重播來源
+RECORDING_DIR = os.getenv('RECORDING_DIR', os.path.join(ASSETS_DIR, 'recordings'))
+RECORDING_INTERVAL = 0.2
+RECORDING_MAX_FRAMES = 3000
+# 取樣剖析：不重啟程序對腳本線程取樣 N 秒，輸出火焰圖用的 collapsed stack 與函數列表
+PROFILER_DIR = os.getenv('PROFILER_DIR', os.path.join(ASSETS_DIR, 'profiles'))
+PROFILER_DEFAULT_DURATION = 10
+PROFILER_INTERVAL = 0.005
+PROFILER_TOP_N = 30
+# 監控指標：本機 HTTP 端點以 Prometheus 文字格式輸出計數與延遲（GET /metrics）；同機多開時各實例設定不同的埠
+ENABLE_METRICS = os.getenv('ENABLE_METRICS', '0') == '1'
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9150))
+# 長時間運行模式：重用截圖與檢測暫存緩衝區，每 LONG_RUN_SNAPSHOT_INTERVAL 秒以 tracemalloc 快照與 RSS 寫出記憶體報告，
+# 標出持續增長超過 LONG_RUN_HOTSPOT_MIN_KB 的配置位置（檔案:行號）；tracemalloc 會讓配置變慢，只在長時間運行時開啟
+ENABLE_LONG_RUN_MODE = os.getenv('ENABLE_LONG_RUN_MODE', '0') == '1'
+LONG_RUN_REPORT_DIR = os.getenv('LONG_RUN_REPORT_DIR', os.path.join(ASSETS_DIR, 'memory_reports'))
+LONG_RUN_SNAPSHOT_INTERVAL = 600
+LONG_RUN_TRACEMALLOC_FRAMES = 1
+LONG_RUN_TOP_N = 15
+LONG_RUN_HOTSPOT_MIN_KB = 512
+FRAME_POOL_SIZE = 4
+SCRATCH_POOL_SIZE = 6
+# 直接附加的日誌檔（security_violations.log、記憶體報告）超過大小時輪替，保留 LOG_FILE_BACKUPS 個舊檔
+LOG_FILE_MAX_BYTES = 1024 * 1024
+LOG_FILE_BACKUPS = 3
+# 日誌：預設等級與各模組等級（例如 {'rope_climbing': 'DEBUG', 'red_dot_detector': 'WARNING'}）
+# 帶 key 的重複訊息每 LOG_RATE_LIMIT_INTERVAL 秒最多輸出 LOG_RATE_LIMIT_BURST 則
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_LEVELS = {}
+LOG_RATE_LIMIT_INTERVAL = 2.0
+LOG_RATE_LIMIT_BURST = 1
+LOG_QUEUE_SIZE = 10000
+LOG_FORMAT = '%(message)s'
+# 介面日誌：環形緩衝區容量、GUI 批次取出間隔（毫秒）與日誌視窗保留的行數
+LOG_RING_CAPACITY = 10000
+LOG_DRAIN_INTERVAL_MS = 100
+LOG_VIEW_MAX_LINES = 1000
+# 畫面年齡門檻（秒）：截圖超過此時間仍未決策時，略過昂貴檢測（怪物、遠距掃描、繩索）並直接換最新畫面
+FRAME_MAX_AGE = 0.25
+# 同一檢查點連續略過多少張過時畫面後照常處理下一張（檢測本身比門檻慢時避免永遠不行動）
+FRAME_MAX_CONSECUTIVE_DROPS = 3
+# 效能統計：無介面執行時每隔多少秒輸出各階段耗時摘要（0 = 不輸出），GUI 效能面板的更新間隔（毫秒）
+PERF_SUMMARY_INTERVAL = float(os.getenv('PERF_SUMMARY_INTERVAL', 60))
+PERF_PANEL_REFRESH_MS = 1000
+# 效能回歸檢查（scripts/perf_regression.py）：基準 JSON 路徑，中位數超過基準多少比例且差距大於多少毫秒判定退化
+PERF_BASELINE_PATH = os.getenv('PERF_BASELINE_PATH', os.path.join(str(BASE_DIR), 'perf_baseline.json'))
+PERF_REGRESSION_TOLERANCE = float(os.getenv('PERF_REGRESSION_TOLERANCE', 0.25))
+PERF_REGRESSION_MIN_DELTA_MS = 0.5
+
+# 非同步檢測後端：sign / rune / 角色檢測並行執行，結果超過時限視為過時
+ENABLE_ASYNC_DETECTION = False
+ASYNC_RESULT_MAX_AGE = 0.3
+IMAGE_PROCESSOR_POOL_SIZES = {'find_medal': 1, 'detect_sign': 1, 'detect_rune': 1, 'detect_monster': 1, 'scan_direction': 1}
+
 # =============================================================================
 # 遊戲功能配置 (默認配置 - 會被外部配置覆蓋)
 # =============================================================================
@@ -174,6 +244,19 @@ MEDIUM_MONSTER_Y_TOLERANCE = 45
 LARGE_MONSTER_Y_TOLERANCE = 70
 MIN_DETECTION_SIZE = 200
 MAX_DETECTION_SIZE = 1000
+# 'ccoeff' = 邊緣相關匹配, 'chamfer' = 雙向距離轉換倒角匹配（約快一倍；雜亂背景上召回率較低，
+# 切換前請以 scripts/benchmark_monster_matching.py --frames <錄製畫面> 在自己的地圖上比較）
+MONSTER_MATCH_MODE = 'ccoeff'
+
+# 角色定位模式: 'template' = 全畫面 medal 匹配, 'minimap' = 小地圖標記定位 + 小窗口精修
+PLAYER_LOCALIZATION_MODE = 'template'
+MINIMAP_REFINE_HALF_WIDTH = 160
+MINIMAP_REFINE_HALF_HEIGHT = 110
+
+# 背景模型：以每個鏡頭位置的背景產生前景區塊，怪物匹配只在區塊內進行
+ENABLE_BACKGROUND_MODEL = False
+BACKGROUND_MODEL_MAP = os.getenv('BACKGROUND_MODEL_MAP', 'default')  # 每張地圖使用不同名稱以分開儲存
+BACKGROUND_MODEL_DIR = os.path.join(ASSETS_DIR, 'background_models')
 
 # =============================================================================
 # 外部配置文件支援
@@ -0,0 +1,493 @@
+"""
+非同步引擎模組 - 以 asyncio 事件循環交錯執行畫面檢測與長時間行為（符文、換頻、爬繩、搜尋）
+
+每個長時間行為都是一個協程，透過 await 等待新畫面或計時器；紅點偵測與被動技能是獨立的任務，
+在 15 秒的搜尋或爬繩進行中也持續運作。仍會阻塞的呼叫（截圖、模板匹配、pyautogui）交給線程池執行。
+
+換頻搶占行為時先設定取消旗標：行為協程與線程中的步驟在每一步之間檢查旗標，
+換頻流程等線程池中尚未完成的行為呼叫全部結束後才開始，避免符文 / 爬繩與換頻點擊同時操作。
+"""
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.metrics import get_metrics
+from core.perf_stats import get_perf_stats
+from core.pipeline import Frame, PipelineEngine, StageStats
+from core.tracing import activate, get_tracer
+
+
+class FrameBus:
+    """最新畫面廣播 - 每個協程各自等待比自己上次看到的更新的畫面"""
+
+    def __init__(self):
+        self._condition = asyncio.Condition()
+        self.latest = None
+
+    async def publish(self, frame):
+        async with self._condition:
+            self.latest = frame
+            self._condition.notify_all()
+
+    async def next(self, after=None):
+        """等待序號大於 after 的畫面（after 為上一次取得的 Frame 或 None）"""
+        after_seq = after.seq if after is not None else 0
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.latest is not None and self.latest.seq > after_seq)
+            return self.latest
+
+
+class AsyncEngine:
+    """asyncio 引擎 - 一個行為協程 + 截圖 / 紅點偵測 / 被動技能三個常駐任務"""
+
+    def __init__(self, window_info, templates, components, blocking_workers=4):
+        self.window_info = window_info
+        self.templates = templates
+        self.components = components
+        self.executor = ThreadPoolExecutor(max_workers=max(2, blocking_workers), thread_name_prefix="async-engine")
+
+        # 探索行為沿用管線引擎的檢測與決策邏輯（紅點偵測改由獨立任務負責）
+        self.planner = PipelineEngine(window_info, templates, dict(components, red_dot_detector=None))
+
+        self.frames = None
+        self.not_changing_channel = None
+        self.behaviour_task = None
+        self.behaviour_name = 'idle'
+        self.behaviour_cancel = threading.Event()  # 換頻搶占：行為在步驟之間檢查後停止
+        self.behaviour_calls = set()  # 行為送進線程池、尚未完成的呼叫（concurrent.futures.Future）
+
+        self.passive_skill_interval = 0.1
+        self.stats_print_interval = 300
+
+        self.stats = {name: StageStats(name) for name in (
+            'capture', 'red_dot', 'passive_skills',
+            'explore', 'search', 'climb', 'rune', 'channel_change'
+        )}
+        self.cancelled_behaviours = 0
+        self.drained_behaviour_calls = 0  # 換頻前等待完成的行為呼叫數
+
+    # ------------------------------------------------------------------
+    # 生命週期
+    # ------------------------------------------------------------------
+
+    def run(self, should_stop=None, perf_summary=True):
+        """阻塞執行直到 should_stop() 為真（或 KeyboardInterrupt）；perf_summary 為真時定期輸出各階段耗時摘要"""
+        try:
+            asyncio.run(self._main(should_stop, perf_summary))
+        finally:
+            self.executor.shutdown(wait=False)
+            try:
+                self.components['movement'].stop()
+            except Exception as e:
+                print(f"⚠️ 停止移動失敗: {e}")
+            from core.input_actuator import get_input_actuator
+            get_input_actuator().release_all()
+            print("🌀 非同步引擎已停止")
+
+    async def _main(self, should_stop, perf_summary=True):
+        import config
+
+        self.frames = FrameBus()
+        self.not_changing_channel = asyncio.Event()
+        self.not_changing_channel.set()
+
+        tasks = [
+            asyncio.ensure_future(self._capture_task()),
+            asyncio.ensure_future(self._behaviour_supervisor()),
+            asyncio.ensure_future(self._passive_skills_task()),
+        ]
+        if self.components.get('red_dot_detector') is not None:
+            tasks.append(asyncio.ensure_future(self._red_dot_task()))
+
+        print(f"🌀 非同步引擎已啟動 ({len(tasks)} 個常駐任務)")
+        last_stats_time = last_perf_time = time.time()
+        try:
+            while True:
+                if should_stop is not None and should_stop():
+                    break
+                for task in tasks:
+                    if task.done() and not task.cancelled() and task.exception() is not None:
+                        raise task.exception()
+                await asyncio.sleep(0.1)
+
+                if time.time() - last_stats_time >= self.stats_print_interval:
+                    self.print_stats()
+                    last_stats_time = time.time()
+                if (perf_summary and config.PERF_SUMMARY_INTERVAL > 0 and
+                        time.time() - last_perf_time >= config.PERF_SUMMARY_INTERVAL):
+                    print(get_perf_stats().format_summary())
+                    last_perf_time = time.time()
+        finally:
+            if self.behaviour_task is not None:
+                self.behaviour_task.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _blocking(self, func, *args, **kwargs):
+        """在線程池執行會阻塞的呼叫；協程被取消時該呼叫仍會在線程中跑完"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def _behaviour_call(self, func, *args, **kwargs):
+        """行為協程的線程池呼叫：已被搶占時不再送出，送出的呼叫記錄下來讓換頻流程等它完成"""
+        if self.behaviour_cancel.is_set():
+            raise asyncio.CancelledError()
+        future = self.executor.submit(func, *args, **kwargs)
+        self.behaviour_calls.add(future)
+        future.add_done_callback(self.behaviour_calls.discard)
+        return await asyncio.wrap_future(future)
+
+    async def _drain_behaviour_calls(self):
+        """等待線程池中尚未完成的行為呼叫結束（協程取消不會中斷已在線程中執行的呼叫）"""
+        pending = [future for future in list(self.behaviour_calls) if not future.done()]
+        if pending:
+            print(f"⏳ 等待 {len(pending)} 個進行中的行為呼叫完成後再換頻")
+            self.drained_behaviour_calls += len(pending)
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in pending), return_exceptions=True)
+
+    # ------------------------------------------------------------------
+    # 常駐任務
+    # ------------------------------------------------------------------
+
+    async def _capture_task(self):
+        import config
+        from core.utils import capture_screen
+
+        seq = 0
+        while True:
+            trace = get_tracer().begin()
+            start = time.time()
+            image = await self._blocking(capture_screen, self.window_info['screen_region'])
+            if image is None:
+                self.stats['capture'].errors += 1
+                await asyncio.sleep(0.05)
+                continue
+            trace.mark('captured')
+
+            seq += 1
+            await self.frames.publish(Frame(seq, start, image, trace))
+            self.stats['capture'].record(time.time() - start)
+            await asyncio.sleep(config.DETECTION_INTERVAL)
+
+    async def _red_dot_task(self):
+        detector = self.components['red_dot_detector']
+        frame = None
+        while True:
+            frame = await self.frames.next(frame)
+            if not self.not_changing_channel.is_set():
+                continue
+
+            start = time.time()
+            should_change_channel = await self._blocking(
+                detector.handle_red_dot_detection,
+                frame.image, self.window_info['client_width'], self.window_info['client_height']
+            )
+            self.stats['red_dot'].record(time.time() - start)
+
+            if should_change_channel:
+                print("🚨 紅點偵測觸發換頻邏輯！")
+                await self._change_channel()
+                frame = None
+
+    async def _passive_skills_task(self):
+        passive_skills = self.components.get('passive_skills')
+        if passive_skills is None:
+            return
+
+        while True:
+            await self.not_changing_channel.wait()
+            start = time.time()
+            try:
+                await self._blocking(passive_skills.check_and_use_skills)
+            except Exception as e:
+                self.stats['passive_skills'].errors += 1
+                print(f"❌ 被動技能錯誤: {e}")
+            self.stats['passive_skills'].record(time.time() - start)
+            await asyncio.sleep(self.passive_skill_interval)
+
+    async def _behaviour_supervisor(self):
+        """依目前狀態選擇行為協程；行為結束或被換頻搶占後重新選擇"""
+        c = self.components
+        while True:
+            await self.not_changing_channel.wait()
+
+            if c['rune_mode'].is_active:
+                name, coroutine = 'rune', self._rune_behaviour()
+            elif c['rope_climbing'].is_climbing:
+                name, coroutine = 'climb', self._climb_behaviour()
+            else:
+                name, coroutine = 'explore', self._explore_behaviour()
+
+            self.behaviour_name = name
+            self.behaviour_cancel.clear()
+            self.behaviour_task = asyncio.ensure_future(coroutine)
+            start = time.time()
+            await asyncio.wait([self.behaviour_task])
+
+            if self.behaviour_task.cancelled():
+                self.cancelled_behaviours += 1
+            elif self.behaviour_task.exception() is not None:
+                self.stats[name].errors += 1
+                print(f"❌ 行為 {name} 錯誤: {self.behaviour_task.exception()}")
+                await asyncio.sleep(0.1)
+            self.stats[name].record(time.time() - start)
+            self.behaviour_task = None
+            self.behaviour_name = 'idle'
+
+    # ------------------------------------------------------------------
+    # 行為協程
+    # ------------------------------------------------------------------
+
+    async def _explore_behaviour(self):
+        """一般狀態：每幀檢測並決策，直到需要切換到搜尋、符文或爬繩"""
+        frame = None
+        while not self.behaviour_cancel.is_set():
+            frame = await self.frames.next(frame)
+            perception = await self._behaviour_call(self.planner._perceive, frame)
+            # 檢測完成時畫面已過時，直接等最新畫面
+            if not self.planner.frame_ages.is_fresh(frame, 'decide'):
+                continue
+            self.planner.frame_ages.record_decision(frame)
+            plan = self.planner._decide(perception)
+            get_metrics().inc('loop_ticks_total', engine='async')
+
+            # 被動技能與搜尋結果回報由各自的任務 / 協程負責
+            steps = [(name, step) for name, step in plan.steps
+                     if name not in ('passive_skills', 'search', 'search_update')]
+            if steps:
+                await self._behaviour_call(self._run_steps, steps, plan.trace)
+
+            if plan.name == 'search':
+                await self._search_behaviour()
+            elif plan.name in ('enter_rune', 'start_climb'):
+                return
+
+    def _run_steps(self, steps, trace=None):
+        # 在線程池執行，trace 設為該線程目前的 trace，攻擊鍵按下時完成延遲追踪
+        with activate(trace):
+            if trace is not None:
+                trace.mark('actuate_start')
+            for _, step in steps:
+                if self.behaviour_cancel.is_set():
+                    break
+                step()
+
+    async def _search_behaviour(self):
+        """角色遺失：送出左右掃描，之後每幀回報檢測結果直到找到角色或掃描結束"""
+        import config
+        from core.utils import find_player_medal
+
+        c = self.components
+        search = c['search']
+        start = time.time()
+        search.search_for_medal(self.window_info['screen_region'], self.templates['medal'],
+                                config.MATCH_THRESHOLD, c['movement'])
+        try:
+            frame = None
+            while search.is_searching and not self.behaviour_cancel.is_set():
+                frame = await self.frames.next(frame)
+                found, _, val = await self._behaviour_call(
+                    find_player_medal, frame.image, self.templates['medal'],
+                    config.MATCH_THRESHOLD, c.get('player_locator')
+                )
+                search.update_search(found, val)
+        finally:
+            if search.is_searching:
+                search.cancel_search()
+            self.stats['search'].record(time.time() - start)
+
+    async def _climb_behaviour(self):
+        """爬繩：每幀更新角色位置並推進爬繩狀態機，直到爬繩結束"""
+        import config
+        from core.utils import find_player_medal
+
+        c = self.components
+        wi = self.window_info
+        climbing = c['rope_climbing']
+        player_x, player_y = self.planner.player_x, self.planner.player_y
+
+        frame = None
+        while climbing.is_climbing and not self.behaviour_cancel.is_set():
+            frame = await self.frames.next(frame)
+            medal_found, medal_loc, _ = await self._behaviour_call(
+                find_player_medal, frame.image, self.templates['medal'],
+                config.MATCH_THRESHOLD, c.get('player_locator')
+            )
+            if medal_found:
+                template_height, template_width = self.templates['medal'].shape[:2]
+                player_x = medal_loc[0] + template_width // 2
+                player_y = medal_loc[1] + template_height // 2 - config.Y_OFFSET
+
+            await self._behaviour_call(
+                climbing.update_climbing, frame.image, player_x, player_y,
+                wi['client_width'], wi['client_height'],
+                self.templates['medal'], wi['client_x'], wi['client_y']
+            )
+            await self._behaviour_call(c['movement'].update)
+            get_metrics().inc('loop_ticks_total', engine='async')
+
+    async def _rune_behaviour(self):
+        """符文模式：方向鍵輸入由按鍵執行器送出，等待期間照常取得新畫面"""
+        c = self.components
+        wi = self.window_info
+        rune_mode = c['rune_mode']
+
+        frame = None
+        while rune_mode.is_active and not self.behaviour_cancel.is_set():
+            frame = await self.frames.next(frame)
+            await self._behaviour_call(
+                rune_mode.handle, frame.image, wi['screen_region'],
+                self.templates['medal'], self.templates['rune'],
+                self.templates['direction'], self.templates['direction_masks'],
+                wi['client_width'], wi['client_height'],
+                c['search'], c['cliff_detection'],
+                wi['client_x'], wi['client_y'],
+                c['movement'], self.templates['change']
+            )
+            await self._behaviour_call(c['movement'].update)
+            get_metrics().inc('loop_ticks_total', engine='async')
+
+    async def _change_channel(self):
+        """搶占目前的行為並執行換頻流程"""
+        c = self.components
+        self.not_changing_channel.clear()
+        start = time.time()
+        try:
+            # 先設旗標讓線程中的步驟停止，再取消協程並等待已送出的呼叫跑完
+            self.behaviour_cancel.set()
+            if self.behaviour_task is not None and not self.behaviour_task.done():
+                self.behaviour_task.cancel()
+                await asyncio.wait([self.behaviour_task])
+            await self._drain_behaviour_calls()
+
+            await self._blocking(c['movement'].stop)
+            if c['rune_mode'].is_active:
+                await self._blocking(c['rune_mode'].exit)
+            if c['rope_climbing'].is_climbing:
+                await self._blocking(c['rope_climbing'].stop_climbing)
+
+            await self._channel_change_behaviour()
+            if c.get('player_locator') is not None:
+                c['player_locator'].reset()
+            await asyncio.sleep(2)
+        finally:
+            self.stats['channel_change'].record(time.time() - start)
+            self.not_changing_channel.set()
+
+    async def _channel_change_behaviour(self):
+        """換頻道流程（與 execute_channel_change 相同的步驟，以新畫面與計時器取代 sleep 輪詢）"""
+        import pyautogui
+
+        get_metrics().inc('channel_changes_total')
+        print("開始執行換頻道流程...")
+        change_templates = self.templates['change']
+        client_rect = self.window_info['screen_region']
+        change_order = ['change0', 'change1', 'change2', 'change3', 'change4', 'change5']
+
+        for i, change_name in enumerate(change_order, 1):
+            if change_name not in change_templates:
+                print(f"警告: 找不到 {change_name}.png 模板，跳過此步驟")
+                continue
+
+            template = change_templates[change_name]
+            print(f"步驟 {i}: 處理 {change_name}.png")
+
+            # 第一階段：等待圖片出現（最多 25 秒）
+            print(f"等待 {change_name}.png 出現...")
+            max_loc = await self._wait_for_template(template, 0.7, timeout=25.0)
+            if max_loc is None:
+                print(f"✗ 超時未找到 {change_name}.png，跳過此步驟")
+                continue
+
+            template_h, template_w = template.shape[:2]
+
+            if change_name == 'change0':
+                click_x = client_rect[0] + max_loc[0] + template_w // 2
+                click_y = client_rect[1] + max_loc[1] + template_h // 2
+                print(f"點擊 change0，位置: ({click_x}, {click_y})")
+                await self._blocking(pyautogui.click, click_x, click_y)
+                await asyncio.sleep(0.5)
+
+                if 'change0_1' in change_templates:
+                    print("等待 change0_1 出現...")
+                    if await self._wait_for_template(change_templates['change0_1'], 0.7, timeout=10.0) is None:
+                        print("⚠ change0_1 未出現，但繼續下一步")
+                else:
+                    print("未定義 change0_1 模板，跳過檢測")
+                    await asyncio.sleep(1)
+                continue
+
+            # change1~change5：點擊直到消失
+            print(f"開始點擊 {change_name}.png 直到消失...")
+            image_disappeared = False
+            for click_attempt in range(1, 201):
+                max_val, max_loc = await self._match_latest(template)
+                if max_val < 0.6:
+                    image_disappeared = True
+                    print(f"✓ {change_name}.png 已消失，點擊成功！")
+                    break
+
+                click_x = client_rect[0] + max_loc[0] + template_w // 2
+                click_y = client_rect[1] + max_loc[1] + template_h // 2
+                print(f"第 {click_attempt} 次點擊 {change_name}.png，位置: ({click_x}, {click_y}), 匹配度: {max_val:.3f}")
+                await self._blocking(pyautogui.click, click_x, click_y)
+                await asyncio.sleep(0.3)
+
+            if image_disappeared:
+                await asyncio.sleep(0.5)
+            else:
+                print(f"⚠ {change_name}.png 經過 200 次點擊仍未消失，可能需要手動處理")
+
+        print("換頻道流程完成")
+
+    async def _match_latest(self, template):
+        """在下一張新畫面上匹配模板，返回 (max_val, max_loc)"""
+        import cv2
+
+        frame = await self.frames.next(self.frames.latest)
+
+        def match():
+            result = cv2.matchTemplate(frame.image, template, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            return max_val, max_loc
+
+        return await self._blocking(match)
+
+    async def _wait_for_template(self, template, threshold, timeout, poll_interval=0.5):
+        """等待模板出現；返回位置或逾時返回 None"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            max_val, max_loc = await self._match_latest(template)
+            if max_val >= threshold:
+                print(f"✓ 找到模板 (匹配度: {max_val:.3f})")
+                return max_loc
+            await asyncio.sleep(poll_interval)
+        return None
+
+    # ------------------------------------------------------------------
+    # 統計
+    # ------------------------------------------------------------------
+
+    def get_stats(self):
+        return {
+            'behaviour': self.behaviour_name,
+            'cancelled_behaviours': self.cancelled_behaviours,
+            'drained_behaviour_calls': self.drained_behaviour_calls,
+            'frame_age': self.planner.frame_ages.snapshot(),
+            'tasks': {name: stats.snapshot() for name, stats in self.stats.items()},
+            'perf': get_perf_stats().snapshot(),
+        }
+
+    def print_stats(self):
+        stats = self.get_stats()
+        print("\n" + "=" * 60)
+        print(f"📊 非同步引擎統計 (目前行為: {stats['behaviour']}, 被搶占 {stats['cancelled_behaviours']} 次)")
+        for name, task in stats['tasks'].items():
+            print(f"   {name:>14}: {task['count']} 次, 平均 {task['avg_ms']:.1f}ms, 最大 {task['max_ms']:.1f}ms, 錯誤 {task['errors']}")
+        print(f"   {self.planner.frame_ages.format_summary()}")
+        print(f"   {get_tracer().format_summary()}")
+        print(get_perf_stats().format_summary())
+        print("=" * 60 + "\n")
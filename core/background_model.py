@@ -0,0 +1,223 @@
+"""
+背景模型模組 - 以每個鏡頭位置的背景估計產生前景遮罩，怪物匹配只在前景區塊內進行
+"""
+import os
+import time
+import cv2
+import numpy as np
+
+
+class BackgroundModel:
+    def __init__(self, map_name='default', save_dir=None):
+        self.map_name = map_name
+        self.save_dir = save_dir
+
+        # 縮小後的灰階畫面上建模，降低記憶體與運算量
+        self.scale = 0.25
+        self.bin_size = 2  # 小地圖標記每幾個像素為一個鏡頭位置
+        self.max_bins = 256
+
+        # 近似滑動中位數：每幀背景向目前畫面靠近固定步長
+        self.median_step = 4.0
+        self.min_samples = 8  # 背景需累積幾幀才開始使用
+
+        # 前景遮罩參數
+        self.foreground_threshold = 25
+        self.min_blob_area = 4  # 縮小後的像素面積
+        self.max_blob_ratio = 0.35  # 前景面積佔比過高表示背景未對齊，放棄使用
+        self.roi_padding = 20
+
+        # 殘餘鏡頭位移以相位相關補償
+        self.max_align_shift = 12
+        self.min_align_response = 0.1
+
+        # bin key -> {'background': float32, 'samples': int, 'last_used': float}
+        self.bins = {}
+        self.frame_shape = None
+
+        # 沒有提供小地圖標記時使用的標記定位器
+        self.marker_finder = None
+
+        # 統計
+        self.proposals = 0
+        self.fallbacks = 0
+        self.debug_background = False
+
+    def _bin_key(self, marker):
+        return int(marker[0] // self.bin_size), int(marker[1] // self.bin_size)
+
+    def _to_small_gray(self, screenshot):
+        gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY) if screenshot.ndim == 3 else screenshot
+        return cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def _find_marker(self, screenshot):
+        if self.marker_finder is None:
+            from core.minimap_locator import MinimapLocator
+            self.marker_finder = MinimapLocator()
+        marker = self.marker_finder.find_player_marker(screenshot)
+        if marker is not None:
+            self.marker_finder.last_marker = marker
+        return marker
+
+    def _align(self, small, background):
+        """補償同一個 bin 內的殘餘鏡頭位移，返回對齊後的背景"""
+        (shift_x, shift_y), response = cv2.phaseCorrelate(background, small)
+        if response < self.min_align_response:
+            return background
+        if abs(shift_x) > self.max_align_shift or abs(shift_y) > self.max_align_shift:
+            return background
+        if abs(shift_x) < 0.5 and abs(shift_y) < 0.5:
+            return background
+
+        matrix = np.float32([[1, 0, shift_x], [0, 1, shift_y]])
+        h, w = background.shape[:2]
+        return cv2.warpAffine(background, matrix, (w, h), borderMode=cv2.BORDER_REPLICATE)
+
+    def _evict_old_bins(self):
+        if len(self.bins) <= self.max_bins:
+            return
+        oldest = sorted(self.bins.items(), key=lambda item: item[1]['last_used'])
+        for key, _ in oldest[:len(self.bins) - self.max_bins]:
+            del self.bins[key]
+
+    def process(self, screenshot, marker=None):
+        """更新背景並返回前景候選區域 [(x1, y1, x2, y2), ...]（畫面座標）
+
+        背景尚未就緒或無法對齊時返回 None，呼叫端應退回完整檢測
+        """
+        if screenshot is None:
+            return None
+
+        if marker is None:
+            marker = self._find_marker(screenshot)
+        if marker is None:
+            self.fallbacks += 1
+            return None
+
+        small = self._to_small_gray(screenshot)
+        if self.frame_shape != small.shape:
+            # 視窗尺寸改變，舊背景全部失效
+            self.bins = {}
+            self.frame_shape = small.shape
+
+        key = self._bin_key(marker)
+        entry = self.bins.get(key)
+        now = time.time()
+
+        if entry is None:
+            self.bins[key] = {'background': small.copy(), 'samples': 1, 'last_used': now}
+            self._evict_old_bins()
+            self.fallbacks += 1
+            return None
+
+        entry['last_used'] = now
+        background = self._align(small, entry['background'])
+
+        rois = None
+        if entry['samples'] >= self.min_samples:
+            rois = self._extract_rois(small, background, screenshot.shape)
+
+        # 近似滑動中位數更新（前景物體只會讓背景緩慢偏移）
+        entry['background'] = background + self.median_step * np.sign(small - background)
+        entry['samples'] += 1
+
+        if rois is None:
+            self.fallbacks += 1
+        else:
+            self.proposals += 1
+        return rois
+
+    def _extract_rois(self, small, background, frame_shape):
+        diff = cv2.absdiff(small, background)
+        mask = (diff > self.foreground_threshold).astype(np.uint8)
+
+        if mask.mean() > self.max_blob_ratio:
+            if self.debug_background:
+                print(f"🧱 [調試] 前景比例過高 ({mask.mean():.2f})，改用完整檢測")
+            return None
+
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+        mask = cv2.dilate(mask, np.ones((3, 3), np.uint8))
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        frame_h, frame_w = frame_shape[:2]
+        inv = 1.0 / self.scale
+
+        rois = []
+        for label in range(1, count):
+            x, y, w, h, area = stats[label]
+            if area < self.min_blob_area:
+                continue
+            x1 = max(0, int(x * inv) - self.roi_padding)
+            y1 = max(0, int(y * inv) - self.roi_padding)
+            x2 = min(frame_w, int((x + w) * inv) + self.roi_padding)
+            y2 = min(frame_h, int((y + h) * inv) + self.roi_padding)
+            rois.append((x1, y1, x2, y2))
+
+        if self.debug_background:
+            print(f"🧱 [調試] 前景區塊: {len(rois)}")
+        return rois
+
+    def get_model_path(self):
+        if not self.save_dir:
+            return None
+        safe_name = "".join(c if c.isalnum() or c in '-_' else '_' for c in self.map_name)
+        return os.path.join(self.save_dir, f"{safe_name}.npz")
+
+    def save(self):
+        """將已就緒的背景存成 .npz（每張地圖一個檔案）"""
+        path = self.get_model_path()
+        if path is None:
+            return False
+
+        ready = [(key, entry) for key, entry in self.bins.items() if entry['samples'] >= self.min_samples]
+        if not ready:
+            return False
+
+        try:
+            os.makedirs(self.save_dir, exist_ok=True)
+            keys = np.array([key for key, _ in ready], dtype=np.int32)
+            backgrounds = np.stack([np.clip(entry['background'], 0, 255).astype(np.uint8) for _, entry in ready])
+            samples = np.array([entry['samples'] for _, entry in ready], dtype=np.int32)
+            np.savez_compressed(path, keys=keys, backgrounds=backgrounds, samples=samples,
+                                scale=self.scale, bin_size=self.bin_size)
+            print(f"💾 背景模型已儲存: {path} ({len(ready)} 個鏡頭位置)")
+            return True
+        except Exception as e:
+            print(f"⚠️ 背景模型儲存失敗: {e}")
+            return False
+
+    def load(self):
+        """載入先前儲存的背景模型，讓新的工作階段立即可用"""
+        path = self.get_model_path()
+        if path is None or not os.path.exists(path):
+            return False
+
+        try:
+            data = np.load(path)
+            if float(data['scale']) != self.scale or int(data['bin_size']) != self.bin_size:
+                print(f"⚠️ 背景模型參數不符，忽略: {path}")
+                return False
+
+            now = time.time()
+            self.bins = {}
+            for key, background, samples in zip(data['keys'], data['backgrounds'], data['samples']):
+                self.bins[(int(key[0]), int(key[1]))] = {
+                    'background': background.astype(np.float32),
+                    'samples': int(samples),
+                    'last_used': now,
+                }
+            self.frame_shape = data['backgrounds'].shape[1:] if len(self.bins) else None
+            print(f"✅ 背景模型已載入: {path} ({len(self.bins)} 個鏡頭位置)")
+            return True
+        except Exception as e:
+            print(f"⚠️ 背景模型載入失敗: {e}")
+            self.bins = {}
+            return False
+
+    def get_stats(self):
+        return {
+            'bins': len(self.bins),
+            'proposals': self.proposals,
+            'fallbacks': self.fallbacks,
+        }
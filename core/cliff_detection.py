@@ -1,87 +1,188 @@
 """
-斷層檢測模組 - 檢測角色是否遇到斷層
+斷層檢測模組 - 檢測角色是否遇到斷層 (改版 - 直接使用主循環畫面，預測前方斷層)
 """
 import time
 import random
 import cv2
 import numpy as np
-import pyautogui
 from config import JUMP_KEY
+from core.input_actuator import KeyTimeline, get_input_actuator, LEGACY_KEY_GAP
+from core.perf_stats import timed_call
 
 
 class CliffDetection:
     def __init__(self):
         self.last_check_time = 0
-        self.prev_screenshot = None
+        self.prev_screenshot = None  # 上一次檢測時角色前方的畫面區塊（從主循環畫面裁切）
         self.threshold = 5
+        self.check_interval = 0.1
+
+        # ★★★ 新增：地面輪廓預測參數 ★★★
+        self.profile_half_width = 120  # 以角色為中心，左右各掃描的像素
+        self.profile_depth = 60  # 從腳下往下掃描的深度
+        self.ground_edge_threshold = 30  # 垂直方向亮度變化閾值（地面上緣）
+        self.player_body_half_width = 35  # 角色本身（含名牌）佔用的半寬，不列入地面估計
+        self.edge_lookahead = 60  # 前方預測距離
+        self.max_ground_step = 12  # 視為同一層地面的最大高度落差
+        self.min_gap_width = 10  # 前方連續多少列沒有同層地面才視為斷層
+        self.action_cooldown = 0.8  # 執行斷層動作後的冷卻，避免連續觸發
+        self.last_action_time = 0
+        self.last_ground_profile = None
+
+    def estimate_ground_profile(self, screenshot, player_x, player_y, client_width, client_height, medal_template):
+        """★★★ 新增：估計角色附近的地面輪廓 - 每一列向下掃描第一個明顯的水平邊緣 ★★★
+
+        返回 (起始X, 每列地面Y陣列)，無地面的列為 -1
+        """
+        scan_top = max(0, min(player_y + medal_template.shape[0] - 20, client_height - 1))
+        scan_bottom = min(client_height, scan_top + self.profile_depth)
+        scan_left = max(0, player_x - self.profile_half_width)
+        scan_right = min(client_width, player_x + self.profile_half_width)
+
+        if scan_bottom - scan_top < 2 or scan_right <= scan_left:
+            return scan_left, None
+
+        strip = screenshot[scan_top:scan_bottom, scan_left:scan_right]
+        if strip.ndim == 3:
+            strip = cv2.cvtColor(strip, cv2.COLOR_BGR2GRAY)
+
+        # 向量化列掃描：垂直方向亮度差超過閾值的第一列即為地面上緣
+        row_diff = np.abs(np.diff(strip.astype(np.int16), axis=0))
+        edge_mask = row_diff > self.ground_edge_threshold
+        has_ground = edge_mask.any(axis=0)
+        first_edge = edge_mask.argmax(axis=0)
+
+        ground_rows = np.where(has_ground, first_edge + scan_top, -1)
+        self.last_ground_profile = (scan_left, ground_rows)
+        return scan_left, ground_rows
+
+    def predict_edge_ahead(self, ground_profile, player_x, movement_direction):
+        """★★★ 新增：根據地面輪廓預測移動方向前方是否有斷層 ★★★"""
+        scan_left, ground_rows = ground_profile
+        if ground_rows is None or movement_direction not in ('left', 'right'):
+            return False
+
+        columns = np.arange(ground_rows.size) + scan_left
+        offset = columns - player_x if movement_direction == 'right' else player_x - columns
+
+        # 腳下參考區（角色身體外側）與前方預測區
+        near_start = self.player_body_half_width
+        ahead_start = near_start + 15
+        near_zone = (offset > near_start) & (offset <= ahead_start)
+        ahead_zone = (offset > ahead_start) & (offset <= ahead_start + self.edge_lookahead)
+
+        near_ground = ground_rows[near_zone]
+        near_ground = near_ground[near_ground >= 0]
+        if near_ground.size == 0 or not ahead_zone.any():
+            return False
+
+        # 前方各列按距離排序，檢查是否出現連續一段沒有同層地面
+        ahead_order = np.argsort(offset[ahead_zone])
+        ahead_ground = ground_rows[ahead_zone][ahead_order]
+        if ahead_ground.size < self.min_gap_width:
+            return False
+
+        reference_y = np.median(near_ground)
+        gap_columns = (ahead_ground < 0) | (np.abs(ahead_ground - reference_y) > self.max_ground_step)
+        gap_runs = np.convolve(gap_columns.astype(np.int16), np.ones(self.min_gap_width, dtype=np.int16), mode='valid')
+        return bool((gap_runs >= self.min_gap_width).any())
 
     def check(self, current_time, screenshot, player_x, player_y, client_width, client_height, medal_template, movement_direction, client_x, client_y):
-        if current_time - self.last_check_time < 0.1:
+        if current_time - self.last_check_time < self.check_interval:
             return
 
         self.last_check_time = current_time
-        
-        # 改為角色前方一小塊區域
+
+        if screenshot is None:
+            return
+
+        self._check_ahead(current_time, screenshot, player_x, player_y, client_width, client_height, medal_template, movement_direction)
+
+    @timed_call('cliff')
+    def _check_ahead(self, current_time, screenshot, player_x, player_y, client_width, client_height, medal_template, movement_direction):
+        """實際的斷層檢測（check 已處理檢測間隔）"""
+        # 改為角色前方一小塊區域（從主循環畫面裁切，不再額外截圖）
         region_width = 50
         region_height = 30
-        
+
         # 根據移動方向調整檢測位置到角色前方
         if movement_direction == 'left':
             # 檢測角色左前方
-            region_x = client_x + player_x - region_width - 15
+            region_x = player_x - region_width - 15
         elif movement_direction == 'right':
-            # 檢測角色右前方  
-            region_x = client_x + player_x + 15
+            # 檢測角色右前方
+            region_x = player_x + 15
         else:
             # 不移動時檢測角色正下方
-            region_x = client_x + player_x - region_width // 2
-        
-        region_y = client_y + player_y + medal_template.shape[0] - 20
-        region_x = max(client_x, min(region_x, client_x + client_width - region_width))
-        region_y = max(client_y, min(region_y, client_y + client_height - region_height))
-        
+            region_x = player_x - region_width // 2
+
+        region_y = player_y + medal_template.shape[0] - 20
+        region_x = max(0, min(region_x, client_width - region_width))
+        region_y = max(0, min(region_y, client_height - region_height))
+
         try:
-            current_screenshot = pyautogui.screenshot(region=(region_x, region_y, region_width, region_height))
-            if current_screenshot is not None:
-                current_screenshot = cv2.cvtColor(np.array(current_screenshot), cv2.COLOR_RGB2BGR)
-                if self.prev_screenshot is not None:
-                    diff = cv2.absdiff(self.prev_screenshot, current_screenshot)
-                    mean_diff = cv2.mean(diff)[0]
-                    
-                    if mean_diff < 2.0 and movement_direction:
-                        random_value = random.random()
-                        
-                        if random_value < 0.2:
-                            action_choice = 1  # 反向移動
-                        else:
-                            action_choice = 2  # 跳躍
-                        
-                        # ★ 簡化斷層檢測輸出 ★
-                        print(f"🔍 檢測到斷層! 執行{'反向移動' if action_choice == 1 else '跳躍'}")
-                        
-                        if action_choice == 1:
-                            # 反方向移動邏輯保持不變...
-                            reverse_direction = 'right' if movement_direction == 'left' else 'left'
-                            reverse_duration = random.uniform(1.0, 1.5)
-                            
-                            pyautogui.keyUp(movement_direction)
-                            pyautogui.keyDown(reverse_direction)
-                            time.sleep(reverse_duration)
-                            pyautogui.keyUp(reverse_direction)
-                            pyautogui.keyDown(movement_direction)
-                            
-                        else:
-                            # 跳躍邏輯保持不變...
-                            pyautogui.keyUp(movement_direction)
-                            pyautogui.keyDown(JUMP_KEY)
-                            pyautogui.keyDown(movement_direction)
-                            time.sleep(0.03)
-                            pyautogui.keyUp(JUMP_KEY)
-                            pyautogui.keyUp(movement_direction)
-                            pyautogui.keyDown(movement_direction)
-                            
-                self.prev_screenshot = current_screenshot
-            else:
-                print("斷層檢測截圖失敗")
+            current_patch = screenshot[region_y:region_y + region_height, region_x:region_x + region_width].copy()
+            if current_patch.size == 0:
+                print("斷層檢測區域為空")
+                return
+
+            cliff_reason = None
+
+            # ★★★ 新增：地面輪廓預測 - 在角色卡住前就發現前方斷層 ★★★
+            if movement_direction and current_time - self.last_action_time >= self.action_cooldown:
+                ground_profile = self.estimate_ground_profile(
+                    screenshot, player_x, player_y, client_width, client_height, medal_template
+                )
+                if self.predict_edge_ahead(ground_profile, player_x, movement_direction):
+                    cliff_reason = "前方地面中斷"
+
+            # 原有邏輯：前方區塊靜止不變表示角色已卡住
+            if cliff_reason is None and self.prev_screenshot is not None and self.prev_screenshot.shape == current_patch.shape:
+                diff = cv2.absdiff(self.prev_screenshot, current_patch)
+                mean_diff = cv2.mean(diff)[0]
+
+                if mean_diff < 2.0 and movement_direction:
+                    cliff_reason = "角色停滯"
+
+            if cliff_reason is not None:
+                self._handle_cliff(movement_direction, cliff_reason)
+                self.last_action_time = time.time()
+                # 動作後畫面已改變，重新建立比較基準
+                self.prev_screenshot = None
+                return
+
+            self.prev_screenshot = current_patch
         except Exception as e:
-            print(f"斷層檢測錯誤: {e}")
\ No newline at end of file
+            print(f"斷層檢測錯誤: {e}")
+
+    def _handle_cliff(self, movement_direction, cliff_reason):
+        """執行斷層應對動作：反向移動或跳躍"""
+        random_value = random.random()
+
+        if random_value < 0.2:
+            action_choice = 1  # 反向移動
+        else:
+            action_choice = 2  # 跳躍
+
+        # ★ 簡化斷層檢測輸出 ★
+        print(f"🔍 檢測到斷層({cliff_reason})! 執行{'反向移動' if action_choice == 1 else '跳躍'}")
+
+        # ★★★ 改為提交按鍵時間軸，由按鍵執行器送出，主循環不再被 sleep 阻塞 ★★★
+        timeline = KeyTimeline('cliff', channel='cliff', key_gap=LEGACY_KEY_GAP)
+
+        if action_choice == 1:
+            reverse_direction = 'right' if movement_direction == 'left' else 'left'
+            reverse_duration = random.uniform(1.0, 1.5)
+
+            timeline.release(movement_direction)
+            timeline.down(reverse_direction).wait(reverse_duration).up(reverse_direction)
+
+        else:
+            timeline.release(movement_direction)
+            timeline.down(JUMP_KEY, movement_direction).wait(0.03)
+            timeline.up(JUMP_KEY, movement_direction)
+
+        # ★★★ 時間軸不再自行按回移動方向：結束（或被 Movement.stop/start、攻擊取消）後由移動模組重新按下 ★★★
+
+        # 上一個斷層動作尚未結束時不重複提交
+        get_input_actuator().submit(timeline, policy='skip')
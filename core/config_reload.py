@@ -0,0 +1,249 @@
+"""
+設定熱重載模組 - 比對新舊設定，只重建受影響的元件，並在兩次 tick 之間一次換上
+
+流程：request() 收集更新（可多次合併）→ apply_pending() 在 tick 邊界呼叫：
+1. 比對差異，沒有實際改變就不做任何事
+2. 準備階段：在不動到運行中元件的情況下建好新資料（例如只載入新增的怪物模板）
+3. 換上階段：寫入 config、重建設定快照、提交各元件的變更；任一準備失敗則整批放棄
+"""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+# 改變後需要重新啟動腳本才會生效的設定（會寫入 config，但不重建元件）
+RESTART_REQUIRED_KEYS = {
+    'ENGINE_MODE', 'PIPELINE_DETECTION_WORKERS', 'ASYNC_ENGINE_BLOCKING_WORKERS',
+    'MULTI_CLIENT_WORKERS', 'MULTI_CLIENT_REPLAY_SOURCES',
+    'ENABLE_RED_DOT_DETECTION', 'RED_DOT_PATH', 'ENABLE_MULTI_RED_DOT',
+    'PLAYER_LOCALIZATION_MODE', 'ENABLE_BACKGROUND_MODEL', 'BACKGROUND_MODEL_MAP', 'BACKGROUND_MODEL_DIR',
+    'ENABLE_ASYNC_DETECTION', 'IMAGE_PROCESSOR_POOL_SIZES', 'ASYNC_RESULT_MAX_AGE', 'ROPE_PATH',
+}
+
+
+class SwapGate:
+    """讀寫閘門 - 檢測期間持有讀取權，換上新資料時等待進行中的檢測結束"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._swapping = False
+
+    @contextmanager
+    def reading(self):
+        with self._condition:
+            while self._swapping:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def swapping(self):
+        with self._condition:
+            while self._swapping:
+                self._condition.wait()
+            self._swapping = True
+            while self._readers:
+                self._condition.wait()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._swapping = False
+                self._condition.notify_all()
+
+
+@dataclass
+class ReloadReport:
+    """一次熱重載的結果"""
+    changed: dict = field(default_factory=dict)  # key -> (舊值, 新值)
+    rebuilt: list = field(default_factory=list)  # 重建的元件與摘要
+    restart_required: list = field(default_factory=list)
+    prepare_ms: float = 0.0
+    swap_ms: float = 0.0
+    latency_ms: float = 0.0  # 從 request 到換上完成
+    error: str = None
+
+
+# ----------------------------------------------------------------------
+# 元件重建器：(元件名稱, 觸發的設定鍵, prepare(component, values) -> (commit, 摘要))
+# prepare 不得修改運行中的元件；commit 在 config 寫入與快照重建之後執行
+# ----------------------------------------------------------------------
+
+def _prepare_monster_detector(detector, values):
+    return detector.prepare_template_reload(values['ENABLED_MONSTERS'], values['MONSTER_BASE_PATH'])
+
+
+def _prepare_red_dot_detector(detector, values):
+    threshold = values['RED_DOT_RESET_THRESHOLD']
+
+    def commit():
+        detector.max_no_detections = threshold
+    return commit, f"消失重置閾值 {threshold} 次"
+
+
+def _prepare_random_down_jump(down_jump, values):
+    # load_config 直接讀取 config，提交時 config 已寫入新值
+    return down_jump.load_config, "重新載入下跳設定"
+
+
+def _prepare_player_locator(locator, values):
+    half_width = values['MINIMAP_REFINE_HALF_WIDTH']
+    half_height = values['MINIMAP_REFINE_HALF_HEIGHT']
+
+    def commit():
+        locator.configure(half_width, half_height)
+    return commit, f"精修窗口 {half_width}x{half_height}"
+
+
+REBUILDERS = [
+    ('monster_detector', ('ENABLED_MONSTERS', 'MONSTER_BASE_PATH'), _prepare_monster_detector),
+    ('red_dot_detector', ('RED_DOT_RESET_THRESHOLD',), _prepare_red_dot_detector),
+    ('random_down_jump', (
+        'ENABLE_RANDOM_DOWN_JUMP', 'RANDOM_DOWN_JUMP_MIN_INTERVAL', 'RANDOM_DOWN_JUMP_MAX_INTERVAL',
+        'DOWN_JUMP_HOLD_TIME', 'DOWN_JUMP_CHANCE', 'DOWN_JUMP_ONLY_WHEN_MOVING',
+        'DOWN_JUMP_AVOID_DURING_ATTACK', 'DOWN_JUMP_AVOID_DURING_CLIMBING',
+        'DOWN_JUMP_WITH_DIRECTION', 'DOWN_JUMP_RANDOM_DIRECTION',
+    ), _prepare_random_down_jump),
+    ('player_locator', ('MINIMAP_REFINE_HALF_WIDTH', 'MINIMAP_REFINE_HALF_HEIGHT'), _prepare_player_locator),
+]
+
+
+class ConfigReloader:
+    """設定熱重載器 - 收集更新並在 tick 邊界一次換上"""
+
+    def __init__(self, components, log=print):
+        self.components = components
+        self.log = log
+
+        self._pending = {}
+        self._requested_at = None
+        self._pending_lock = threading.Lock()
+        self._apply_lock = threading.Lock()
+
+        # 統計
+        self.reload_count = 0
+        self.failed_count = 0
+        self.max_swap_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.last_report = None
+
+    @property
+    def has_pending(self):
+        return bool(self._pending)
+
+    def request(self, updates):
+        """登記設定更新（任何線程皆可呼叫），實際套用在下一次 apply_pending"""
+        with self._pending_lock:
+            if not self._pending:
+                self._requested_at = time.time()
+            self._pending.update(updates)
+
+    def apply_pending(self):
+        """在 tick 邊界呼叫；沒有待套用的更新時返回 None"""
+        with self._pending_lock:
+            if not self._pending:
+                return None
+            updates, self._pending = self._pending, {}
+            requested_at, self._requested_at = self._requested_at, None
+        return self.apply(updates, requested_at)
+
+    def diff(self, updates):
+        """返回實際改變的設定 key -> (舊值, 新值)；未知的設定會被忽略"""
+        import config
+
+        changed = {}
+        for key, value in updates.items():
+            if not hasattr(config, key):
+                self.log(f"⚠️ 忽略未知設定: {key}")
+                continue
+            old_value = getattr(config, key)
+            if old_value != value:
+                changed[key] = (old_value, value)
+        return changed
+
+    def apply(self, updates, requested_at=None):
+        """比對、準備、換上；返回 ReloadReport，沒有實際改變時返回 None"""
+        import config
+        from core.config_snapshot import refresh_config_snapshot
+
+        requested_at = requested_at or time.time()
+        with self._apply_lock:
+            changed = self.diff(updates)
+            if not changed:
+                return None
+
+            report = ReloadReport(changed=changed)
+            report.restart_required = sorted(key for key in changed if key in RESTART_REQUIRED_KEYS)
+            values = {key: new for key, (_, new) in changed.items()}
+
+            def value_of(key):
+                return values[key] if key in values else getattr(config, key, None)
+
+            # 準備階段 - 運行中的元件不受影響
+            prepare_start = time.time()
+            commits = []
+            try:
+                for name, keys, prepare in REBUILDERS:
+                    component = self.components.get(name)
+                    if component is None or not any(key in changed for key in keys):
+                        continue
+                    commit, summary = prepare(component, {key: value_of(key) for key in keys})
+                    commits.append((name, commit, summary))
+            except Exception as e:
+                report.error = str(e)
+                report.prepare_ms = (time.time() - prepare_start) * 1000
+                self.failed_count += 1
+                self.last_report = report
+                self.log(f"❌ 設定熱重載失敗，保留原設定: {e}")
+                return report
+            report.prepare_ms = (time.time() - prepare_start) * 1000
+
+            # 換上階段
+            swap_start = time.time()
+            for key, value in values.items():
+                setattr(config, key, value)
+            refresh_config_snapshot()
+            if 'LOG_LEVEL' in changed or 'LOG_LEVELS' in changed:
+                from core.logger import apply_log_levels
+                apply_log_levels()
+                report.rebuilt.append("logger: 日誌等級")
+            for name, commit, summary in commits:
+                commit()
+                report.rebuilt.append(f"{name}: {summary}")
+            swap_end = time.time()
+
+            report.swap_ms = (swap_end - swap_start) * 1000
+            report.latency_ms = (swap_end - requested_at) * 1000
+            self.reload_count += 1
+            self.max_swap_ms = max(self.max_swap_ms, report.swap_ms)
+            self.max_latency_ms = max(self.max_latency_ms, report.latency_ms)
+            self.last_report = report
+
+        for key, (old_value, new_value) in changed.items():
+            self.log(f"⚙️ 配置已更新: {key} = {new_value} (原 {old_value})")
+        for line in report.rebuilt:
+            self.log(f"♻️ 已重建 {line}")
+        if report.restart_required:
+            self.log(f"⚠️ 以下設定需重新啟動腳本才會生效: {', '.join(report.restart_required)}")
+        self.log(f"✅ 設定熱重載完成: {len(changed)} 項變更, 準備 {report.prepare_ms:.1f}ms, "
+                 f"換上 {report.swap_ms:.2f}ms, 請求到生效 {report.latency_ms:.1f}ms")
+        return report
+
+    def get_stats(self):
+        last = self.last_report
+        return {
+            'reloads': self.reload_count,
+            'failed': self.failed_count,
+            'pending': len(self._pending),
+            'max_swap_ms': self.max_swap_ms,
+            'max_latency_ms': self.max_latency_ms,
+            'last_swap_ms': last.swap_ms if last else 0.0,
+            'last_latency_ms': last.latency_ms if last else 0.0,
+        }
@@ -0,0 +1,139 @@
+"""
+設定快照模組 - 熱路徑用到的設定值整理成唯讀快照，取代每次呼叫都執行 from config import
+
+快照只在設定實際改變時重建，並帶有版本號；元件透過 ConfigBinding 取得快照，
+版本改變時才重新計算由設定衍生的數值。
+"""
+import threading
+
+# 欄位名稱（與 config.py 相同）-> (型別, config 中沒有此項時的預設值)
+SNAPSHOT_FIELDS = {
+    # 基本檢測
+    'MATCH_THRESHOLD': (float, 0.7),
+    'Y_OFFSET': (int, 50),
+    'DETECTION_INTERVAL': (float, 0.01),
+
+    # 攻擊
+    'JUMP_KEY': (str, 'alt'),
+    'ATTACK_KEY': (str, 'z'),
+    'SECONDARY_ATTACK_KEY': (str, 'v'),
+    'ENABLE_SECONDARY_ATTACK': (bool, False),
+    'PRIMARY_ATTACK_CHANCE': (float, 1.0),
+    'SECONDARY_ATTACK_CHANCE': (float, 0.0),
+    'ATTACK_RANGE_X': (int, 400),
+    'JUMP_ATTACK_MODE': (str, 'original'),
+
+    # 怪物檢測
+    'MONSTER_MATCH_MODE': (str, 'ccoeff'),
+    'MIN_DETECTION_SIZE': (int, 200),
+    'MAX_DETECTION_SIZE': (int, 1000),
+    'SMALL_MONSTER_Y_TOLERANCE': (int, 30),
+    'MEDIUM_MONSTER_Y_TOLERANCE': (int, 45),
+    'LARGE_MONSTER_Y_TOLERANCE': (int, 70),
+    'Y_LAYER_THRESHOLD': (int, 300),
+
+    # 增強移動
+    'ENABLE_ENHANCED_MOVEMENT': (bool, True),
+    'ENABLE_JUMP_MOVEMENT': (bool, False),
+    'JUMP_MOVEMENT_CHANCE': (float, 0.05),
+    'ENABLE_DASH_MOVEMENT': (bool, True),
+    'DASH_MOVEMENT_CHANCE': (float, 0.7),
+    'DASH_SKILL_KEY': (str, 'x'),
+    'DASH_SKILL_COOLDOWN': (float, 3.0),
+    'MOVEMENT_PRIORITY': (tuple, ('jump', 'dash', 'normal')),
+    'ROPE_COOLDOWN_TIME': (float, 60.0),
+
+    # 紅點偵測
+    'RED_DOT_DETECTION_THRESHOLD': (float, 0.7),
+    'RED_DOT_RESET_THRESHOLD': (int, 3),
+    'RED_DOT_MIN_TIME': (float, 1.0),
+    'RED_DOT_MAX_TIME': (float, 2.0),
+}
+
+
+class ConfigSnapshot:
+    """唯讀設定快照 - 欄位見 SNAPSHOT_FIELDS，另有 version"""
+
+    __slots__ = ('version',) + tuple(SNAPSHOT_FIELDS)
+
+    def __init__(self, version, values):
+        object.__setattr__(self, 'version', version)
+        for name in SNAPSHOT_FIELDS:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"設定快照為唯讀，請修改 config 後呼叫 refresh_config_snapshot(): {name}")
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in SNAPSHOT_FIELDS}
+
+    def diff(self, other):
+        """返回與另一個快照數值不同的欄位名稱"""
+        if other is None:
+            return list(SNAPSHOT_FIELDS)
+        return [name for name in SNAPSHOT_FIELDS if getattr(self, name) != getattr(other, name)]
+
+
+def _coerce(name, value):
+    field_type, default = SNAPSHOT_FIELDS[name]
+    try:
+        if field_type is tuple:
+            return tuple(value)
+        return field_type(value)
+    except (TypeError, ValueError):
+        print(f"⚠️ 設定 {name}={value!r} 無法轉換為 {field_type.__name__}，使用預設值 {default!r}")
+        return default
+
+
+def _read_config_values():
+    import config
+
+    values = {}
+    for name, (_, default) in SNAPSHOT_FIELDS.items():
+        values[name] = _coerce(name, getattr(config, name, default))
+    return values
+
+
+_lock = threading.Lock()
+_current = None
+
+
+def get_config_snapshot():
+    """取得目前的設定快照（第一次呼叫時建立）"""
+    snapshot = _current
+    if snapshot is None:
+        snapshot = refresh_config_snapshot()
+    return snapshot
+
+
+def refresh_config_snapshot():
+    """依 config 模組目前的數值重建快照；數值沒有改變時保留原快照與版本號"""
+    global _current
+
+    values = _read_config_values()
+    with _lock:
+        if _current is not None and _current.as_dict() == values:
+            return _current
+        version = 1 if _current is None else _current.version + 1
+        _current = ConfigSnapshot(version, values)
+        return _current
+
+
+class ConfigBinding:
+    """元件持有的設定綁定 - 快照版本改變時才呼叫 rebind(snapshot) 重新計算衍生數值"""
+
+    __slots__ = ('snapshot', 'rebind')
+
+    def __init__(self, rebind=None):
+        self.rebind = rebind
+        self.snapshot = get_config_snapshot()
+        if rebind is not None:
+            rebind(self.snapshot)
+
+    def current(self):
+        snapshot = _current if _current is not None else get_config_snapshot()
+        if snapshot.version != self.snapshot.version:
+            self.snapshot = snapshot
+            if self.rebind is not None:
+                self.rebind(snapshot)
+        return snapshot
@@ -0,0 +1,312 @@
+"""
+無介面常駐模式 - 本機 JSON-RPC 控制埠
+
+不載入任何 GUI 元件（不 import tkinter / customtkinter），腳本線程與命令、狀態隊列沿用
+ScriptController 的協定。每個連線以換行分隔的 JSON-RPC 2.0 請求溝通，例如：
+
+    {"jsonrpc": "2.0", "id": 1, "method": "update_config", "params": {"config": {"DETECTION_INTERVAL": 0.05}}}
+
+可用方法：start, stop, status, stats, perf, latency, update_config, start_recording, stop_recording,
+         start_profiling, stop_profiling, profile, memory, logs, shutdown
+"""
+import json
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from core.script_controller import ScriptController
+
+# JSON-RPC 2.0 錯誤碼
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+UNAUTHORIZED = -32001
+
+
+class DaemonController(ScriptController):
+    """常駐模式控制器 - 由背景線程取出日誌與狀態，輸出到終端；最近的日誌保留在環形緩衝區"""
+
+    MODE_LABEL = '常駐模式'
+    ECHO_CAPTURED_LOG = False
+
+    def __init__(self):
+        super().__init__()
+        # 捕獲 print 時 sys.stdout 會被替換，終端輸出固定寫到啟動時的 stdout
+        self.console = sys.stdout
+        self.log_reader = self.log_ring.reader()
+        self.latest_stats = None
+        self.last_stats_time = 0.0
+
+        self.drain_thread = threading.Thread(target=self._drain_loop, name='daemon-drain', daemon=True)
+        self.drain_thread.start()
+
+    def _drain_loop(self):
+        """取出日誌與狀態；腳本運行中每 0.5 秒更新一次統計"""
+        while True:
+            try:
+                records = self.log_reader.drain()
+                missed = self.log_reader.take_missed()
+                if records or missed:
+                    lines = [record.message for record in records]
+                    if missed:
+                        lines.insert(0, f"⚠️ 日誌輸出跟不上，略過 {missed} 則")
+                    try:
+                        self.console.write('\n'.join(lines) + '\n')
+                        self.console.flush()
+                    except Exception:
+                        pass
+
+                while True:
+                    try:
+                        status_type, data = self.status_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if status_type == 'stats':
+                        self.latest_stats = data
+                        self.last_stats_time = time.time()
+
+                if self.is_running:
+                    self._update_script_stats()
+                    if time.time() - self.last_stats_time >= 0.5:
+                        self._send_stats()
+
+                time.sleep(0.1)
+
+            except Exception as e:
+                self.console.write(f"常駐模式隊列處理錯誤: {str(e)}\n")
+                time.sleep(1)
+
+    def update_config(self, updates):
+        """運行中交給命令隊列（tick 邊界熱重載），未運行時直接寫入 config"""
+        if self.is_running:
+            return self.send_command('update_config', config=updates)
+        self._update_config(updates)
+        return True
+
+    def get_logs(self, limit=100):
+        return [{'time': record.time, 'message': record.message} for record in self.log_ring.tail(limit)]
+
+
+class _RpcHandler(socketserver.StreamRequestHandler):
+    """一行一個請求，一行一個回應"""
+
+    def handle(self):
+        for raw in self.rfile:
+            line = raw.strip()
+            if not line:
+                continue
+            response = self.server.rpc.handle_line(line)
+            if response is not None:
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                self.wfile.flush()
+
+
+class _RpcServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class DaemonServer:
+    """常駐模式 JSON-RPC 伺服器"""
+
+    def __init__(self, controller, host='127.0.0.1', port=8765, token=''):
+        self.controller = controller
+        self.host = host
+        self.port = port
+        self.token = token
+        self.server = None
+        self.request_count = 0
+
+        self.methods = {
+            'start': self._rpc_start,
+            'stop': self._rpc_stop,
+            'status': self._rpc_status,
+            'stats': self._rpc_stats,
+            'perf': self._rpc_perf,
+            'latency': self._rpc_latency,
+            'update_config': self._rpc_update_config,
+            'start_recording': self._rpc_start_recording,
+            'stop_recording': self._rpc_stop_recording,
+            'start_profiling': self._rpc_start_profiling,
+            'stop_profiling': self._rpc_stop_profiling,
+            'profile': self._rpc_profile,
+            'memory': self._rpc_memory,
+            'logs': self._rpc_logs,
+            'shutdown': self._rpc_shutdown,
+        }
+
+    # ------------------------------------------------------------------
+    # 方法
+    # ------------------------------------------------------------------
+
+    def _rpc_start(self):
+        return {'started': self.controller.start_script(), 'running': self.controller.is_running}
+
+    def _rpc_stop(self):
+        return {'stopped': self.controller.stop_script(), 'running': self.controller.is_running}
+
+    def _rpc_status(self):
+        return {
+            'running': self.controller.is_running,
+            'status': self.controller.script_stats['current_status'],
+            'recording': bool(self.controller.frame_recorder and self.controller.frame_recorder.is_recording),
+            'profiling': bool(self.controller.profiler and self.controller.profiler.is_running),
+        }
+
+    def _rpc_stats(self):
+        stats = self.controller.get_script_stats()
+        stats['latest'] = self.controller.latest_stats
+        return stats
+
+    def _rpc_perf(self, reset=False):
+        """各階段耗時統計與文字摘要；reset 為真時回應後清除統計"""
+        from core.perf_stats import get_perf_stats
+        perf = get_perf_stats()
+        snapshot = perf.snapshot()
+        if reset:
+            perf.reset()
+        return {'summary': perf.format_summary(snapshot), 'stats': snapshot}
+
+    def _rpc_latency(self, limit=20):
+        """截圖到攻擊按鍵的延遲拆解與最近 limit 筆 trace"""
+        from core.tracing import get_tracer
+        tracer = get_tracer()
+        snapshot = tracer.snapshot(int(limit))
+        return {'summary': tracer.format_summary(snapshot), 'stats': snapshot}
+
+    def _rpc_update_config(self, config):
+        if not isinstance(config, dict):
+            raise TypeError("config 必須是物件")
+        return {'queued': self.controller.update_config(config)}
+
+    def _rpc_start_recording(self, output_dir=None, interval=None):
+        if not self.controller.is_running:
+            raise RuntimeError("腳本未運行，無法錄製畫面")
+        return {'queued': self.controller.start_recording(output_dir, interval)}
+
+    def _rpc_stop_recording(self):
+        return {'queued': self.controller.stop_recording()}
+
+    def _rpc_start_profiling(self, duration=None):
+        if not self.controller.is_running:
+            raise RuntimeError("腳本未運行，無法剖析")
+        return {'queued': self.controller.start_profiling(float(duration) if duration is not None else None)}
+
+    def _rpc_stop_profiling(self):
+        return {'queued': self.controller.stop_profiling()}
+
+    def _rpc_profile(self):
+        """剖析進度與最近一次的結果（檔案路徑、各狀態樣本數、函數列表）"""
+        profiler = self.controller.profiler
+        if profiler is None:
+            return {'profiling': False, 'result': None}
+        stats = profiler.get_stats()
+        if stats['result'] is not None:
+            stats['summary'] = profiler.format_result(stats['result'])
+        return stats
+
+    def _rpc_memory(self):
+        """長時間運行模式的記憶體報告（最近一次快照、熱點與緩衝池統計）"""
+        from core.long_run import get_pool_stats
+        monitor = self.controller.memory_monitor
+        if monitor is None:
+            return {'running': False, 'latest': None, 'pools': get_pool_stats()}
+        stats = monitor.get_stats()
+        if stats['latest'] is not None:
+            stats['summary'] = monitor.format_summary(stats['latest'], limit=10)
+        return stats
+
+    def _rpc_logs(self, limit=100):
+        return self.controller.get_logs(int(limit))
+
+    def _rpc_shutdown(self):
+        if self.controller.is_running:
+            self.controller.stop_script()
+        # 在另一個線程關閉，讓本次回應能先送出
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+        return {'shutdown': True}
+
+    # ------------------------------------------------------------------
+    # 協定
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _error(request_id, code, message):
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+    def handle_line(self, line):
+        """處理一行請求，返回回應物件；通知（沒有 id）返回 None"""
+        try:
+            request = json.loads(line)
+        except (ValueError, UnicodeDecodeError) as e:
+            return self._error(None, PARSE_ERROR, f"無法解析 JSON: {e}")
+        return self.handle_request(request)
+
+    def handle_request(self, request):
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return self._error(None, INVALID_REQUEST, "請求必須是包含 method 的物件")
+
+        request_id = request.get('id')
+        self.request_count += 1
+
+        if self.token and request.get('token') != self.token:
+            return self._error(request_id, UNAUTHORIZED, "token 錯誤")
+
+        method = self.methods.get(request['method'])
+        if method is None:
+            return self._error(request_id, METHOD_NOT_FOUND, f"未知的方法: {request['method']}")
+
+        params = request.get('params') or {}
+        try:
+            if isinstance(params, dict):
+                result = method(**params)
+            elif isinstance(params, list):
+                result = method(*params)
+            else:
+                return self._error(request_id, INVALID_PARAMS, "params 必須是物件或陣列")
+        except TypeError as e:
+            return self._error(request_id, INVALID_PARAMS, str(e))
+        except Exception as e:
+            return self._error(request_id, SERVER_ERROR, str(e))
+
+        if 'id' not in request:
+            return None
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+    # ------------------------------------------------------------------
+    # 執行
+    # ------------------------------------------------------------------
+
+    def serve_forever(self):
+        """阻塞執行直到收到 shutdown 或 Ctrl+C"""
+        self.server = _RpcServer((self.host, self.port), _RpcHandler)
+        self.server.rpc = self
+        self.port = self.server.server_address[1]
+        print(f"🛰️ 常駐模式已啟動，控制埠 {self.host}:{self.port}"
+              f"{'（需要 token）' if self.token else ''}")
+        try:
+            self.server.serve_forever(poll_interval=0.2)
+        finally:
+            self.server.server_close()
+            self.controller.cleanup()
+            print("🏁 常駐模式已結束")
+
+
+def rpc_call(method, params=None, host='127.0.0.1', port=8765, token='', timeout=10.0):
+    """對常駐模式送出一個請求並返回回應物件"""
+    request = {'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params or {}}
+    if token:
+        request['token'] = token
+
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("常駐模式沒有回應")
+    return json.loads(line)
@@ -0,0 +1,427 @@
+"""
+主循環引擎模組 - main.py 與 GUI 共用的單一主循環實作
+
+Engine.step(frame) 處理一張畫面；GUI 命令、統計、日誌透過 EngineHooks 接入，
+兩種執行方式跑的是同一份邏輯，效能改進與基準測試同時涵蓋兩者。
+"""
+import time
+
+from core.metrics import get_metrics
+from core.perf_stats import get_perf_stats
+from core.pipeline import Frame, FrameAgeTracker, StageStats
+from core.scheduler import FrameScheduler
+from core.tracing import activate, get_tracer
+
+
+class EngineHooks:
+    """引擎掛鉤 - 預設行為與 main.py 相同（print 輸出、錯誤直接拋出）"""
+
+    def log(self, message):
+        print(message)
+
+    def on_tick(self, engine):
+        """每個循環開始時呼叫（GUI 在此處理命令）"""
+
+    def should_stop(self, engine):
+        return False
+
+    def on_detection(self, engine):
+        """檢測到怪物並攻擊時呼叫"""
+
+    def on_stats(self, engine):
+        """定期統計時呼叫"""
+        engine.print_stats()
+
+    def on_perf_summary(self, engine):
+        """定期輸出各階段耗時摘要（config.PERF_SUMMARY_INTERVAL）"""
+        print(get_perf_stats().format_summary())
+
+    def on_error(self, engine, error):
+        """單次循環發生錯誤；返回 True 繼續執行，否則拋出"""
+        return False
+
+
+class Engine:
+    """主循環引擎 - 狀態機與 main_loop 相同，每次 step 處理一張畫面"""
+
+    # step 的結果；只有完整跑完一個循環才需要等待 DETECTION_INTERVAL
+    TICK = 'tick'
+
+    def __init__(self, window_info, templates, components, hooks=None):
+        self.window_info = window_info
+        self.templates = templates
+        self.components = components
+        self.hooks = hooks or EngineHooks()
+
+        self.player_x = window_info['client_width'] // 2
+        self.player_y = window_info['client_height'] // 2
+        self.last_monster_detection_time = 0
+        self.last_rope_detection_time = 0
+        self.rope_detection_interval = 1.0
+
+        # 怪物清理狀態追踪
+        self.no_monster_time = 0
+        self.required_clear_time = 1.5
+
+        self.is_attacking = False
+        self.attack_end_time = 0
+
+        # 性能統計
+        self.loop_count = 0
+        self.frame_seq = 0
+        self.stats_print_interval = 300
+        self.step_stats = StageStats('step')
+        self.outcomes = {}
+
+        # ★★★ 新增：畫面年齡追踪，過時畫面不做昂貴檢測 ★★★
+        import config
+        self.frame_ages = FrameAgeTracker(config.FRAME_MAX_AGE, config.FRAME_MAX_CONSECUTIVE_DROPS)
+
+        # ★★★ 新增：週期性子系統交給幀預算排程器，tick 結束後只執行放得下的到期任務 ★★★
+        self.last_frame = None
+        self.medal_visible = False  # 本幀在一般模式下看到角色（斷層、繩索檢測的前提）
+        self.scheduler = self._create_scheduler()
+
+    def _create_scheduler(self):
+        import config
+
+        c = self.components
+        scheduler = FrameScheduler(config.SCHEDULER_FRAME_BUDGET_MS / 1000, log=self.hooks.log)
+        # 優先級：斷層檢測 > 繩索檢測 > 被動技能 > 統計
+        scheduler.register('cliff', self._cliff_task, c['cliff_detection'].check_interval, priority=3)
+        scheduler.register('rope', self._rope_task, self.rope_detection_interval, priority=2)
+        if c.get('passive_skills'):
+            scheduler.register('passive_skills', c['passive_skills'].check_and_use_skills, 0.5, priority=1)
+        scheduler.register('stats', lambda: self.hooks.on_stats(self), self.stats_print_interval, priority=0)
+        if config.PERF_SUMMARY_INTERVAL > 0:
+            scheduler.register('perf_summary', lambda: self.hooks.on_perf_summary(self),
+                               config.PERF_SUMMARY_INTERVAL, priority=0)
+        return scheduler
+
+    # ------------------------------------------------------------------
+    # 執行
+    # ------------------------------------------------------------------
+
+    def capture(self):
+        """截取一張畫面；失敗返回 None"""
+        from core.utils import capture_screen
+
+        trace = get_tracer().begin()
+        frame_time = time.time()
+        image = capture_screen(self.window_info['screen_region'])
+        if image is None:
+            return None
+        trace.mark('captured')
+        self.frame_seq += 1
+        return Frame(self.frame_seq, frame_time, image, trace)
+
+    def run(self):
+        """阻塞執行直到 hooks.should_stop() 為真"""
+        import config
+
+        while True:
+            self.loop_count += 1
+            self.hooks.on_tick(self)
+            if self.hooks.should_stop(self):
+                break
+
+            try:
+                frame = self.capture()
+                if frame is None:
+                    continue
+
+                outcome = self.step(frame)
+                self.scheduler.run_due()
+
+                if outcome == self.TICK:
+                    time.sleep(config.DETECTION_INTERVAL)
+
+            except Exception as e:
+                if not self.hooks.on_error(self, e):
+                    raise
+                time.sleep(1)
+
+    def step(self, frame):
+        """處理一張畫面，返回本次循環的結果名稱"""
+        start = time.time()
+        # 檢測、決策與攻擊都在本線程依序執行；怪物檢測器與攻擊函數標記其餘的時間點
+        with activate(frame.trace):
+            if frame.trace is not None:
+                frame.trace.mark('detect_start')
+            outcome = self._step(frame)
+        elapsed = time.time() - start
+        self.step_stats.record(elapsed)
+        get_perf_stats().record('step', elapsed)
+        get_metrics().inc('loop_ticks_total', engine='loop')
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        return outcome
+
+    def _step(self, frame):
+        import config
+        from core.utils import detect_sign_text, detect_rune_text, find_player_medal
+
+        c = self.components
+        wi = self.window_info
+        screenshot = frame.image
+        current_time = time.time()
+        self.last_frame = frame
+        self.medal_visible = False
+
+        # 紅點偵測檢查
+        if c.get('red_dot_detector') is not None:
+            should_change_channel = c['red_dot_detector'].handle_red_dot_detection(
+                screenshot, wi['client_width'], wi['client_height']
+            )
+            if should_change_channel:
+                self._change_channel()
+                return 'channel_change'
+
+        # 如果不在特殊模式中
+        if not c['rune_mode'].is_active and not c['rope_climbing'].is_climbing:
+            # 截圖後已耽擱太久（例如上一輪按鍵或排程任務太慢），直接換最新畫面
+            if not self.frame_ages.is_fresh(frame, 'detect'):
+                return 'stale'
+
+            # 非同步後端時 sign / rune / 角色三項檢測並行
+            image_processor = c.get('image_processor')
+            if image_processor is not None:
+                sign_result, rune_result, medal_result = image_processor.detect_frame(screenshot, frame.timestamp)
+                if not self.frame_ages.accept(not image_processor.is_stale(frame.timestamp), 'async_detect'):
+                    # 檢測太慢，畫面已過時，不依舊畫面行動（連續過時達上限時照常處理）
+                    return 'stale'
+            else:
+                sign_result = rune_result = medal_result = None
+
+            # 檢測 sign_text
+            sign_found, sign_loc, sign_val = sign_result or detect_sign_text(screenshot, self.templates['sign'])
+            if sign_found:
+                self.hooks.log(f"檢測到 sign_text (匹配度 {sign_val:.2f})，進入 Rune 模式")
+                c['rune_mode'].enter()
+                c['movement'].stop()
+                return 'enter_rune'
+
+            # 直接檢測 rune_text
+            rune_found, rune_loc, rune_val = rune_result or detect_rune_text(screenshot, self.templates['rune'], config.MATCH_THRESHOLD)
+            if rune_found:
+                self.hooks.log(f"直接檢測到 rune_text (匹配度 {rune_val:.2f})，立即進入 Rune 模式")
+                c['rune_mode'].enter()
+                c['movement'].stop()
+                return 'enter_rune'
+
+            # 角色檢測
+            medal_found, medal_loc, match_val = medal_result or find_player_medal(
+                screenshot, self.templates['medal'], config.MATCH_THRESHOLD, c.get('player_locator')
+            )
+            # 搜尋掃描進行中：每幀回報角色檢測結果（找到即停止掃描並恢復移動）
+            c['search'].update_search(medal_found, match_val)
+
+            if medal_found:
+                template_height, template_width = self.templates['medal'].shape[:2]
+                self.player_x = medal_loc[0] + template_width // 2
+                self.player_y = medal_loc[1] + template_height // 2 - config.Y_OFFSET
+                c['search'].last_medal_found_time = time.time()
+                c['search'].medal_lost_count = 0
+                self.medal_visible = True
+
+                # 角色檢測後畫面已過時：不依舊位置做怪物檢測與攻擊
+                if not self.frame_ages.is_fresh(frame, 'monster'):
+                    return 'stale'
+                self._handle_combat(frame, current_time)
+
+            else:
+                self.no_monster_time = 0
+
+                # 搜尋角色
+                c['search'].medal_lost_count += 1
+                if c['search'].medal_lost_count >= 5 and not c['search'].is_searching:
+                    c['search'].search_for_medal(
+                        wi['screen_region'], self.templates['medal'], config.MATCH_THRESHOLD, c['movement']
+                    )
+
+        elif c['rope_climbing'].is_climbing:
+            # 爬繩邏輯
+            medal_found, medal_loc, match_val = find_player_medal(
+                screenshot, self.templates['medal'], config.MATCH_THRESHOLD, c.get('player_locator')
+            )
+            if medal_found:
+                template_height, template_width = self.templates['medal'].shape[:2]
+                self.player_x = medal_loc[0] + template_width // 2
+                self.player_y = medal_loc[1] + template_height // 2 - config.Y_OFFSET
+
+            c['rope_climbing'].update_climbing(
+                screenshot, self.player_x, self.player_y,
+                wi['client_width'], wi['client_height'],
+                self.templates['medal'], wi['client_x'], wi['client_y']
+            )
+
+        elif c['rune_mode'].is_active:
+            # rune模式邏輯
+            c['rune_mode'].handle(
+                screenshot, wi['screen_region'],
+                self.templates['medal'], self.templates['rune'],
+                self.templates['direction'], self.templates['direction_masks'],
+                wi['client_width'], wi['client_height'],
+                c['search'], c['cliff_detection'],
+                wi['client_x'], wi['client_y'],
+                c['movement'], self.templates['change']
+            )
+
+        # 移動狀態更新
+        movement_completed = c['movement'].update()
+        if (movement_completed and not c['search'].is_searching and
+                c['search'].medal_lost_count == 0 and
+                not c['rune_mode'].is_active and
+                not c['rope_climbing'].is_climbing):
+            c['movement'].transition(
+                screenshot, self.player_x, self.player_y,
+                wi['client_width'], wi['client_height'],
+                self._scan_detector(frame)
+            )
+
+        self.frame_ages.record_decision(frame)
+        return self.TICK
+
+    def _scan_detector(self, frame):
+        """遠距掃描用的檢測器；畫面已過時返回 None，移動改用偏好/隨機方向"""
+        if self.frame_ages.is_fresh(frame, 'scan'):
+            return self.components['monster_detector']
+        return None
+
+    def _handle_combat(self, frame, current_time):
+        """怪物檢測、清理狀態追踪與隨機移動（繩索檢測由排程器執行）"""
+        import config
+
+        c = self.components
+        wi = self.window_info
+        screenshot = frame.image
+        player_x, player_y = self.player_x, self.player_y
+
+        # 怪物檢測
+        monster_found = False
+        if not c['search'].is_searching and current_time - self.last_monster_detection_time >= config.DETECTION_INTERVAL:
+            candidate_rois = None
+            if c.get('background_model') is not None:
+                locator = c.get('player_locator')
+                candidate_rois = c['background_model'].process(screenshot, locator.last_marker if locator is not None else None)
+            monster_found = c['monster_detector'].detect_monsters(
+                screenshot, player_x, player_y, wi['client_width'], wi['client_height'],
+                c['movement'], c['cliff_detection'], wi['client_x'], wi['client_y'],
+                candidate_rois
+            )
+            self.last_monster_detection_time = current_time
+
+            if monster_found:
+                self.is_attacking = True
+                self.attack_end_time = current_time + 0.2
+                self.hooks.on_detection(self)
+
+        # 更新攻擊狀態
+        if self.is_attacking and current_time > self.attack_end_time:
+            self.is_attacking = False
+
+        # 怪物清理狀態追踪
+        if monster_found:
+            self.no_monster_time = current_time
+        elif self.no_monster_time == 0:
+            self.no_monster_time = current_time
+
+        # 隨機移動
+        if not monster_found and not c['movement'].is_moving:
+            c['movement'].start(
+                screenshot, player_x, player_y, wi['client_width'], wi['client_height'],
+                self._scan_detector(frame)
+            )
+
+    # ------------------------------------------------------------------
+    # 排程任務
+    # ------------------------------------------------------------------
+
+    def _cliff_task(self):
+        """移動中的斷層檢測"""
+        c = self.components
+        wi = self.window_info
+        if not (self.medal_visible and c['movement'].is_moving):
+            return
+        if not self.frame_ages.is_fresh(self.last_frame, 'cliff'):
+            return
+        c['cliff_detection'].check(
+            time.time(), self.last_frame.image, self.player_x, self.player_y,
+            wi['client_width'], wi['client_height'],
+            self.templates['medal'], c['movement'].direction,
+            wi['client_x'], wi['client_y']
+        )
+
+    def _rope_task(self):
+        """區域清理乾淨一段時間後檢測繩索，找到即開始爬繩"""
+        c = self.components
+        wi = self.window_info
+        current_time = time.time()
+        if not self.medal_visible or not self.no_monster_time:
+            return
+        if current_time - self.no_monster_time < self.required_clear_time:
+            return
+        if not self.frame_ages.is_fresh(self.last_frame, 'rope'):
+            return
+
+        rope_found, rope_x, rope_y = c['rope_climbing'].detect_rope(
+            self.last_frame.image, self.player_x, self.player_y, wi['client_width'], wi['client_height']
+        )
+        self.last_rope_detection_time = current_time
+
+        if rope_found:
+            self.hooks.log("✅ 區域已清理乾淨，檢測到繩索，開始爬繩邏輯")
+            c['movement'].stop()
+            c['rope_climbing'].start_climbing(rope_x, rope_y, self.player_x, self.player_y)
+            self.no_monster_time = 0
+            self.medal_visible = False
+            self.outcomes['start_climb'] = self.outcomes.get('start_climb', 0) + 1
+
+    def _change_channel(self):
+        from core.utils import execute_channel_change
+
+        c = self.components
+        self.hooks.log("🚨 紅點偵測觸發換頻邏輯！")
+        c['movement'].stop()
+        if c['rune_mode'].is_active:
+            c['rune_mode'].exit()
+        if c['rope_climbing'].is_climbing:
+            c['rope_climbing'].stop_climbing()
+
+        execute_channel_change(self.window_info['screen_region'], self.templates['change'])
+        if c.get('player_locator') is not None:
+            c['player_locator'].reset()
+        time.sleep(2)
+
+    # ------------------------------------------------------------------
+    # 統計
+    # ------------------------------------------------------------------
+
+    def get_stats(self):
+        return {
+            'loop_count': self.loop_count,
+            'step': self.step_stats.snapshot(),
+            'outcomes': dict(self.outcomes),
+            'scheduler': self.scheduler.get_stats(),
+            'frame_age': self.frame_ages.snapshot(),
+            'perf': get_perf_stats().snapshot(),
+        }
+
+    def print_stats(self):
+        from core.utils import get_attack_key_info
+
+        step = self.step_stats.snapshot()
+        print("\n" + "=" * 60)
+        print(f"📊 運行統計 (循環次數: {self.loop_count})")
+        print(f"⏱️ 每次 step 平均 {step['avg_ms']:.1f}ms, 最大 {step['max_ms']:.1f}ms")
+
+        attack_info = get_attack_key_info()
+        if attack_info['secondary_enabled']:
+            print(f"🎯 攻擊按鍵: {attack_info['primary_key']}({attack_info['primary_chance']*100:.0f}%), {attack_info['secondary_key']}({attack_info['secondary_chance']*100:.0f}%)")
+        else:
+            print(f"🎯 攻擊按鍵: {attack_info['primary_key']} (僅主要攻擊)")
+
+        print(self.frame_ages.format_summary())
+        print(get_tracer().format_summary())
+        print(get_perf_stats().format_summary())
+        self.scheduler.print_stats()
+        print("=" * 60 + "\n")
@@ -3,8 +3,12 @@
 """
 import time
 import random
-import pyautogui
 from config import JUMP_KEY
+from core.config_snapshot import ConfigBinding
+from core.input_actuator import get_input_actuator, MOVEMENT_OWNER
+from core.logger import get_logger
+
+log = get_logger('enhanced_movement')
 
 
 class EnhancedMovement:
@@ -13,28 +17,30 @@ class EnhancedMovement:
         self.last_jump_time = 0  # 上次跳躍的時間
         self.current_keys_pressed = []  # 當前按下的按鍵列表
         self.protected_keys = []  # 受保護的按鍵（攻擊時不會被釋放）
+        self.config = ConfigBinding()  # ★ 新增：設定快照綁定
+        # ★★★ 新增：按鍵經由按鍵執行器送出，與斷層等時間軸共用按鍵狀態 ★★★
+        self.actuator = get_input_actuator()
+        self.key_owner = MOVEMENT_OWNER
         
     def can_use_dash(self):
         """檢查是否可以使用位移技能（冷卻檢查）"""
-        # 導入配置（避免循環導入）
-        from config import ENABLE_ENHANCED_MOVEMENT, ENABLE_DASH_MOVEMENT, DASH_SKILL_COOLDOWN
+        cfg = self.config.current()
         
-        if not ENABLE_ENHANCED_MOVEMENT or not ENABLE_DASH_MOVEMENT:
+        if not cfg.ENABLE_ENHANCED_MOVEMENT or not cfg.ENABLE_DASH_MOVEMENT:
             return False
         
         current_time = time.time()
-        if current_time - self.last_dash_time < DASH_SKILL_COOLDOWN:
-            remaining = DASH_SKILL_COOLDOWN - (current_time - self.last_dash_time)
-            print(f"🕒 位移技能冷卻中，剩餘 {remaining:.1f} 秒")
+        if current_time - self.last_dash_time < cfg.DASH_SKILL_COOLDOWN:
+            log.debug("🕒 位移技能冷卻中，剩餘 %.1f 秒", cfg.DASH_SKILL_COOLDOWN - (current_time - self.last_dash_time),
+                      key='dash_cooldown')
             return False
         return True
     
     def can_jump(self):
         """檢查是否可以跳躍（避免跳躍過於頻繁）"""
-        # 導入配置（避免循環導入）
-        from config import ENABLE_ENHANCED_MOVEMENT, ENABLE_JUMP_MOVEMENT
+        cfg = self.config.current()
         
-        if not ENABLE_ENHANCED_MOVEMENT or not ENABLE_JUMP_MOVEMENT:
+        if not cfg.ENABLE_ENHANCED_MOVEMENT or not cfg.ENABLE_JUMP_MOVEMENT:
             return False
         
         current_time = time.time()
@@ -45,11 +51,9 @@ class EnhancedMovement:
     
     def determine_movement_type(self):
         """決定移動類型：normal, jump, dash"""
-        # 導入配置（避免循環導入）
-        from config import (ENABLE_ENHANCED_MOVEMENT, ENABLE_JUMP_MOVEMENT, ENABLE_DASH_MOVEMENT,
-                           MOVEMENT_PRIORITY, JUMP_MOVEMENT_CHANCE, DASH_MOVEMENT_CHANCE)
+        cfg = self.config.current()
         
-        if not ENABLE_ENHANCED_MOVEMENT:
+        if not cfg.ENABLE_ENHANCED_MOVEMENT:
             return 'normal'
         
         # 生成隨機數決定移動類型
@@ -58,26 +62,26 @@ class EnhancedMovement:
         # 檢查各種移動類型的可用性
         available_types = ['normal']  # 普通移動總是可用
         
-        if ENABLE_JUMP_MOVEMENT and self.can_jump():
+        if cfg.ENABLE_JUMP_MOVEMENT and self.can_jump():
             available_types.append('jump')
         
-        if ENABLE_DASH_MOVEMENT and self.can_use_dash():
+        if cfg.ENABLE_DASH_MOVEMENT and self.can_use_dash():
             available_types.append('dash')
         
         # 根據優先級和機率決定移動類型
         cumulative_chance = 0
         
         # 計算各類型的實際機率
-        for movement_type in MOVEMENT_PRIORITY:
+        for movement_type in cfg.MOVEMENT_PRIORITY:
             if movement_type not in available_types:
                 continue
                 
             if movement_type == 'jump':
-                cumulative_chance += JUMP_MOVEMENT_CHANCE
+                cumulative_chance += cfg.JUMP_MOVEMENT_CHANCE
                 if random_value < cumulative_chance:
                     return 'jump'
             elif movement_type == 'dash':
-                cumulative_chance += DASH_MOVEMENT_CHANCE
+                cumulative_chance += cfg.DASH_MOVEMENT_CHANCE
                 if random_value < cumulative_chance:
                     return 'dash'
         
@@ -97,25 +101,25 @@ class EnhancedMovement:
         
         if movement_type == 'normal':
             # 普通移動：只按方向鍵
-            pyautogui.keyDown(direction)
+            self.actuator.hold_key(direction, self.key_owner)
             self.current_keys_pressed = [direction]
             print(f"✅ 普通移動設置完成: {self.current_keys_pressed}")
             
         elif movement_type == 'jump':
             # 跳躍移動：持續按住方向鍵 + 空白鍵
             print(f"🦘 持續跳躍移動: {direction} + JUMP_KEY (持續按住)")
-            pyautogui.keyDown(direction)
-            pyautogui.keyDown(JUMP_KEY)
+            self.actuator.hold_key(direction, self.key_owner)
+            self.actuator.hold_key(JUMP_KEY, self.key_owner)
             self.current_keys_pressed = [direction, JUMP_KEY]
             self.last_jump_time = time.time()
             print(f"✅ 跳躍移動設置完成: {self.current_keys_pressed}")
             
         elif movement_type == 'dash':
             # 位移技能移動：持續按住方向鍵 + 位移技能鍵
-            from config import DASH_SKILL_KEY
+            DASH_SKILL_KEY = self.config.current().DASH_SKILL_KEY
             print(f"⚡ 持續位移技能移動: {direction} + {DASH_SKILL_KEY} (持續按住)")
-            pyautogui.keyDown(direction)
-            pyautogui.keyDown(DASH_SKILL_KEY)
+            self.actuator.hold_key(direction, self.key_owner)
+            self.actuator.hold_key(DASH_SKILL_KEY, self.key_owner)
             self.current_keys_pressed = [direction, DASH_SKILL_KEY]
             self.last_dash_time = time.time()
             print(f"✅ 位移技能移動設置完成: {self.current_keys_pressed}")
@@ -141,7 +145,7 @@ class EnhancedMovement:
         for key in keys_to_release:
             try:
                 print(f"🔓 正在釋放按鍵: {key}")
-                pyautogui.keyUp(key)
+                self.actuator.release_key(key, self.key_owner)
                 
                 # 短暫等待確保按鍵釋放生效
                 time.sleep(0.01)
@@ -166,7 +170,7 @@ class EnhancedMovement:
             # 強制清理
             for remaining_key in self.current_keys_pressed[:]:
                 try:
-                    pyautogui.keyUp(remaining_key)
+                    self.actuator.release_key(remaining_key, self.key_owner)
                     print(f"🚨 強制釋放遺漏按鍵: {remaining_key}")
                 except:
                     pass
@@ -210,22 +214,30 @@ class EnhancedMovement:
             if current_time - self.last_jump_time > 0.8:  # 每0.8秒重新跳躍
                 if JUMP_KEY in self.current_keys_pressed:
                     print("🦘 重新觸發跳躍")
-                    pyautogui.keyUp(JUMP_KEY)
+                    self.actuator.release_key(JUMP_KEY, self.key_owner)
                     time.sleep(0.05)  # 短暫釋放
-                    pyautogui.keyDown(JUMP_KEY)
+                    self.actuator.hold_key(JUMP_KEY, self.key_owner)
                     self.last_jump_time = current_time
                     
         elif movement_type == 'dash':
             # 位移技能移動中，檢查是否需要重新觸發技能
-            from config import DASH_SKILL_KEY
+            DASH_SKILL_KEY = self.config.current().DASH_SKILL_KEY
             if current_time - self.last_dash_time > 1.0:  # 每1秒重新觸發位移技能
                 if DASH_SKILL_KEY in self.current_keys_pressed:
                     print("⚡ 重新觸發位移技能")
-                    pyautogui.keyUp(DASH_SKILL_KEY)
+                    self.actuator.release_key(DASH_SKILL_KEY, self.key_owner)
                     time.sleep(0.05)  # 短暫釋放
-                    pyautogui.keyDown(DASH_SKILL_KEY)
+                    self.actuator.hold_key(DASH_SKILL_KEY, self.key_owner)
                     self.last_dash_time = current_time
     
+    def restore_keys(self):
+        """★★★ 新增：重新按下被其他動作（例如斷層時間軸）放開的移動按鍵 ★★★"""
+        owned = self.actuator.get_owned_keys(self.key_owner)
+        for key in self.current_keys_pressed:
+            if key not in owned:
+                print(f"🔁 恢復移動按鍵: {key}")
+                self.actuator.hold_key(key, self.key_owner)
+
     # ★★★ 新增：設置按鍵狀態的方法（用於攻擊後同步狀態）★★★
     def set_keys_pressed(self, keys_list):
         """設置當前按下的按鍵列表（用於攻擊後狀態同步）"""
@@ -260,7 +272,7 @@ class EnhancedMovement:
     def force_release_specific_key(self, key):
         """強制釋放特定按鍵"""
         try:
-            pyautogui.keyUp(key)
+            self.actuator.force_release(key)
             if key in self.current_keys_pressed:
                 self.current_keys_pressed.remove(key)
             print(f"🚨 強制釋放特定按鍵: {key}")
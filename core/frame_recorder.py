@@ -0,0 +1,90 @@
+"""
+畫面錄製模組 - 在獨立線程定時截取遊戲視窗，依序存成編號圖片
+
+錄製的資料夾可直接作為多開模式的重播來源（ReplayFrameSource 依檔名排序讀取），
+用於離線重現問題與量測吞吐量。
+"""
+import os
+import threading
+import time
+
+import cv2
+
+
+class FrameRecorder:
+    """畫面錄製器 - start() 開始、stop() 停止，達到 max_frames 時自動停止"""
+
+    def __init__(self, screen_region, output_dir, interval=0.2, max_frames=3000, log=print):
+        self.screen_region = screen_region
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_frames = max_frames
+        self.log = log
+
+        self.thread = None
+        self.stop_event = threading.Event()
+
+        # 統計
+        self.frames_written = 0
+        self.capture_failures = 0
+        self.started_at = None
+        self.stopped_at = None
+
+    @property
+    def is_recording(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.is_recording:
+            return False
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.stop_event.clear()
+        self.frames_written = 0
+        self.capture_failures = 0
+        self.started_at = time.time()
+        self.stopped_at = None
+        self.thread = threading.Thread(target=self._run, name='frame-recorder', daemon=True)
+        self.thread.start()
+        self.log(f"🎬 開始錄製畫面: {self.output_dir} (每 {self.interval:.2f} 秒, 最多 {self.max_frames} 張)")
+        return True
+
+    def stop(self, timeout=2.0):
+        if self.thread is None:
+            return False
+        self.stop_event.set()
+        self.thread.join(timeout=timeout)
+        self.thread = None
+        self.log(f"⏹️ 停止錄製畫面: 共 {self.frames_written} 張, 截圖失敗 {self.capture_failures} 次")
+        return True
+
+    def _run(self):
+        from core.utils import capture_screen
+
+        next_time = time.time()
+        while not self.stop_event.is_set() and self.frames_written < self.max_frames:
+            image = capture_screen(self.screen_region)
+            if image is None:
+                self.capture_failures += 1
+            else:
+                path = os.path.join(self.output_dir, f"frame_{self.frames_written + 1:06d}.png")
+                if cv2.imwrite(path, image):
+                    self.frames_written += 1
+                else:
+                    self.capture_failures += 1
+
+            next_time += self.interval
+            self.stop_event.wait(max(0.0, next_time - time.time()))
+
+        self.stopped_at = time.time()
+        if self.frames_written >= self.max_frames:
+            self.log(f"⏹️ 錄製已達上限 {self.max_frames} 張，自動停止")
+
+    def get_stats(self):
+        end = self.stopped_at or time.time()
+        return {
+            'recording': self.is_recording,
+            'output_dir': self.output_dir,
+            'frames_written': self.frames_written,
+            'capture_failures': self.capture_failures,
+            'duration': end - self.started_at if self.started_at else 0.0,
+        }
@@ -1,13 +1,16 @@
 """
-圖像處理線程模組 - 負責後台圖像處理和檢測
+圖像處理線程模組 - 負責後台圖像處理和檢測（每種任務獨立工作線程池 + 最新結果槽）
 """
 import threading
-import queue
 import time
-from dataclasses import dataclass
-from typing import Optional, Tuple, Any
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Optional, Any, Callable, Dict
 import cv2
 
+from core.metrics import get_metrics
+from core.perf_stats import get_perf_stats
+
 
 @dataclass
 class ImageTask:
@@ -16,7 +19,9 @@ class ImageTask:
     task_type: str  # 'detect_monster', 'find_medal', 'detect_sign', 'detect_rune', 'scan_direction'
     screenshot: Any
     params: dict
-    timestamp: float
+    timestamp: float  # 截圖時間（用於判斷結果是否過時）
+    future: Future = field(default_factory=Future)
+    callback: Optional[Callable] = None
 
 
 @dataclass
@@ -26,150 +31,226 @@ class ImageResult:
     task_type: str
     success: bool
     result: Any
-    timestamp: float
+    timestamp: float  # 對應截圖的時間
     processing_time: float
+    completed_at: float = 0.0
+
+    def age(self, now=None) -> float:
+        """結果對應的畫面距今多久"""
+        return (now or time.time()) - self.timestamp
+
+    def is_fresh(self, max_age: float) -> bool:
+        return self.age() <= max_age
 
 
 class ImageProcessor:
-    """圖像處理器 - 在獨立線程中運行"""
-    
-    def __init__(self):
-        self.task_queue = queue.Queue(maxsize=10)  # 限制隊列大小避免內存堆積
-        self.result_queue = queue.Queue(maxsize=50)
-        self.worker_thread = None
+    """圖像處理器 - 每種任務類型各自的工作線程池，任務只保留最新一筆"""
+
+    TASK_TYPES = ('detect_monster', 'find_medal', 'detect_sign', 'detect_rune', 'scan_direction')
+
+    def __init__(self, pool_sizes: Optional[Dict[str, int]] = None, max_result_age: float = 0.3):
+        self.pool_sizes = {task_type: 1 for task_type in self.TASK_TYPES}
+        if pool_sizes:
+            self.pool_sizes.update(pool_sizes)
+        self.max_result_age = max_result_age
+
+        # 每種任務一個待處理槽（新任務覆蓋未開始的舊任務）與一個最新結果槽
+        self._pending: Dict[str, Optional[ImageTask]] = {task_type: None for task_type in self.TASK_TYPES}
+        self._latest: Dict[str, Optional[ImageResult]] = {task_type: None for task_type in self.TASK_TYPES}
+        self._condition = threading.Condition()
+
+        self.worker_threads = []
         self.running = False
         self.components = {}
         self.templates = {}
-        
+        self._task_counter = 0
+
         # 性能統計
         self.processed_tasks = 0
         self.total_processing_time = 0
-        
+        self.superseded_tasks = 0
+        self.stale_results = 0
+        self.type_stats = {task_type: {'count': 0, 'total_time': 0.0} for task_type in self.TASK_TYPES}
+
     def start(self, components, templates):
-        """啟動圖像處理線程"""
+        """啟動圖像處理線程池"""
         self.components = components
         self.templates = templates
         self.running = True
-        self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
-        self.worker_thread.start()
-        print("🚀 圖像處理線程已啟動")
-        
+
+        for task_type in self.TASK_TYPES:
+            for index in range(max(1, self.pool_sizes.get(task_type, 1))):
+                thread = threading.Thread(
+                    target=self._worker_loop, args=(task_type,),
+                    name=f"image-{task_type}-{index + 1}", daemon=True
+                )
+                thread.start()
+                self.worker_threads.append(thread)
+        get_metrics().add_collector(self._collect_metrics)
+
+        print(f"🚀 圖像處理線程已啟動 ({len(self.worker_threads)} 個工作線程)")
+
     def stop(self):
         """停止圖像處理線程"""
         self.running = False
-        if self.worker_thread:
-            self.worker_thread.join(timeout=2.0)
+        with self._condition:
+            for task_type, task in self._pending.items():
+                if task is not None:
+                    task.future.cancel()
+                    self._pending[task_type] = None
+            self._condition.notify_all()
+
+        for thread in self.worker_threads:
+            thread.join(timeout=2.0)
+        self.worker_threads = []
+        get_metrics().remove_collector(self._collect_metrics)
         print("🛑 圖像處理線程已停止")
-        
-    def submit_task(self, task_type: str, screenshot, params: dict) -> str:
-        """提交圖像處理任務"""
-        task_id = f"{task_type}_{time.time():.6f}"
-        task = ImageTask(
-            task_id=task_id,
-            task_type=task_type,
-            screenshot=screenshot,
-            params=params,
-            timestamp=time.time()
-        )
-        
-        try:
-            # 非阻塞提交，如果隊列滿了就丟棄舊任務
-            self.task_queue.put_nowait(task)
-            return task_id
-        except queue.Full:
-            # 隊列滿了，清空一些舊任務
-            try:
-                while not self.task_queue.empty():
-                    old_task = self.task_queue.get_nowait()
-                self.task_queue.put_nowait(task)
-                return task_id
-            except queue.Empty:
-                pass
+
+    def submit_task(self, task_type: str, screenshot, params: dict,
+                    callback: Optional[Callable] = None, frame_time: Optional[float] = None) -> Future:
+        """提交圖像處理任務，返回 Future（結果為 ImageResult）
+
+        同類型尚未開始處理的舊任務會被取消，只處理最新畫面
+        """
+        if task_type not in self._pending:
+            raise ValueError(f"未知任務類型: {task_type}")
+
+        with self._condition:
+            self._task_counter += 1
+            task = ImageTask(
+                task_id=f"{task_type}_{self._task_counter}",
+                task_type=task_type,
+                screenshot=screenshot,
+                params=params,
+                timestamp=frame_time if frame_time is not None else time.time(),
+                callback=callback
+            )
+
+            old_task = self._pending[task_type]
+            if old_task is not None and old_task.future.cancel():
+                self.superseded_tasks += 1
+
+            self._pending[task_type] = task
+            self._condition.notify_all()
+
+        return task.future
+
+    def get_latest_result(self, task_type: str, max_age: Optional[float] = None) -> Optional[ImageResult]:
+        """獲取指定類型的最新結果；超過 max_age 的結果視為過時並返回 None"""
+        result = self._latest.get(task_type)
+        if result is None:
             return None
-    
-    def get_result(self, timeout: float = 0.001) -> Optional[ImageResult]:
-        """獲取處理結果"""
-        try:
-            return self.result_queue.get_nowait()
-        except queue.Empty:
+
+        max_age = self.max_result_age if max_age is None else max_age
+        if max_age is not None and not result.is_fresh(max_age):
+            self.stale_results += 1
             return None
-    
-    def get_latest_result(self, task_type: str) -> Optional[ImageResult]:
-        """獲取指定類型的最新結果"""
-        latest_result = None
-        latest_time = 0
-        
-        # 收集所有結果
-        results = []
+        return result
+
+    def detect_frame(self, screenshot, frame_time=None, timeout=1.0):
+        """★ 主循環使用：sign / rune / 角色三項檢測並行執行
+
+        返回 ((sign_found, loc, val), (rune_found, loc, val), (medal_found, loc, val))，
+        逾時或失敗的檢測視為未找到；畫面是否過時由呼叫端以 is_stale 判斷
+        """
+        from config import MATCH_THRESHOLD
+
+        frame_time = frame_time if frame_time is not None else time.time()
+        futures = [
+            self.submit_task('detect_sign', screenshot, {}, frame_time=frame_time),
+            self.submit_task('detect_rune', screenshot, {'threshold': MATCH_THRESHOLD}, frame_time=frame_time),
+            self.submit_task('find_medal', screenshot, {'threshold': MATCH_THRESHOLD}, frame_time=frame_time),
+        ]
+
+        outputs = []
+        for future in futures:
+            outputs.append(self._result_tuple(future, timeout))
+        return tuple(outputs)
+
+    def is_stale(self, frame_time) -> bool:
+        """畫面是否已超過可用時間（檢測太慢時，決策邏輯不應依舊畫面行動）"""
+        if time.time() - frame_time > self.max_result_age:
+            self.stale_results += 1
+            return True
+        return False
+
+    def _result_tuple(self, future, timeout):
         try:
-            while True:
-                result = self.result_queue.get_nowait()
-                results.append(result)
-        except queue.Empty:
-            pass
-        
-        # 找到最新的指定類型結果
-        for result in results:
-            if result.task_type == task_type and result.timestamp > latest_time:
-                latest_result = result
-                latest_time = result.timestamp
-        
-        # 把其他結果放回隊列
-        for result in results:
-            if result != latest_result:
-                try:
-                    self.result_queue.put_nowait(result)
-                except queue.Full:
-                    pass  # 隊列滿了就丟棄
-                    
-        return latest_result
-    
-    def _worker_loop(self):
-        """工作線程主循環"""
-        print("🔄 圖像處理工作線程開始運行")
-        
+            image_result = future.result(timeout=timeout)
+        except Exception:
+            return False, None, 0.0
+
+        if not image_result.success:
+            return False, None, 0.0
+
+        result = image_result.result
+        return result['found'], result.get('location'), result.get('match_value', 0.0)
+
+    def _next_task(self, task_type):
+        with self._condition:
+            while self.running and self._pending[task_type] is None:
+                self._condition.wait(timeout=0.1)
+            if not self.running:
+                return None
+            task = self._pending[task_type]
+            self._pending[task_type] = None
+            return task
+
+    def _worker_loop(self, task_type):
+        """工作線程主循環 - 只處理指定類型的任務"""
         while self.running:
+            task = self._next_task(task_type)
+            if task is None:
+                continue
+
+            # 被取消的任務不處理
+            if not task.future.set_running_or_notify_cancel():
+                continue
+
             try:
-                # 獲取任務，最多等待0.1秒
-                task = self.task_queue.get(timeout=0.1)
-                
                 # 處理任務
                 start_time = time.time()
                 result = self._process_task(task)
                 processing_time = time.time() - start_time
-                
+
                 # 創建結果
                 image_result = ImageResult(
                     task_id=task.task_id,
                     task_type=task.task_type,
                     success=result is not None,
                     result=result,
-                    timestamp=time.time(),
-                    processing_time=processing_time
+                    timestamp=task.timestamp,
+                    processing_time=processing_time,
+                    completed_at=time.time()
                 )
-                
-                # 提交結果
-                try:
-                    self.result_queue.put_nowait(image_result)
-                except queue.Full:
-                    # 結果隊列滿了，清理一些舊結果
+
+                # 只保留較新畫面的結果
+                with self._condition:
+                    latest = self._latest[task_type]
+                    if latest is None or latest.timestamp <= image_result.timestamp:
+                        self._latest[task_type] = image_result
+
+                    # 更新統計
+                    self.processed_tasks += 1
+                    self.total_processing_time += processing_time
+                    self.type_stats[task_type]['count'] += 1
+                    self.type_stats[task_type]['total_time'] += processing_time
+
+                # 從截圖到結果可用的延遲（含排隊），檢測本身的耗時由各檢測函數記錄
+                get_perf_stats().record(f"async.{task_type}", image_result.completed_at - task.timestamp)
+
+                task.future.set_result(image_result)
+
+                if task.callback is not None:
                     try:
-                        for _ in range(10):  # 清理10個舊結果
-                            self.result_queue.get_nowait()
-                        self.result_queue.put_nowait(image_result)
-                    except queue.Empty:
-                        pass
-                
-                # 更新統計
-                self.processed_tasks += 1
-                self.total_processing_time += processing_time
-                
-            except queue.Empty:
-                continue
+                        task.callback(image_result)
+                    except Exception as e:
+                        print(f"❌ 圖像處理回調錯誤 {task_type}: {e}")
+
             except Exception as e:
                 print(f"❌ 圖像處理錯誤: {e}")
-                continue
-    
+                task.future.set_exception(e)
+
     def _process_task(self, task: ImageTask):
         """處理具體的圖像任務"""
         try:
@@ -189,36 +270,35 @@ class ImageProcessor:
         except Exception as e:
             print(f"❌ 處理任務失敗 {task.task_type}: {e}")
             return None
-    
+
     def _detect_monster(self, screenshot, params):
-        """怪物檢測"""
+        """怪物檢測（只定位，不在背景線程按鍵攻擊）"""
         detector = self.components.get('monster_detector')
         if not detector:
             return None
-            
-        return detector.detect_monsters(
-            screenshot, 
-            params['player_x'], 
+
+        return detector.locate_monster(
+            screenshot,
+            params['player_x'],
             params['player_y'],
-            params['client_width'], 
+            params['client_width'],
             params['client_height'],
-            params['movement'], 
-            params['cliff_detection'],
-            params['client_x'], 
-            params['client_y']
+            params.get('is_moving', False),
+            params.get('candidate_rois')
         )
-    
+
     def _find_medal(self, screenshot, params):
         """角色檢測"""
-        from core.utils import simple_find_medal
-        
+        from core.utils import find_player_medal
+
         medal_template = self.templates.get('medal')
         if medal_template is None:
             return None
-            
+
         threshold = params.get('threshold', 0.6)
-        found, loc, val = simple_find_medal(screenshot, medal_template, threshold)
-        
+        # 小地圖定位器與主循環共用，locate_medal 內部以鎖逐一執行
+        found, loc, val = find_player_medal(screenshot, medal_template, threshold, self.components.get('player_locator'))
+
         if found:
             template_height, template_width = medal_template.shape[:2]
             player_x = loc[0] + template_width // 2
@@ -230,48 +310,50 @@ class ImageProcessor:
                 'player_x': player_x,
                 'player_y': player_y
             }
-        return {'found': False, 'match_value': val}
-    
+        return {'found': False, 'location': loc, 'match_value': val}
+
     def _detect_sign(self, screenshot, params):
         """檢測sign_text"""
         from core.utils import detect_sign_text
-        
+
         sign_template = self.templates.get('sign')
         if sign_template is None:
             return None
-            
-        threshold = params.get('threshold', 0.65)
-        found, loc, val = detect_sign_text(screenshot, sign_template, threshold)
-        
+
+        if 'threshold' in params:
+            found, loc, val = detect_sign_text(screenshot, sign_template, params['threshold'])
+        else:
+            found, loc, val = detect_sign_text(screenshot, sign_template)
+
         return {
             'found': found,
             'location': loc,
             'match_value': val
         }
-    
+
     def _detect_rune(self, screenshot, params):
         """檢測rune_text"""
-        from core.utils import simple_find_medal
-        
+        from core.utils import detect_rune_text
+
         rune_template = self.templates.get('rune')
         if rune_template is None:
             return None
-            
+
         threshold = params.get('threshold', 0.6)
-        found, loc, val = simple_find_medal(screenshot, rune_template, threshold)
-        
+        found, loc, val = detect_rune_text(screenshot, rune_template, threshold)
+
         return {
             'found': found,
             'location': loc,
             'match_value': val
         }
-    
+
     def _scan_direction(self, screenshot, params):
         """遠距離方向掃描"""
         detector = self.components.get('monster_detector')
         if not detector:
             return None
-            
+
         direction, target_y = detector.scan_for_direction(
             screenshot,
             params['player_x'],
@@ -280,16 +362,31 @@ class ImageProcessor:
             params['client_height'],
             params['movement']
         )
-        
+
         return {
             'direction': direction,
             'target_y': target_y
         }
-    
+
+    def _collect_metrics(self):
+        """指標端點的收集函數：各任務類型待處理槽的深度（0 或 1）與被取代的任務數"""
+        with self._condition:
+            pending = {task_type: int(task is not None) for task_type, task in self._pending.items()}
+        samples = [('queue_depth', {'queue': f'image.{task_type}'}, depth) for task_type, depth in pending.items()]
+        samples.append(('queue_dropped_total', {'queue': 'image'}, self.superseded_tasks))
+        return samples
+
     def get_stats(self):
         """獲取處理統計"""
         if self.processed_tasks == 0:
             return "圖像處理統計: 尚無數據"
-        
+
         avg_time = self.total_processing_time / self.processed_tasks
-        return f"圖像處理統計: 已處理 {self.processed_tasks} 個任務, 平均耗時 {avg_time*1000:.1f}ms"
\ No newline at end of file
+        perf = get_perf_stats()
+        per_type = ", ".join(
+            f"{task_type} {stats['total_time'] / stats['count'] * 1000:.1f}ms"
+            f" (延遲 p95 {perf.histogram(f'async.{task_type}').snapshot()['p95_ms']:.1f}ms)"
+            for task_type, stats in self.type_stats.items() if stats['count']
+        )
+        return (f"圖像處理統計: 已處理 {self.processed_tasks} 個任務, 平均耗時 {avg_time*1000:.1f}ms, "
+                f"被取代 {self.superseded_tasks}, 過時 {self.stale_results} ({per_type})")
@@ -0,0 +1,446 @@
+"""
+按鍵執行器模組 - 在獨立線程依時間軸送出按鍵，呼叫端提交序列後立即返回
+
+預設以 pyautogui 送到聚焦中的視窗；多開模式每個客戶端有自己的執行器（送出端為該視窗），
+以 bind_input_actuator() 綁定到目前線程後，各模組的 get_input_actuator() 取得的就是該客戶端的執行器
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+import pyautogui
+
+from core.metrics import get_metrics
+from core.perf_stats import get_perf_stats
+
+# 原本的 keyDown / keyUp 呼叫每次都有 pyautogui.PAUSE（預設 0.1 秒）的間隔，
+# 遊戲對按鍵的判定依賴這個間隔；轉換舊序列時以 key_gap 保留相同節奏
+LEGACY_KEY_GAP = 0.1
+
+# 直接按鍵的持有者名稱（時間軸以 id 持有按鍵，直接按鍵以名稱持有）
+MOVEMENT_OWNER = 'movement'
+ATTACK_OWNER = 'attack'
+
+
+class KeyTimeline:
+    """按鍵時間軸 - 以游標方式描述按鍵序列（取代 keyDown / sleep / keyUp 的寫法）
+
+    例：KeyTimeline('cliff_jump').up('left').down(JUMP_KEY, 'left').wait(0.03).up(JUMP_KEY, 'left')
+    """
+
+    def __init__(self, name, channel=None, key_gap=0.0):
+        self.name = name
+        self.channel = channel or name
+        self.key_gap = key_gap  # 每個按鍵事件之後自動前進的時間
+        self.events = []  # (offset, order, action, key)
+        self.cursor = 0.0
+        self._order = itertools.count()
+
+    def _add(self, action, keys):
+        for key in keys:
+            if key is None or not isinstance(key, str) or len(key) == 0:
+                print(f"⚠️ 時間軸 {self.name} 跳過無效按鍵: {key}")
+                continue
+            self.events.append((self.cursor, next(self._order), action, key))
+            self.cursor += self.key_gap
+        return self
+
+    def down(self, *keys):
+        return self._add('down', keys)
+
+    def up(self, *keys):
+        return self._add('up', keys)
+
+    def release(self, *keys):
+        """無條件放開按鍵（即使不是此時間軸按下的），用於清除殘留狀態"""
+        return self._add('release', keys)
+
+    def wait(self, seconds):
+        self.cursor += max(0.0, seconds)
+        return self
+
+    def tap(self, key, hold=0.0):
+        """按一下後放開"""
+        self.down(key)
+        self.wait(hold)
+        return self.up(key)
+
+    def hold(self, key, duration):
+        """按住一段時間後放開"""
+        return self.tap(key, duration)
+
+    @property
+    def duration(self):
+        return self.cursor
+
+    def sorted_events(self):
+        return sorted(self.events, key=lambda event: (event[0], event[1]))
+
+
+class TimelineHandle:
+    """已提交時間軸的控制代碼"""
+
+    def __init__(self, actuator, timeline, handle_id, on_complete=None):
+        self.actuator = actuator
+        self.timeline = timeline
+        self.id = handle_id
+        self.name = timeline.name
+        self.channel = timeline.channel
+        self.events = timeline.sorted_events()
+        self.duration = timeline.duration
+        self.on_complete = on_complete
+        self.next_index = 0
+        self.started_at = None
+        self.held_keys = set()
+        self.cancelled = False
+        self._done_event = threading.Event()
+
+    @property
+    def done(self):
+        return self._done_event.is_set()
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return time.time() - self.started_at
+
+    def wait(self, timeout=None):
+        return self._done_event.wait(timeout)
+
+    def cancel(self):
+        """取消尚未執行的按鍵，並立即放開此時間軸按住的按鍵"""
+        self.actuator.cancel(self)
+
+
+class InputActuator:
+    """按鍵執行器 - 集中管理按鍵狀態，支援搶占 (preempt)、合併 (merge) 與略過 (skip)
+
+    sender: 送出端（有 key_down / key_up / click 方法，例如 core.window_input.WindowInputSender），
+            None 時使用 pyautogui
+    """
+
+    def __init__(self, sender=None, name='input-actuator'):
+        self.sender = sender
+        self.name = name
+        self._condition = threading.Condition(threading.RLock())
+        self._active = []
+        self._ids = itertools.count(1)
+        self._thread = None
+        self._running = False
+
+        # 集中按鍵狀態：按鍵 -> 目前按住它的時間軸 id 或直接持有者名稱（例如 'movement'）
+        self._key_owners = {}
+
+        # 統計
+        self.submitted = 0
+        self.preempted = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+
+        self.debug_actuator = False
+
+    # ------------------------------------------------------------------
+    # 生命週期
+    # ------------------------------------------------------------------
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        get_metrics().add_collector(self._collect_metrics)
+        print("⌨️ 按鍵執行器已啟動")
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+        get_metrics().remove_collector(self._collect_metrics)
+        self.release_all()
+
+    # ------------------------------------------------------------------
+    # 提交與取消
+    # ------------------------------------------------------------------
+
+    def submit(self, timeline, policy='merge', on_complete=None):
+        """提交時間軸並立即返回 TimelineHandle
+
+        policy:
+            'merge'   - 與其他時間軸同時執行（同一按鍵以引用計數合併）
+            'preempt' - 先取消同一 channel 或使用相同按鍵的時間軸
+            'skip'    - 同一 channel 已有時間軸執行中時不提交，返回執行中的那一個
+        """
+        if not self._running:
+            self.start()
+
+        with self._condition:
+            if policy == 'skip':
+                for active in self._active:
+                    if active.channel == timeline.channel:
+                        self.skipped += 1
+                        return active
+
+            if policy == 'preempt':
+                keys = {event[3] for event in timeline.events}
+                for active in list(self._active):
+                    active_keys = {event[3] for event in active.events}
+                    if active.channel == timeline.channel or keys & active_keys:
+                        self._cancel_locked(active)
+                        self.preempted += 1
+
+            handle = TimelineHandle(self, timeline, next(self._ids), on_complete)
+            handle.started_at = time.time()
+            self._active.append(handle)
+            self.submitted += 1
+            self._condition.notify_all()
+
+        if self.debug_actuator:
+            print(f"⌨️ [調試] 提交時間軸 {timeline.name} ({len(handle.events)} 個事件, {timeline.duration:.2f}s, {policy})")
+        return handle
+
+    def cancel(self, handle):
+        with self._condition:
+            self._cancel_locked(handle)
+            self._condition.notify_all()
+
+    def cancel_channel(self, channel):
+        with self._condition:
+            for active in list(self._active):
+                if active.channel == channel:
+                    self._cancel_locked(active)
+            self._condition.notify_all()
+
+    def _cancel_locked(self, handle):
+        if handle.done:
+            return
+        handle.cancelled = True
+        for key in list(handle.held_keys):
+            self._key_up(handle, key)
+        if handle in self._active:
+            self._active.remove(handle)
+        self._finish(handle)
+
+    # ------------------------------------------------------------------
+    # 集中按鍵狀態
+    # ------------------------------------------------------------------
+
+    def is_pressed(self, key):
+        with self._condition:
+            return bool(self._key_owners.get(key))
+
+    def get_pressed_keys(self):
+        with self._condition:
+            return [key for key, owners in self._key_owners.items() if owners]
+
+    def is_busy(self, channel=None):
+        with self._condition:
+            if channel is None:
+                return bool(self._active)
+            return any(active.channel == channel for active in self._active)
+
+    def release_all(self):
+        """取消所有時間軸並放開所有由執行器按住的按鍵"""
+        with self._condition:
+            for active in list(self._active):
+                self._cancel_locked(active)
+            for key, owners in list(self._key_owners.items()):
+                if owners:
+                    self._send('up', key)
+            self._key_owners.clear()
+
+    # ------------------------------------------------------------------
+    # ★★★ 新增：直接按鍵 - 移動、攻擊等在呼叫線程同步送出的按鍵，與時間軸共用按鍵狀態 ★★★
+    # ------------------------------------------------------------------
+
+    def hold_key(self, key, owner, pause=True):
+        """由 owner 按住按鍵，直到 release_key()；已被其他持有者按住時只登記不重送"""
+        with self._condition:
+            owners = self._key_owners.setdefault(key, set())
+            if not owners:
+                self._send('down', key)
+            owners.add(owner)
+        self._legacy_pause(pause)
+
+    def release_key(self, key, owner, pause=True):
+        """放開 owner 持有的按鍵；其他持有者（例如斷層時間軸）仍按住時不放開"""
+        with self._condition:
+            owners = self._key_owners.get(key, set())
+            owners.discard(owner)
+            if not owners:
+                self._send('up', key)
+        self._legacy_pause(pause)
+
+    def tap_key(self, key, owner, pause=True):
+        """按一下後放開（對應原本的 keyDown + keyUp）"""
+        self.hold_key(key, owner, pause)
+        self.release_key(key, owner, pause)
+
+    def force_release(self, *keys):
+        """無條件放開按鍵並清除所有持有者（緊急清理用）"""
+        with self._condition:
+            for key in keys:
+                for handle in self._active:
+                    handle.held_keys.discard(key)
+                self._key_owners.pop(key, None)
+                self._send('up', key)
+
+    def click(self, x, y):
+        """在螢幕座標 (x, y) 點擊左鍵（多開模式送到此執行器的視窗）"""
+        try:
+            if self.sender is not None:
+                self.sender.click(x, y)
+            else:
+                pyautogui.click(x, y)
+        except Exception as e:
+            print(f"❌ 點擊失敗 ({x}, {y}): {e}")
+
+    def get_owned_keys(self, owner):
+        with self._condition:
+            return [key for key, owners in self._key_owners.items() if owner in owners]
+
+    def _legacy_pause(self, pause):
+        # 直接按鍵保留 pyautogui.PAUSE 的間隔，但不在持有鎖時等待，避免拖慢時間軸
+        if pause and getattr(pyautogui, 'PAUSE', 0):
+            time.sleep(pyautogui.PAUSE)
+
+    def _key_down(self, handle, key):
+        owners = self._key_owners.setdefault(key, set())
+        if not owners:
+            self._send('down', key)
+        owners.add(handle.id)
+        handle.held_keys.add(key)
+
+    def _key_up(self, handle, key):
+        owners = self._key_owners.get(key, set())
+        owners.discard(handle.id)
+        handle.held_keys.discard(key)
+        # 其他時間軸仍按住時不放開（合併）
+        if not owners:
+            self._send('up', key)
+
+    def _release(self, handle, key):
+        owners = self._key_owners.get(key)
+        if owners:
+            # 其他時間軸正在使用此按鍵，不強制放開
+            if any(isinstance(owner, int) for owner in owners - {handle.id}):
+                return
+            # 直接持有者（例如移動模組的方向鍵）一併清除，由持有者之後自行重新按下
+            owners.clear()
+        handle.held_keys.discard(key)
+        self._send('up', key)
+
+    def _send(self, action, key):
+        try:
+            if self.sender is not None:
+                if action == 'down':
+                    self.sender.key_down(key)
+                else:
+                    self.sender.key_up(key)
+            elif action == 'down':
+                pyautogui.keyDown(key, _pause=False)
+            else:
+                pyautogui.keyUp(key, _pause=False)
+        except Exception as e:
+            print(f"❌ 按鍵執行失敗 {action} {key}: {e}")
+
+    # ------------------------------------------------------------------
+    # 執行線程
+    # ------------------------------------------------------------------
+
+    def _finish(self, handle):
+        handle._done_event.set()
+        # 完整執行的序列記錄實際耗時（含按鍵間隔與延遲），被取消的不計
+        if not handle.cancelled and handle.started_at is not None:
+            get_perf_stats().record(f"input.{handle.name}", handle.elapsed)
+        if handle.on_complete is not None:
+            try:
+                handle.on_complete(handle)
+            except Exception as e:
+                print(f"❌ 時間軸完成回調錯誤 {handle.name}: {e}")
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+
+                now = time.time()
+                next_wake = None
+
+                for handle in list(self._active):
+                    elapsed = now - handle.started_at
+
+                    while handle.next_index < len(handle.events) and handle.events[handle.next_index][0] <= elapsed:
+                        offset, _, action, key = handle.events[handle.next_index]
+                        handle.next_index += 1
+                        self.max_lateness = max(self.max_lateness, elapsed - offset)
+                        get_perf_stats().record('input_lateness', elapsed - offset)
+                        if action == 'down':
+                            self._key_down(handle, key)
+                        elif action == 'up':
+                            self._key_up(handle, key)
+                        else:
+                            self._release(handle, key)
+
+                    if handle.next_index >= len(handle.events) and elapsed >= handle.duration:
+                        # 時間軸結束時仍按住的按鍵保持原狀（例如恢復移動方向）
+                        handle.held_keys.clear()
+                        for owners in self._key_owners.values():
+                            owners.discard(handle.id)
+                        self._active.remove(handle)
+                        self._finish(handle)
+                        continue
+
+                    if handle.next_index < len(handle.events):
+                        due = handle.started_at + handle.events[handle.next_index][0]
+                    else:
+                        due = handle.started_at + handle.duration
+                    next_wake = due if next_wake is None else min(next_wake, due)
+
+                timeout = None if next_wake is None else max(0.0, next_wake - time.time())
+                self._condition.wait(timeout if timeout is None else min(timeout, 0.5))
+
+    def _collect_metrics(self):
+        """指標端點的收集函數：執行中的時間軸數"""
+        with self._condition:
+            labels = {} if self.sender is None else {'actuator': self.name}
+            return [('input_active_timelines', labels, len(self._active))]
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                'active': [handle.name for handle in self._active],
+                'pressed_keys': [key for key, owners in self._key_owners.items() if owners],
+                'submitted': self.submitted,
+                'preempted': self.preempted,
+                'skipped': self.skipped,
+                'max_lateness_ms': self.max_lateness * 1000,
+            }
+
+
+# 全局按鍵執行器實例
+_input_actuator = InputActuator()
+_local = threading.local()
+
+
+def get_input_actuator():
+    """獲取按鍵執行器實例（目前線程有綁定的執行器時返回綁定的那一個）"""
+    return getattr(_local, 'actuator', None) or _input_actuator
+
+
+@contextmanager
+def bind_input_actuator(actuator):
+    """在此區塊內把 actuator 設為目前線程的按鍵執行器（多開模式每個客戶端各自一個）"""
+    previous = getattr(_local, 'actuator', None)
+    _local.actuator = actuator
+    try:
+        yield actuator
+    finally:
+        _local.actuator = previous
@@ -0,0 +1,98 @@
+"""
+日誌環形緩衝區 - 寫入端永不阻塞，讀取端定時批次取出
+
+寫入：取得遞增序號後直接寫入固定大小的槽位（兩步在 CPython 下皆為原子操作，不需要鎖），
+     多個線程可同時寫入；緩衝區滿時覆蓋最舊的記錄，寫入端不會因為讀取端太慢而等待或失敗。
+     last_seq 的「比較後賦值」不是原子操作，以只包住這兩行的鎖更新，避免較小的序號覆蓋較大的。
+讀取：每個讀取端各自持有游標（LogRingReader），只取出游標之後已寫好的記錄；
+     讀取端落後超過容量時，被覆蓋的記錄計入 missed，由讀取端自行提示。
+"""
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class LogRecord:
+    seq: int
+    time: float
+    message: str
+
+
+class LogRing:
+    """多寫入、多讀取的日誌環形緩衝區"""
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._counter = itertools.count(1)
+        self.last_seq = 0  # 已寫入的最大序號（可能有更早的序號尚未寫好），只會遞增
+        self._seq_lock = threading.Lock()
+
+    def append(self, message):
+        seq = next(self._counter)
+        self._slots[seq % self.capacity] = LogRecord(seq, time.time(), message)
+        with self._seq_lock:
+            if seq > self.last_seq:
+                self.last_seq = seq
+
+    def reader(self, from_start=False):
+        """建立讀取端；from_start=False 時只讀取之後寫入的記錄"""
+        return LogRingReader(self, 0 if from_start else self.last_seq)
+
+    def tail(self, limit=100):
+        """最近 limit 筆已寫好的記錄（由舊到新）"""
+        records = []
+        seq = self.last_seq
+        while seq > 0 and len(records) < min(limit, self.capacity):
+            record = self._slots[seq % self.capacity]
+            if record is not None and record.seq == seq:
+                records.append(record)
+            elif record is not None and record.seq > seq:
+                break  # 已被覆蓋，更早的記錄也不存在了
+            seq -= 1
+        records.reverse()
+        return records
+
+
+class LogRingReader:
+    """日誌讀取端 - 游標之後的記錄依序批次取出"""
+
+    def __init__(self, ring, cursor=0):
+        self.ring = ring
+        self.cursor = cursor
+        self.missed = 0
+
+    def drain(self, max_records=None):
+        """取出游標之後已寫好的記錄；遇到尚未寫好的槽位就停下，下次再取"""
+        ring = self.ring
+        capacity = ring.capacity
+        end = ring.last_seq
+        if max_records is not None:
+            end = min(end, self.cursor + max_records)
+
+        # 落後超過容量的部分已被覆蓋
+        oldest_available = ring.last_seq - capacity + 1
+        if self.cursor + 1 < oldest_available:
+            self.missed += oldest_available - self.cursor - 1
+            self.cursor = oldest_available - 1
+
+        records = []
+        seq = self.cursor + 1
+        while seq <= end:
+            record = ring._slots[seq % capacity]
+            if record is None or record.seq < seq:
+                break  # 其他線程已取得序號但還沒寫入
+            if record.seq > seq:
+                # 讀取期間被覆蓋
+                self.missed += 1
+            else:
+                records.append(record)
+            seq += 1
+        self.cursor = seq - 1
+        return records
+
+    def take_missed(self):
+        missed, self.missed = self.missed, 0
+        return missed
@@ -0,0 +1,252 @@
+"""
+日誌模組 - 分級、限流、非同步輸出，取代熱路徑上的 print
+
+- get_logger(name)：模組日誌器（artale.<name>），等級由 config.LOG_LEVEL / LOG_LEVELS 決定
+- 呼叫端只做等級判斷與限流判斷，通過後才建立記錄放進隊列，格式化與輸出在背景線程進行；
+  訊息請用 %-格式參數（log.debug("匹配度 %.2f", val)），被過濾時不會格式化任何字串
+- 帶 key 的訊息依 key 限流（log.info("...", key='attack')）：每個 key 在 LOG_RATE_LIMIT_INTERVAL
+  秒內最多 LOG_RATE_LIMIT_BURST 則，被略過的次數附在該 key 下一則輸出的訊息後
+- 不記錄呼叫位置（檔名、行號），省去每則訊息的堆疊查找
+- 輸出寫到當下的 sys.stdout，GUI / 常駐模式的日誌捕獲照常運作
+- 直接附加的日誌檔（security_violations.log、記憶體報告）以 append_capped_log 寫入，
+  超過大小時輪替為 .1 ~ .N，長時間運行不會無限增長
+"""
+import atexit
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT_LOGGER_NAME = 'artale'
+
+_setup_lock = threading.Lock()
+_queue_handler = None
+_listener = None
+_rate_limiter = None
+
+
+class RateLimiter:
+    """依訊息 key 限流；allow() 返回 None 表示略過，否則返回先前被略過的則數"""
+
+    def __init__(self, interval=1.0, burst=1):
+        self.interval = interval
+        self.burst = burst
+        self._windows = {}  # key -> [視窗開始時間, 視窗內已輸出數, 已略過數]
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                self._windows[key] = [now, 1, 0]
+                return window[2] if window is not None else 0
+            if window[1] < self.burst:
+                window[1] += 1
+                return 0
+            window[2] += 1
+            self.suppressed_total += 1
+            return None
+
+
+class ModuleLogger:
+    """模組日誌器 - 介面同 logging.Logger 的 debug/info/warning/error，另外支援 key 限流"""
+
+    __slots__ = ('logger',)
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def _log(self, level, msg, args, key, exc_info):
+        if not self.logger.isEnabledFor(level):
+            return
+        suppressed = 0
+        if key is not None:
+            suppressed = _rate_limiter.allow(key)
+            if suppressed is None:
+                return
+        if exc_info and not isinstance(exc_info, tuple):
+            exc_info = sys.exc_info()
+        record = self.logger.makeRecord(self.logger.name, level, '', 0, msg, args, exc_info,
+                                        extra={'suppressed': suppressed} if suppressed else None)
+        self.logger.handle(record)
+
+    def debug(self, msg, *args, key=None, exc_info=None):
+        self._log(logging.DEBUG, msg, args, key, exc_info)
+
+    def info(self, msg, *args, key=None, exc_info=None):
+        self._log(logging.INFO, msg, args, key, exc_info)
+
+    def warning(self, msg, *args, key=None, exc_info=None):
+        self._log(logging.WARNING, msg, args, key, exc_info)
+
+    def error(self, msg, *args, key=None, exc_info=None):
+        self._log(logging.ERROR, msg, args, key, exc_info)
+
+    def exception(self, msg, *args, key=None):
+        self._log(logging.ERROR, msg, args, key, True)
+
+    def isEnabledFor(self, level):
+        return self.logger.isEnabledFor(level)
+
+    def setLevel(self, level):
+        self.logger.setLevel(level)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """不在呼叫端格式化；隊列滿時丟棄記錄而不阻塞熱路徑"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _ConsoleHandler(logging.Handler):
+    """輸出到當下的 sys.stdout（GUI 模式下為日誌捕獲）"""
+
+    def emit(self, record):
+        try:
+            sys.stdout.write(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+
+
+class _Formatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            text += f" （已略過 {suppressed} 則相同訊息）"
+        return text
+
+
+def _level_of(value):
+    if isinstance(value, int):
+        return value
+    return logging.getLevelName(str(value).upper())
+
+
+def apply_log_levels(default_level=None, module_levels=None):
+    """套用 config.LOG_LEVEL / LOG_LEVELS（或傳入的值）到各模組日誌器"""
+    import config
+
+    default_level = config.LOG_LEVEL if default_level is None else default_level
+    module_levels = config.LOG_LEVELS if module_levels is None else module_levels
+
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel(_level_of(default_level))
+
+    manager = logging.Logger.manager
+    prefix = ROOT_LOGGER_NAME + '.'
+    # 先清除已移除的模組設定，讓它們回到預設等級
+    for name, logger in list(manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger) and name.startswith(prefix):
+            logger.setLevel(logging.NOTSET)
+    for name, level in module_levels.items():
+        logging.getLogger(prefix + name).setLevel(_level_of(level))
+
+
+def setup_logging():
+    """建立隊列與背景輸出線程（只執行一次，get_logger 會自動呼叫）"""
+    global _queue_handler, _listener, _rate_limiter
+
+    with _setup_lock:
+        if _listener is not None:
+            return
+        import config
+
+        log_queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+        _queue_handler = _DeferredQueueHandler(log_queue)
+        _rate_limiter = RateLimiter(config.LOG_RATE_LIMIT_INTERVAL, config.LOG_RATE_LIMIT_BURST)
+
+        console = _ConsoleHandler()
+        console.setFormatter(_Formatter(config.LOG_FORMAT))
+
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.addHandler(_queue_handler)
+        root.propagate = False
+        apply_log_levels()
+
+        _listener = QueueListener(log_queue, console)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """輸出隊列中剩餘的記錄並停止背景線程"""
+    global _listener
+
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        logging.getLogger(ROOT_LOGGER_NAME).removeHandler(_queue_handler)
+
+
+def get_logger(name):
+    """取得模組日誌器，例如 get_logger('rope_climbing')"""
+    if _listener is None:
+        setup_logging()
+    return ModuleLogger(logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}"))
+
+
+def set_module_level(name, level):
+    """執行中調整單一模組的等級（例如開關除錯輸出）"""
+    get_logger(name).setLevel(_level_of(level))
+
+
+def toggle_module_debug(name):
+    """開關單一模組的除錯輸出，返回切換後是否開啟"""
+    logger = get_logger(name)
+    enabled = not logger.isEnabledFor(logging.DEBUG)
+    logger.setLevel(logging.DEBUG if enabled else logging.INFO)
+    return enabled
+
+
+def get_logging_stats():
+    if _queue_handler is None:
+        return {'queued': 0, 'dropped': 0, 'rate_limited': 0}
+    return {
+        'queued': _queue_handler.queue.qsize(),
+        'dropped': _queue_handler.dropped,
+        'rate_limited': _rate_limiter.suppressed_total,
+    }
+
+
+def _rotate_log_file(path, backups):
+    """path -> path.1 -> ... -> path.N，最舊的刪除；backups 為 0 時直接刪除 path"""
+    if backups <= 0:
+        os.remove(path)
+        return
+    for index in range(backups - 1, 0, -1):
+        source = f"{path}.{index}"
+        if os.path.exists(source):
+            os.replace(source, f"{path}.{index + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def append_capped_log(path, text, max_bytes=None, backups=3):
+    """附加文字到日誌檔；加上後會超過 max_bytes 時先輪替（max_bytes 為 None 時不限制）"""
+    if max_bytes:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if size and size + len(text.encode('utf-8')) > max_bytes:
+            _rotate_log_file(path, backups)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
@@ -0,0 +1,378 @@
+"""
+長時間運行模組 - 重用截圖與檢測暫存緩衝區，定期寫出記憶體報告
+
+- BufferPool：依 (形狀, dtype) 保存少量 numpy 緩衝區；只有沒有任何外部引用（含 view）的緩衝區才會被重用，
+  呼叫端不需要歸還，保留畫面（錄製、隊列、背景模型）也不會被覆寫，池滿時改為一般配置並計入 overflow
+- 'frames' 池供 capture_screen 的 BGR 畫面，'scratch' 池供檢測的模糊 / 邊緣 / 距離轉換暫存；
+  未啟用時 acquire() 直接返回 np.empty，行為與原本相同
+- MemoryMonitor：獨立線程每 interval 秒做一次 tracemalloc 快照並讀取 RSS，
+  與起始快照比較列出增長最多的配置位置（檔案:行號），與上次快照相比仍在增長的標為熱點，
+  結果附加到報告檔（memory_<時間>.txt，超過大小時輪替）
+- tracemalloc 會讓配置變慢，預設只記錄 1 層呼叫堆疊（LONG_RUN_TRACEMALLOC_FRAMES）
+"""
+import linecache
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from core.logger import append_capped_log
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _probe_free_refcount():
+    """沒有外部引用時，緩衝區在 acquire() 的迴圈內的引用數（列表 + 迴圈變數 + getrefcount 參數）"""
+    buffers = [np.empty(1)]
+    for buffer in buffers:
+        return sys.getrefcount(buffer)
+
+
+_FREE_REFCOUNT = _probe_free_refcount()
+
+
+class BufferPool:
+    """numpy 緩衝區池 - acquire() 返回的緩衝區內容未初始化，適合作為 OpenCV 的 dst"""
+
+    def __init__(self, name, max_buffers=4, max_shapes=8):
+        self.name = name
+        self.max_buffers = max_buffers
+        self.max_shapes = max_shapes
+        self.enabled = False
+        self._buffers = OrderedDict()  # (形狀, dtype) -> [ndarray]，最近使用的形狀在最後
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.allocated = 0
+        self.overflow = 0
+
+    def enable(self, max_buffers=None):
+        if max_buffers is not None:
+            self.max_buffers = max_buffers
+        self.enabled = True
+
+    def disable(self):
+        """停用並釋放所有緩衝區（仍在使用中的由呼叫端持有，不受影響）"""
+        with self._lock:
+            self.enabled = False
+            self._buffers.clear()
+
+    def acquire(self, shape, dtype=np.uint8):
+        if not self.enabled:
+            return np.empty(shape, dtype)
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            buffers = self._buffers.get(key)
+            if buffers is None:
+                buffers = self._buffers[key] = []
+                while len(self._buffers) > self.max_shapes:
+                    self._buffers.popitem(last=False)
+            else:
+                self._buffers.move_to_end(key)
+                for buffer in buffers:
+                    if sys.getrefcount(buffer) <= _FREE_REFCOUNT:
+                        self.reused += 1
+                        return buffer
+
+            buffer = np.empty(shape, dtype)
+            if len(buffers) < self.max_buffers:
+                buffers.append(buffer)
+                self.allocated += 1
+            else:
+                self.overflow += 1
+            return buffer
+
+    def get_stats(self):
+        with self._lock:
+            pooled = [buffer for buffers in self._buffers.values() for buffer in buffers]
+            return {
+                'name': self.name,
+                'enabled': self.enabled,
+                'buffers': len(pooled),
+                'bytes': sum(buffer.nbytes for buffer in pooled),
+                'reused': self.reused,
+                'allocated': self.allocated,
+                'overflow': self.overflow,
+            }
+
+
+# 全局緩衝區池
+_pools = {
+    'frames': BufferPool('frames'),
+    'scratch': BufferPool('scratch'),
+}
+
+
+def get_buffer_pool(name):
+    """獲取緩衝區池（'frames' / 'scratch'）"""
+    return _pools[name]
+
+
+def get_pool_stats():
+    return {name: pool.get_stats() for name, pool in _pools.items()}
+
+
+# ----------------------------------------------------------------------
+# 記憶體監控
+# ----------------------------------------------------------------------
+
+# 不計入報告的配置來源（tracemalloc 本身、匯入系統、原始碼快取）
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def _short_path(filename):
+    """專案內的檔案顯示相對路徑"""
+    path = os.path.abspath(filename)
+    if path.startswith(PROJECT_ROOT + os.sep):
+        return os.path.relpath(path, PROJECT_ROOT)
+    return filename
+
+
+def _rss_bytes():
+    if psutil is None:
+        return None
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+class MemoryMonitor:
+    """記憶體監控 - start() 記錄起始快照，之後每 interval 秒寫一筆報告；stop() 寫出最後一筆"""
+
+    def __init__(self, report_dir, interval=600.0, frames=1, top_n=15, hotspot_min_kb=512,
+                 max_bytes=None, backups=3, log=print):
+        self.report_dir = report_dir
+        self.interval = interval
+        self.frames = frames
+        self.top_n = top_n
+        self.hotspot_min_kb = hotspot_min_kb
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.log = log
+
+        self.thread = None
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+        self.report_path = None
+        self.started_at = None
+        self.baseline = None
+        self.previous = None
+        self.rss_start = None
+        self.snapshots = 0
+        self.latest = None
+
+    @property
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return False
+        os.makedirs(self.report_dir, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracemalloc = True
+        self.started_at = time.time()
+        self.report_path = os.path.join(
+            self.report_dir, f"memory_{time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started_at))}.txt")
+        self.baseline = self.previous = self._take()
+        self.rss_start = _rss_bytes()
+        self.snapshots = 0
+        self.latest = None
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='memory-monitor', daemon=True)
+        self.thread.start()
+        self.log(f"🧠 長時間運行模式: 每 {self.interval:.0f} 秒記錄記憶體報告 -> {self.report_path}")
+        return True
+
+    def stop(self, timeout=5.0):
+        """停止監控並寫出最後一筆報告；tracemalloc 由本監控啟動時一併停止"""
+        if self.thread is None:
+            return False
+        self.stop_event.set()
+        self.thread.join(timeout=timeout)
+        self.thread = None
+        try:
+            self.log(self.format_summary(self.take_snapshot()))
+        except Exception as e:
+            self.log(f"⚠️ 記憶體報告失敗: {e}")
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        return True
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.log(self.format_summary(self.take_snapshot()))
+            except Exception as e:
+                self.log(f"⚠️ 記憶體報告失敗: {e}")
+
+    # ------------------------------------------------------------------
+    # 快照
+    # ------------------------------------------------------------------
+
+    def _take(self):
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    def take_snapshot(self):
+        """做一次快照，與起始及上次快照比較後附加到報告檔，返回本次結果"""
+        with self._lock:
+            snapshot = self._take()
+            since_start = snapshot.compare_to(self.baseline, 'lineno')
+            since_previous = {stat.traceback[0]: stat.size_diff
+                              for stat in snapshot.compare_to(self.previous, 'lineno')}
+            self.previous = snapshot
+            self.snapshots += 1
+
+            min_bytes = self.hotspot_min_kb * 1024
+            top = []
+            for stat in since_start[:self.top_n]:
+                if stat.size_diff <= 0:
+                    break
+                frame = stat.traceback[0]
+                recent = since_previous.get(frame, 0)
+                top.append({
+                    'file': _short_path(frame.filename),
+                    'line': frame.lineno,
+                    'size_diff_kb': stat.size_diff / 1024,
+                    'count_diff': stat.count_diff,
+                    'recent_kb': recent / 1024,
+                    'hotspot': stat.size_diff >= min_bytes and recent > 0,
+                })
+
+            now = time.time()
+            traced, peak = tracemalloc.get_traced_memory()
+            rss = _rss_bytes()
+            hours = max(now - self.started_at, 1e-9) / 3600
+            result = {
+                'time': now,
+                'uptime': now - self.started_at,
+                'rss_mb': rss / 1024 / 1024 if rss is not None else None,
+                'rss_start_mb': self.rss_start / 1024 / 1024 if self.rss_start is not None else None,
+                'traced_mb': traced / 1024 / 1024,
+                'traced_peak_mb': peak / 1024 / 1024,
+                'top': top,
+                'hotspots': [entry for entry in top if entry['hotspot']],
+                'pools': get_pool_stats(),
+            }
+            if rss is not None and self.rss_start is not None:
+                result['rss_growth_mb'] = result['rss_mb'] - result['rss_start_mb']
+                result['rss_growth_mb_per_hour'] = result['rss_growth_mb'] / hours
+            self.latest = result
+            append_capped_log(self.report_path, self.format_report(result), self.max_bytes, self.backups)
+            return result
+
+    # ------------------------------------------------------------------
+    # 輸出
+    # ------------------------------------------------------------------
+
+    def format_report(self, result):
+        lines = [f"=== {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(result['time']))} "
+                 f"(運行 {result['uptime'] / 3600:.2f} 小時, 第 {self.snapshots} 次快照) ==="]
+        if result['rss_mb'] is not None:
+            lines.append(f"RSS {result['rss_mb']:.1f} MB (起始 {result['rss_start_mb']:.1f} MB, "
+                         f"{result['rss_growth_mb']:+.1f} MB, {result['rss_growth_mb_per_hour']:+.1f} MB/小時)")
+        lines.append(f"tracemalloc 目前 {result['traced_mb']:.1f} MB / 峰值 {result['traced_peak_mb']:.1f} MB")
+        lines.append("緩衝池: " + '; '.join(
+            f"{name} 重用 {pool['reused']} / 配置 {pool['allocated']} / 超出 {pool['overflow']} "
+            f"({pool['bytes'] / 1024 / 1024:.1f} MB)" for name, pool in result['pools'].items()))
+        lines.append("配置增長（相對起始，檔案:行號）:")
+        for entry in result['top']:
+            flag = "  ⚠️ 持續增長" if entry['hotspot'] else ""
+            lines.append(f"  {entry['size_diff_kb']:+10.1f} KB ({entry['count_diff']:+d} 個, "
+                         f"上次以來 {entry['recent_kb']:+.1f} KB)  {entry['file']}:{entry['line']}{flag}")
+        if not result['top']:
+            lines.append("  無")
+        return '\n'.join(lines) + '\n\n'
+
+    def format_summary(self, result, limit=3):
+        parts = [f"🧠 記憶體 (運行 {result['uptime'] / 3600:.1f} 小時):"]
+        if result['rss_mb'] is not None:
+            parts.append(f"RSS {result['rss_mb']:.1f} MB ({result['rss_growth_mb_per_hour']:+.1f} MB/小時),")
+        parts.append(f"tracemalloc {result['traced_mb']:.1f} MB")
+        lines = [' '.join(parts)]
+        for entry in result['hotspots'][:limit]:
+            lines.append(f"   ⚠️ 持續增長 {entry['size_diff_kb']:+.0f} KB  {entry['file']}:{entry['line']}")
+        return '\n'.join(lines)
+
+    def get_stats(self):
+        return {
+            'running': self.is_running,
+            'report_path': self.report_path,
+            'interval': self.interval,
+            'snapshots': self.snapshots,
+            'latest': self.latest,
+            'pools': get_pool_stats(),
+        }
+
+
+# ----------------------------------------------------------------------
+# 長時間運行模式
+# ----------------------------------------------------------------------
+
+_monitor = None
+
+
+def get_memory_monitor():
+    """獲取目前的記憶體監控（未啟用長時間運行模式時為 None）"""
+    return _monitor
+
+
+def _collect_metrics():
+    """指標端點的收集函數：緩衝池與 tracemalloc"""
+    samples = []
+    for name, stats in get_pool_stats().items():
+        samples.append(('buffer_pool_bytes', {'pool': name}, stats['bytes']))
+        for event in ('reused', 'allocated', 'overflow'):
+            samples.append(('buffer_pool_events_total', {'pool': name, 'event': event}, stats[event]))
+    if tracemalloc.is_tracing():
+        samples.append(('traced_memory_bytes', {}, tracemalloc.get_traced_memory()[0]))
+    return samples
+
+
+def start_long_run_mode(log=print):
+    """啟用緩衝池並啟動記憶體監控（已啟動時直接返回）；參數取自 config.LONG_RUN_*"""
+    global _monitor
+    import config
+    from core.metrics import get_metrics
+
+    if _monitor is not None and _monitor.is_running:
+        return _monitor
+    get_buffer_pool('frames').enable(config.FRAME_POOL_SIZE)
+    get_buffer_pool('scratch').enable(config.SCRATCH_POOL_SIZE)
+    _monitor = MemoryMonitor(config.LONG_RUN_REPORT_DIR,
+                             interval=config.LONG_RUN_SNAPSHOT_INTERVAL,
+                             frames=config.LONG_RUN_TRACEMALLOC_FRAMES,
+                             top_n=config.LONG_RUN_TOP_N,
+                             hotspot_min_kb=config.LONG_RUN_HOTSPOT_MIN_KB,
+                             max_bytes=config.LOG_FILE_MAX_BYTES,
+                             backups=config.LOG_FILE_BACKUPS,
+                             log=log)
+    _monitor.start()
+    get_metrics().add_collector(_collect_metrics)
+    return _monitor
+
+
+def stop_long_run_mode():
+    """停止記憶體監控（寫出最後一筆報告）並停用緩衝池"""
+    from core.metrics import get_metrics
+
+    if _monitor is not None:
+        _monitor.stop()
+    get_metrics().remove_collector(_collect_metrics)
+    for pool in _pools.values():
+        pool.disable()
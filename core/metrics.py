@@ -0,0 +1,323 @@
+"""
+監控指標模組 - 計數器與量表以 Prometheus 文字格式在本機 HTTP 端點輸出（GET /metrics）
+
+- 事件計數（循環次數、怪物檢測、攻擊、rune、換頻道、搜尋、過時畫面）以 inc(name, **labels) 累加，
+  目前值（隊列深度等）由各元件註冊的收集函數在抓取時提供，平時不需要任何背景工作
+- 每次抓取另外匯出：perf_stats 的各階段耗時直方圖（artale_stage_latency_seconds）
+  與程序 CPU / RSS / 線程數（與 ScriptController._update_script_stats 相同的 psutil 數據）
+- 同一台機器的每個實例設定不同的 METRICS_PORT，監控端逐一抓取；
+  吞吐量以 rate(artale_loop_ticks_total[1m]) 計算，降到門檻以下即可告警
+- 計數只在程序內累加，重新啟動或重置效能統計時歸零（Prometheus 的 rate() 會自動處理計數器重置）
+"""
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from core.perf_stats import DEFAULT_BOUNDS_MS, LatencyHistogram, get_perf_stats
+
+METRIC_PREFIX = 'artale_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 指標名稱（不含前綴） -> (類型, 說明)；未列出的名稱視為 gauge
+METRIC_INFO = {
+    'loop_ticks_total': ('counter', '主循環處理的畫面數 (loop: step, pipeline / async: 決策, multi: 客戶端 tick)'),
+    'monster_detections_total': ('counter', '找到攻擊目標的怪物檢測次數'),
+    'attacks_total': ('counter', '送出的攻擊次數'),
+    'rune_events_total': ('counter', 'rune 事件 (enter / solved / failed / timeout / unreachable)'),
+    'channel_changes_total': ('counter', '換頻道次數'),
+    'search_events_total': ('counter', '角色搜尋事件 (start / found / failed)'),
+    'stale_frames_total': ('counter', '畫面過時而略過的檢查次數'),
+    'frame_age_seconds': ('histogram', '決策時的畫面年齡（截圖到決策）'),
+    'stage_latency_seconds': ('histogram', '各階段 / 檢測器的耗時'),
+    'queue_depth': ('gauge', '隊列目前的深度'),
+    'queue_dropped_total': ('counter', '隊列滿時丟棄的項目數'),
+    'input_active_timelines': ('gauge', '按鍵執行器中執行中的時間軸數'),
+    'script_running': ('gauge', '腳本是否運行中'),
+    'buffer_pool_bytes': ('gauge', '緩衝池保存的緩衝區大小（長時間運行模式）'),
+    'buffer_pool_events_total': ('counter', '緩衝池取用 (reused / allocated / overflow)'),
+    'traced_memory_bytes': ('gauge', 'tracemalloc 追蹤中的配置大小（長時間運行模式）'),
+    'collector_errors': ('gauge', '本次抓取時失敗的收集函數'),
+    'process_cpu_seconds_total': ('counter', '程序累計 CPU 時間（秒）'),
+    'process_resident_memory_bytes': ('gauge', '程序常駐記憶體 (RSS)'),
+    'process_threads': ('gauge', '程序線程數'),
+    'process_start_time_seconds': ('gauge', '程序啟動時間 (Unix 秒)'),
+}
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    value = float(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsRegistry:
+    """計數器、量表與直方圖的集合；收集函數在每次 render() 時呼叫"""
+
+    def __init__(self, prefix=METRIC_PREFIX):
+        self.prefix = prefix
+        self._values = {}      # 名稱 -> {標籤: 值}（計數器與量表）
+        self._histograms = {}  # 名稱 -> {標籤: LatencyHistogram}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 記錄
+    # ------------------------------------------------------------------
+
+    def inc(self, name, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+
+    def observe(self, name, seconds, **labels):
+        """記錄一筆耗時到直方圖（與 perf_stats 相同的固定區間）"""
+        key = _label_key(labels)
+        histogram = self._histograms.get(name, {}).get(key)
+        if histogram is None:
+            with self._lock:
+                series = self._histograms.setdefault(name, {})
+                histogram = series.get(key)
+                if histogram is None:
+                    histogram = series[key] = LatencyHistogram(name, DEFAULT_BOUNDS_MS)
+        histogram.record(seconds)
+
+    def get(self, name, **labels):
+        """計數器 / 量表目前的值（不存在時為 0）"""
+        with self._lock:
+            return self._values.get(name, {}).get(_label_key(labels), 0)
+
+    def add_collector(self, func):
+        """func() 返回 [(名稱, {標籤}, 值), ...]，每次抓取時呼叫；重複加入同一函數只算一次"""
+        with self._lock:
+            if func not in self._collectors:
+                self._collectors.append(func)
+
+    def remove_collector(self, func):
+        with self._lock:
+            if func in self._collectors:
+                self._collectors.remove(func)
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+            self._histograms = {}
+
+    # ------------------------------------------------------------------
+    # 輸出
+    # ------------------------------------------------------------------
+
+    def _collect_samples(self):
+        """所有計數器 / 量表樣本：{名稱: {標籤: 值}}"""
+        with self._lock:
+            samples = {name: dict(series) for name, series in self._values.items()}
+            collectors = list(self._collectors)
+
+        for collector in collectors + [_process_samples]:
+            try:
+                for name, labels, value in collector():
+                    samples.setdefault(name, {})[_label_key(labels)] = value
+            except Exception:
+                # 收集失敗不影響其他指標，以 collector_errors 標出是哪個收集函數
+                name = getattr(collector, '__qualname__', repr(collector))
+                samples.setdefault('collector_errors', {})[_label_key({'collector': name})] = 1
+        return samples
+
+    def _collect_histograms(self):
+        """{名稱: [(標籤, LatencyHistogram), ...]}，含 perf_stats 的各階段耗時"""
+        with self._lock:
+            histograms = {name: sorted(series.items()) for name, series in self._histograms.items()}
+        histograms['stage_latency_seconds'] = [((('stage', name),), histogram)
+                                               for name, histogram in get_perf_stats().histograms()]
+        return histograms
+
+    def _header(self, lines, name, default_type):
+        metric_type, help_text = METRIC_INFO.get(name, (default_type, name))
+        full_name = self.prefix + name
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {metric_type}")
+        return full_name
+
+    def render(self):
+        """Prometheus 文字格式 (version 0.0.4)"""
+        lines = []
+        for name, series in sorted(self._collect_samples().items()):
+            full_name = self._header(lines, name, 'gauge')
+            for labels, value in sorted(series.items()):
+                lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+
+        for name, series in sorted(self._collect_histograms().items()):
+            if not series:
+                continue
+            full_name = self._header(lines, name, 'histogram')
+            for labels, histogram in series:
+                bounds, counts, count, total_ms = histogram.buckets()
+                cumulative = 0
+                for bound, bucket_count in zip(bounds, counts):
+                    cumulative += bucket_count
+                    bucket_labels = labels + (('le', _format_value(bound / 1000)),)
+                    lines.append(f"{full_name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{full_name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(total_ms / 1000)}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _process_samples():
+    """程序 CPU / 記憶體 / 線程數；沒有 psutil 時只輸出線程數"""
+    if psutil is None:
+        return [('process_threads', {}, threading.active_count())]
+    process = psutil.Process(os.getpid())
+    with process.oneshot():
+        cpu = process.cpu_times()
+        return [
+            ('process_cpu_seconds_total', {}, cpu.user + cpu.system),
+            ('process_resident_memory_bytes', {}, process.memory_info().rss),
+            ('process_threads', {}, process.num_threads()),
+            ('process_start_time_seconds', {}, process.create_time()),
+        ]
+
+
+# ----------------------------------------------------------------------
+# HTTP 端點
+# ----------------------------------------------------------------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        try:
+            body = self.server.registry.render().encode('utf-8')
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 監控端每隔幾秒抓取一次，不寫入腳本日誌
+        pass
+
+
+class _MetricsHTTPServer(ThreadingHTTPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class MetricsServer:
+    """本機指標端點 - 獨立線程處理 HTTP 請求，不影響腳本線程"""
+
+    def __init__(self, registry, host='127.0.0.1', port=9150):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    @property
+    def is_running(self):
+        return self.server is not None
+
+    def start(self):
+        if self.server is not None:
+            return True
+        try:
+            self.server = _MetricsHTTPServer((self.host, self.port), _MetricsHandler)
+        except OSError as e:
+            print(f"⚠️ 指標端點無法啟動 ({self.host}:{self.port}): {e}")
+            return False
+        self.server.registry = self.registry
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+        self.thread.start()
+        print(f"📈 指標端點: http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(timeout=2.0)
+        self.server = None
+        self.thread = None
+
+
+# 全局指標實例
+_metrics = MetricsRegistry()
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_metrics():
+    """獲取指標實例"""
+    return _metrics
+
+
+def inc(name, amount=1, **labels):
+    _metrics.inc(name, amount, **labels)
+
+
+def set_gauge(name, value, **labels):
+    _metrics.set_gauge(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    _metrics.observe(name, seconds, **labels)
+
+
+def start_metrics_server(host=None, port=None):
+    """啟動全局指標端點（已啟動時直接返回）；位址預設為 config.METRICS_HOST / METRICS_PORT"""
+    global _server
+    import config
+
+    with _server_lock:
+        if _server is None or not _server.is_running:
+            _server = MetricsServer(_metrics,
+                                    host or config.METRICS_HOST,
+                                    config.METRICS_PORT if port is None else port)
+            _server.start()
+        return _server if _server.is_running else None
+
+
+def stop_metrics_server():
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.stop()
+            _server = None
@@ -0,0 +1,185 @@
+"""
+小地圖定位模組 - 以小地圖上的角色標記推算角色畫面位置，只在小範圍內精修 medal 匹配
+
+定位結果會更新校正比例與上一次位置，圖像處理工作線程與主循環可能同時定位，
+locate_medal / reset / configure 以同一把鎖逐一執行
+"""
+import threading
+
+import cv2
+import numpy as np
+
+
+class MinimapLocator:
+    def __init__(self):
+        # 小地圖區域（與 RedDotDetector 相同的左上角裁切）
+        self.minimap_max_width = 300
+        self.minimap_max_height = 200
+
+        # 角色標記顏色範圍（HSV，黃色標記）
+        self.marker_hsv_lower = np.array([20, 120, 180], dtype=np.uint8)
+        self.marker_hsv_upper = np.array([35, 255, 255], dtype=np.uint8)
+        self.marker_min_area = 3
+        self.marker_max_area = 80
+
+        # 精修窗口大小（以預測的 medal 左上角為中心，左右 / 上下各延伸）
+        self.refine_half_width = 160
+        self.refine_half_height = 110
+
+        # 小地圖位移 → 畫面位移的比例（由連續兩次定位結果自動校正）
+        self.scale_x = 0.0
+        self.scale_y = 0.0
+        self.scale_smoothing = 0.3
+        self.min_marker_shift = 2
+        self.max_scale = 40.0
+
+        # 最近一次成功定位
+        self.last_marker = None
+        self.last_medal_loc = None
+
+        # 統計
+        self.refine_hits = 0
+        self.full_searches = 0
+
+        self.debug_minimap = False
+        self._lock = threading.Lock()
+
+    def configure(self, refine_half_width=None, refine_half_height=None):
+        """套用配置中的精修窗口大小"""
+        with self._lock:
+            if refine_half_width is not None:
+                self.refine_half_width = int(refine_half_width)
+            if refine_half_height is not None:
+                self.refine_half_height = int(refine_half_height)
+
+    def reset(self):
+        """清除定位狀態（換頻、換地圖後使用）"""
+        with self._lock:
+            self.last_marker = None
+            self.last_medal_loc = None
+            self.scale_x = 0.0
+            self.scale_y = 0.0
+
+    def find_player_marker(self, screenshot):
+        """在小地圖區域以顏色遮罩找出角色標記，返回標記中心 (x, y) 或 None"""
+        if screenshot is None:
+            return None
+
+        h, w = screenshot.shape[:2]
+        minimap = screenshot[0:min(self.minimap_max_height, h // 2), 0:min(self.minimap_max_width, w // 3)]
+        if minimap.size == 0:
+            return None
+
+        hsv = cv2.cvtColor(minimap, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, self.marker_hsv_lower, self.marker_hsv_upper)
+
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if count <= 1:
+            return None
+
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        valid = np.nonzero((areas >= self.marker_min_area) & (areas <= self.marker_max_area))[0]
+        if valid.size == 0:
+            return None
+
+        candidates = centroids[1:][valid]
+        if self.last_marker is not None and candidates.shape[0] > 1:
+            # 多個候選時取最接近上一次標記的位置
+            distances = np.abs(candidates - np.array(self.last_marker)).sum(axis=1)
+            best = candidates[int(np.argmin(distances))]
+        else:
+            best = candidates[int(np.argmax(areas[valid]))]
+
+        return float(best[0]), float(best[1])
+
+    def predict_medal_loc(self, marker):
+        """依小地圖標記位移推算 medal 左上角的畫面位置"""
+        if marker is None or self.last_marker is None or self.last_medal_loc is None:
+            return None
+
+        dx = marker[0] - self.last_marker[0]
+        dy = marker[1] - self.last_marker[1]
+        return (int(round(self.last_medal_loc[0] + dx * self.scale_x)),
+                int(round(self.last_medal_loc[1] + dy * self.scale_y)))
+
+    def _match_in_window(self, screenshot, template, threshold, predicted_loc):
+        """只在預測位置附近的小窗口內做模板匹配"""
+        h, w = screenshot.shape[:2]
+        th, tw = template.shape[:2]
+
+        x1 = max(0, predicted_loc[0] - self.refine_half_width)
+        y1 = max(0, predicted_loc[1] - self.refine_half_height)
+        x2 = min(w, predicted_loc[0] + tw + self.refine_half_width)
+        y2 = min(h, predicted_loc[1] + th + self.refine_half_height)
+
+        if x2 - x1 < tw or y2 - y1 < th:
+            return False, None, 0.0
+
+        window = screenshot[y1:y2, x1:x2]
+        result = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+
+        if max_val >= threshold:
+            return True, (max_loc[0] + x1, max_loc[1] + y1), max_val
+        return False, None, max_val
+
+    def _update_calibration(self, marker, medal_loc):
+        """以連續兩次成功定位更新小地圖→畫面的位移比例"""
+        if marker is not None and self.last_marker is not None and self.last_medal_loc is not None:
+            dx = marker[0] - self.last_marker[0]
+            dy = marker[1] - self.last_marker[1]
+            alpha = self.scale_smoothing
+
+            if abs(dx) >= self.min_marker_shift:
+                sample = (medal_loc[0] - self.last_medal_loc[0]) / dx
+                sample = max(0.0, min(self.max_scale, sample))
+                self.scale_x = (1 - alpha) * self.scale_x + alpha * sample
+            if abs(dy) >= self.min_marker_shift:
+                sample = (medal_loc[1] - self.last_medal_loc[1]) / dy
+                sample = max(0.0, min(self.max_scale, sample))
+                self.scale_y = (1 - alpha) * self.scale_y + alpha * sample
+
+        if marker is not None:
+            self.last_marker = marker
+        self.last_medal_loc = medal_loc
+
+    def locate_medal(self, screenshot, medal_template, threshold):
+        """小地圖定位 + 小窗口精修；無法預測或精修失敗時退回全畫面匹配
+
+        返回值與 simple_find_medal 相同：(found, loc, match_val)
+        """
+        with self._lock:
+            return self._locate_medal(screenshot, medal_template, threshold)
+
+    def _locate_medal(self, screenshot, medal_template, threshold):
+        from core.utils import simple_find_medal
+
+        marker = self.find_player_marker(screenshot)
+        predicted_loc = self.predict_medal_loc(marker)
+
+        if predicted_loc is not None:
+            found, loc, val = self._match_in_window(screenshot, medal_template, threshold, predicted_loc)
+            if found:
+                self.refine_hits += 1
+                self._update_calibration(marker, loc)
+                return True, loc, val
+            if self.debug_minimap:
+                print(f"🗺️ [調試] 小窗口精修失敗 (預測 {predicted_loc}, 匹配度 {val:.2f})，改用全畫面匹配")
+
+        self.full_searches += 1
+        found, loc, val = simple_find_medal(screenshot, medal_template, threshold)
+        if found:
+            self._update_calibration(marker, loc)
+        elif marker is None:
+            # 小地圖與畫面皆找不到角色，下次重新完整定位
+            self.last_marker = None
+        return found, loc, val
+
+    def get_stats(self):
+        total = self.refine_hits + self.full_searches
+        return {
+            'refine_hits': self.refine_hits,
+            'full_searches': self.full_searches,
+            'refine_ratio': self.refine_hits / total if total else 0.0,
+            'scale': (self.scale_x, self.scale_y),
+        }
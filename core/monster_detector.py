@@ -4,6 +4,24 @@
 import cv2
 import os
 import glob
+import numpy as np
+
+from core.config_snapshot import ConfigBinding
+from core.config_reload import SwapGate
+from core.logger import get_logger
+from core.long_run import get_buffer_pool
+from core.metrics import get_metrics
+from core.perf_stats import timed_call
+from core.tracing import mark_current
+
+log = get_logger('monster_detector')
+
+# 怪物分類 -> 對應的 Y 軸容忍度設定欄位
+CATEGORY_Y_TOLERANCE_FIELDS = {
+    "小型": 'SMALL_MONSTER_Y_TOLERANCE',
+    "中型": 'MEDIUM_MONSTER_Y_TOLERANCE',
+    "大型": 'LARGE_MONSTER_Y_TOLERANCE',
+}
 
 
 class SimplifiedMonsterDetector:
@@ -13,117 +31,428 @@ class SimplifiedMonsterDetector:
         self.template_sizes = []
         self.template_categories = []
 
-    def load_selected_monsters(self):
-        """載入選定的怪物模板"""
-        from config import ENABLED_MONSTERS, MONSTER_BASE_PATH
-        
-        monster_templates = []
+        # ★★★ 新增：倒角匹配 (chamfer) 模式參數 ★★★
+        self.match_mode = 'ccoeff'  # 'ccoeff' = 密集相關匹配, 'chamfer' = 距離轉換倒角匹配
+        self.monster_templates_points = []  # 每個模板的稀疏邊緣點 (ys, xs)
+        self.monster_templates_distance = []  # 每個模板自身的距離轉換圖（反向項用）
+        self.monster_templates_support = []  # 模板邊緣凸包範圍（反向項只看此範圍內的畫面邊緣）
+        self.monster_templates_edge_counts = []
+        self.chamfer_max_points = 120
+        self.chamfer_truncate = 5.0  # 距離上限，避免雜訊邊緣主導分數
+        self.chamfer_coarse_step = 4
+        self.chamfer_refine_candidates = 3
+        self.chamfer_max_edge_density = 1.35  # 凸包內畫面邊緣數 / 模板邊緣數 超過此值視為雜物
+        self.chamfer_threshold_moving = 0.88
+        self.chamfer_threshold_idle = 0.9
+
+        # ★★★ 新增：由設定衍生的檢測範圍快取 (靜止, 移動)，設定版本改變時才重算 ★★★
+        self.detection_sizes = (400, 400)
+        self.config = ConfigBinding(self._rebind_config)
+
+        # ★★★ 新增：熱重載 - 依怪物分組的分析結果，換上新模板時與檢測互斥 ★★★
+        self.templates_by_monster = {}
+        self.monster_base_path = None
+        self.swap_gate = SwapGate()
+
+    def _rebind_config(self, cfg):
+        """設定快照版本改變時重新計算衍生數值"""
+        self.match_mode = cfg.MONSTER_MATCH_MODE
+        for category in self.template_categories:
+            category['y_tolerance'] = getattr(cfg, CATEGORY_Y_TOLERANCE_FIELDS[category['type']])
+        self._update_detection_sizes(cfg)
+
+    def _update_detection_sizes(self, cfg):
+        """根據怪物模板尺寸與設定計算靜止/移動時的檢測範圍"""
+        if not self.template_sizes:
+            self.detection_sizes = (400, 400)
+            return
+
+        # 找出最大的模板尺寸
+        max_template_size = max(max(w, h) for w, h in self.template_sizes)
+
+        # 基礎檢測範圍；移動時適度增加範圍
+        base_size = max(cfg.ATTACK_RANGE_X, max_template_size + 100)
+        self.detection_sizes = tuple(
+            max(cfg.MIN_DETECTION_SIZE, min(cfg.MAX_DETECTION_SIZE, size))
+            for size in (base_size, base_size + 50)
+        )
+
+    def load_monster_templates(self, monster_names, base_path):
+        """載入指定怪物的模板，返回 {怪物名稱: [模板, ...]}"""
+        templates_by_monster = {}
         image_extensions = ['*.png', '*.jpg', '*.jpeg', '*.bmp', '*.webp']
         
-        print(f"載入選定怪物: {ENABLED_MONSTERS}")
-        
-        for monster_name in ENABLED_MONSTERS:
-            monster_folder = os.path.join(MONSTER_BASE_PATH, monster_name)
+        for monster_name in monster_names:
+            monster_folder = os.path.join(base_path, monster_name)
             
             if not os.path.exists(monster_folder):
                 print(f"警告: 找不到怪物資料夾 {monster_name}")
                 continue
             
-            loaded_count = 0
+            templates = []
             for ext in image_extensions:
                 for file_path in glob.glob(os.path.join(monster_folder, ext)):
                     template = cv2.imread(file_path, cv2.IMREAD_COLOR)
                     if template is not None:
-                        monster_templates.append(template)
-                        loaded_count += 1
+                        templates.append(template)
                         print(f"載入: {monster_name}/{os.path.basename(file_path)}")
             
-            print(f"{monster_name}: 載入 {loaded_count} 張圖片")
+            templates_by_monster[monster_name] = templates
+            print(f"{monster_name}: 載入 {len(templates)} 張圖片")
+        
+        return templates_by_monster
+
+    def load_selected_monsters(self):
+        """載入選定的怪物模板"""
+        from config import ENABLED_MONSTERS, MONSTER_BASE_PATH
+        
+        print(f"載入選定怪物: {ENABLED_MONSTERS}")
+        templates_by_monster = self.load_monster_templates(ENABLED_MONSTERS, MONSTER_BASE_PATH)
+        monster_templates = [t for templates in templates_by_monster.values() for t in templates]
         
         print(f"總計載入 {len(monster_templates)} 個怪物模板")
         return monster_templates
+
+    def _analyze_template(self, template, cfg):
+        """分析單一模板：邊緣、稀疏邊緣點、尺寸與分類"""
+        # 生成邊緣檢測模板
+        edges = cv2.Canny(template, 50, 150)
+        
+        # 記錄模板尺寸
+        h, w = template.shape[:2]
+        
+        # 簡化分類標準：140x140 以上為大型
+        max_size = max(w, h)
+        if max_size < 100:
+            category = {
+                "type": "小型", 
+                "y_tolerance": cfg.SMALL_MONSTER_Y_TOLERANCE,
+                "jump_strategy": "conservative"
+            }
+        elif max_size < 140:
+            category = {
+                "type": "中型", 
+                "y_tolerance": cfg.MEDIUM_MONSTER_Y_TOLERANCE,
+                "jump_strategy": "balanced"
+            }
+        else:  # >= 140 像素
+            category = {
+                "type": "大型", 
+                "y_tolerance": cfg.LARGE_MONSTER_Y_TOLERANCE,
+                "jump_strategy": "selective"
+            }
+        
+        distance, support = self._template_reverse_maps(edges)
+        return {
+            'template': template,
+            'edges': edges,
+            'points': self._extract_edge_points(edges),
+            'distance': distance,
+            'support': support,
+            'edge_count': int(np.count_nonzero(edges)),
+            'size': (w, h),
+            'category': category,
+        }
+
+    def _install_entries(self, entries):
+        """以分析結果替換模板相關列表（呼叫端負責與檢測互斥）"""
+        self.monster_templates = [entry['template'] for entry in entries]
+        self.monster_templates_edges = [entry['edges'] for entry in entries]
+        self.monster_templates_points = [entry['points'] for entry in entries]
+        self.monster_templates_distance = [entry['distance'] for entry in entries]
+        self.monster_templates_support = [entry['support'] for entry in entries]
+        self.monster_templates_edge_counts = [entry['edge_count'] for entry in entries]
+        self.template_sizes = [entry['size'] for entry in entries]
+        self.template_categories = [entry['category'] for entry in entries]
+        self._update_detection_sizes(self.config.current())
         
     def setup_templates(self, monster_templates=None):
         """設置怪物模板並分析尺寸"""
-        # 如果沒有提供模板，就載入選定的怪物
+        cfg = self.config.current()
+        self.match_mode = cfg.MONSTER_MATCH_MODE
+
+        # 如果沒有提供模板，就載入選定的怪物（依怪物分組，供熱重載只重建有變動的怪物）
         if monster_templates is None:
-            monster_templates = self.load_selected_monsters()
-            
-        self.monster_templates = monster_templates
-        self.monster_templates_edges = []
-        self.template_sizes = []
-        self.template_categories = []
+            from config import ENABLED_MONSTERS, MONSTER_BASE_PATH
+            print(f"載入選定怪物: {ENABLED_MONSTERS}")
+            groups = self.load_monster_templates(ENABLED_MONSTERS, MONSTER_BASE_PATH)
+            self.monster_base_path = MONSTER_BASE_PATH
+        else:
+            groups = {None: monster_templates}
+            self.monster_base_path = None
         
         print("分析怪物模板尺寸...")
-        for i, template in enumerate(monster_templates, 1):
-            # 生成邊緣檢測模板
-            edges = cv2.Canny(template, 50, 150)
-            self.monster_templates_edges.append(edges)
-            
-            # 記錄模板尺寸
-            h, w = template.shape[:2]
-            self.template_sizes.append((w, h))
-            
-            # 簡化分類標準：140x140 以上為大型
-            max_size = max(w, h)
-            if max_size < 100:
-                from config import SMALL_MONSTER_Y_TOLERANCE
-                category = {
-                    "type": "小型", 
-                    "y_tolerance": SMALL_MONSTER_Y_TOLERANCE,
-                    "jump_strategy": "conservative"
-                }
-            elif max_size < 140:
-                from config import MEDIUM_MONSTER_Y_TOLERANCE
-                category = {
-                    "type": "中型", 
-                    "y_tolerance": MEDIUM_MONSTER_Y_TOLERANCE,
-                    "jump_strategy": "balanced"
-                }
-            else:  # >= 140 像素
-                from config import LARGE_MONSTER_Y_TOLERANCE
-                category = {
-                    "type": "大型", 
-                    "y_tolerance": LARGE_MONSTER_Y_TOLERANCE,
-                    "jump_strategy": "selective"
-                }
-            
-            self.template_categories.append(category)
+        self.templates_by_monster = {}
+        entries = []
+        for name, templates in groups.items():
+            self.templates_by_monster[name] = [self._analyze_template(template, cfg) for template in templates]
+            entries.extend(self.templates_by_monster[name])
+
+        for i, entry in enumerate(entries, 1):
+            w, h = entry['size']
+            category = entry['category']
             print(f"怪物模板 {i}: {w}x{h} ({category['type']}) - Y軸閾值: {category['y_tolerance']}px")
-        
+
+        with self.swap_gate.swapping():
+            self._install_entries(entries)
         print("已完成怪物模板分析")
-        
+
+    def share_templates_from(self, other):
+        """★★★ 新增：多開模式共用另一個檢測器已分析好的模板（唯讀，不重複載入與分析）★★★"""
+        self.match_mode = other.match_mode
+        entries = [entry for group in other.templates_by_monster.values() for entry in group]
+        with self.swap_gate.swapping():
+            self.templates_by_monster = other.templates_by_monster
+            self.monster_base_path = other.monster_base_path
+            self._install_entries(entries)
+
+    def prepare_template_reload(self, monster_names, base_path):
+        """★★★ 新增：熱重載準備 - 只載入新增怪物的模板，返回 (commit, 摘要)
+
+        準備期間不修改運行中的資料；commit 等待進行中的檢測結束後一次換上
+        """
+        cfg = self.config.current()
+        if base_path != self.monster_base_path:
+            reusable = {}  # 資料夾路徑改變，全部重新載入
+        else:
+            reusable = self.templates_by_monster
+
+        kept = [name for name in monster_names if name in reusable]
+        added = [name for name in monster_names if name not in reusable]
+        removed = [name for name in self.templates_by_monster if name not in monster_names]
+
+        loaded = self.load_monster_templates(added, base_path)
+        groups = {}
+        for name in monster_names:
+            if name in reusable:
+                groups[name] = reusable[name]
+            else:
+                groups[name] = [self._analyze_template(template, cfg) for template in loaded.get(name, [])]
+
+        entries = [entry for group in groups.values() for entry in group]
+        if not entries:
+            raise ValueError(f"沒有載入到任何怪物模板: {list(monster_names)}")
+
+        def commit():
+            with self.swap_gate.swapping():
+                self.templates_by_monster = groups
+                self.monster_base_path = base_path
+                self._install_entries(entries)
+
+        summary = f"保留 {len(kept)} 種, 新增 {added or '無'}, 移除 {removed or '無'}, 共 {len(entries)} 個模板"
+        return commit, summary
+
     def get_detection_size(self, movement_state):
-        """根據怪物模板尺寸決定檢測範圍"""
-        from config import MIN_DETECTION_SIZE, MAX_DETECTION_SIZE
-        
-        if not self.template_sizes:
-            return 400
-            
-        # 找出最大的模板尺寸
-        max_template_size = max(max(w, h) for w, h in self.template_sizes)
+        """根據怪物模板尺寸決定檢測範圍（取快取值，設定改變時由 _rebind_config 重算）"""
+        self.config.current()
+        return self.detection_sizes[1 if movement_state else 0]
 
-        # 基礎檢測範圍
-        from config import ATTACK_RANGE_X
-        base_size = max(ATTACK_RANGE_X, max_template_size + 100)
-        
-        # 移動時適度增加範圍
-        if movement_state:
-            detection_size = base_size + 50
+    def _extract_edge_points(self, template_edges):
+        """★★★ 新增：取出模板的稀疏邊緣點，點數過多時均勻抽樣 ★★★"""
+        ys, xs = np.nonzero(template_edges)
+        if ys.size > self.chamfer_max_points:
+            keep = np.linspace(0, ys.size - 1, self.chamfer_max_points).astype(np.intp)
+            ys, xs = ys[keep], xs[keep]
+        return ys, xs
+
+    def _template_reverse_maps(self, template_edges):
+        """★★★ 新增：反向項用的模板距離轉換圖與邊緣凸包遮罩 ★★★"""
+        non_edges = (template_edges == 0).astype(np.uint8)
+        distance = np.minimum(cv2.distanceTransform(non_edges, cv2.DIST_L2, 3), self.chamfer_truncate)
+        support = np.zeros(template_edges.shape[:2], dtype=np.uint8)
+        ys, xs = np.nonzero(template_edges)
+        if ys.size >= 3:
+            hull = cv2.convexHull(np.stack([xs, ys], axis=1).astype(np.int32))
+            cv2.fillConvexPoly(support, hull, 1)
+        return distance, support.astype(bool)
+
+    def compute_distance_map(self, region_edges):
+        """★★★ 新增：每個 tick 只計算一次的邊緣距離轉換圖（暫存緩衝區取自緩衝池）★★★"""
+        pool = get_buffer_pool('scratch')
+        _, non_edges = cv2.threshold(region_edges, 0, 1, cv2.THRESH_BINARY_INV,
+                                     dst=pool.acquire(region_edges.shape))
+        distance_map = cv2.distanceTransform(non_edges, cv2.DIST_L2, 3,
+                                             dst=pool.acquire(region_edges.shape, np.float32))
+        return np.minimum(distance_map, self.chamfer_truncate, out=distance_map)
+
+    def _chamfer_scores(self, distance_map, points, x0, y0, nx, ny, step):
+        """對 (ny, nx) 個候選左上角位置同時計算平均倒角距離"""
+        ys, xs = points
+        scores = np.zeros((ny, nx), dtype=np.float32)
+        x_span = (nx - 1) * step + 1
+        y_span = (ny - 1) * step + 1
+        for py, px in zip(ys, xs):
+            scores += distance_map[y0 + py:y0 + py + y_span:step, x0 + px:x0 + px + x_span:step]
+        return scores / len(ys)
+
+    def _reverse_chamfer(self, region_edges, template_index, x, y):
+        """★★★ 新增：反向項 - 模板凸包內的畫面邊緣到模板邊緣的平均距離
+
+        單向分數只檢查模板邊緣附近有沒有畫面邊緣，雜亂的畫面處處都有邊緣；
+        凸包內畫面邊緣遠多於模板邊緣（雜物、文字）時直接視為不匹配
+        """
+        distance = self.monster_templates_distance[template_index]
+        h, w = distance.shape[:2]
+        frame_edges = (region_edges[y:y + h, x:x + w] > 0) & self.monster_templates_support[template_index]
+        count = np.count_nonzero(frame_edges)
+        if count == 0 or count > self.chamfer_max_edge_density * self.monster_templates_edge_counts[template_index]:
+            return self.chamfer_truncate
+        return float(distance[frame_edges].mean())
+
+    def _chamfer_match(self, distance_map, region_edges, template_index, rois=None):
+        """★★★ 新增：粗網格 + 局部精修的雙向倒角匹配，返回 (相似度, 檢測區域內座標)
+
+        精修後的每個候選位置取 max(正向, 反向) 平均距離，分數最好的候選為結果
+        ★★★"""
+        points = self.monster_templates_points[template_index]
+        if len(points[0]) == 0:
+            return 0.0, (0, 0)
+
+        template_h, template_w = self.monster_templates_edges[template_index].shape[:2]
+        region_h, region_w = distance_map.shape[:2]
+        max_x = region_w - template_w + 1
+        max_y = region_h - template_h + 1
+        if max_x <= 0 or max_y <= 0:
+            return 0.0, (0, 0)
+
+        # 允許的左上角範圍 [x1, x2) x [y1, y2)
+        if rois is None:
+            windows = [(0, 0, max_x, max_y)]
         else:
-            detection_size = base_size
-            
-        # 限制範圍
-        detection_size = max(MIN_DETECTION_SIZE, min(MAX_DETECTION_SIZE, detection_size))
-        
-        return detection_size
+            windows = []
+            for x1, y1, x2, y2 in rois:
+                wx1 = max(0, min(x1, x2 - template_w))
+                wy1 = max(0, min(y1, y2 - template_h))
+                wx2 = min(max_x, max(wx1 + 1, x2 - template_w + 1))
+                wy2 = min(max_y, max(wy1 + 1, y2 - template_h + 1))
+                if wx2 > wx1 and wy2 > wy1:
+                    windows.append((wx1, wy1, wx2, wy2))
+
+        step = self.chamfer_coarse_step
+        best_score = float('inf')
+        best_loc = (0, 0)
+
+        for wx1, wy1, wx2, wy2 in windows:
+            nx = (wx2 - wx1 + step - 1) // step
+            ny = (wy2 - wy1 + step - 1) // step
+            coarse = self._chamfer_scores(distance_map, points, wx1, wy1, nx, ny, step)
+
+            # 取最好的幾個粗網格位置做局部精修
+            flat = coarse.ravel()
+            k = min(self.chamfer_refine_candidates, flat.size)
+            candidates = np.argpartition(flat, k - 1)[:k]
+
+            for index in candidates:
+                cy, cx = divmod(int(index), nx)
+                center_x = wx1 + cx * step
+                center_y = wy1 + cy * step
+                rx1 = max(wx1, center_x - step + 1)
+                ry1 = max(wy1, center_y - step + 1)
+                rx2 = min(wx2, center_x + step)
+                ry2 = min(wy2, center_y + step)
+
+                fine = self._chamfer_scores(distance_map, points, rx1, ry1, rx2 - rx1, ry2 - ry1, 1)
+                fy, fx = np.unravel_index(int(np.argmin(fine)), fine.shape)
+                if fine[fy, fx] >= best_score:
+                    continue
+                loc = (rx1 + int(fx), ry1 + int(fy))
+                score = max(float(fine[fy, fx]), self._reverse_chamfer(region_edges, template_index, *loc))
+                if score < best_score:
+                    best_score = score
+                    best_loc = loc
+
+        if best_score == float('inf'):
+            return 0.0, (0, 0)
 
-    def detect_monsters(self, screenshot, player_x, player_y, client_width, client_height, movement, cliff_detection, client_x, client_y):
-        """智能Y軸限制的怪物檢測"""
-        from core.utils import preprocess_screenshot, quick_attack_monster
-        from config import Y_LAYER_THRESHOLD, JUMP_ATTACK_MODE
+        # 平均距離轉為 0~1 的相似度，與相關匹配的「越大越好」一致
+        return 1.0 - best_score / self.chamfer_truncate, best_loc
+
+    def get_match_threshold(self, is_moving):
+        """依匹配模式返回閾值"""
+        if self.match_mode == 'chamfer':
+            return self.chamfer_threshold_moving if is_moving else self.chamfer_threshold_idle
+        return 0.3 if is_moving else 0.35
+
+    def _clip_candidate_rois(self, candidate_rois, region_x, region_y, actual_width, actual_height):
+        """★★★ 新增：將前景候選區域轉為檢測區域內的座標 ★★★"""
+        clipped = []
+        for x1, y1, x2, y2 in candidate_rois:
+            cx1 = max(0, x1 - region_x)
+            cy1 = max(0, y1 - region_y)
+            cx2 = min(actual_width, x2 - region_x)
+            cy2 = min(actual_height, y2 - region_y)
+            if cx2 > cx1 and cy2 > cy1:
+                clipped.append((cx1, cy1, cx2, cy2))
+        return clipped
+
+    def _match_in_rois(self, detection_region, roi_edges_cache, rois, template_edges):
+        """★★★ 新增：只在前景區塊內匹配模板，返回 (最高匹配度, 檢測區域內座標) ★★★"""
+        from core.utils import preprocess_screenshot
+
+        template_h, template_w = template_edges.shape[:2]
+        region_h, region_w = detection_region.shape[:2]
+        best_val = -1.0
+        best_loc = (0, 0)
+
+        for roi in rois:
+            x1, y1, x2, y2 = roi
+            # 區塊至少要容納一個模板
+            if x2 - x1 < template_w:
+                x1 = max(0, min(x1, x2 - template_w))
+                x2 = min(region_w, x1 + template_w)
+            if y2 - y1 < template_h:
+                y1 = max(0, min(y1, y2 - template_h))
+                y2 = min(region_h, y1 + template_h)
+            if x2 - x1 < template_w or y2 - y1 < template_h:
+                continue
+
+            cache_key = (x1, y1, x2, y2)
+            roi_edges = roi_edges_cache.get(cache_key)
+            if roi_edges is None:
+                roi_edges = preprocess_screenshot(detection_region[y1:y2, x1:x2])
+                roi_edges_cache[cache_key] = roi_edges
+
+            result = cv2.matchTemplate(roi_edges, template_edges, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            if max_val > best_val:
+                best_val = max_val
+                best_loc = (max_loc[0] + x1, max_loc[1] + y1)
+
+        return best_val, best_loc
+
+    def detect_monsters(self, screenshot, player_x, player_y, client_width, client_height, movement, cliff_detection, client_x, client_y, candidate_rois=None):
+        """智能Y軸限制的怪物檢測 - 找到目標後立即攻擊
+
+        candidate_rois: 背景模型提供的前景區域（畫面座標），None 表示在整個檢測範圍內匹配
+        """
+        from core.utils import quick_attack_monster
+
+        target = self.locate_monster(screenshot, player_x, player_y, client_width, client_height, movement.is_moving, candidate_rois)
+        mark_current('detect_end')
+        if target is None:
+            return False
+
+        mark_current('decide_start')
+
+        quick_attack_monster(target['monster_x'], target['monster_y'], player_x, player_y, movement, cliff_detection, target['attack_direction'], target['attack_type'])
+        return True
+
+    @timed_call('monster')
+    def locate_monster(self, screenshot, player_x, player_y, client_width, client_height, is_moving, candidate_rois=None):
+        """★★★ 新增：只做檢測不做攻擊，返回攻擊目標資訊或 None（供管線模式的檢測階段使用）★★★"""
+        with self.swap_gate.reading():
+            target = self._locate_monster(screenshot, player_x, player_y, client_width, client_height, is_moving, candidate_rois)
+        if target is not None:
+            get_metrics().inc('monster_detections_total')
+        return target
+
+    def _locate_monster(self, screenshot, player_x, player_y, client_width, client_height, is_moving, candidate_rois=None):
+        from core.utils import preprocess_screenshot
+        cfg = self.config.current()
+        Y_LAYER_THRESHOLD = cfg.Y_LAYER_THRESHOLD
+        JUMP_ATTACK_MODE = cfg.JUMP_ATTACK_MODE
         
-        detection_size = self.get_detection_size(movement.is_moving)
+        detection_size = self.get_detection_size(is_moving)
         
         region_x = max(0, min(player_x - detection_size // 2, client_width - detection_size))
         region_y = max(0, min(player_y - detection_size // 2, client_height - detection_size))
@@ -136,9 +465,23 @@ class SimplifiedMonsterDetector:
         detection_region = screenshot[region_y:region_y_end, region_x:region_x_end]
         
         if detection_region.size == 0:
-            return False
+            return None
         
-        detection_region_edges = preprocess_screenshot(detection_region)
+        # ★★★ 新增：有前景候選區域時只在區塊內匹配 ★★★
+        rois = None
+        if candidate_rois is not None:
+            rois = self._clip_candidate_rois(candidate_rois, region_x, region_y, actual_width, actual_height)
+            if not rois:
+                return None
+            roi_edges_cache = {}
+
+        # ★★★ 新增：倒角模式每個 tick 只做一次邊緣 + 距離轉換 ★★★
+        use_chamfer = self.match_mode == 'chamfer'
+        if use_chamfer:
+            region_edges = preprocess_screenshot(detection_region, scratch=True)
+            distance_map = self.compute_distance_map(region_edges)
+        elif rois is None:
+            detection_region_edges = preprocess_screenshot(detection_region, scratch=True)
         
         # 簡化檢測邏輯 - 直接按順序檢測
         for i, template_edges in enumerate(self.monster_templates_edges, 1):
@@ -149,10 +492,15 @@ class SimplifiedMonsterDetector:
                 continue
             
             try:
-                result = cv2.matchTemplate(detection_region_edges, template_edges, cv2.TM_CCOEFF_NORMED)
-                _, max_val, _, max_loc = cv2.minMaxLoc(result)
+                if use_chamfer:
+                    max_val, max_loc = self._chamfer_match(distance_map, region_edges, i-1, rois)
+                elif rois is not None:
+                    max_val, max_loc = self._match_in_rois(detection_region, roi_edges_cache, rois, template_edges)
+                else:
+                    result = cv2.matchTemplate(detection_region_edges, template_edges, cv2.TM_CCOEFF_NORMED)
+                    _, max_val, _, max_loc = cv2.minMaxLoc(result)
                 
-                threshold = 0.3 if movement.is_moving else 0.35
+                threshold = self.get_match_threshold(is_moving)
                 
                 if max_val > threshold:
                     original_template_h, original_template_w = self.monster_templates[i-1].shape[:2]
@@ -169,7 +517,8 @@ class SimplifiedMonsterDetector:
                         continue  # 跳過這個怪物
                     
                     # ★ 簡化輸出 - 只保留關鍵信息 ★
-                    print(f"🎯 攻擊{category['type']}怪物 (匹配度:{max_val:.2f}, Y差:{y_diff}px)")
+                    log.info("🎯 攻擊%s怪物 (匹配度:%.2f, Y差:%dpx)", category['type'], max_val, y_diff,
+                             key='attack_target')
                     
                     # 預計算攻擊參數
                     attack_direction = 'left' if monster_x < player_x else 'right'
@@ -186,18 +535,29 @@ class SimplifiedMonsterDetector:
                         elif category['jump_strategy'] == "selective" and y_diff > category['y_tolerance'] and y_diff > 50:
                             attack_type = 'jump'
                     
-                    quick_attack_monster(monster_x, monster_y, player_x, player_y, movement, cliff_detection, attack_direction, attack_type)
-                    return True
+                    return {
+                        'monster_x': monster_x,
+                        'monster_y': monster_y,
+                        'attack_direction': attack_direction,
+                        'attack_type': attack_type,
+                        'match_val': max_val,
+                        'category': category['type'],
+                    }
                     
             except cv2.error as e:
                 continue
         
-        return False
+        return None
 
+    @timed_call('scan')
     def scan_for_direction(self, screenshot, player_x, player_y, client_width, client_height, movement):
         """帶智能Y軸限制的遠距離掃描"""
+        with self.swap_gate.reading():
+            return self._scan_for_direction(screenshot, player_x, player_y, client_width, client_height, movement)
+
+    def _scan_for_direction(self, screenshot, player_x, player_y, client_width, client_height, movement):
         from core.utils import preprocess_screenshot
-        from config import Y_LAYER_THRESHOLD
+        Y_LAYER_THRESHOLD = self.config.current().Y_LAYER_THRESHOLD
         
         # 動態掃描範圍
         if self.template_sizes:
@@ -221,7 +581,7 @@ class SimplifiedMonsterDetector:
         if detection_region.size == 0:
             return None, None
         
-        detection_region_edges = preprocess_screenshot(detection_region)
+        detection_region_edges = preprocess_screenshot(detection_region, scratch=True)
         
         best_val = 0
         best_direction = None
@@ -4,6 +4,7 @@
 import time
 import random
 from config import JUMP_KEY, ATTACK_KEY, DASH_SKILL_KEY
+from core.input_actuator import get_input_actuator
 
 class Movement:
     def __init__(self):
@@ -26,6 +27,7 @@ class Movement:
 
     def stop(self):
         """完全停止移動並清理所有按鍵狀態"""
+        self._cancel_cliff_action()
         if self.is_moving:
             # 使用增強移動系統停止移動
             self.enhanced_movement.stop_movement(self.direction)
@@ -36,13 +38,14 @@ class Movement:
 
     def start(self, screenshot, player_x, player_y, client_width, client_height, detector):
         """開始移動 - 修正版，避免按鍵衝突"""
+        self._cancel_cliff_action()
         # ★★★ 關鍵修正：檢查並清理衝突的按鍵狀態 ★★★
         if self.is_moving:
             print(f"⚠️ 已在移動中 ({self.direction}, {self.current_movement_type})，先停止當前移動")
             self.stop()  # 完全停止當前移動，清理所有按鍵
 
-        # 減少掃描時的輸出信息
-        if time.time() - self.last_scan_time > self.scan_cooldown:
+        # 減少掃描時的輸出信息（detector 為 None 表示畫面已過時，略過遠距掃描）
+        if detector is not None and time.time() - self.last_scan_time > self.scan_cooldown:
             direction, target_y = detector.scan_for_direction(screenshot, player_x, player_y, client_width, client_height, self)
             self.last_scan_time = time.time()
         else:
@@ -88,8 +91,8 @@ class Movement:
         old_movement_type = self.current_movement_type
         current_time = time.time()
         
-        # 新增：檢查掃描冷卻
-        if current_time - self.last_scan_time > self.scan_cooldown:
+        # 新增：檢查掃描冷卻（detector 為 None 表示畫面已過時，略過遠距掃描）
+        if detector is not None and current_time - self.last_scan_time > self.scan_cooldown:
             direction, target_y = detector.scan_for_direction(screenshot, player_x, player_y, client_width, client_height, self)
             self.last_scan_time = current_time
         else:
@@ -169,7 +172,8 @@ class Movement:
 
         # ★★★ 執行實際的切換操作 ★★★
         
-        # 完全停止舊的移動，清理所有按鍵狀態
+        # 完全停止舊的移動，清理所有按鍵狀態（包含進行中的斷層動作）
+        self._cancel_cliff_action()
         self.enhanced_movement.stop_movement(old_direction)
         
         # 額外安全檢查：確保沒有衝突的按鍵狀態
@@ -187,42 +191,47 @@ class Movement:
 
         print(f"✅ 移動切換完成: {new_direction}({self.enhanced_movement.get_movement_name(new_movement_type)}) ({duration:.1f}秒)")
 
+    def _cancel_cliff_action(self):
+        """★★★ 新增：取消進行中的斷層時間軸，避免反向鍵與新的移動方向同時按住 ★★★"""
+        get_input_actuator().cancel_channel('cliff')
+
     def _switch_movement_type_only(self, old_type, new_type, direction):
         """★★★ 新增：只切換移動類型，保持移動方向不變 ★★★"""
-        import pyautogui
+        actuator = get_input_actuator()
+        owner = self.enhanced_movement.key_owner
         
         print(f"🔄 執行移動類型切換: {old_type} -> {new_type}")
         
         # 首先移除舊移動類型的特殊按鍵
         if old_type == 'jump':
             if JUMP_KEY in self.enhanced_movement.current_keys_pressed:
-                pyautogui.keyUp(JUMP_KEY)
+                actuator.release_key(JUMP_KEY, owner)
                 self.enhanced_movement.current_keys_pressed.remove(JUMP_KEY)
                 print("🔓 釋放跳躍鍵: JUMP_KEY")
         
         elif old_type == 'dash':
             from config import DASH_SKILL_KEY
             if DASH_SKILL_KEY in self.enhanced_movement.current_keys_pressed:
-                pyautogui.keyUp(DASH_SKILL_KEY)
+                actuator.release_key(DASH_SKILL_KEY, owner)
                 self.enhanced_movement.current_keys_pressed.remove(DASH_SKILL_KEY)
                 print(f"🔓 釋放位移技能鍵: {DASH_SKILL_KEY}")
         
         # 確保方向鍵保持按住
         if direction not in self.enhanced_movement.current_keys_pressed:
-            pyautogui.keyDown(direction)
+            actuator.hold_key(direction, owner)
             self.enhanced_movement.current_keys_pressed.append(direction)
             print(f"🔒 確保方向鍵按住: {direction}")
         
         # 添加新移動類型的特殊按鍵
         if new_type == 'jump' and self.enhanced_movement.can_jump():
-            pyautogui.keyDown(JUMP_KEY)
+            actuator.hold_key(JUMP_KEY, owner)
             self.enhanced_movement.current_keys_pressed.append(JUMP_KEY)
             self.enhanced_movement.last_jump_time = time.time()
             print("🔒 添加跳躍鍵: JUMP_KEY")
         
         elif new_type == 'dash' and self.enhanced_movement.can_use_dash():
             from config import DASH_SKILL_KEY
-            pyautogui.keyDown(DASH_SKILL_KEY)
+            actuator.hold_key(DASH_SKILL_KEY, owner)
             self.enhanced_movement.current_keys_pressed.append(DASH_SKILL_KEY)
             self.enhanced_movement.last_dash_time = time.time()
             print(f"🔒 添加位移技能鍵: {DASH_SKILL_KEY}")
@@ -236,6 +245,10 @@ class Movement:
             
             # 在移動過程中持續更新增強移動狀態
             self.enhanced_movement.update_movement(self.current_movement_type)
+
+            # ★★★ 新增：斷層動作結束後由移動模組自行重新按下方向鍵 ★★★
+            if not get_input_actuator().is_busy('cliff'):
+                self.enhanced_movement.restore_keys()
             
             if elapsed >= self.duration:
                 return True  # 移動時間到，需要停止
@@ -243,7 +256,8 @@ class Movement:
 
     def _ensure_clean_movement_state(self, target_direction):
         """確保乾淨的移動狀態，避免按鍵衝突"""
-        import pyautogui
+        actuator = get_input_actuator()
+        owner = self.enhanced_movement.key_owner
         
         # 定義所有可能的移動相關按鍵
         all_movement_keys = ['left', 'right', JUMP_KEY]
@@ -278,7 +292,7 @@ class Movement:
                 # 只釋放衝突的按鍵
                 for key in conflicting_keys:
                     try:
-                        pyautogui.keyUp(key)
+                        actuator.release_key(key, owner)
                         self.enhanced_movement.remove_key_pressed(key)
                         print(f"🔓 釋放衝突按鍵: {key}")
                     except:
@@ -292,25 +306,19 @@ class Movement:
         
         # 額外保險：確保相反方向鍵被釋放
         try:
-            pyautogui.keyUp(opposite_direction)
+            actuator.release_key(opposite_direction, owner)
             self.enhanced_movement.remove_key_pressed(opposite_direction)
         except:
             pass
 
     def force_clean_all_keys(self):
         """★★★ 新增：強制清理所有移動相關按鍵（緊急使用）★★★"""
-        import pyautogui
-        
         print("🚨 執行強制按鍵清理...")
+        self._cancel_cliff_action()
         
         # 所有可能的移動按鍵
         emergency_keys = ['left', 'right', 'up', 'down', JUMP_KEY, DASH_SKILL_KEY, ATTACK_KEY]
-        
-        for key in emergency_keys:
-            try:
-                pyautogui.keyUp(key)
-            except:
-                pass
+        get_input_actuator().force_release(*emergency_keys)
         
         # 重置所有狀態
         self.enhanced_movement.current_keys_pressed = []
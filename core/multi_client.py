@@ -0,0 +1,452 @@
+"""
+多開模式模組 - 一個程序同時驅動多個遊戲視窗
+
+- TemplateBank：所有模板只載入、分析一次，設為唯讀後由所有客戶端共用
+- ClientSession：每個客戶端各自的畫面來源、狀態機（沿用 PipelineEngine 的檢測 / 決策）與按鍵執行器，
+  計畫在工作線程上執行，符文 / 爬繩 / 搜尋狀態機照常推進
+- MultiClientSupervisor：所有客戶端共用一個工作線程池，依「最久未服務者優先」公平排程
+- 按鍵以 PostMessage 直接送進各自的視窗（core.window_input），不經過鍵盤焦點，
+  持續按住的移動鍵與斷層時間軸不會漏到其他客戶端；視窗需並排不重疊（截圖取自螢幕）
+- 重播來源（錄製畫面）的按鍵只記錄不送出，可在 Linux 測吞吐量（scripts/benchmark_multi_client.py）
+"""
+import glob
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from core.input_actuator import InputActuator, bind_input_actuator
+from core.metrics import get_metrics
+from core.perf_stats import get_perf_stats
+from core.pipeline import Frame, PipelineEngine, StageStats
+from core.tracing import activate, get_tracer
+from core.window_input import RecordingInputSender, WindowInputSender
+
+
+def _freeze(value):
+    """把模板陣列設為唯讀（遞迴處理 dict / list），避免共用時被任一客戶端改動"""
+    if hasattr(value, 'setflags'):
+        value.setflags(write=False)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _freeze(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _freeze(item)
+    return value
+
+
+class TemplateBank:
+    """共用模板庫 - 基本模板、怪物模板分析結果、繩索與紅點模板各只有一份"""
+
+    def __init__(self, templates, monster_detector, rope_climbing=None, red_dot_detector=None):
+        self.templates = _freeze(templates)
+        self.monster_detector = monster_detector
+        self.rope_climbing = rope_climbing
+        self.red_dot_detector = red_dot_detector
+
+        for group in monster_detector.templates_by_monster.values():
+            for entry in group:
+                _freeze([entry['template'], entry['edges'], entry['points']])
+        if rope_climbing is not None:
+            _freeze(rope_climbing.rope_templates)
+        if red_dot_detector is not None:
+            _freeze(getattr(red_dot_detector, 'red_templates', [red_dot_detector.red_template]))
+
+    @classmethod
+    def load(cls, templates, monster_templates=None):
+        """依 config 載入怪物、繩索、紅點模板；templates 為 load_templates() 的結果"""
+        import config
+        from core.monster_detector import SimplifiedMonsterDetector
+        from core.rope_climbing import RopeClimbing
+        from core.red_dot_detector import RedDotDetector
+
+        monster_detector = SimplifiedMonsterDetector()
+        monster_detector.setup_templates(monster_templates)
+        if not monster_detector.monster_templates:
+            raise ValueError("沒有載入到任何怪物模板，請檢查 ENABLED_MONSTERS 設定和資料夾路徑")
+
+        rope_climbing = RopeClimbing()
+        rope_climbing.load_rope_templates(config.ROPE_PATH)
+
+        red_dot_detector = None
+        if config.ENABLE_RED_DOT_DETECTION and templates.get('red') is not None:
+            red_dot_detector = RedDotDetector()
+            if not red_dot_detector.load_red_template(config.RED_DOT_PATH):
+                red_dot_detector = None
+
+        return cls(templates, monster_detector, rope_climbing, red_dot_detector)
+
+    def build_components(self, screenshot_func=None):
+        """建立一個客戶端的元件：狀態各自獨立，模板全部指向模板庫"""
+        import config
+        from core.monster_detector import SimplifiedMonsterDetector
+        from core.rope_climbing import RopeClimbing
+        from core.red_dot_detector import RedDotDetector
+        from core.movement import Movement
+        from core.search import Search
+        from core.cliff_detection import CliffDetection
+        from core.rune_mode import RuneMode
+        from core.minimap_locator import MinimapLocator
+
+        components = {}
+        components['monster_detector'] = SimplifiedMonsterDetector()
+        components['monster_detector'].share_templates_from(self.monster_detector)
+
+        components['rope_climbing'] = RopeClimbing()
+        if self.rope_climbing is not None:
+            components['rope_climbing'].share_templates_from(self.rope_climbing)
+        if screenshot_func is not None:
+            components['rope_climbing'].set_screenshot_callback(screenshot_func)
+        components['rope_climbing'].set_medal_template(self.templates['medal'])
+
+        components['movement'] = Movement()
+        components['search'] = Search()
+        components['cliff_detection'] = CliffDetection()
+        components['rune_mode'] = RuneMode()
+
+        if config.PLAYER_LOCALIZATION_MODE == 'minimap':
+            components['player_locator'] = MinimapLocator()
+            components['player_locator'].configure(config.MINIMAP_REFINE_HALF_WIDTH, config.MINIMAP_REFINE_HALF_HEIGHT)
+        else:
+            components['player_locator'] = None
+        components['search'].set_player_locator(components['player_locator'])
+
+        # 背景模型與地圖綁定、被動技能直接以 pyautogui 按鍵（會送到聚焦中的視窗），多開模式不使用
+        components['background_model'] = None
+        components['passive_skills'] = None
+        components['image_processor'] = None
+
+        if self.red_dot_detector is not None:
+            components['red_dot_detector'] = RedDotDetector()
+            components['red_dot_detector'].share_templates_from(self.red_dot_detector)
+        else:
+            components['red_dot_detector'] = None
+        return components
+
+
+# ----------------------------------------------------------------------
+# 畫面來源
+# ----------------------------------------------------------------------
+
+def window_info_from_hwnd(hwnd):
+    """依視窗句柄計算客戶區位置（與 setup_game_window 相同的欄位）"""
+    import win32gui
+
+    client_rect = win32gui.GetClientRect(hwnd)
+    client_width, client_height = client_rect[2], client_rect[3]
+    client_x, client_y = win32gui.ClientToScreen(hwnd, (0, 0))
+    return {
+        'hwnd': hwnd,
+        'client_rect': client_rect,
+        'client_width': client_width,
+        'client_height': client_height,
+        'client_x': client_x,
+        'client_y': client_y,
+        'screen_region': (client_x, client_y, client_width, client_height),
+    }
+
+
+def find_game_windows(window_name):
+    """列舉所有標題為 window_name 的可見視窗"""
+    import win32gui
+
+    hwnds = []
+
+    def collect(hwnd, _):
+        if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd) == window_name:
+            hwnds.append(hwnd)
+        return True
+
+    win32gui.EnumWindows(collect, None)
+    return [window_info_from_hwnd(hwnd) for hwnd in hwnds]
+
+
+class WindowFrameSource:
+    """實際遊戲視窗的畫面來源；按鍵以 PostMessage 送到此視窗"""
+
+    def __init__(self, window_info):
+        self.window_info = window_info
+        self.seq = 0
+        self.input_sender = WindowInputSender(window_info['hwnd'])
+
+    def capture(self):
+        from core.utils import capture_screen
+        return capture_screen(self.window_info['screen_region'])
+
+    def read(self):
+        trace = get_tracer().begin()
+        frame_time = time.time()
+        image = self.capture()
+        if image is None:
+            return None
+        trace.mark('captured')
+        self.seq += 1
+        return Frame(self.seq, frame_time, image, trace)
+
+    @property
+    def exhausted(self):
+        return False
+
+
+class ReplayFrameSource:
+    """錄製畫面的來源 - 圖片資料夾（依檔名排序）或影片檔；時間戳為讀取當下，按鍵只記錄不送出"""
+
+    IMAGE_EXTENSIONS = ('*.png', '*.jpg', '*.jpeg', '*.bmp', '*.webp')
+
+    def __init__(self, path=None, frames=None, loop=True):
+        self.path = path
+        self.loop = loop
+        self.seq = 0
+        self.index = 0
+        self.finished = False
+        self.input_sender = RecordingInputSender()
+        self.frames = list(frames) if frames is not None else self._load(path)
+        if not self.frames:
+            raise ValueError(f"重播來源沒有任何畫面: {path}")
+        _freeze(self.frames)
+
+        height, width = self.frames[0].shape[:2]
+        self.window_info = {
+            'hwnd': None,
+            'client_rect': (0, 0, width, height),
+            'client_width': width,
+            'client_height': height,
+            'client_x': 0,
+            'client_y': 0,
+            'screen_region': (0, 0, width, height),
+        }
+
+    def _load(self, path):
+        if os.path.isdir(path):
+            files = sorted(f for ext in self.IMAGE_EXTENSIONS for f in glob.glob(os.path.join(path, ext)))
+            images = (cv2.imread(f, cv2.IMREAD_COLOR) for f in files)
+            return [image for image in images if image is not None]
+
+        capture = cv2.VideoCapture(path)
+        frames = []
+        while True:
+            ok, image = capture.read()
+            if not ok:
+                break
+            frames.append(image)
+        capture.release()
+        return frames
+
+    def capture(self):
+        return self.frames[self.index % len(self.frames)]
+
+    def read(self):
+        if self.index >= len(self.frames):
+            if not self.loop:
+                self.finished = True
+                return None
+            self.index = 0
+        image = self.frames[self.index]
+        self.index += 1
+        self.seq += 1
+        return Frame(self.seq, time.time(), image)
+
+    @property
+    def exhausted(self):
+        return self.finished
+
+
+# ----------------------------------------------------------------------
+# 客戶端與排程
+# ----------------------------------------------------------------------
+
+class ClientSession:
+    """單一客戶端 - 自己的畫面來源、狀態機與按鍵執行器，一次最多只有一個 tick 在執行"""
+
+    def __init__(self, client_id, source, bank, frame_interval=None):
+        import config
+
+        self.client_id = client_id
+        self.source = source
+        self.frame_interval = config.DETECTION_INTERVAL if frame_interval is None else frame_interval
+
+        # 每個客戶端自己的按鍵狀態；建立元件與執行計畫時綁定，元件取得的執行器都是這一個
+        self.actuator = InputActuator(sender=source.input_sender, name=f"input-{client_id}")
+        with bind_input_actuator(self.actuator):
+            self.components = bank.build_components(source.capture)
+            self.planner = PipelineEngine(source.window_info, bank.templates, self.components)
+
+        # 排程狀態（由 MultiClientSupervisor 維護）
+        self.busy = False
+        self.last_dispatch = 0.0
+        self.next_ready = 0.0
+
+        # 統計
+        self.tick_stats = StageStats('tick')
+        self.actuate_stats = StageStats('actuate')
+        self.plans = {}
+        self.stale = 0
+
+    @property
+    def finished(self):
+        return self.source.exhausted
+
+    def tick(self):
+        """截圖 → 檢測 → 決策 → 執行計畫（按鍵送到此客戶端的視窗），在共用工作線程上執行"""
+        start = time.time()
+        frame = self.source.read()
+        if frame is None:
+            self.tick_stats.skipped += 1
+            return
+
+        perception = self.planner._perceive(frame)
+        if not self.planner.frame_ages.is_fresh(frame, 'decide'):
+            self.stale += 1
+            self.tick_stats.record(time.time() - start)
+            return
+        self.planner.frame_ages.record_decision(frame)
+        plan = self.planner._decide(perception)
+        self.plans[plan.name] = self.plans.get(plan.name, 0) + 1
+
+        if plan.steps:
+            actuate_start = time.time()
+            with bind_input_actuator(self.actuator), activate(plan.trace):
+                if plan.trace is not None:
+                    plan.trace.mark('actuate_start')
+                for _, step in plan.steps:
+                    step()
+            self.actuate_stats.record(time.time() - actuate_start)
+
+        self.tick_stats.record(time.time() - start)
+        get_metrics().inc('loop_ticks_total', engine='multi', client=self.client_id)
+
+    def close(self):
+        """停止此客戶端：停止移動並放開其視窗中仍按住的按鍵"""
+        with bind_input_actuator(self.actuator):
+            try:
+                self.components['movement'].stop()
+                if self.components['rune_mode'].is_active:
+                    self.components['rune_mode'].exit()
+                if self.components['rope_climbing'].is_climbing:
+                    self.components['rope_climbing'].stop_climbing()
+            except Exception as e:
+                print(f"⚠️ [{self.client_id}] 停止元件失敗: {e}")
+        self.actuator.stop()
+
+    def get_stats(self):
+        return {
+            'tick': self.tick_stats.snapshot(),
+            'actuate': self.actuate_stats.snapshot(),
+            'plans': dict(self.plans),
+            'stale': self.stale,
+            'keys_sent': self.source.input_sender.sent,
+            'pressed_keys': self.actuator.get_pressed_keys(),
+        }
+
+
+class MultiClientSupervisor:
+    """多開監督器 - 共用工作線程池，最久未服務的客戶端優先"""
+
+    def __init__(self, bank, workers=4):
+        self.bank = bank
+        self.workers = max(1, int(workers))
+        self.clients = []
+
+        self.pool = None
+        self._condition = threading.Condition()
+        self._in_flight = 0
+
+        self.started_at = 0.0
+        self.errors = 0
+
+    def add_client(self, source, client_id=None, **kwargs):
+        client_id = client_id or f"client-{len(self.clients) + 1}"
+        session = ClientSession(client_id, source, self.bank, **kwargs)
+        self.clients.append(session)
+        return session
+
+    def _ready_clients(self, now):
+        ready = [s for s in self.clients if not s.busy and not s.finished and now >= s.next_ready]
+        ready.sort(key=lambda s: s.last_dispatch)
+        return ready
+
+    def run(self, should_stop=None, duration=None):
+        """阻塞執行直到 should_stop() 為真、超過 duration 秒或所有重播來源結束"""
+        if not self.clients:
+            raise ValueError("沒有任何客戶端")
+
+        # 工作線程已並行處理各客戶端，OpenCV 內部線程數按比例縮小避免超額訂用
+        cv2.setNumThreads(max(1, (os.cpu_count() or 1) // self.workers))
+
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='multi-client')
+        self.started_at = time.time()
+        print(f"🖥️ 多開模式啟動: {len(self.clients)} 個客戶端, 共用 {self.workers} 個工作線程")
+
+        try:
+            while True:
+                now = time.time()
+                if should_stop is not None and should_stop():
+                    break
+                if duration is not None and now - self.started_at >= duration:
+                    break
+                if all(s.finished for s in self.clients):
+                    break
+
+                with self._condition:
+                    free = self.workers - self._in_flight
+                    ready = self._ready_clients(now)[:free] if free > 0 else []
+                    if not ready:
+                        self._condition.wait(timeout=0.005)
+                        continue
+                    for session in ready:
+                        session.busy = True
+                        session.last_dispatch = now
+                        self._in_flight += 1
+
+                for session in ready:
+                    self.pool.submit(self._run_tick, session)
+        finally:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+            for session in self.clients:
+                session.close()
+
+    def _run_tick(self, session):
+        try:
+            session.tick()
+        except Exception as e:
+            self.errors += 1
+            session.tick_stats.errors += 1
+            print(f"❌ [{session.client_id}] 執行錯誤: {e}")
+        finally:
+            with self._condition:
+                session.busy = False
+                session.next_ready = time.time() + session.frame_interval
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def get_stats(self):
+        elapsed = max(time.time() - self.started_at, 1e-6) if self.started_at else 0.0
+        clients = {s.client_id: s.get_stats() for s in self.clients}
+        total_ticks = sum(c['tick']['count'] for c in clients.values())
+        return {
+            'workers': self.workers,
+            'elapsed': elapsed,
+            'total_ticks': total_ticks,
+            'ticks_per_second': total_ticks / elapsed if elapsed else 0.0,
+            'errors': self.errors,
+            'clients': clients,
+            'perf': get_perf_stats().snapshot(),
+        }
+
+    def print_stats(self):
+        stats = self.get_stats()
+        print("\n" + "=" * 60)
+        print(f"📊 多開統計: {len(stats['clients'])} 個客戶端, {stats['workers']} 個工作線程, "
+              f"總計 {stats['ticks_per_second']:.1f} tick/秒, 錯誤 {stats['errors']}")
+        for client_id, client in stats['clients'].items():
+            tick = client['tick']
+            rate = tick['count'] / stats['elapsed'] if stats['elapsed'] else 0.0
+            print(f"   {client_id}: {tick['count']} tick ({rate:.1f}/秒), 平均 {tick['avg_ms']:.1f}ms, "
+                  f"最大 {tick['max_ms']:.1f}ms, 過時 {client['stale']}, 按鍵 {client['keys_sent']}, 計畫 {client['plans']}")
+        # 各客戶端共用同一份階段統計
+        print(get_perf_stats().format_summary())
+        print("=" * 60 + "\n")
@@ -0,0 +1,301 @@
+"""
+效能回歸檢查模組 - 固定畫面集上量測檢測與決策熱路徑，與版本化的基準 JSON 比較
+
+- 畫面集：錄製的重播畫面（FrameRecorder 輸出的資料夾 / 影片）或固定 seed 的合成畫面，
+  同一畫面集每次量測的輸入完全相同
+- 工作負載：core/utils.py（角色 / sign / rune / 方向符號）、core/monster_detector.py（近距定位 / 遠距掃描）、
+  繩索、紅點，以及 PipelineEngine 的整段檢測（_perceive）與決策（_decide），決策只產生步驟不按鍵
+- 每個工作負載對畫面集跑數輪，取各輪單次呼叫耗時中位數的最小值（背景負載只會讓時間變長）；
+  超過基準 (1 + tolerance) 倍且差距大於 min_delta_ms 才判定退化，避免不到 1 毫秒的階段被計時雜訊誤判
+- 基準與比較結果都是 JSON；基準依機器而異，每種機型各自保存一份（scripts/perf_regression.py --update-baseline）
+"""
+import json
+import os
+import platform
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+BASELINE_SCHEMA = 1
+
+
+@dataclass
+class PerfWorkload:
+    """一個工作負載：對畫面集的每張畫面呼叫 func(index, image)"""
+    name: str
+    frames: List[Any]
+    func: Callable
+
+
+@dataclass
+class WorkloadResult:
+    """一個工作負載的量測結果（毫秒）；rounds_ms 為每輪各張畫面的耗時"""
+    name: str
+    frames: int
+    rounds_ms: List[List[float]] = field(default_factory=list, repr=False)
+
+    @property
+    def samples_ms(self):
+        return [sample for samples in self.rounds_ms for sample in samples]
+
+    @property
+    def median_ms(self):
+        """各輪中位數的最小值（比較基準用）"""
+        medians = [statistics.median(samples) for samples in self.rounds_ms if samples]
+        return min(medians) if medians else 0.0
+
+    @property
+    def p90_ms(self):
+        ordered = sorted(self.samples_ms)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+
+    def to_dict(self):
+        samples = self.samples_ms
+        return {
+            'frames': self.frames,
+            'rounds': len(self.rounds_ms),
+            'median_ms': round(self.median_ms, 4),
+            'p90_ms': round(self.p90_ms, 4),
+            'min_ms': round(min(samples), 4) if samples else 0.0,
+        }
+
+
+@dataclass
+class StageComparison:
+    """單一工作負載與基準的比較"""
+    name: str
+    status: str  # 'ok', 'regressed', 'improved', 'new', 'missing'
+    baseline_ms: Optional[float] = None
+    current_ms: Optional[float] = None
+
+    @property
+    def ratio(self):
+        if not self.baseline_ms or self.current_ms is None:
+            return None
+        return self.current_ms / self.baseline_ms
+
+    def to_dict(self):
+        ratio = self.ratio
+        return {
+            'name': self.name,
+            'status': self.status,
+            'baseline_ms': self.baseline_ms,
+            'current_ms': self.current_ms,
+            'ratio': round(ratio, 4) if ratio is not None else None,
+        }
+
+
+@dataclass
+class RegressionReport:
+    """與基準比較的結果；passed 為假時 CI / 農場部署前應中止"""
+    comparisons: List[StageComparison]
+    tolerance: float
+    min_delta_ms: float
+    baseline_info: Dict[str, Any]
+    current_info: Dict[str, Any]
+
+    @property
+    def regressions(self):
+        return [c for c in self.comparisons if c.status == 'regressed']
+
+    @property
+    def passed(self):
+        return not self.regressions
+
+    def to_dict(self):
+        return {
+            'passed': self.passed,
+            'tolerance': self.tolerance,
+            'min_delta_ms': self.min_delta_ms,
+            'baseline': self.baseline_info,
+            'current': self.current_info,
+            'stages': [c.to_dict() for c in self.comparisons],
+        }
+
+    def format_summary(self):
+        marks = {'ok': '✅', 'regressed': '❌', 'improved': '🚀', 'new': '🆕', 'missing': '⚪'}
+        lines = [f"📉 效能回歸檢查 (容許 +{self.tolerance:.0%}, 最小差距 {self.min_delta_ms:.2f}ms, "
+                 f"基準版本 {self.baseline_info.get('version', '?')})"]
+        for c in self.comparisons:
+            baseline = f"{c.baseline_ms:9.2f}" if c.baseline_ms is not None else f"{'-':>9}"
+            current = f"{c.current_ms:9.2f}" if c.current_ms is not None else f"{'-':>9}"
+            ratio = f"{c.ratio:6.2f}x" if c.ratio is not None else f"{'':>7}"
+            lines.append(f"  {marks.get(c.status, '?')} {c.name:<24}{baseline}ms →{current}ms {ratio}")
+        if self.passed:
+            lines.append("✅ 沒有階段退化")
+        else:
+            lines.append(f"❌ {len(self.regressions)} 個階段退化: {', '.join(c.name for c in self.regressions)}")
+        return '\n'.join(lines)
+
+
+# ----------------------------------------------------------------------
+# 量測
+# ----------------------------------------------------------------------
+
+def measure_workload(workload, repeat=3, warmup=1):
+    """對畫面集執行 warmup 輪（不計入）後再執行 repeat 輪，記錄每次呼叫的耗時"""
+    result = WorkloadResult(workload.name, len(workload.frames))
+    for round_index in range(warmup + repeat):
+        samples = []
+        for index, image in enumerate(workload.frames):
+            start = time.perf_counter()
+            workload.func(index, image)
+            samples.append((time.perf_counter() - start) * 1000)
+        if round_index >= warmup:
+            result.rounds_ms.append(samples)
+    return result
+
+
+def run_workloads(workloads, repeat=3, warmup=1, log=print):
+    """依序量測所有工作負載，返回 {名稱: WorkloadResult}"""
+    results = {}
+    for workload in workloads:
+        result = measure_workload(workload, repeat, warmup)
+        results[workload.name] = result
+        if log is not None:
+            log(f"⏱️ {workload.name:<24} 中位數 {result.median_ms:8.2f}ms  p90 {result.p90_ms:8.2f}ms "
+                f"({len(result.samples_ms)} 次)")
+    return results
+
+
+def build_workloads(set_name, frames, templates, components, window_info):
+    """為一個畫面集建立所有工作負載；名稱為 '<畫面集>.<階段>'
+
+    templates 為 load_templates() 格式（medal / sign / rune / direction / direction_masks），
+    components 為 TemplateBank.build_components() 或 initialize_components() 的結果
+    """
+    import config
+    from core.pipeline import Frame, PipelineEngine
+    from core.utils import (detect_rune_text, detect_sign_text, find_player_medal,
+                            recognize_direction_symbols)
+
+    width = window_info['client_width']
+    height = window_info['client_height']
+    medal = templates['medal']
+    medal_height, medal_width = medal.shape[:2]
+    detector = components['monster_detector']
+    movement = components['movement']
+
+    # 角色位置先以名牌匹配算好（找不到時用畫面中央），各檢測器在同一位置量測
+    players = []
+    for image in frames:
+        found, loc, _ = find_player_medal(image, medal, config.MATCH_THRESHOLD)
+        if found:
+            players.append((loc[0] + medal_width // 2, loc[1] + medal_height // 2 - config.Y_OFFSET))
+        else:
+            players.append((width // 2, height // 2))
+
+    workloads = [
+        ('medal', lambda i, image: find_player_medal(image, medal, config.MATCH_THRESHOLD)),
+        ('sign', lambda i, image: detect_sign_text(image, templates['sign'])),
+        ('rune', lambda i, image: detect_rune_text(image, templates['rune'], config.MATCH_THRESHOLD)),
+        ('monster', lambda i, image: detector.locate_monster(image, players[i][0], players[i][1], width, height, False)),
+        ('scan', lambda i, image: detector.scan_for_direction(image, players[i][0], players[i][1], width, height, movement)),
+    ]
+    if templates.get('direction'):
+        workloads.append(('direction', lambda i, image: recognize_direction_symbols(
+            image, templates['direction'], templates['direction_masks'], width, height)))
+    if components.get('rope_climbing') is not None and components['rope_climbing'].rope_templates:
+        rope = components['rope_climbing']
+        workloads.append(('rope', lambda i, image: rope._detect_rope_internal(
+            image, players[i][0], players[i][1], width, height, rope.detection_size)))
+    if components.get('red_dot_detector') is not None:
+        red_dot = components['red_dot_detector']
+        workloads.append(('red_dot', lambda i, image: red_dot.detect_red_dot(image, width, height)))
+
+    # 管線的整段檢測與決策：紅點計時會觸發換頻道、繩索檢測依清場時間觸發，量測時關閉以保持輸入固定
+    engine = PipelineEngine(window_info, templates, dict(components, red_dot_detector=None, image_processor=None))
+    engine.required_clear_time = float('inf')
+    perceptions = {}
+
+    def perceive(i, image):
+        perceptions[i] = engine._perceive(Frame(i + 1, time.time(), image))
+
+    def decide(i, image):
+        perception = perceptions.get(i)
+        if perception is None:
+            perception = perceptions[i] = engine._perceive(Frame(i + 1, time.time(), image))
+        engine._decide(perception)
+
+    workloads += [('perceive', perceive), ('decide', decide)]
+    return [PerfWorkload(f"{set_name}.{stage}", frames, func) for stage, func in workloads]
+
+
+# ----------------------------------------------------------------------
+# 基準
+# ----------------------------------------------------------------------
+
+def environment_info():
+    """基準與比較結果附帶的版本與機器資訊"""
+    import cv2
+    import numpy as np
+
+    try:
+        from __version__ import __version__ as version
+    except ImportError:
+        version = 'unknown'
+
+    return {
+        'version': version,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def make_baseline(results, info=None):
+    """由量測結果產生基準 JSON 內容"""
+    return {
+        'schema': BASELINE_SCHEMA,
+        'info': info or environment_info(),
+        'workloads': {name: result.to_dict() for name, result in sorted(results.items())},
+    }
+
+
+def save_baseline(path, baseline):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+def load_baseline(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('schema') != BASELINE_SCHEMA:
+        raise ValueError(f"基準格式版本不符: {baseline.get('schema')} (需要 {BASELINE_SCHEMA})")
+    return baseline
+
+
+def compare_to_baseline(results, baseline, tolerance=0.25, min_delta_ms=0.5, info=None):
+    """比較各工作負載的中位數；results 為 {名稱: WorkloadResult} 或 {名稱: 中位數毫秒}"""
+    current = {name: (value.median_ms if isinstance(value, WorkloadResult) else float(value))
+               for name, value in results.items()}
+    reference = {name: entry['median_ms'] for name, entry in baseline.get('workloads', {}).items()}
+
+    comparisons = []
+    for name in sorted(set(current) | set(reference)):
+        base = reference.get(name)
+        value = current.get(name)
+        if base is None:
+            status = 'new'
+        elif value is None:
+            status = 'missing'
+        elif value > base * (1 + tolerance) and value - base > min_delta_ms:
+            status = 'regressed'
+        elif value < base * (1 - tolerance) and base - value > min_delta_ms:
+            status = 'improved'
+        else:
+            status = 'ok'
+        comparisons.append(StageComparison(name, status, base, round(value, 4) if value is not None else None))
+
+    return RegressionReport(comparisons, tolerance, min_delta_ms,
+                            baseline.get('info', {}), info or environment_info())
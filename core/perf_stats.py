@@ -0,0 +1,207 @@
+"""
+效能統計模組 - 各階段延遲的固定區間直方圖（p50 / p95 / p99）
+
+- 截圖、各檢測器（sign / rune / medal / monster / scan / rope / red_dot / cliff）與按鍵序列
+  以 @timed_call(name)、with timed(name) 或 record(name, seconds) 記錄耗時
+- 直方圖的區間固定，記錄一次只是二分搜尋加計數，不保留原始樣本，長時間運行記憶體不增長
+- 百分位數在區間內線性內插，並以實際觀測的最小 / 最大值為界
+- 全程序共用一個統計表（get_perf_stats()），GUI 面板與常駐模式的定期摘要都從這裡讀取
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# 區間上界（毫秒）；最後一個區間收集超過 5 秒的記錄
+DEFAULT_BOUNDS_MS = (
+    0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 50, 75,
+    100, 150, 200, 300, 500, 750, 1000, 2000, 5000,
+)
+
+# 摘要中的顯示順序（step 為整個 tick）；不在其中的名稱（例如各按鍵序列）依名稱排在後面
+STAGE_ORDER = ('step', 'capture', 'red_dot', 'sign', 'rune', 'medal', 'monster', 'scan', 'rope', 'cliff',
+               'e2e.capture', 'e2e.queue', 'e2e.detect', 'e2e.decide', 'e2e.actuate', 'e2e.total')
+
+
+class LatencyHistogram:
+    """固定區間的延遲直方圖"""
+
+    def __init__(self, name, bounds_ms=DEFAULT_BOUNDS_MS):
+        self.name = name
+        self.bounds = tuple(bounds_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        index = bisect.bisect_left(self.bounds, ms)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ms += ms
+            if self.min_ms is None or ms < self.min_ms:
+                self.min_ms = ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.total_ms = 0.0
+            self.min_ms = None
+            self.max_ms = 0.0
+
+    def buckets(self):
+        """(區間上界毫秒, 各區間次數（最後一個為超出上界）, 總次數, 總耗時毫秒)，匯出 Prometheus 直方圖用"""
+        with self._lock:
+            return self.bounds, list(self.counts), self.count, self.total_ms
+
+    def _percentile(self, counts, count, min_ms, max_ms, q):
+        target = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if not bucket_count:
+                continue
+            if cumulative + bucket_count >= target:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else max_ms
+                lower = max(lower, min_ms)
+                upper = min(upper, max_ms)
+                fraction = (target - cumulative) / bucket_count
+                return lower + (upper - lower) * fraction
+            cumulative += bucket_count
+        return max_ms
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+            total_ms = self.total_ms
+            min_ms = self.min_ms or 0.0
+            max_ms = self.max_ms
+
+        if not count:
+            return {'count': 0, 'avg_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0,
+                    'max_ms': 0.0, 'total_ms': 0.0}
+        return {
+            'count': count,
+            'avg_ms': total_ms / count,
+            'p50_ms': self._percentile(counts, count, min_ms, max_ms, 0.50),
+            'p95_ms': self._percentile(counts, count, min_ms, max_ms, 0.95),
+            'p99_ms': self._percentile(counts, count, min_ms, max_ms, 0.99),
+            'max_ms': max_ms,
+            'total_ms': total_ms,
+        }
+
+
+class PerfStats:
+    """具名直方圖的集合"""
+
+    def __init__(self, bounds_ms=DEFAULT_BOUNDS_MS):
+        self.bounds_ms = bounds_ms
+        self.started_at = time.time()
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(name)
+                if histogram is None:
+                    histogram = LatencyHistogram(name, self.bounds_ms)
+                    self._histograms[name] = histogram
+        return histogram
+
+    def record(self, name, seconds):
+        self.histogram(name).record(seconds)
+
+    @contextmanager
+    def timed(self, name):
+        """with perf.timed('monster'): ... 記錄區塊耗時（發生例外也記錄）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).record(time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            histograms = list(self._histograms.values())
+            self.started_at = time.time()
+        for histogram in histograms:
+            histogram.reset()
+
+    def _ordered_names(self):
+        names = list(self._histograms)
+        order = {name: index for index, name in enumerate(STAGE_ORDER)}
+        return sorted(names, key=lambda name: (order.get(name, len(order)), name))
+
+    def histograms(self):
+        """[(名稱, LatencyHistogram), ...]，依 STAGE_ORDER 排序"""
+        return [(name, self._histograms[name]) for name in self._ordered_names()]
+
+    def snapshot(self):
+        """各直方圖的統計，另附 share：該項目總耗時佔統計期間的比例"""
+        elapsed_ms = max(time.time() - self.started_at, 1e-6) * 1000
+        stages = {}
+        for name in self._ordered_names():
+            stage = self._histograms[name].snapshot()
+            stage['share'] = stage['total_ms'] / elapsed_ms
+            stages[name] = stage
+        return {'elapsed_s': elapsed_ms / 1000, 'stages': stages}
+
+    def format_summary(self, snapshot=None):
+        """文字表格，GUI 面板與常駐模式的定期摘要共用"""
+        snapshot = snapshot or self.snapshot()
+        lines = [f"⏱️ 各階段耗時 (統計 {snapshot['elapsed_s']:.0f} 秒)",
+                 # 中文字佔兩格寬，欄寬各少算兩格以對齊數字欄
+                 f"{'階段':<18}{'次數':>6}{'平均':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'最大':>7}{'佔比':>6}"]
+        for name, stage in snapshot['stages'].items():
+            if not stage['count']:
+                continue
+            lines.append(
+                f"{name:<20}{stage['count']:>8}{stage['avg_ms']:>9.1f}{stage['p50_ms']:>9.1f}"
+                f"{stage['p95_ms']:>9.1f}{stage['p99_ms']:>9.1f}{stage['max_ms']:>9.1f}{stage['share'] * 100:>7.1f}%"
+            )
+        if len(lines) == 2:
+            lines.append("  尚無數據")
+        return '\n'.join(lines)
+
+
+# 全局效能統計實例
+_perf_stats = PerfStats()
+
+
+def get_perf_stats():
+    """獲取效能統計實例"""
+    return _perf_stats
+
+
+def timed(name):
+    """記錄區塊耗時到全局統計：with timed('capture'): ..."""
+    return _perf_stats.timed(name)
+
+
+def record(name, seconds):
+    _perf_stats.record(name, seconds)
+
+
+def timed_call(name):
+    """函數裝飾器：每次呼叫的耗時記錄到全局統計"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _perf_stats.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
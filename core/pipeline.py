@@ -0,0 +1,721 @@
+"""
+管線引擎模組 - 截圖 → 檢測 → 決策 → 按鍵 四個階段分離，以「只保留最新」的有界隊列串接
+
+決策狀態（清怪計時、角色遺失次數）只由決策階段寫入；檢測階段讀取決策階段發布的唯讀快照
+DecisionState，按鍵階段使用計畫中附帶的快照，不直接讀取決策線程正在修改的欄位
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+from core.metrics import get_metrics
+from core.perf_stats import get_perf_stats
+from core.tracing import activate, get_tracer
+
+
+class LatestQueue:
+    """有界隊列 - 滿了就丟棄最舊的資料，讓下游永遠拿到最新的結果"""
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._condition = threading.Condition()
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, item):
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """取出最舊的一筆；逾時返回 None"""
+        with self._condition:
+            if not self._items:
+                self._condition.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def clear(self):
+        with self._condition:
+            self._items.clear()
+
+    def depth(self):
+        return len(self._items)
+
+    def snapshot(self):
+        return {
+            'depth': self.depth(),
+            'max_depth': self.max_depth,
+            'dropped': self.dropped,
+        }
+
+
+class StageStats:
+    """單一階段的處理次數與延遲統計"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.skipped = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        with self._lock:
+            self.count += 1
+            self.total_latency += latency
+            self.last_latency = latency
+            if latency > self.max_latency:
+                self.max_latency = latency
+
+    def snapshot(self):
+        with self._lock:
+            avg = self.total_latency / self.count if self.count else 0.0
+            return {
+                'count': self.count,
+                'errors': self.errors,
+                'skipped': self.skipped,
+                'avg_ms': avg * 1000,
+                'max_ms': self.max_latency * 1000,
+                'last_ms': self.last_latency * 1000,
+            }
+
+
+@dataclass
+class Frame:
+    """截圖階段產生的畫面"""
+    seq: int
+    timestamp: float
+    image: Any
+    trace: Any = None  # core.tracing.FrameTrace，截圖到攻擊按鍵的延遲追踪
+
+    def age(self, now=None):
+        """從截圖到現在經過的秒數"""
+        return (now if now is not None else time.time()) - self.timestamp
+
+
+class FrameAgeTracker:
+    """★★★ 新增：畫面年齡追踪 - 截圖到決策的延遲；超過門檻的畫面不再做昂貴檢測，直接換最新畫面 ★★★
+
+    檢測本身比門檻慢時每張畫面都會過時；同一檢查點連續略過 max_consecutive_drops 次後
+    照常處理下一張，避免永遠不行動
+    """
+
+    def __init__(self, max_age, max_consecutive_drops=3):
+        self.max_age = max_age
+        self.max_consecutive_drops = max_consecutive_drops
+        self.decision_age = StageStats('frame_age')
+        self.stale_drops = {}  # 檢查點 -> 因畫面過時而略過的次數
+        self.consecutive_drops = {}  # 檢查點 -> 目前連續略過的次數
+        self.forced = {}  # 檢查點 -> 連續略過達上限後仍照常處理的次數
+        self._lock = threading.Lock()
+
+    def is_fresh(self, frame, checkpoint):
+        """畫面仍在門檻內（或此檢查點已連續略過太多次）返回 True；否則記錄此檢查點的略過次數"""
+        if frame is None:
+            return False
+        return self.accept(frame.age() <= self.max_age, checkpoint)
+
+    def accept(self, fresh, checkpoint):
+        """依畫面是否新鮮決定是否處理；過時時累計連續略過次數，達上限時放行一次"""
+        with self._lock:
+            if fresh:
+                self.consecutive_drops[checkpoint] = 0
+                return True
+            count = self.consecutive_drops.get(checkpoint, 0)
+            if count >= self.max_consecutive_drops:
+                self.consecutive_drops[checkpoint] = 0
+                self.forced[checkpoint] = self.forced.get(checkpoint, 0) + 1
+                forced = True
+            else:
+                self.consecutive_drops[checkpoint] = count + 1
+                forced = False
+        if forced:
+            get_metrics().inc('stale_frames_forced_total', checkpoint=checkpoint)
+            return True
+        self.record_drop(checkpoint)
+        return False
+
+    def record_drop(self, checkpoint):
+        with self._lock:
+            self.stale_drops[checkpoint] = self.stale_drops.get(checkpoint, 0) + 1
+        get_metrics().inc('stale_frames_total', checkpoint=checkpoint)
+
+    def record_decision(self, frame):
+        """記錄依此畫面做出決策時的年齡"""
+        age = frame.age()
+        self.decision_age.record(age)
+        get_metrics().observe('frame_age_seconds', age)
+
+    def snapshot(self):
+        with self._lock:
+            drops = dict(self.stale_drops)
+            forced = dict(self.forced)
+        return {
+            'max_age_ms': self.max_age * 1000,
+            'decision_age': self.decision_age.snapshot(),
+            'stale_drops': drops,
+            'stale_total': sum(drops.values()),
+            'forced': forced,
+        }
+
+    def format_summary(self):
+        stats = self.snapshot()
+        age = stats['decision_age']
+        drops = ', '.join(f"{name} {count}" for name, count in stats['stale_drops'].items()) or '無'
+        summary = (f"🕰️ 畫面年齡: 決策時平均 {age['avg_ms']:.1f}ms, 最大 {age['max_ms']:.1f}ms "
+                   f"(門檻 {stats['max_age_ms']:.0f}ms), 過時略過: {drops}")
+        if stats['forced']:
+            forced = ', '.join(f"{name} {count}" for name, count in stats['forced'].items())
+            summary += f", 連續過時仍處理: {forced}（檢測比門檻慢，考慮調高 FRAME_MAX_AGE）"
+        return summary
+
+
+@dataclass
+class Perception:
+    """檢測階段的結果 - 只描述畫面，不做任何按鍵"""
+    frame: Frame
+    change_channel: bool = False
+    sign_found: bool = False
+    rune_found: bool = False
+    medal_found: bool = False
+    player_x: int = 0
+    player_y: int = 0
+    monster: Optional[dict] = None
+    rope: Optional[Tuple[int, int]] = None
+
+
+@dataclass(frozen=True)
+class DecisionState:
+    """決策階段發布的狀態快照（唯讀，整個物件替換，跨線程讀取不會看到一半更新的值）"""
+    no_monster_time: float = 0.0  # 開始沒有怪物的時間，0 表示目前有怪物或角色不在畫面
+    medal_lost_count: int = 0  # 連續找不到角色的次數
+
+
+@dataclass
+class Plan:
+    """決策階段交給按鍵階段執行的步驟"""
+    name: str
+    frame_time: float
+    steps: List[Tuple[str, Callable]] = field(default_factory=list)
+    trace: Any = None
+    decision_state: DecisionState = field(default_factory=DecisionState)
+
+
+class PipelineEngine:
+    """管線引擎 - 慢的按鍵序列不會卡住畫面檢測，檢測也不會延遲進行中的按鍵序列"""
+
+    def __init__(self, window_info, templates, components, detection_workers=1):
+        import config
+
+        self.window_info = window_info
+        self.templates = templates
+        self.components = components
+        self.detection_workers = max(1, int(detection_workers))
+
+        # 階段之間的隊列（只保留最新）
+        self.frame_queue = LatestQueue(1)
+        self.perception_queue = LatestQueue(1)
+        self.plan_queue = LatestQueue(1)
+
+        self.stats = {name: StageStats(name) for name in ('capture', 'detect', 'decide', 'actuate')}
+
+        self.stop_event = threading.Event()
+        self.threads = []
+        # 定位器、背景模型、紅點偵測器帶有狀態，多個檢測線程時需互斥
+        self.perception_lock = threading.Lock()
+
+        # 計畫超過此時間（相對於截圖時間）才輪到執行就捨棄
+        self.max_plan_age = 0.5
+        # 檢測/決策時畫面超過門檻就略過昂貴檢測或整個決策
+        self.frame_ages = FrameAgeTracker(config.FRAME_MAX_AGE, config.FRAME_MAX_CONSECUTIVE_DROPS)
+
+        # 決策狀態（與 main_loop 相同）
+        self.player_x = window_info['client_width'] // 2
+        self.player_y = window_info['client_height'] // 2
+        self.no_monster_time = 0
+        self.required_clear_time = 1.5
+        self.last_rope_detection_time = 0
+        self.rope_detection_interval = 1.0
+        self.last_perception_seq = 0
+        # ★ 決策階段每次決策後發布，檢測階段只讀這份快照
+        self.decision_state = DecisionState()
+
+        self.stats_print_interval = 300
+
+    # ------------------------------------------------------------------
+    # 生命週期
+    # ------------------------------------------------------------------
+
+    def start(self):
+        self.stop_event.clear()
+        workers = [('capture', self._capture_stage)]
+        workers += [(f'detect-{i + 1}', self._detect_stage) for i in range(self.detection_workers)]
+        workers += [('decide', self._decide_stage), ('actuate', self._actuate_stage)]
+
+        for name, target in workers:
+            thread = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        get_metrics().add_collector(self._collect_metrics)
+
+        print(f"🧵 管線引擎已啟動 (檢測線程: {self.detection_workers})")
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+        get_metrics().remove_collector(self._collect_metrics)
+
+        # 釋放所有可能仍按住的按鍵
+        try:
+            self.components['movement'].stop()
+        except Exception as e:
+            print(f"⚠️ 停止移動失敗: {e}")
+        print("🧵 管線引擎已停止")
+
+    def run(self, should_stop=None, perf_summary=True):
+        """阻塞執行直到 stop_event 或 should_stop() 為真；perf_summary 為真時定期輸出各階段耗時摘要"""
+        import config
+
+        self.start()
+        last_stats_time = last_perf_time = time.time()
+        try:
+            while not self.stop_event.is_set():
+                if should_stop is not None and should_stop():
+                    break
+                time.sleep(0.1)
+
+                if time.time() - last_stats_time >= self.stats_print_interval:
+                    self.print_stats()
+                    last_stats_time = time.time()
+                if (perf_summary and config.PERF_SUMMARY_INTERVAL > 0 and
+                        time.time() - last_perf_time >= config.PERF_SUMMARY_INTERVAL):
+                    print(get_perf_stats().format_summary())
+                    last_perf_time = time.time()
+        finally:
+            self.stop()
+
+    # ------------------------------------------------------------------
+    # 統計
+    # ------------------------------------------------------------------
+
+    def get_stats(self):
+        return {
+            'frame_age': self.frame_ages.snapshot(),
+            'perf': get_perf_stats().snapshot(),
+            'stages': {name: stats.snapshot() for name, stats in self.stats.items()},
+            'queues': {
+                'frames': self.frame_queue.snapshot(),
+                'perceptions': self.perception_queue.snapshot(),
+                'plans': self.plan_queue.snapshot(),
+            },
+        }
+
+    def _collect_metrics(self):
+        """指標端點的收集函數：各階段隊列的深度與丟棄數"""
+        samples = []
+        for name, latest_queue in (('frames', self.frame_queue), ('perceptions', self.perception_queue),
+                                   ('plans', self.plan_queue)):
+            samples.append(('queue_depth', {'queue': f'pipeline.{name}'}, latest_queue.depth()))
+            samples.append(('queue_dropped_total', {'queue': f'pipeline.{name}'}, latest_queue.dropped))
+        return samples
+
+    def print_stats(self):
+        stats = self.get_stats()
+        print("\n" + "=" * 60)
+        print("📊 管線統計")
+        for name, stage in stats['stages'].items():
+            print(f"   {name:>8}: {stage['count']} 次, 平均 {stage['avg_ms']:.1f}ms, 最大 {stage['max_ms']:.1f}ms, "
+                  f"略過 {stage['skipped']}, 錯誤 {stage['errors']}")
+        for name, queue_stats in stats['queues'].items():
+            print(f"   隊列 {name}: 深度 {queue_stats['depth']}, 丟棄 {queue_stats['dropped']}")
+        print(f"   {self.frame_ages.format_summary()}")
+        print(f"   {get_tracer().format_summary()}")
+        print(get_perf_stats().format_summary())
+        print("=" * 60 + "\n")
+
+    # ------------------------------------------------------------------
+    # 截圖階段
+    # ------------------------------------------------------------------
+
+    def _capture_stage(self):
+        import config
+        from core.utils import capture_screen
+
+        seq = 0
+        while not self.stop_event.is_set():
+            trace = get_tracer().begin()
+            start = time.time()
+            image = capture_screen(self.window_info['screen_region'])
+            if image is None:
+                self.stats['capture'].errors += 1
+                time.sleep(0.05)
+                continue
+            trace.mark('captured')
+
+            seq += 1
+            self.frame_queue.put(Frame(seq, start, image, trace))
+            self.stats['capture'].record(time.time() - start)
+            time.sleep(config.DETECTION_INTERVAL)
+
+    # ------------------------------------------------------------------
+    # 檢測階段
+    # ------------------------------------------------------------------
+
+    def _detect_stage(self):
+        while not self.stop_event.is_set():
+            frame = self.frame_queue.get(timeout=0.1)
+            if frame is None:
+                continue
+
+            start = time.time()
+            try:
+                perception = self._perceive(frame)
+            except Exception as e:
+                self.stats['detect'].errors += 1
+                print(f"❌ 管線檢測錯誤: {e}")
+                continue
+
+            self.perception_queue.put(perception)
+            self.stats['detect'].record(time.time() - start)
+
+    def _perceive(self, frame):
+        """只做畫面分析；畫面帶有 trace 時記錄檢測的開始與結束"""
+        if frame.trace is not None:
+            frame.trace.mark('detect_start')
+        perception = self._perceive_frame(frame)
+        if frame.trace is not None:
+            frame.trace.mark('detect_end')
+        return perception
+
+    def _perceive_frame(self, frame):
+        """只做畫面分析 - 與 main_loop 的檢測順序相同"""
+        import config
+        from core.utils import detect_sign_text, detect_rune_text, find_player_medal
+
+        c = self.components
+        screenshot = frame.image
+        client_width = self.window_info['client_width']
+        client_height = self.window_info['client_height']
+        perception = Perception(frame=frame)
+
+        if c.get('red_dot_detector') is not None:
+            with self.perception_lock:
+                perception.change_channel = c['red_dot_detector'].handle_red_dot_detection(
+                    screenshot, client_width, client_height
+                )
+            if perception.change_channel:
+                return perception
+
+        rune_active = c['rune_mode'].is_active
+        climbing = c['rope_climbing'].is_climbing
+        if rune_active:
+            # rune 模式由按鍵階段自行截圖處理
+            return perception
+
+        # 有非同步檢測後端時 sign / rune / 角色三項並行
+        sign_result = rune_result = medal_result = None
+        if c.get('image_processor') is not None and not climbing:
+            sign_result, rune_result, medal_result = c['image_processor'].detect_frame(screenshot, frame.timestamp)
+
+        if not climbing:
+            sign_found, _, _ = sign_result or detect_sign_text(screenshot, self.templates['sign'])
+            if sign_found:
+                perception.sign_found = True
+                return perception
+
+            rune_found, _, _ = rune_result or detect_rune_text(screenshot, self.templates['rune'], config.MATCH_THRESHOLD)
+            if rune_found:
+                perception.rune_found = True
+                return perception
+
+        if medal_result is None:
+            with self.perception_lock:
+                medal_result = find_player_medal(
+                    screenshot, self.templates['medal'], config.MATCH_THRESHOLD, c.get('player_locator')
+                )
+        medal_found, medal_loc, _ = medal_result
+        if not medal_found:
+            return perception
+
+        template_height, template_width = self.templates['medal'].shape[:2]
+        perception.medal_found = True
+        perception.player_x = medal_loc[0] + template_width // 2
+        perception.player_y = medal_loc[1] + template_height // 2 - config.Y_OFFSET
+
+        if climbing or c['search'].is_searching:
+            return perception
+
+        # 角色檢測後畫面已過時：略過怪物與繩索檢測，讓決策只用角色位置
+        if not self.frame_ages.is_fresh(frame, 'monster'):
+            return perception
+
+        candidate_rois = None
+        if c.get('background_model') is not None:
+            with self.perception_lock:
+                locator = c.get('player_locator')
+                candidate_rois = c['background_model'].process(screenshot, locator.last_marker if locator is not None else None)
+
+        perception.monster = c['monster_detector'].locate_monster(
+            screenshot, perception.player_x, perception.player_y, client_width, client_height,
+            c['movement'].is_moving, candidate_rois
+        )
+
+        # 區域清理乾淨一段時間後才檢測繩索（清怪計時取自決策階段發布的快照）
+        now = time.time()
+        no_monster_time = self.decision_state.no_monster_time
+        if (perception.monster is None and no_monster_time and
+                now - no_monster_time >= self.required_clear_time and
+                now - self.last_rope_detection_time >= self.rope_detection_interval):
+            self.last_rope_detection_time = now
+            rope_found, rope_x, rope_y = c['rope_climbing'].detect_rope(
+                screenshot, perception.player_x, perception.player_y, client_width, client_height
+            )
+            if rope_found:
+                perception.rope = (rope_x, rope_y)
+
+        return perception
+
+    # ------------------------------------------------------------------
+    # 決策階段
+    # ------------------------------------------------------------------
+
+    def _decide_stage(self):
+        while not self.stop_event.is_set():
+            perception = self.perception_queue.get(timeout=0.1)
+            if perception is None:
+                continue
+
+            # 多個檢測線程時結果可能亂序，比已處理的更舊就略過
+            if perception.frame.seq <= self.last_perception_seq:
+                self.stats['decide'].skipped += 1
+                continue
+            self.last_perception_seq = perception.frame.seq
+
+            # 檢測完成時畫面已過時，不依舊畫面決策，等下一個較新的結果
+            if not self.frame_ages.is_fresh(perception.frame, 'decide'):
+                self.stats['decide'].skipped += 1
+                continue
+            self.frame_ages.record_decision(perception.frame)
+
+            start = time.time()
+            try:
+                plan = self._decide(perception)
+            except Exception as e:
+                self.stats['decide'].errors += 1
+                print(f"❌ 管線決策錯誤: {e}")
+                continue
+
+            if plan is not None and plan.steps:
+                self.plan_queue.put(plan)
+            self.stats['decide'].record(time.time() - start)
+            get_metrics().inc('loop_ticks_total', engine='pipeline')
+
+    def _decide(self, perception):
+        """依檢測結果產生計畫；畫面的 trace 隨計畫交給按鍵階段"""
+        trace = perception.frame.trace
+        if trace is not None:
+            trace.mark('decide_start')
+        plan = self._decide_plan(perception)
+        plan.trace = trace
+        plan.decision_state = self.decision_state = DecisionState(
+            self.no_monster_time, self.components['search'].medal_lost_count
+        )
+        if trace is not None:
+            trace.mark('decide_end')
+        return plan
+
+    def _decide_plan(self, perception):
+        """狀態機 - 依檢測結果產生按鍵步驟（本身不按任何鍵）"""
+        import config
+        from core.utils import quick_attack_monster
+
+        c = self.components
+        wi = self.window_info
+        screenshot = perception.frame.image
+        now = time.time()
+        plan = Plan(name='idle', frame_time=perception.frame.timestamp)
+
+        if perception.change_channel:
+            plan.name = 'channel_change'
+            plan.steps.append(('channel_change', self._change_channel))
+            return plan
+
+        if c['rune_mode'].is_active:
+            plan.name = 'rune'
+            plan.steps.append(('rune', lambda: c['rune_mode'].handle(
+                screenshot, wi['screen_region'],
+                self.templates['medal'], self.templates['rune'],
+                self.templates['direction'], self.templates['direction_masks'],
+                wi['client_width'], wi['client_height'],
+                c['search'], c['cliff_detection'],
+                wi['client_x'], wi['client_y'],
+                c['movement'], self.templates['change']
+            )))
+
+        elif c['rope_climbing'].is_climbing:
+            if perception.medal_found:
+                self.player_x, self.player_y = perception.player_x, perception.player_y
+            player_x, player_y = self.player_x, self.player_y
+            plan.name = 'climb'
+            plan.steps.append(('climb', lambda: c['rope_climbing'].update_climbing(
+                screenshot, player_x, player_y,
+                wi['client_width'], wi['client_height'],
+                self.templates['medal'], wi['client_x'], wi['client_y']
+            )))
+
+        elif perception.sign_found or perception.rune_found:
+            print("檢測到 rune 提示，進入 Rune 模式")
+            plan.name = 'enter_rune'
+            plan.steps.append(('enter_rune', self._enter_rune_mode))
+            return plan
+
+        elif perception.medal_found:
+            self.player_x, self.player_y = perception.player_x, perception.player_y
+            player_x, player_y = self.player_x, self.player_y
+            c['search'].last_medal_found_time = now
+            c['search'].medal_lost_count = 0
+            if c['search'].is_searching:
+                plan.steps.append(('search_update', lambda: c['search'].update_search(True)))
+
+            if perception.monster is not None:
+                target = perception.monster
+                self.no_monster_time = now
+                plan.name = 'attack'
+                plan.steps.append(('attack', lambda: quick_attack_monster(
+                    target['monster_x'], target['monster_y'], player_x, player_y,
+                    c['movement'], c['cliff_detection'], target['attack_direction'], target['attack_type']
+                )))
+            else:
+                if self.no_monster_time == 0:
+                    self.no_monster_time = now
+
+                if perception.rope is not None:
+                    rope_x, rope_y = perception.rope
+                    print("✅ 區域已清理乾淨，檢測到繩索，開始爬繩邏輯")
+                    self.no_monster_time = 0
+                    plan.name = 'start_climb'
+                    plan.steps.append(('start_climb', lambda: self._start_climbing(rope_x, rope_y, player_x, player_y)))
+                    return plan
+
+                if not c['movement'].is_moving:
+                    plan.name = 'move'
+                    plan.steps.append(('move_start', lambda: c['movement'].start(
+                        screenshot, player_x, player_y,
+                        wi['client_width'], wi['client_height'], c['monster_detector']
+                    )))
+
+            if c['movement'].is_moving:
+                plan.steps.append(('cliff_check', lambda: c['cliff_detection'].check(
+                    time.time(), screenshot, player_x, player_y,
+                    wi['client_width'], wi['client_height'],
+                    self.templates['medal'], c['movement'].direction,
+                    wi['client_x'], wi['client_y']
+                )))
+
+        else:
+            self.no_monster_time = 0
+            if c['search'].is_searching:
+                plan.steps.append(('search_update', lambda: c['search'].update_search(False)))
+            # 按鍵階段結束搜尋時會歸零（Search._finish_search）；與這裡的遞增交錯只讓下一次搜尋早或晚一幀開始
+            c['search'].medal_lost_count += 1
+            if c['search'].medal_lost_count >= 5 and not c['search'].is_searching:
+                plan.name = 'search'
+                plan.steps.append(('search', lambda: c['search'].search_for_medal(
+                    wi['screen_region'], self.templates['medal'], config.MATCH_THRESHOLD, c['movement']
+                )))
+
+        player_x, player_y = self.player_x, self.player_y
+        plan.steps.append(('movement_update', lambda: self._update_movement(
+            screenshot, player_x, player_y, plan.decision_state.medal_lost_count
+        )))
+
+        if c.get('passive_skills'):
+            plan.steps.append(('passive_skills', c['passive_skills'].check_and_use_skills))
+
+        return plan
+
+    # ------------------------------------------------------------------
+    # 按鍵階段
+    # ------------------------------------------------------------------
+
+    def _actuate_stage(self):
+        while not self.stop_event.is_set():
+            plan = self.plan_queue.get(timeout=0.1)
+            if plan is None:
+                continue
+
+            if time.time() - plan.frame_time > self.max_plan_age:
+                # 等待期間畫面已過時，等下一個新的計畫
+                self.stats['actuate'].skipped += 1
+                continue
+
+            start = time.time()
+            try:
+                with activate(plan.trace):
+                    if plan.trace is not None:
+                        plan.trace.mark('actuate_start')
+                    for step_name, step in plan.steps:
+                        if self.stop_event.is_set():
+                            break
+                        step()
+            except Exception as e:
+                self.stats['actuate'].errors += 1
+                print(f"❌ 管線按鍵錯誤 ({plan.name}): {e}")
+            self.stats['actuate'].record(time.time() - start)
+
+    def _change_channel(self):
+        from core.utils import execute_channel_change
+
+        c = self.components
+        print("🚨 紅點偵測觸發換頻邏輯！")
+        c['movement'].stop()
+        if c['rune_mode'].is_active:
+            c['rune_mode'].exit()
+        if c['rope_climbing'].is_climbing:
+            c['rope_climbing'].stop_climbing()
+
+        execute_channel_change(self.window_info['screen_region'], self.templates['change'])
+        if c.get('player_locator') is not None:
+            c['player_locator'].reset()
+        time.sleep(2)
+
+        # 換頻前的畫面與結果全部作廢
+        self.frame_queue.clear()
+        self.perception_queue.clear()
+        self.plan_queue.clear()
+
+    def _enter_rune_mode(self):
+        self.components['rune_mode'].enter()
+        self.components['movement'].stop()
+
+    def _start_climbing(self, rope_x, rope_y, player_x, player_y):
+        self.components['movement'].stop()
+        self.components['rope_climbing'].start_climbing(rope_x, rope_y, player_x, player_y)
+
+    def _update_movement(self, screenshot, player_x, player_y, medal_lost_count):
+        """medal_lost_count 為決策時的快照（計畫附帶），不讀取決策線程正在修改的計數"""
+        c = self.components
+        movement_completed = c['movement'].update()
+        if (movement_completed and not c['search'].is_searching and
+                medal_lost_count == 0 and
+                not c['rune_mode'].is_active and
+                not c['rope_climbing'].is_climbing):
+            c['movement'].transition(
+                screenshot, player_x, player_y,
+                self.window_info['client_width'], self.window_info['client_height'],
+                c['monster_detector']
+            )
@@ -5,6 +5,7 @@ import time
 import random
 import pyautogui
 from config import JUMP_KEY
+from core.input_actuator import KeyTimeline, get_input_actuator, LEGACY_KEY_GAP
 
 class RandomDownJump:
     def __init__(self):
@@ -277,29 +278,21 @@ class RandomDownJump:
             if self.debug_down_jump:
                 print(f"🔧 [調試] 開始按鍵操作序列:")
             
-            # 同時按下所有按鍵
-            for key in keys_to_press:
-                if self.debug_down_jump:
-                    print(f"🔧 [調試] 按下: {key}")
-                pyautogui.keyDown(key)
-            
+            # ★★★ 按鍵序列交給按鍵執行器，不在主循環 sleep ★★★
+            timeline = KeyTimeline('down_jump', channel='down_jump', key_gap=LEGACY_KEY_GAP)
+            timeline.down(*keys_to_press).wait(self.hold_time).up(*keys_to_press)
+
             if self.debug_down_jump:
-                print(f"🔧 [調試] 保持按鍵 {self.hold_time}秒...")
-            
-            # 保持指定時間
-            time.sleep(self.hold_time)
-            
-            # 釋放所有按鍵
-            for key in keys_to_press:
-                if self.debug_down_jump:
-                    print(f"🔧 [調試] 釋放: {key}")
-                pyautogui.keyUp(key)
-            
+                print(f"🔧 [調試] 提交按鍵時間軸: 按下 {keys_str}, 保持 {self.hold_time}秒後釋放")
+
+            # 時間軸結束（或被取消）時才清除下跳狀態
+            get_input_actuator().submit(timeline, policy='preempt', on_complete=self._on_down_jump_complete)
+
             # 更新統計
             self.down_jump_count += 1
             self.last_down_jump_time = current_time
             
-            print(f"✅ 下跳執行完成 (總計: {self.down_jump_count}次)")
+            print(f"✅ 下跳已提交 (總計: {self.down_jump_count}次)")
             
             # 安排下一次下跳
             self.schedule_next_down_jump()
@@ -310,10 +303,15 @@ class RandomDownJump:
             print(f"❌ 下跳執行失敗: {e}")
             import traceback
             print(f"詳細錯誤: {traceback.format_exc()}")
-            return False
-        
-        finally:
             self.is_down_jumping = False
+            return False
+
+    def _on_down_jump_complete(self, handle):
+        """按鍵執行器回調：下跳按鍵序列結束"""
+        self.is_down_jumping = False
+        if self.debug_down_jump:
+            status = "已取消" if handle.cancelled else "完成"
+            print(f"🔧 [調試] 下跳按鍵序列{status}")
     
     def check_and_execute(self, movement_state=None, is_attacking=False, is_climbing=False):
         """檢查並執行下跳（主要調用接口）- 增強版"""
@@ -6,6 +6,12 @@ import time
 import random
 import os
 
+from core.config_snapshot import ConfigBinding
+from core.logger import get_logger, toggle_module_debug
+from core.perf_stats import timed_call
+
+log = get_logger('red_dot_detector')
+
 
 class RedDotDetector:
     def __init__(self):
@@ -26,8 +32,8 @@ class RedDotDetector:
         self.max_no_detections = 3  # 連續未檢測到3次就重置 (可調整)
         self.last_red_dot_time = 0  # 最後一次檢測到紅點的時間
         
-        # 調試標誌
-        self.debug_red_detection = True
+        # ★★★ 新增：設定快照綁定，熱路徑不再每次 import config ★★★
+        self.config = ConfigBinding()
         
     def load_red_template(self, red_path):
         """載入紅點模板 - 修改版支援多模板"""
@@ -38,9 +44,8 @@ class RedDotDetector:
             return False
         else:
             print(f"✅ 成功載入紅點模板: {red_path}")
-            if self.debug_red_detection:
-                h, w = self.red_template.shape[:2]
-                print(f"🔧 [調試] 紅點模板尺寸: {w}x{h}")
+            h, w = self.red_template.shape[:2]
+            log.debug("🔧 [調試] 紅點模板尺寸: %dx%d", w, h)
         
         # 初始化模板列表
         self.red_templates = [self.red_template]
@@ -79,6 +84,13 @@ class RedDotDetector:
         
         return True
 
+    def share_templates_from(self, other):
+        """★★★ 新增：多開模式共用另一個實例已載入的紅點模板（唯讀，不重複載入）★★★"""
+        self.red_template = other.red_template
+        self.red_templates = getattr(other, 'red_templates', [other.red_template])
+        self.max_no_detections = other.max_no_detections
+
+    @timed_call('red_dot')
     def detect_red_dot(self, screenshot, client_width, client_height):
         """檢測左上角的紅點 - 修改版支援多模板"""
         # 使用模板列表而不是單一模板
@@ -97,19 +109,12 @@ class RedDotDetector:
         top_left_region = screenshot[0:detection_height, 0:detection_width]
         
         if top_left_region.size == 0:
-            if self.debug_red_detection:
-                print("🔧 [調試] 左上角檢測區域為空")
+            log.debug("🔧 [調試] 左上角檢測區域為空", key='red_region_empty')
             return False
         
         try:
-            # 從config載入檢測閾值
-            try:
-                from config import RED_DOT_DETECTION_THRESHOLD
-                threshold = RED_DOT_DETECTION_THRESHOLD
-            except ImportError:
-                threshold = 0.7
-                if self.debug_red_detection:
-                    print("⚠️ 無法載入config閾值設定，使用預設值 0.7")
+            # 從設定快照取得檢測閾值
+            threshold = self.config.current().RED_DOT_DETECTION_THRESHOLD
             
             # 檢測所有模板
             best_match_val = 0
@@ -125,25 +130,22 @@ class RedDotDetector:
                         best_template_index = i
                         
                 except cv2.error as e:
-                    if self.debug_red_detection:
-                        print(f"🔧 [調試] 模板 {i+1} 匹配錯誤: {e}")
+                    log.debug("🔧 [調試] 模板 %d 匹配錯誤: %s", i + 1, e, key='red_match_error')
                     continue
             
-            if self.debug_red_detection and best_match_val > 0.4:
-                template_name = "red.png" if best_template_index == 0 else f"red{best_template_index}.png"
-                print(f"🔧 [調試] 紅點匹配度: {best_match_val:.3f} ({template_name}, 閾值: {threshold})")
+            if best_match_val > 0.4:
+                log.debug("🔧 [調試] 紅點匹配度: %.3f (red%s.png, 閾值: %s)",
+                          best_match_val, best_template_index or '', threshold, key='red_match')
             
             if best_match_val >= threshold:
-                if self.debug_red_detection:
-                    template_name = "red.png" if best_template_index == 0 else f"red{best_template_index}.png"
-                    print(f"🔴 檢測到紅點！模板: {template_name}, 匹配度: {best_match_val:.3f}")
+                log.debug("🔴 檢測到紅點！模板: red%s.png, 匹配度: %.3f",
+                          best_template_index or '', best_match_val, key='red_detected')
                 return True
             
             return False
             
         except cv2.error as e:
-            if self.debug_red_detection:
-                print(f"🔧 [調試] 紅點檢測錯誤: {e}")
+            log.debug("🔧 [調試] 紅點檢測錯誤: %s", e, key='red_detect_error')
             return False
     
     def start_detection_timer(self):
@@ -151,16 +153,10 @@ class RedDotDetector:
         if self.is_detecting:
             return  # 已經在檢測中
         
-        # 導入配置參數
-        try:
-            from config import RED_DOT_MIN_TIME, RED_DOT_MAX_TIME
-            min_time = RED_DOT_MIN_TIME
-            max_time = RED_DOT_MAX_TIME
-        except ImportError:
-            # 如果無法導入配置，使用預設值
-            min_time = 15.0
-            max_time = 20.0
-            print("⚠️ 無法載入config設定，使用預設時間範圍 15-20 秒")
+        # 從設定快照取得時間範圍
+        cfg = self.config.current()
+        min_time = cfg.RED_DOT_MIN_TIME
+        max_time = cfg.RED_DOT_MAX_TIME
         
         self.is_detecting = True
         self.detection_start_time = time.time()
@@ -200,8 +196,7 @@ class RedDotDetector:
     
     def reset_detection(self):
         """重置檢測狀態"""
-        if self.debug_red_detection:
-            print("🔧 [調試] 重置紅點檢測狀態")
+        log.debug("🔧 [調試] 重置紅點檢測狀態")
         
         self.is_detecting = False
         self.detection_start_time = 0
@@ -235,8 +230,8 @@ class RedDotDetector:
             else:
                 # 持續檢測到紅點
                 self.consecutive_detections += 1
-                if self.debug_red_detection and self.consecutive_detections % 5 == 0:
-                    print(f"🔴 持續檢測到紅點 (連續 {self.consecutive_detections} 次)")
+                if self.consecutive_detections % 5 == 0:
+                    log.debug("🔴 持續檢測到紅點 (連續 %d 次)", self.consecutive_detections)
         else:
             # ★★★ 沒有檢測到紅點 ★★★
             if self.is_detecting:
@@ -251,12 +246,11 @@ class RedDotDetector:
                     return False
                 else:
                     # 紅點暫時消失，但還在容忍範圍內
-                    if self.debug_red_detection:
-                        elapsed = current_time - self.detection_start_time
-                        remaining = self.required_detection_time - elapsed
-                        time_since_last_red = current_time - self.last_red_dot_time
-                        print(f"⚪ 紅點暫時消失 ({self.consecutive_no_detections}/{self.max_no_detections}次)")
-                        print(f"   距離上次檢測到: {time_since_last_red:.1f}秒, 計時剩餘: {remaining:.1f}秒")
+                    elapsed = current_time - self.detection_start_time
+                    log.info("⚪ 紅點暫時消失 (%d/%d次)\n   距離上次檢測到: %.1f秒, 計時剩餘: %.1f秒",
+                             self.consecutive_no_detections, self.max_no_detections,
+                             current_time - self.last_red_dot_time, self.required_detection_time - elapsed,
+                             key='red_dot_missing')
             
             self.consecutive_detections = 0
         
@@ -322,9 +316,9 @@ class RedDotDetector:
             print(f"   當前檢測時間調整: {old_required_time:.1f} -> {self.required_detection_time:.1f} 秒")
     
     def toggle_debug(self):
-        """切換調試模式"""
-        self.debug_red_detection = not self.debug_red_detection
-        print(f"🔧 紅點檢測調試模式: {'開啟' if self.debug_red_detection else '關閉'}")
+        """切換調試模式（調整 red_dot_detector 模組的日誌等級）"""
+        enabled = toggle_module_debug('red_dot_detector')
+        print(f"🔧 紅點檢測調試模式: {'開啟' if enabled else '關閉'}")
     
     def set_detection_interval(self, interval):
         """設置檢測間隔"""
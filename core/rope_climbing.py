@@ -2,12 +2,18 @@
 爬繩模組 - 處理繩索檢測和爬繩邏輯 (修復版 - 實時更新繩索位置)
 """
 import cv2
+import numpy as np
 import os
 import glob
 import time
 import random
-import pyautogui
 from config import JUMP_KEY, DASH_SKILL_KEY, ATTACK_KEY
+from core.input_actuator import KeyTimeline, get_input_actuator, LEGACY_KEY_GAP
+from core.config_snapshot import ConfigBinding
+from core.logger import get_logger, toggle_module_debug
+from core.perf_stats import timed_call
+
+log = get_logger('rope_climbing')
 
 class RopeClimbing:
     def __init__(self):
@@ -23,6 +29,7 @@ class RopeClimbing:
         self.target_rope_y = None
         self.last_foot_area = None
         self.movement_direction = None
+        self.key_owner = 'rope'  # ★ 新增：爬繩按鍵經由按鍵執行器送出
         self.approaching_start_time = 0
         self.max_approaching_time = 2
         
@@ -34,34 +41,43 @@ class RopeClimbing:
         # ★★★ 修復：初始化為0，讓程式啟動時就能爬繩 ★★★
         self.last_climb_time = 0
         
-        # ★★★ 新增：調試標誌 ★★★
-        self.debug_rope_detection = True
+        # ★★★ 新增：列投影預檢測 - 先找出候選繩索X位置，只在候選列做模板匹配 ★★★
+        self.enable_column_predetector = True
+        self.column_edge_threshold = 40  # 水平梯度強度閾值（Sobel）
+        self.column_min_coverage = 0.5  # 候選列的垂直邊緣覆蓋率（相對最短模板高度）
+        self.max_rope_candidates = 4  # 最多保留幾個候選列
+        self.column_band_padding = 3  # 候選列兩側額外保留的像素
+        self.rope_template_max_width = 0
+        self.rope_template_min_height = 0
         
         # ★★★ 新增：最長爬繩時間限制 ★★★
         self.max_climbing_duration = 15.0  # 最長爬繩時間 15 秒
         self.climbing_start_time = 0  # 開始爬繩的時間
 
+        # ★★★ 新增：執行中的爬繩按鍵序列 ★★★
+        self.climb_handle = None
+
+        # ★★★ 新增：設定快照綁定 ★★★
+        self.config = ConfigBinding()
+
     def can_climb(self):
         """檢查是否可以爬繩（冷卻檢查）- 修復版"""
-        from config import ROPE_COOLDOWN_TIME
+        ROPE_COOLDOWN_TIME = self.config.current().ROPE_COOLDOWN_TIME
         current_time = time.time()
         
         # ★★★ 修復：簡化冷卻檢查邏輯 ★★★
         if ROPE_COOLDOWN_TIME <= 0:
             # 如果冷卻時間設為0或負數，總是允許爬繩
-            if self.debug_rope_detection:
-                print(f"🔧 [調試] 冷卻時間為 {ROPE_COOLDOWN_TIME}，允許爬繩")
+            log.debug("🔧 [調試] 冷卻時間為 %s，允許爬繩", ROPE_COOLDOWN_TIME, key='rope_cooldown')
             return True
         
         time_since_last_climb = current_time - self.last_climb_time
         if time_since_last_climb < ROPE_COOLDOWN_TIME:
             remaining = ROPE_COOLDOWN_TIME - time_since_last_climb
-            if self.debug_rope_detection:
-                print(f"🕒 [調試] 爬繩冷卻中，剩餘 {remaining:.1f} 秒")
+            log.debug("🕒 [調試] 爬繩冷卻中，剩餘 %.1f 秒", remaining, key='rope_cooldown')
             return False
         
-        if self.debug_rope_detection:
-            print(f"✅ [調試] 冷卻完成，可以爬繩 (上次爬繩: {time_since_last_climb:.1f} 秒前)")
+        log.debug("✅ [調試] 冷卻完成，可以爬繩 (上次爬繩: %.1f 秒前)", time_since_last_climb, key='rope_cooldown')
         return True
     
     def load_rope_templates(self, rope_folder):
@@ -85,26 +101,34 @@ class RopeClimbing:
         if not self.rope_templates:
             print(f"警告: 未找到任何繩索模板")
         else:
+            # 預先記錄模板尺寸，供列投影預檢測使用
+            self.rope_template_max_width = max(t.shape[1] for t in self.rope_templates)
+            self.rope_template_min_height = min(t.shape[0] for t in self.rope_templates)
             print(f"成功載入 {len(self.rope_templates)} 個繩索模板")
+
+    def share_templates_from(self, other):
+        """★★★ 新增：多開模式共用另一個實例已載入的繩索模板（唯讀，不重複載入）★★★"""
+        self.rope_templates = other.rope_templates
+        self.rope_template_max_width = other.rope_template_max_width
+        self.rope_template_min_height = other.rope_template_min_height
     
     def detect_rope(self, screenshot, player_x, player_y, client_width, client_height):
         """檢測繩索位置（修復版）"""
         if not self.rope_templates:
-            if self.debug_rope_detection:
-                print("🔧 [調試] 無繩索模板，跳過檢測")
+            log.debug("🔧 [調試] 無繩索模板，跳過檢測", key='rope_no_template')
             return False, None, None
         
         # ★★★ 修復：使用簡化的冷卻檢查 ★★★
         if not self.can_climb():
             return False, None, None
         
-        if self.debug_rope_detection:
-            print(f"🔧 [調試] 開始繩索檢測，角色位置: ({player_x}, {player_y})")
+        log.debug("🔧 [調試] 開始繩索檢測，角色位置: (%s, %s)", player_x, player_y)
         
         return self._detect_rope_internal(screenshot, player_x, player_y, client_width, client_height, self.detection_size)
     
+    @timed_call('rope')
     def _detect_rope_internal(self, screenshot, player_x, player_y, client_width, client_height, detection_size):
-        """內部繩索檢測函數"""
+        """內部繩索檢測函數 - 列投影預檢測 + 候選列模板確認"""
         region_x = max(0, min(player_x - detection_size // 2, client_width - detection_size))
         region_y = max(0, min(player_y - detection_size, client_height - detection_size))
         
@@ -114,42 +138,100 @@ class RopeClimbing:
         detection_region = screenshot[region_y:region_y_end, region_x:region_x_end]
         
         if detection_region.size == 0:
-            if self.debug_rope_detection:
-                print("🔧 [調試] 檢測區域為空")
+            log.debug("🔧 [調試] 檢測區域為空")
             return False, None, None
         
+        # ★★★ 新增：先用列投影找出候選繩索列，只在這些列附近做模板匹配 ★★★
+        if self.enable_column_predetector:
+            candidate_columns = self._propose_rope_columns(detection_region)
+            if not candidate_columns:
+                log.debug("🔧 [調試] 列投影未發現候選繩索")
+                return False, None, None
+            
+            half_band = self.rope_template_max_width + self.column_band_padding
+            search_bands = []
+            for column_x in candidate_columns:
+                band_start = max(0, column_x - half_band)
+                band_end = min(detection_region.shape[1], column_x + half_band + 1)
+                search_bands.append((band_start, band_end))
+            
+            log.debug("🔧 [調試] 候選繩索列: %s", candidate_columns)
+        else:
+            search_bands = [(0, detection_region.shape[1])]
+        
         best_val = 0
         best_rope_x = None
         best_rope_y = None
         
-        for i, template in enumerate(self.rope_templates, 1):
-            template_h, template_w = template.shape[:2]
-            if template_h > detection_region.shape[0] or template_w > detection_region.shape[1]:
-                continue
+        for band_start, band_end in search_bands:
+            band_region = detection_region[:, band_start:band_end]
             
-            try:
-                result = cv2.matchTemplate(detection_region, template, cv2.TM_CCOEFF_NORMED)
-                _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            for i, template in enumerate(self.rope_templates, 1):
+                template_h, template_w = template.shape[:2]
+                if template_h > band_region.shape[0] or template_w > band_region.shape[1]:
+                    continue
                 
-                threshold = 0.75
-                if max_val > threshold and max_val > best_val:
-                    best_val = max_val
-                    best_rope_x = region_x + max_loc[0] + template_w // 2
-                    best_rope_y = region_y + max_loc[1] + template_h // 2
+                try:
+                    result = cv2.matchTemplate(band_region, template, cv2.TM_CCOEFF_NORMED)
+                    _, max_val, _, max_loc = cv2.minMaxLoc(result)
                     
-                    if self.debug_rope_detection:
-                        print(f"🔧 [調試] 繩索模板 {i} 匹配度: {max_val:.3f}")
+                    threshold = 0.75
+                    if max_val > threshold and max_val > best_val:
+                        best_val = max_val
+                        best_rope_x = region_x + band_start + max_loc[0] + template_w // 2
+                        best_rope_y = region_y + max_loc[1] + template_h // 2
                         
-            except cv2.error as e:
-                continue
+                        log.debug("🔧 [調試] 繩索模板 %d 匹配度: %.3f", i, max_val)
+                            
+                except cv2.error as e:
+                    continue
         
         if best_rope_x is not None:
             return True, best_rope_x, best_rope_y
         else:
-            if self.debug_rope_detection:
-                print("🔧 [調試] 未檢測到繩索")
+            log.debug("🔧 [調試] 未檢測到繩索")
             return False, None, None
     
+    def _propose_rope_columns(self, detection_region):
+        """★★★ 新增：列投影預檢測 - 繩索是長條垂直結構，找出垂直邊緣持續出現的X位置 ★★★"""
+        if detection_region.ndim == 3:
+            region_gray = cv2.cvtColor(detection_region, cv2.COLOR_BGR2GRAY)
+        else:
+            region_gray = detection_region
+        
+        region_h = region_gray.shape[0]
+        if region_h == 0 or region_gray.shape[1] == 0:
+            return []
+        
+        # 水平方向梯度 = 垂直邊緣
+        gradient_x = cv2.Sobel(region_gray, cv2.CV_16S, 1, 0, ksize=3)
+        strong_edges = np.abs(gradient_x) > self.column_edge_threshold
+        
+        # 每一列的垂直邊緣覆蓋率，並合併相鄰列（繩索兩側邊緣）
+        column_coverage = strong_edges.mean(axis=0)
+        column_coverage = np.convolve(column_coverage, np.ones(3) / 3.0, mode='same')
+        
+        # 繩索至少要覆蓋最短模板高度的一部分
+        min_height = self.rope_template_min_height or region_h
+        required_coverage = self.column_min_coverage * min(min_height, region_h) / region_h
+        
+        candidate_indices = np.flatnonzero(column_coverage >= required_coverage)
+        if candidate_indices.size == 0:
+            return []
+        
+        # 非極大值抑制：同一條繩索只保留覆蓋率最高的列
+        suppress_distance = max(self.rope_template_max_width, 1) + self.column_band_padding
+        ordered = candidate_indices[np.argsort(column_coverage[candidate_indices])[::-1]]
+        
+        candidate_columns = []
+        for column_x in ordered:
+            if all(abs(int(column_x) - picked) > suppress_distance for picked in candidate_columns):
+                candidate_columns.append(int(column_x))
+                if len(candidate_columns) >= self.max_rope_candidates:
+                    break
+        
+        return candidate_columns
+    
     def update_rope_position(self, screenshot, player_x, player_y, client_width, client_height):
         """★★★ 新增：實時更新繩索位置 ★★★"""
         current_time = time.time()
@@ -160,8 +242,7 @@ class RopeClimbing:
         
         self.last_rope_update_time = current_time
         
-        if self.debug_rope_detection:
-            print(f"🔄 更新繩索位置檢測...")
+        log.debug("🔄 更新繩索位置檢測...")
         
         # 使用較小的檢測範圍進行更新（提高效率）
         rope_found, new_rope_x, new_rope_y = self._detect_rope_internal(
@@ -179,15 +260,13 @@ class RopeClimbing:
             self.target_rope_x = new_rope_x
             self.target_rope_y = new_rope_y
             
-            if self.debug_rope_detection:
-                print(f"✅ 繩索位置已更新: ({new_rope_x}, {new_rope_y})")
-                if x_change > 0 or y_change > 0:
-                    print(f"   位置變化: X軸 {x_change}px, Y軸 {y_change}px")
+            log.debug("✅ 繩索位置已更新: (%s, %s)", new_rope_x, new_rope_y)
+            if x_change > 0 or y_change > 0:
+                log.debug("   位置變化: X軸 %spx, Y軸 %spx", x_change, y_change)
             
             return True
         else:
-            if self.debug_rope_detection:
-                print("⚠️ 無法更新繩索位置，使用舊位置繼續")
+            log.debug("⚠️ 無法更新繩索位置，使用舊位置繼續")
             return False
     
     def capture_head_area(self, screenshot, player_x, player_y, client_width, client_height, medal_template):
@@ -229,13 +308,14 @@ class RopeClimbing:
         x_diff = abs(rope_x - player_x)
         
         if x_diff < self.min_distance:
-            print(f"❌ 太靠近繩索: X差異 {x_diff}px < 最小距離 {self.min_distance}px")
+            log.info("❌ 太靠近繩索: X差異 %spx < 最小距離 %spx", x_diff, self.min_distance, key='climb_range')
             return False
         elif x_diff > self.max_distance:
-            print(f"❌ 距離繩索太遠: X差異 {x_diff}px > 最大距離 {self.max_distance}px")
+            log.info("❌ 距離繩索太遠: X差異 %spx > 最大距離 %spx", x_diff, self.max_distance, key='climb_range')
             return False
         else:
-            print(f"✅ 在可爬繩範圍內: X差異 {x_diff}px (範圍: {self.min_distance}-{self.max_distance}px)")
+            log.info("✅ 在可爬繩範圍內: X差異 %spx (範圍: %s-%spx)", x_diff, self.min_distance, self.max_distance,
+                     key='climb_range')
             return True
     
     def start_climbing(self, rope_x, rope_y, player_x, player_y):
@@ -284,12 +364,9 @@ class RopeClimbing:
         
         # ★★★ 關鍵：強制釋放所有可能影響爬繩的按鍵 ★★★
         problem_keys = ['left', 'right', JUMP_KEY, DASH_SKILL_KEY, ATTACK_KEY, 'up', 'down']
-        for key in problem_keys:
-            try:
-                pyautogui.keyUp(key)
-                print(f"🚨 爬繩準備：釋放 {key}")
-            except:
-                pass
+        get_input_actuator().cancel_channel('cliff')
+        get_input_actuator().force_release(*problem_keys)
+        print(f"🚨 爬繩準備：釋放 {problem_keys}")
         
         # 短暫等待，確保按鍵狀態穩定
         time.sleep(0.1)
@@ -299,15 +376,15 @@ class RopeClimbing:
         """開始移動"""
         if self.movement_direction != direction:
             if self.movement_direction:
-                pyautogui.keyUp(self.movement_direction)
-            pyautogui.keyDown(direction)
+                get_input_actuator().release_key(self.movement_direction, self.key_owner)
+            get_input_actuator().hold_key(direction, self.key_owner)
             self.movement_direction = direction
             print(f"🔄 開始朝 {direction} 移動")
     
     def stop_movement(self):
         """停止移動"""
         if self.movement_direction:
-            pyautogui.keyUp(self.movement_direction)
+            get_input_actuator().release_key(self.movement_direction, self.key_owner)
             print(f"🛑 停止 {self.movement_direction} 移動")
             self.movement_direction = None
     
@@ -341,21 +418,14 @@ class RopeClimbing:
         print(f"繩索在角色{direction}邊，執行 {direction}+跳+上")
         print(f"🚀 執行動作序列: {direction} + JUMP_KEY + up")
         
-        # 執行爬繩動作
-        pyautogui.keyDown(direction)
-        pyautogui.keyDown(JUMP_KEY)
-        pyautogui.keyUp(direction)
-        pyautogui.keyUp(JUMP_KEY)
-        pyautogui.keyDown('up')  # 按下 up 鍵並保持
-        time.sleep(0.1)  # 動作保持 0.1 秒
-        pyautogui.keyUp('up')
-        
-        # 短暫等待讓動作生效
-        time.sleep(0.5)
-        
-        # 驗證爬繩成功
-        self.verify_climb_success(screenshot, player_x, player_y, client_width, client_height, medal_template)
-    
+        # ★★★ 爬繩動作交給按鍵執行器，完成後在 update_climbing 的 executing 階段驗證 ★★★
+        timeline = KeyTimeline('climb', channel='climb', key_gap=LEGACY_KEY_GAP)
+        timeline.down(direction, JUMP_KEY).up(direction, JUMP_KEY)
+        timeline.down('up').wait(0.1).up('up')  # 按下 up 鍵保持 0.1 秒
+        timeline.wait(0.5)  # 短暫等待讓動作生效
+
+        self.climb_handle = get_input_actuator().submit(timeline, policy='preempt')
+
     def verify_climb_success(self, screenshot, player_x, player_y, client_width, client_height, medal_template):
         """通過攻擊驗證爬繩成功"""
         print("🔍 === 驗證爬繩成功 ===")
@@ -364,7 +434,7 @@ class RopeClimbing:
         current_screenshot = self.get_current_screenshot()
         if current_screenshot is None:
             print("❌ 獲取驗證截圖失敗")
-            pyautogui.keyUp('up')
+            get_input_actuator().release_key('up', self.key_owner)
             self.retry_climb()
             return
         
@@ -390,7 +460,7 @@ class RopeClimbing:
                 
                 if before_attack_head_area is None:
                     print("❌ 截取攻擊前頭上區域失敗")
-                    pyautogui.keyUp('up')
+                    get_input_actuator().release_key('up', self.key_owner)
                     self.retry_climb()
                     return
                 
@@ -398,9 +468,9 @@ class RopeClimbing:
                 
                 # 執行攻擊驗證
                 print("🗡️ 執行攻擊驗證")
-                pyautogui.keyDown(ATTACK_KEY)
+                get_input_actuator().hold_key(ATTACK_KEY, self.key_owner)
                 time.sleep(0.1)
-                pyautogui.keyUp(ATTACK_KEY)
+                get_input_actuator().release_key(ATTACK_KEY, self.key_owner)
                 
                 # 短暫等待攻擊動畫完成
                 time.sleep(0.1)
@@ -409,7 +479,7 @@ class RopeClimbing:
                 after_attack_screenshot = self.get_current_screenshot()
                 if after_attack_screenshot is None:
                     print("❌ 獲取攻擊後截圖失敗")
-                    pyautogui.keyUp('up')
+                    get_input_actuator().release_key('up', self.key_owner)
                     self.retry_climb()
                     return
                 
@@ -441,7 +511,7 @@ class RopeClimbing:
                         if mean_diff < 25.0:
                             print("👍 頭上區域無明顯變化，成功上繩!")
                             print("   攻擊時角色沒有移動，表示已固定在繩索上")
-                            pyautogui.keyDown('up')
+                            get_input_actuator().hold_key('up', self.key_owner)
                             self.start_going_up()
                             return True
                         else:
@@ -476,7 +546,7 @@ class RopeClimbing:
                 print("🦘 驗證時找不到角色，執行隨機方向跳躍動作")
                 self.perform_exit_jump()
         
-        pyautogui.keyUp('up')
+        get_input_actuator().release_key('up', self.key_owner)
         self.retry_climb()
     
     def retry_climb(self):
@@ -521,7 +591,7 @@ class RopeClimbing:
                     # 需要連續 3 次都小於閾值才算到達頂層
                     if self.low_change_count >= 2:
                         print("🏆 到達頂層！連續2次腳下區域變化都很小")
-                        pyautogui.keyUp('up')
+                        get_input_actuator().release_key('up', self.key_owner)
                         self.climbing_phase = "finished"
                         self.stop_climbing()
                         return True
@@ -540,8 +610,8 @@ class RopeClimbing:
         
         # 確保先停止所有移動和爬繩相關按鍵
         self.stop_movement()
-        pyautogui.keyUp('up')
-        pyautogui.keyUp(JUMP_KEY)
+        get_input_actuator().release_key('up', self.key_owner)
+        get_input_actuator().release_key(JUMP_KEY, self.key_owner)
         
         # 隨機選擇左或右
         random_direction = random.choice(['left', 'right'])
@@ -549,11 +619,11 @@ class RopeClimbing:
         
         # 執行方向鍵+跳躍
         print(f"執行動作: {random_direction} + JUMP_KEY")
-        pyautogui.keyDown(random_direction)
-        pyautogui.keyDown(JUMP_KEY)
+        get_input_actuator().hold_key(random_direction, self.key_owner)
+        get_input_actuator().hold_key(JUMP_KEY, self.key_owner)
         time.sleep(0.1)  # 保持0.1秒
-        pyautogui.keyUp(JUMP_KEY)
-        pyautogui.keyUp(random_direction)
+        get_input_actuator().release_key(JUMP_KEY, self.key_owner)
+        get_input_actuator().release_key(random_direction, self.key_owner)
         
         print("✅ 隨機方向跳躍動作完成")
     
@@ -616,7 +686,10 @@ class RopeClimbing:
                     self.start_movement(required_direction)
                 
         elif self.climbing_phase == "executing":
-            pass
+            # 等待爬繩按鍵序列結束後驗證爬繩成功
+            if self.climb_handle is not None and self.climb_handle.done:
+                self.climb_handle = None
+                self.verify_climb_success(screenshot, player_x, player_y, client_width, client_height, medal_template)
             
         elif self.climbing_phase == "going_up":
             self.check_reach_top(screenshot, player_x, player_y, client_width, client_height, medal_template)
@@ -625,9 +698,13 @@ class RopeClimbing:
         """★★★ 修復版：停止爬繩邏輯，不重置冷卻時間 ★★★"""
         print("🏁 === 爬繩邏輯結束 ===")
         
+        if self.climb_handle is not None:
+            self.climb_handle.cancel()
+            self.climb_handle = None
+        
         self.stop_movement()
-        pyautogui.keyUp('up')
-        pyautogui.keyUp(JUMP_KEY)
+        get_input_actuator().release_key('up', self.key_owner)
+        get_input_actuator().release_key(JUMP_KEY, self.key_owner)
         
         self.is_climbing = False
         self.climbing_phase = "detecting"
@@ -654,11 +731,11 @@ class RopeClimbing:
         print("🦘 執行結束跳躍動作，確保脫離繩索")
         random_direction = random.choice(['left', 'right'])
         print(f"執行動作: {random_direction} + JUMP_KEY")
-        pyautogui.keyDown(random_direction)
-        pyautogui.keyDown(JUMP_KEY)
+        get_input_actuator().hold_key(random_direction, self.key_owner)
+        get_input_actuator().hold_key(JUMP_KEY, self.key_owner)
         time.sleep(0.1)  # 保持0.1秒
-        pyautogui.keyUp(JUMP_KEY)
-        pyautogui.keyUp(random_direction)
+        get_input_actuator().release_key(JUMP_KEY, self.key_owner)
+        get_input_actuator().release_key(random_direction, self.key_owner)
         
         print("爬繩邏輯已重置，冷卻時間保持")
         
@@ -708,9 +785,9 @@ class RopeClimbing:
     
     # ★★★ 新增：調試方法 ★★★
     def toggle_debug(self):
-        """切換調試模式"""
-        self.debug_rope_detection = not self.debug_rope_detection
-        print(f"🔧 繩索檢測調試模式: {'開啟' if self.debug_rope_detection else '關閉'}")
+        """切換調試模式（調整 rope_climbing 模組的日誌等級）"""
+        enabled = toggle_module_debug('rope_climbing')
+        print(f"🔧 繩索檢測調試模式: {'開啟' if enabled else '關閉'}")
     
     def force_enable_rope_detection(self):
         """強制啟用繩索檢測（忽略冷卻）"""
@@ -3,8 +3,9 @@
 """
 import time
 import random
-import pyautogui
 import keyboard
+from core.input_actuator import KeyTimeline, get_input_actuator, LEGACY_KEY_GAP
+from core.metrics import get_metrics
 
 
 class RuneMode:
@@ -19,27 +20,41 @@ class RuneMode:
         self.search_duration = 0
         self.is_searching = False
 
+        # ★★★ 新增：方向鍵輸入交給按鍵執行器，輸入期間主循環繼續運作 ★★★
+        self.max_symbol_attempts = 2
+        self.arrow_interval = 1.0  # 每個方向鍵間隔
+        self.symbol_settle_time = 2.0  # 輸入完成後等待多久再驗證
+        self.interface_wait = 1.0  # 按上鍵 / ESC 後等待符號界面出現或重置
+        self.max_alignment_attempts = 10  # 驗證失敗後重新對齊的最多次數
+        # ★★★ 進行中的步驟：按鍵 / 等待交給按鍵執行器，handle 每幀檢查完成後才執行下一步 ★★★
+        self.pending_step = None  # {'handle': TimelineHandle, 'phase': str, 'attempt': int, ...}
+        self.key_owner = 'rune'  # ★ 新增：移動方向鍵經由按鍵執行器按住
+
     def enter(self):
         self.is_active = True
         self.start_time = time.time()
         self.is_searching = False
         self.search_movement = None
+        get_metrics().inc('rune_events_total', event='enter')
         print("進入 rune 模式")
 
     def exit(self):
         self.is_active = False
+        if self.pending_step:
+            self.pending_step['handle'].cancel()
+            self.pending_step = None
         if self.movement_direction:
-            pyautogui.keyUp(self.movement_direction)
+            get_input_actuator().release_key(self.movement_direction, self.key_owner)
             self.movement_direction = None
         if self.search_movement:
-            pyautogui.keyUp(self.search_movement)
+            get_input_actuator().release_key(self.search_movement, self.key_owner)
             self.search_movement = None
         self.is_searching = False
         print("退出 rune 模式")
 
     def start_random_search(self):
         if self.search_movement:
-            pyautogui.keyUp(self.search_movement)
+            get_input_actuator().release_key(self.search_movement, self.key_owner)
         
         directions = ['left', 'right']
         self.search_movement = random.choice(directions)
@@ -47,7 +62,7 @@ class RuneMode:
         self.search_start_time = time.time()
         self.is_searching = True
         
-        pyautogui.keyDown(self.search_movement)
+        get_input_actuator().hold_key(self.search_movement, self.key_owner)
         print(f"開始隨機搜尋 rune_text.png：方向 {self.search_movement}，持續 {self.search_duration:.1f}秒")
 
     def update_search(self):
@@ -57,164 +72,214 @@ class RuneMode:
         elapsed = time.time() - self.search_start_time
         if elapsed >= self.search_duration:
             if self.search_movement:
-                pyautogui.keyUp(self.search_movement)
+                get_input_actuator().release_key(self.search_movement, self.key_owner)
                 self.search_movement = None
             self.is_searching = False
             print("搜尋時間到，準備下一次隨機搜尋")
             return True
         return False
 
-    def handle_rune_symbol_recognition(self, screenshot, client_rect, direction_templates, direction_masks, client_width, client_height, change_templates, medal_template, rune_template):
-        """改進的符號識別和驗證邏輯"""
+    def _restore_direction(self, direction):
+        """★★★ 新增：斷層時間軸結束後重新按下被放開的移動方向鍵 ★★★"""
+        actuator = get_input_actuator()
+        if direction and not actuator.is_busy('cliff') and direction not in actuator.get_owned_keys(self.key_owner):
+            actuator.hold_key(direction, self.key_owner)
+
+    def _timeline(self, name):
+        """rune 模式的按鍵時間軸（保留原本 pyautogui.PAUSE 的按鍵間隔）"""
+        return KeyTimeline(name, channel='rune_input', key_gap=LEGACY_KEY_GAP)
+
+    def _submit_step(self, timeline, phase, **state):
+        """★★★ 提交時間軸並記錄下一步；等待期間主循環照常截圖檢測，完成後由 handle 以最新畫面繼續 ★★★"""
+        handle = get_input_actuator().submit(timeline, policy='preempt')
+        self.pending_step = dict(state, handle=handle, phase=phase)
+        return handle
+
+    def _continue_step(self, screenshot, client_rect, direction_templates, direction_masks, client_width, client_height, change_templates, medal_template, rune_template):
+        """上一步的時間軸已完成，依階段執行下一步"""
+        step = self.pending_step
+        self.pending_step = None
+        phase = step['phase']
+
+        if phase == 'recognize':
+            self.handle_rune_symbol_recognition(
+                screenshot, client_rect, direction_templates, direction_masks,
+                client_width, client_height, change_templates, medal_template, rune_template,
+                start_attempt=step['attempt']
+            )
+        elif phase == 'verify':
+            self._verify_symbol_input(
+                screenshot, step['attempt'], client_rect, direction_templates, direction_masks,
+                client_width, client_height, change_templates
+            )
+        elif phase == 'align':
+            self._realign_step(screenshot, step['attempt'], step['align_attempts'], medal_template, rune_template)
+        elif phase == 'search':
+            self.start_random_search()
+
+    def _trigger_symbols(self, attempt):
+        """按上鍵觸發符號界面，等待界面出現後以最新畫面識別"""
+        timeline = self._timeline('rune_trigger').tap('up').wait(self.interface_wait)  # 等待界面出現
+        self._submit_step(timeline, 'recognize', attempt=attempt)
+
+    def handle_rune_symbol_recognition(self, screenshot, client_rect, direction_templates, direction_masks, client_width, client_height, change_templates, medal_template, rune_template, start_attempt=1):
+        """改進的符號識別邏輯 - 每次呼叫只識別一次，識別成功後提交方向鍵序列並立即返回
+
+        返回 None 表示仍在進行中（方向鍵輸入或等待重試，由 handle 在時間軸完成後繼續），False 表示失敗
+        """
         # 導入函數（避免循環導入）
-        from core.utils import capture_screen, recognize_direction_symbols, execute_channel_change
+        from core.utils import recognize_direction_symbols, execute_channel_change
         
-        max_attempts = 2  # 最多嘗試2次
+        max_attempts = self.max_symbol_attempts
+        attempt = start_attempt
+        print(f"=== 符號識別嘗試 {attempt}/{max_attempts} ===")
         
-        for attempt in range(1, max_attempts + 1):
-            print(f"=== 符號識別嘗試 {attempt}/{max_attempts} ===")
-            
-            # 第一步：識別符號
-            success, direction_sequence = recognize_direction_symbols(
-                screenshot, direction_templates, direction_masks, client_width, client_height
-            )
-            
-            if not success:
-                print(f"第 {attempt} 次符號識別失敗")
-                if attempt >= max_attempts:
-                    print("達到最大嘗試次數，符號識別失敗，按下 esc 鍵 2 次")
-                    # 執行換頻道流程
-                    execute_channel_change(client_rect, change_templates)
-                    self.exit()
-                    return False
-                else:
-                    print(f"等待後重試...")
-                    time.sleep(1)
-                    screenshot = capture_screen(client_rect)
-                    if screenshot is None:
-                        continue
-                    continue
-            
-            # 第二步：輸入識別到的序列
-            print(f"識別出的方向序列: {direction_sequence}")
-            for i, direction in enumerate(direction_sequence, 1):
-                pyautogui.keyUp('left')
-                pyautogui.keyUp('right')
-                pyautogui.keyUp('up')
-                pyautogui.keyUp('down')
-                print(f"輸入第 {i} 個方向鍵: {direction}")
-                pyautogui.press(direction)
-                time.sleep(1)  # 每個方向鍵間隔2秒
-            
-            print("方向序列輸入完成，等待2秒後驗證...")
-            time.sleep(2)  # 等待輸入效果生效
-            
-            # 第三步：驗證是否成功（重新截圖並嘗試識別）
-            print("=== 驗證輸入結果 ===")
-            verification_screenshot = capture_screen(client_rect)
-            if verification_screenshot is None:
-                print("驗證截圖失敗，假設成功")
-                self.exit()
-                return True
-            
-            # 再次嘗試識別符號
-            verify_success, verify_sequence = recognize_direction_symbols(
-                verification_screenshot, direction_templates, direction_masks, 
-                client_width, client_height
-            )
-            
-            if not verify_success:
-                # 識別不到符號 = 成功解除了符號界面
-                print("✓ 驗證成功：無法識別到符號，表示 rune 已成功解除")
+        # 第一步：識別符號
+        success, direction_sequence = (False, None) if screenshot is None else recognize_direction_symbols(
+            screenshot, direction_templates, direction_masks, client_width, client_height
+        )
+        
+        if not success:
+            print(f"第 {attempt} 次符號識別失敗")
+            if attempt >= max_attempts:
+                print("達到最大嘗試次數，符號識別失敗，按下 esc 鍵 2 次")
+                get_metrics().inc('rune_events_total', event='failed')
+                # 執行換頻道流程
+                execute_channel_change(client_rect, change_templates)
                 self.exit()
-                return True
-            else:
-                # 還能識別到符號 = 輸入失敗，需要重試
-                print(f"✗ 驗證失敗：仍能識別到符號 {verify_sequence}，表示輸入錯誤")
-                
-                if attempt >= max_attempts:
-                    print("達到最大嘗試次數，符號輸入失敗，按下 esc 鍵")
+                return False
+            print(f"等待後重試...")
+            self._submit_step(self._timeline('rune_retry_wait').wait(self.interface_wait), 'recognize', attempt=attempt + 1)
+            return None
+        
+        # 第二步：輸入識別到的序列（★★★ 交給按鍵執行器，不阻塞主循環 ★★★）
+        print(f"識別出的方向序列: {direction_sequence}")
+        self._submit_symbol_input(direction_sequence, attempt)
+        return None
 
-                    # 執行換頻道流程
-                    execute_channel_change(client_rect, change_templates)
-                    self.exit()
-                    return False
-                
-                # 先按 ESC 清除當前狀態，然後重新嘗試
-                print("按下 ESC 鍵清除當前符號界面狀態")
-                pyautogui.press('esc')
-                time.sleep(1)  # 等待界面重置
-                
-                # 重新對齊 rune_text 位置（使用原本的對齊邏輯）
-                print("重新對齊 rune_text 位置...")
-                alignment_attempts = 0
-                max_alignment_attempts = 10
-                aligned = False
-                
-                while not aligned and alignment_attempts < max_alignment_attempts:
-                    alignment_attempts += 1
-                    current_screenshot = capture_screen(client_rect)
-                    if current_screenshot is None:
-                        time.sleep(0.5)
-                        continue
-                    
-                    # 重新檢測角色和 rune_text 位置
-                    from core.utils import simple_find_medal
-                    from config import MATCH_THRESHOLD
-                    
-                    medal_found, medal_loc, _ = simple_find_medal(current_screenshot, medal_template, MATCH_THRESHOLD)
-                    rune_found, rune_loc, _ = simple_find_medal(current_screenshot, rune_template, MATCH_THRESHOLD)
-                    
-                    if medal_found and rune_found:
-                        medal_center_x = medal_loc[0] + medal_template.shape[1] // 2
-                        rune_center_x = rune_loc[0] + rune_template.shape[1] // 2
-                        diff = rune_center_x - medal_center_x
-                        
-                        print(f"對齊檢查: X軸差異 {diff}px")
-                        
-                        if abs(diff) < 10:
-                            print("已對齊 rune_text")
-                            aligned = True
-                            break
-                        else:
-                            # 使用原本的對齊邏輯
-                            direction = 'left' if diff < 0 else 'right'
-                            print(f"朝 {direction} 移動以對齊 rune_text.png")
-                            pyautogui.keyDown(direction)
-                            time.sleep(0.2)  # 與原本邏輯一致的移動時間
-                            pyautogui.keyUp(direction)
-                            time.sleep(0.1)
-                    else:
-                        print(f"對齊嘗試 {alignment_attempts}: 未找到角色或 rune_text")
-                        time.sleep(0.5)
-                
-                if not aligned:
-                    print("⚠ 無法重新對齊，但繼續嘗試觸發符號界面")
-                
-                # 重新觸發符號界面
-                print("重新觸發符號界面（按上鍵）")
-                pyautogui.press('up')
-                time.sleep(1)  # 等待界面出現
-                
-                # 重新截圖準備下次嘗試
-                print(f"準備第 {attempt + 1} 次嘗試...")
-                screenshot = capture_screen(client_rect)
-                if screenshot is None:
-                    print("重新截圖失敗，跳過此次重試")
-                    continue
-                
-                # 繼續下次循環嘗試
-                continue
+    def _submit_symbol_input(self, direction_sequence, attempt):
+        """提交方向鍵時間軸：每個方向鍵間隔 1 秒，輸入完成後再等待 2 秒讓效果生效"""
+        timeline = KeyTimeline('rune_symbols', channel='rune_input')
+        for direction in direction_sequence:
+            timeline.release('left', 'right', 'up', 'down')
+            timeline.tap(direction)
+            timeline.wait(self.arrow_interval)
+        timeline.wait(self.symbol_settle_time)
+
+        print(f"提交 {len(direction_sequence)} 個方向鍵輸入，完成後等待 {self.symbol_settle_time} 秒再驗證...")
+        self._submit_step(timeline, 'verify', attempt=attempt)
+
+    def _verify_symbol_input(self, screenshot, attempt, client_rect, direction_templates, direction_masks, client_width, client_height, change_templates):
+        """方向鍵輸入完成後以最新畫面驗證結果，失敗時按 ESC 並進入重新對齊步驟"""
+        from core.utils import recognize_direction_symbols, execute_channel_change
         
-        return False
+        max_attempts = self.max_symbol_attempts
+        
+        # 第三步：驗證是否成功（以輸入完成後的最新畫面嘗試識別）
+        print("=== 驗證輸入結果 ===")
+        if screenshot is None:
+            print("驗證截圖失敗，假設成功")
+            get_metrics().inc('rune_events_total', event='solved')
+            self.exit()
+            return True
+        
+        # 再次嘗試識別符號
+        verify_success, verify_sequence = recognize_direction_symbols(
+            screenshot, direction_templates, direction_masks, 
+            client_width, client_height
+        )
+        
+        if not verify_success:
+            # 識別不到符號 = 成功解除了符號界面
+            print("✓ 驗證成功：無法識別到符號，表示 rune 已成功解除")
+            get_metrics().inc('rune_events_total', event='solved')
+            self.exit()
+            return True
+
+        # 還能識別到符號 = 輸入失敗，需要重試
+        print(f"✗ 驗證失敗：仍能識別到符號 {verify_sequence}，表示輸入錯誤")
+        
+        if attempt >= max_attempts:
+            print("達到最大嘗試次數，符號輸入失敗，按下 esc 鍵")
+            get_metrics().inc('rune_events_total', event='failed')
+
+            # 執行換頻道流程
+            execute_channel_change(client_rect, change_templates)
+            self.exit()
+            return False
+        
+        # 先按 ESC 清除當前狀態，等待界面重置後重新對齊
+        print("按下 ESC 鍵清除當前符號界面狀態")
+        print("重新對齊 rune_text 位置...")
+        timeline = self._timeline('rune_reset').tap('esc').wait(self.interface_wait)  # 等待界面重置
+        self._submit_step(timeline, 'align', attempt=attempt + 1, align_attempts=0)
+        return None
+
+    def _realign_step(self, screenshot, attempt, align_attempts, medal_template, rune_template):
+        """重新對齊 rune_text 的一步：每次只移動一小段，時間軸完成後以最新畫面再檢查"""
+        from core.utils import simple_find_medal
+        from config import MATCH_THRESHOLD
+
+        align_attempts += 1
+        aligned = False
+        timeline = self._timeline('rune_align')
+
+        if screenshot is None:
+            timeline.wait(0.5)
+        else:
+            # 重新檢測角色和 rune_text 位置
+            medal_found, medal_loc, _ = simple_find_medal(screenshot, medal_template, MATCH_THRESHOLD)
+            rune_found, rune_loc, _ = simple_find_medal(screenshot, rune_template, MATCH_THRESHOLD)
+
+            if medal_found and rune_found:
+                medal_center_x = medal_loc[0] + medal_template.shape[1] // 2
+                rune_center_x = rune_loc[0] + rune_template.shape[1] // 2
+                diff = rune_center_x - medal_center_x
+
+                print(f"對齊檢查: X軸差異 {diff}px")
+
+                if abs(diff) < 10:
+                    print("已對齊 rune_text")
+                    aligned = True
+                else:
+                    # 使用原本的對齊邏輯
+                    direction = 'left' if diff < 0 else 'right'
+                    print(f"朝 {direction} 移動以對齊 rune_text.png")
+                    timeline.hold(direction, 0.2)  # 與原本邏輯一致的移動時間
+                    timeline.wait(0.1)
+            else:
+                print(f"對齊嘗試 {align_attempts}: 未找到角色或 rune_text")
+                timeline.wait(0.5)
+
+        if not aligned and align_attempts < self.max_alignment_attempts:
+            self._submit_step(timeline, 'align', attempt=attempt, align_attempts=align_attempts)
+            return
+
+        if not aligned:
+            print("⚠ 無法重新對齊，但繼續嘗試觸發符號界面")
+
+        # 重新觸發符號界面，界面出現後進行下次嘗試
+        print("重新觸發符號界面（按上鍵）")
+        print(f"準備第 {attempt} 次嘗試...")
+        self._trigger_symbols(attempt)
 
     def handle(self, screenshot, client_rect, medal_template, rune_template, direction_templates, direction_masks, client_width, client_height, search, cliff_detection, client_x, client_y, movement, change_templates):
         # 導入函數和配置（避免循環導入）
-        from core.utils import capture_screen, simple_find_medal, execute_channel_change
+        from core.utils import simple_find_medal, execute_channel_change
         from config import MATCH_THRESHOLD, Y_OFFSET, RUNE_HEIGHT_THRESHOLD
         
+        # ★★★ 按鍵 / 等待步驟進行中：時間軸完成後以本幀畫面繼續下一步 ★★★
+        if self.pending_step:
+            if self.pending_step['handle'].done:
+                self._continue_step(
+                    screenshot, client_rect, direction_templates, direction_masks, client_width, client_height,
+                    change_templates, medal_template, rune_template
+                )
+            return
+        
         if time.time() - self.start_time > 60:
             print("在 Rune 模式下超過60秒未找到 rune_text，執行 esc")
+            get_metrics().inc('rune_events_total', event='timeout')
             # 執行換頻道流程
             execute_channel_change(client_rect, change_templates)
             self.exit()
@@ -227,12 +292,10 @@ class RuneMode:
         medal_found, medal_loc, medal_val = simple_find_medal(screenshot, medal_template, MATCH_THRESHOLD)
         print(f"角色檢測匹配度: {medal_val:.2f} (閾值: {MATCH_THRESHOLD})")
         
+        # ★ 搜尋掃描由按鍵執行器進行，每次呼叫回報角色檢測結果
+        search.update_search(medal_found, medal_val)
         if not medal_found:
-            search_found, search_loc, search_screenshot = search.search_for_medal(client_rect, medal_template, MATCH_THRESHOLD, movement)
-            if search_found:
-                medal_found = True
-                medal_loc = search_loc
-                screenshot = search_screenshot
+            search.search_for_medal(client_rect, medal_template, MATCH_THRESHOLD, movement)
 
         if medal_found:
             player_x = medal_loc[0] + medal_template.shape[1] // 2
@@ -244,7 +307,7 @@ class RuneMode:
             if rune_found:
                 if self.is_searching:
                     if self.search_movement:
-                        pyautogui.keyUp(self.search_movement)
+                        get_input_actuator().release_key(self.search_movement, self.key_owner)
                         self.search_movement = None
                     self.is_searching = False
                     print("找到 rune_text，停止搜尋")
@@ -259,30 +322,23 @@ class RuneMode:
                     
                     if height_diff > RUNE_HEIGHT_THRESHOLD:
                         print(f"rune_text 高度差異 {height_diff} 超過閾值 {RUNE_HEIGHT_THRESHOLD}，觸發 esc")
+                        get_metrics().inc('rune_events_total', event='unreachable')
                         # 執行換頻道流程
                         execute_channel_change(client_rect, change_templates)
                         self.exit()
                         return
                     
                     print("與 rune_text.png 對齊，執行上鍵並開始符號識別流程")
-                    pyautogui.press('up')
-                    time.sleep(1)
-                    screenshot = capture_screen(client_rect)
-                    if screenshot is not None:
-                        # 使用新的符號識別邏輯
-                        success = self.handle_rune_symbol_recognition(
-                            screenshot, client_rect, direction_templates, direction_masks, 
-                            client_width, client_height, change_templates, medal_template, rune_template
-                        )
-                        # 無論成功或失敗，都會在函數內處理，這裡直接返回
-                        return
+                    # 界面出現後由之後的 handle 呼叫以最新畫面識別符號
+                    self._trigger_symbols(1)
+                    return
                 else:
                     direction = 'left' if diff < 0 else 'right'
                     
                     if self.movement_direction != direction:
                         if self.movement_direction:
-                            pyautogui.keyUp(self.movement_direction)
-                        pyautogui.keyDown(direction)
+                            get_input_actuator().release_key(self.movement_direction, self.key_owner)
+                        get_input_actuator().hold_key(direction, self.key_owner)
                         self.movement_direction = direction
                         print(f"朝 {direction} 移動以對齊 rune_text.png")
                         
@@ -291,19 +347,21 @@ class RuneMode:
                             self.manual_override_time = time.time()
                             print("檢測到手動移動，設定 manual_override")
 
+                    self._restore_direction(self.movement_direction)
                     cliff_detection.check(time.time(), screenshot, player_x, player_y, client_width, client_height, medal_template, self.movement_direction, client_x, client_y)
             else:
                 if self.movement_direction:
-                    pyautogui.keyUp(self.movement_direction)
+                    get_input_actuator().release_key(self.movement_direction, self.key_owner)
                     self.movement_direction = None
                 
                 if self.is_searching:
                     if self.search_movement:
+                        self._restore_direction(self.search_movement)
                         cliff_detection.check(time.time(), screenshot, player_x, player_y, client_width, client_height, medal_template, self.search_movement, client_x, client_y)
                     
                     if self.update_search():
-                        time.sleep(random.uniform(0.2, 0.8))
-                        self.start_random_search()
+                        # 短暫停頓後才開始下一次隨機搜尋（停頓期間主循環照常運作）
+                        self._submit_step(self._timeline('rune_search_pause').wait(random.uniform(0.2, 0.8)), 'search')
                 else:
                     print("未找到 rune_text.png，開始隨機搜尋")
                     self.start_random_search()
\ No newline at end of file
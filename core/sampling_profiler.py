@@ -0,0 +1,193 @@
+"""
+取樣剖析模組 - 不重啟程序，對執行中的腳本線程做 N 秒的低開銷取樣
+
+- 獨立線程每隔 interval 秒讀取 sys._current_frames()，只記錄目標線程的呼叫堆疊，
+  被剖析的線程本身不做任何額外工作
+- 每筆樣本標上當下的腳本狀態（normal / rune / climbing / searching）與線程名稱
+- 取樣線程需要 GIL 才能讀取堆疊：純 Python 的長迴圈在 GIL 切換時（sys.getswitchinterval()）被取到，
+  OpenCV 等釋放 GIL 的呼叫期間則歸到呼叫它的 Python 函數
+- 結束時寫出兩個檔案：
+  *.collapsed：每行「狀態;線程;最外層;...;最內層 次數」，可直接交給 flamegraph.pl / speedscope
+  *_top.txt：各函數的 self（位於堆疊頂端）與 total（出現在堆疊中）樣本比例，以及各狀態的樣本數
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """取樣剖析器 - start() 開始，duration 秒後自動停止並寫出結果；stop() 可提前結束"""
+
+    def __init__(self, target_idents, output_dir, duration=10.0, interval=0.005,
+                 state_func=None, top_n=30, log=print):
+        # target_idents: 返回要取樣的線程 ident 集合的函數（每次取樣時呼叫，涵蓋中途啟動的工作線程）
+        self.target_idents = target_idents
+        self.output_dir = output_dir
+        self.duration = duration
+        self.interval = interval
+        self.state_func = state_func
+        self.top_n = top_n
+        self.log = log
+
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.stacks = Counter()
+        self.state_samples = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self.result = None
+        self._labels = {}
+
+    @property
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return False
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.stop_event.clear()
+        self.stacks = Counter()
+        self.state_samples = Counter()
+        self.samples = 0
+        self.result = None
+        self.started_at = time.time()
+        self.stopped_at = None
+        self.thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self.thread.start()
+        self.log(f"🔬 開始取樣剖析: {self.duration:.0f} 秒 (每 {self.interval * 1000:.0f}ms 取樣)")
+        return True
+
+    def stop(self, timeout=5.0):
+        """提前結束（仍會寫出已收集的結果）"""
+        if self.thread is None:
+            return False
+        self.stop_event.set()
+        self.thread.join(timeout=timeout)
+        return True
+
+    # ------------------------------------------------------------------
+    # 取樣
+    # ------------------------------------------------------------------
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _current_state(self):
+        if self.state_func is None:
+            return 'normal'
+        try:
+            return self.state_func()
+        except Exception:
+            return 'unknown'
+
+    def _sample(self):
+        targets = self.target_idents()
+        if not targets:
+            return
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        state = self._current_state()
+        frames = sys._current_frames()
+
+        for ident in targets:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[(state, names.get(ident, str(ident)), tuple(stack))] += 1
+            self.state_samples[state] += 1
+            self.samples += 1
+
+    def _run(self):
+        end_time = self.started_at + self.duration
+        while not self.stop_event.is_set() and time.time() < end_time:
+            try:
+                self._sample()
+            except Exception as e:
+                self.log(f"⚠️ 取樣失敗: {e}")
+            self.stop_event.wait(self.interval)
+
+        self.stopped_at = time.time()
+        try:
+            self.result = self._write_results()
+            self.log(self.format_result(self.result))
+        except Exception as e:
+            self.log(f"❌ 寫出剖析結果失敗: {e}")
+
+    # ------------------------------------------------------------------
+    # 結果
+    # ------------------------------------------------------------------
+
+    def top_functions(self):
+        """[(函數, self 樣本數, total 樣本數), ...]，依 self 由多到少"""
+        self_counts = Counter()
+        total_counts = Counter()
+        for (_, _, stack), count in self.stacks.items():
+            if not stack:
+                continue
+            self_counts[stack[-1]] += count
+            for label in set(stack):
+                total_counts[label] += count
+        ranked = sorted(total_counts, key=lambda label: (-self_counts[label], -total_counts[label], label))
+        return [(label, self_counts[label], total_counts[label]) for label in ranked]
+
+    def _write_results(self):
+        base = os.path.join(self.output_dir, f"profile_{time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started_at))}")
+        collapsed_path = base + '.collapsed'
+        top_path = base + '_top.txt'
+
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            for (state, thread_name, stack), count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+                f.write(';'.join((state, thread_name) + stack).replace('\n', ' ') + f" {count}\n")
+
+        top = self.top_functions()
+        samples = max(1, self.samples)
+        elapsed = (self.stopped_at or time.time()) - self.started_at
+        with open(top_path, 'w', encoding='utf-8') as f:
+            f.write(f"取樣 {self.samples} 筆 / {elapsed:.1f} 秒 (間隔 {self.interval * 1000:.0f}ms)\n")
+            f.write("狀態: " + ', '.join(f"{state} {count} ({count / samples:.0%})"
+                                         for state, count in self.state_samples.most_common()) + "\n\n")
+            f.write(f"{'self%':>7} {'total%':>7}  函數\n")
+            for label, self_count, total_count in top[:self.top_n]:
+                f.write(f"{self_count / samples:7.1%} {total_count / samples:7.1%}  {label}\n")
+
+        return {
+            'collapsed_path': collapsed_path,
+            'top_path': top_path,
+            'samples': self.samples,
+            'duration': elapsed,
+            'states': dict(self.state_samples),
+            'top': [{'function': label, 'self': self_count, 'total': total_count}
+                    for label, self_count, total_count in top[:self.top_n]],
+        }
+
+    def format_result(self, result, limit=10):
+        samples = max(1, result['samples'])
+        states = ', '.join(f"{state} {count}" for state, count in sorted(result['states'].items(), key=lambda item: -item[1]))
+        lines = [f"🔬 取樣剖析完成: {result['samples']} 筆 / {result['duration']:.1f} 秒 (狀態: {states or '無'})"]
+        for entry in result['top'][:limit]:
+            lines.append(f"   {entry['self'] / samples:6.1%} self {entry['total'] / samples:6.1%} total  {entry['function']}")
+        lines.append(f"   火焰圖: {result['collapsed_path']}")
+        lines.append(f"   函數列表: {result['top_path']}")
+        return '\n'.join(lines)
+
+    def get_stats(self):
+        end = self.stopped_at or time.time()
+        return {
+            'profiling': self.is_running,
+            'output_dir': self.output_dir,
+            'samples': self.samples,
+            'elapsed': end - self.started_at if self.started_at else 0.0,
+            'duration': self.duration,
+            'result': self.result,
+        }
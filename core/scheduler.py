@@ -0,0 +1,148 @@
+"""
+幀預算排程器 - 週期性子系統（被動技能、斷層檢測、繩索檢測、統計…）集中登記
+
+每個任務登記週期、優先級，執行成本由排程器自行量測；每個 tick 只執行
+在本幀時間預算內放得下的到期任務，其餘順延，並記錄每個任務的逾期次數。
+"""
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class ScheduledTask:
+    """排程任務與其統計"""
+    name: str
+    func: object
+    period: float
+    priority: int = 0  # 數字越大越優先
+    cost: float = 0.0  # 量測到的執行成本（指數移動平均，秒）
+    next_due: float = 0.0
+    last_run: float = 0.0
+    runs: int = 0
+    deferred: int = 0  # 因預算不足順延的次數
+    deadline_misses: int = 0  # 到期後超過一個週期才執行的次數
+    errors: int = 0
+    max_lateness: float = 0.0
+    max_cost: float = 0.0
+    enabled: bool = True
+
+    def snapshot(self):
+        return {
+            'period': self.period,
+            'priority': self.priority,
+            'runs': self.runs,
+            'avg_cost_ms': self.cost * 1000,
+            'max_cost_ms': self.max_cost * 1000,
+            'deferred': self.deferred,
+            'deadline_misses': self.deadline_misses,
+            'errors': self.errors,
+            'max_lateness_ms': self.max_lateness * 1000,
+        }
+
+
+class FrameScheduler:
+    """幀預算排程器"""
+
+    # 成本指數移動平均的權重
+    COST_SMOOTHING = 0.2
+
+    def __init__(self, frame_budget=0.006, log=print):
+        self.frame_budget = frame_budget
+        self.log = log
+        self.tasks = {}
+
+        # 統計
+        self.ticks = 0
+        self.over_budget_ticks = 0
+        self.max_tick_cost = 0.0
+
+    def register(self, name, func, period, priority=0, cost_estimate=0.0, run_immediately=False):
+        """登記週期任務；cost_estimate 為第一次量測前使用的成本估計（秒）"""
+        now = time.time()
+        task = ScheduledTask(
+            name=name, func=func, period=period, priority=priority, cost=cost_estimate,
+            next_due=now if run_immediately else now + period,
+        )
+        self.tasks[name] = task
+        return task
+
+    def unregister(self, name):
+        self.tasks.pop(name, None)
+
+    def set_enabled(self, name, enabled):
+        task = self.tasks.get(name)
+        if task is not None:
+            task.enabled = enabled
+            if enabled:
+                task.next_due = time.time() + task.period
+
+    def _urgency(self, task, now):
+        # 逾期越多週期，優先級越高，避免低優先任務長期餓死
+        overdue_periods = (now - task.next_due) / task.period if task.period > 0 else 0
+        return task.priority + overdue_periods
+
+    def run_due(self, budget=None):
+        """執行本 tick 放得下的到期任務，返回已執行的任務名稱"""
+        budget = self.frame_budget if budget is None else budget
+        start = time.time()
+        deadline = start + budget
+
+        due = [task for task in self.tasks.values() if task.enabled and start >= task.next_due]
+        if not due:
+            return []
+        due.sort(key=lambda task: self._urgency(task, start), reverse=True)
+
+        executed = []
+        for task in due:
+            now = time.time()
+            # 至少執行最急的一個，避免成本大於預算的任務永遠排不上
+            if executed and now + task.cost > deadline:
+                task.deferred += 1
+                continue
+
+            lateness = now - task.next_due
+            task.max_lateness = max(task.max_lateness, lateness)
+            if lateness >= task.period:
+                task.deadline_misses += 1
+
+            try:
+                task.func()
+            except Exception as e:
+                task.errors += 1
+                self.log(f"❌ 排程任務 {task.name} 錯誤: {e}")
+
+            end = time.time()
+            cost = end - now
+            if task.runs == 0:
+                task.cost = cost
+            else:
+                task.cost += self.COST_SMOOTHING * (cost - task.cost)
+            task.max_cost = max(task.max_cost, cost)
+            task.runs += 1
+            task.last_run = end
+            task.next_due = end + task.period
+            executed.append(task.name)
+
+        tick_cost = time.time() - start
+        self.ticks += 1
+        self.max_tick_cost = max(self.max_tick_cost, tick_cost)
+        if tick_cost > budget:
+            self.over_budget_ticks += 1
+        return executed
+
+    def get_stats(self):
+        return {
+            'frame_budget_ms': self.frame_budget * 1000,
+            'ticks': self.ticks,
+            'over_budget_ticks': self.over_budget_ticks,
+            'max_tick_cost_ms': self.max_tick_cost * 1000,
+            'tasks': {name: task.snapshot() for name, task in self.tasks.items()},
+        }
+
+    def print_stats(self):
+        stats = self.get_stats()
+        print(f"🗓️ 排程器: 預算 {stats['frame_budget_ms']:.1f}ms/幀, 超出預算 {stats['over_budget_ticks']}/{stats['ticks']} 次, "
+              f"最大 {stats['max_tick_cost_ms']:.1f}ms")
+        for name, task in stats['tasks'].items():
+            print(f"   {name:>14}: 每 {task['period']:.2f}s, 執行 {task['runs']} 次, 平均 {task['avg_cost_ms']:.1f}ms, "
+                  f"順延 {task['deferred']}, 逾期 {task['deadline_misses']}, 錯誤 {task['errors']}")
@@ -0,0 +1,761 @@
+"""
+腳本控制器 - 腳本線程、命令/狀態/日誌隊列與元件生命週期（不依賴任何介面）
+
+GUI（gui.script_wrapper.ScriptWrapper）與無介面常駐模式（core.daemon）共用同一套協定：
+- 命令隊列：{'type': 'stop' | 'update_config' | 'get_stats' | 'start_recording' | 'stop_recording', ...}
+- 狀態隊列：('stats', dict) / ('status', str)
+- 日誌：寫入 LogRing 環形緩衝區（寫入端永不阻塞），介面各自用讀取端定時批次取出
+"""
+import threading
+import queue
+import time
+import sys
+import os
+import traceback
+import psutil
+from typing import Optional, Dict, Any
+from core.engine import EngineHooks
+from core.log_ring import LogRing
+
+class LogCapture:
+    """日誌捕獲類 - 重定向print輸出到日誌緩衝區"""
+    
+    def __init__(self, log_ring: LogRing, echo: bool = True):
+        self.log_ring = log_ring
+        self.echo = echo
+        self.original_stdout = sys.stdout
+        self.original_stderr = sys.stderr
+        # print 會分多次寫入（內容、分隔符、換行），依線程組合成完整的行
+        self._partial = threading.local()
+        
+    def write(self, text):
+        """寫入方法 - 只有完整的非空行才寫入緩衝區"""
+        pending = getattr(self._partial, 'text', '') + text
+        if '\n' in pending:
+            *lines, pending = pending.split('\n')
+            for line in lines:
+                if line.strip():
+                    self.log_ring.append(line.rstrip())
+        self._partial.text = pending
+        
+        # 同時輸出到原始輸出
+        if self.echo:
+            self.original_stdout.write(text)
+        
+    def flush(self):
+        """刷新方法"""
+        self.original_stdout.flush()
+
+class ControllerEngineHooks(EngineHooks):
+    """主循環引擎的控制器掛鉤 - 處理命令、統計與日誌"""
+
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+
+    def log(self, message):
+        self.wrapper._send_log(message)
+
+    def on_tick(self, engine):
+        self.wrapper._process_commands()
+        if engine.loop_count % 100 == 0:
+            self.wrapper._update_script_stats()
+
+    def should_stop(self, engine):
+        return not self.wrapper.is_running or self.wrapper.is_stopping
+
+    def on_detection(self, engine):
+        self.wrapper.script_stats['detections'] += 1
+
+    def on_perf_summary(self, engine):
+        if self.wrapper.PRINT_PERF_SUMMARY:
+            super().on_perf_summary(engine)
+
+    def on_error(self, engine, error):
+        self.wrapper._send_log(f"❌ 主循環迭代錯誤: {str(error)}")
+        self.wrapper.script_stats['errors'] += 1
+        return True
+
+
+class ScriptController:
+    """腳本控制器類 - 使用main.py的功能"""
+
+    # 日誌中顯示的執行方式
+    MODE_LABEL = '控制器模式'
+    # 捕獲的 print 是否同時輸出到原始 stdout（常駐模式由日誌隊列統一輸出）
+    ECHO_CAPTURED_LOG = True
+    # 是否定期在日誌中輸出各階段耗時摘要（GUI 改由效能面板顯示）
+    PRINT_PERF_SUMMARY = True
+
+    def __init__(self, log_ring: Optional[LogRing] = None):
+        import config
+
+        # 線程和狀態管理
+        self.script_thread: Optional[threading.Thread] = None
+        self.is_running = False
+        self.is_stopping = False
+        
+        # 通信隊列
+        self.command_queue = queue.Queue(maxsize=10)
+        self.status_queue = queue.Queue(maxsize=50)
+        self.log_ring = log_ring if log_ring is not None else LogRing(config.LOG_RING_CAPACITY)
+        
+        # 腳本狀態
+        self.script_stats = {
+            'start_time': None,
+            'total_runtime': 0,
+            'current_status': '未運行',
+            'last_activity': None,
+            'errors': 0,
+            'detections': 0
+        }
+        
+        # 性能監控
+        self.process = psutil.Process()
+        self.performance_stats = {
+            'cpu_percent': 0.0,
+            'memory_mb': 0.0,
+            'threads_count': 0
+        }
+        
+        # main.py 相關組件
+        self.main_components = None
+        self.main_window_info = None
+        self.main_templates = None
+        self.main_engine = None
+        self.pipeline_engine = None
+        self.async_engine = None
+        self.config_reloader = None
+        self.frame_recorder = None
+        self.profiler = None
+        self.memory_monitor = None
+        
+        # 日誌捕獲
+        self.log_capture = None
+
+        # 監控指標端點（ENABLE_METRICS）
+        self._start_metrics()
+
+        
+    def start_script(self) -> bool:
+        """啟動腳本"""
+        if self.is_running:
+            self._send_log("⚠️ 腳本已在運行中")
+            return False
+            
+        try:
+            self._send_log("🚀 正在啟動腳本...")
+            
+            # 重置統計
+            self._reset_stats()
+            
+            # 創建並啟動腳本線程
+            self.script_thread = threading.Thread(target=self._script_main_loop, daemon=True)
+            self.script_thread.start()
+            
+            # 等待腳本初始化完成
+            time.sleep(1.0)
+            
+            if self.is_running:
+                self._send_log("✅ 腳本啟動成功")
+                self._update_status('運行中')
+                return True
+            else:
+                self._send_log("❌ 腳本啟動失敗")
+                self._update_status('未運行')
+                return False
+                
+        except Exception as e:
+            self._send_log(f"❌ 啟動腳本時發生錯誤: {str(e)}")
+            self._send_log(f"詳細錯誤: {traceback.format_exc()}")
+            return False
+    
+    def stop_script(self) -> bool:
+        """停止腳本"""
+        if not self.is_running:
+            self._send_log("⚠️ 腳本未在運行")
+            return False
+            
+        try:
+            self._send_log("🛑 正在停止腳本...")
+            self.is_stopping = True
+            
+            # 等待腳本線程結束
+            if self.script_thread and self.script_thread.is_alive():
+                self.script_thread.join(timeout=5.0)  # 最多等待5秒
+                
+            # 清理資源
+            self._cleanup_script_resources()
+            
+            self._send_log("✅ 腳本已停止")
+            self._update_status('已停止')
+            return True
+            
+        except Exception as e:
+            self._send_log(f"❌ 停止腳本時發生錯誤: {str(e)}")
+            return False
+    
+    def _script_main_loop(self):
+        """腳本主循環 - 使用main.py的功能"""
+        try:
+            self.is_running = True
+            self.is_stopping = False
+            self.script_stats['start_time'] = time.time()
+            
+            # 設置日誌捕獲
+            self._setup_log_capture()
+            
+            self._send_log("🔧 初始化腳本組件...")
+            
+            # 使用main.py的初始化函數
+            success = self._initialize_main_components()
+            if not success:
+                self._send_log("❌ 腳本組件初始化失敗")
+                self.is_running = False
+                return
+            
+            self._send_log("✅ 腳本組件初始化完成")
+
+            # 長時間運行模式：起始快照在組件與模板載入後，報告只反映運行中的增長
+            self._start_long_run_mode()
+
+            self._send_log("🎮 開始執行主循環...")
+            
+            # 執行main.py的主循環邏輯
+            self._execute_main_loop_logic()
+            
+        except Exception as e:
+            self._send_log(f"❌ 腳本執行錯誤: {str(e)}")
+            self._send_log(f"詳細錯誤: {traceback.format_exc()}")
+            self.script_stats['errors'] += 1
+        finally:
+            self._cleanup_script_resources()
+            self.is_running = False
+            self._send_log("🏁 腳本主循環已結束")
+    
+    def _setup_authentication_for_script(self):
+        """確認本機已有有效的認證會話（由 GUI 登入後建立）"""
+        try:
+            from core.auth_manager import get_auth_manager
+            if get_auth_manager().is_authenticated():
+                self._send_log("✅ 認證會話有效，腳本可以安全執行")
+                return True
+
+            self._send_log("❌ 沒有有效的認證會話，請先透過 GUI 登入")
+            return False
+
+        except Exception as e:
+            self._send_log(f"❌ 檢查認證會話失敗: {str(e)}")
+            return False
+
+    def _release_authentication(self):
+        """腳本結束時釋放認證；會話不是本控制器建立的，保留給下次啟動"""
+
+    def _initialize_main_components(self) -> bool:
+        """使用main.py的初始化函數"""
+        try:
+            # 設置認證令牌
+            if not self._setup_authentication_for_script():
+                self._send_log("❌ 認證設置失敗，無法啟動腳本")
+                return False
+            
+            # 設置環境變數以確保能夠通過認證檢查
+            os.environ['ARTALE_GUI_MODE'] = 'true'
+            
+            # 導入main.py的函數
+            from main import setup_game_window, load_templates, initialize_components
+            
+            self._send_log("📦 設置遊戲視窗...")
+            
+            # 使用main.py的函數設置遊戲視窗
+            self.main_window_info = setup_game_window()
+            
+            self._send_log("📦 載入模板...")
+            
+            # 使用main.py的函數載入模板
+            self.main_templates = load_templates()
+            
+            self._send_log("📦 初始化組件...")
+            
+            # 使用main.py的函數初始化組件
+            self.main_components = initialize_components(
+                self.main_templates, 
+                self.main_window_info['screen_region']
+            )
+
+            # ★★★ 添加：初始化被動技能管理器 ★★★
+            try:
+                from core.passive_skills_manager import PassiveSkillsManager
+                self.main_components['passive_skills'] = PassiveSkillsManager()
+                self._send_log("✅ 被動技能管理器已初始化")
+            except Exception as e:
+                self._send_log(f"⚠️ 被動技能管理器初始化失敗: {str(e)}")
+                # 不影響主要功能，繼續執行
+                self.main_components['passive_skills'] = None
+            
+            # ★★★ 新增：設定熱重載器（在命令處理後一次換上）★★★
+            from core.config_reload import ConfigReloader
+            self.config_reloader = ConfigReloader(self.main_components, log=self._send_log)
+            
+            self._send_log("✅ 所有組件初始化完成")
+            return True
+            
+        except Exception as e:
+            self._send_log(f"❌ 初始化main.py組件失敗: {str(e)}")
+            self._send_log(f"詳細錯誤: {traceback.format_exc()}")
+            return False
+    
+    def _execute_main_loop_logic(self):
+        """執行main.py的主循環邏輯（修改版）"""
+        if not all([self.main_window_info, self.main_templates, self.main_components]):
+            self._send_log("❌ 組件未正確初始化")
+            return
+        
+        # 導入main.py的配置
+        import config
+
+        # ★★★ 新增：管線模式 ★★★
+        if config.ENGINE_MODE == 'pipeline':
+            self._execute_pipeline_logic()
+            return
+        if config.ENGINE_MODE == 'async':
+            self._execute_async_logic()
+            return
+        
+        # ★★★ 與 main.py 共用同一個引擎，控制器只透過掛鉤處理命令、統計與日誌 ★★★
+        from core.engine import Engine
+
+        self.main_engine = Engine(
+            self.main_window_info, self.main_templates, self.main_components,
+            hooks=ControllerEngineHooks(self)
+        )
+        self._send_log(f"🎮 主循環開始執行（{self.MODE_LABEL}）")
+
+        try:
+            self.main_engine.run()
+        finally:
+            self.main_engine = None
+                
+        self._send_log("🏁 主循環已退出")
+    
+    def _execute_pipeline_logic(self):
+        """以管線引擎執行（截圖/檢測/決策/按鍵分離），本線程只處理命令與統計"""
+        from core.pipeline import PipelineEngine
+        import config
+
+        self.pipeline_engine = PipelineEngine(
+            self.main_window_info, self.main_templates, self.main_components,
+            config.PIPELINE_DETECTION_WORKERS
+        )
+        self._send_log(f"🎮 管線模式開始執行（{self.MODE_LABEL}）")
+
+        loop_count = 0
+
+        def should_stop():
+            nonlocal loop_count
+            loop_count += 1
+            self._process_commands()
+            if loop_count % 10 == 0:
+                self._update_script_stats()
+            return not self.is_running or self.is_stopping
+
+        try:
+            self.pipeline_engine.run(should_stop, perf_summary=self.PRINT_PERF_SUMMARY)
+        finally:
+            self.pipeline_engine = None
+        self._send_log("🏁 管線模式已退出")
+
+    def _execute_async_logic(self):
+        """以非同步引擎執行（長時間行為為協程），本線程只處理命令與統計"""
+        from core.async_engine import AsyncEngine
+        import config
+
+        self.async_engine = AsyncEngine(
+            self.main_window_info, self.main_templates, self.main_components,
+            config.ASYNC_ENGINE_BLOCKING_WORKERS
+        )
+        self._send_log(f"🎮 非同步模式開始執行（{self.MODE_LABEL}）")
+
+        loop_count = 0
+
+        def should_stop():
+            nonlocal loop_count
+            loop_count += 1
+            self._process_commands()
+            if loop_count % 10 == 0:
+                self._update_script_stats()
+            return not self.is_running or self.is_stopping
+
+        try:
+            self.async_engine.run(should_stop, perf_summary=self.PRINT_PERF_SUMMARY)
+        finally:
+            self.async_engine = None
+        self._send_log("🏁 非同步模式已退出")
+
+    def _process_commands(self):
+        """處理來自命令隊列的命令"""
+        try:
+            while not self.command_queue.empty():
+                command = self.command_queue.get_nowait()
+                command_type = command.get('type')
+                
+                if command_type == 'stop':
+                    self.is_stopping = True
+                elif command_type == 'update_config':
+                    self._update_config(command.get('config', {}))
+                elif command_type == 'get_stats':
+                    self._send_stats()
+                elif command_type == 'start_recording':
+                    self._start_recording(command.get('output_dir'), command.get('interval'))
+                elif command_type == 'stop_recording':
+                    self._stop_recording()
+                elif command_type == 'start_profiling':
+                    self._start_profiling(command.get('duration'))
+                elif command_type == 'stop_profiling':
+                    self._stop_profiling()
+                    
+        except queue.Empty:
+            pass
+        except Exception as e:
+            self._send_log(f"❌ 處理命令錯誤: {str(e)}")
+
+        # ★★★ 新增：本次收到的設定更新合併後在 tick 邊界一次換上 ★★★
+        if self.config_reloader is not None:
+            try:
+                self.config_reloader.apply_pending()
+            except Exception as e:
+                self._send_log(f"❌ 設定熱重載錯誤: {str(e)}")
+
+    def _start_recording(self, output_dir=None, interval=None):
+        """開始錄製遊戲視窗畫面（需在腳本運行中，視窗位置由初始化取得）"""
+        if not self.main_window_info:
+            self._send_log("⚠️ 腳本未運行，無法錄製畫面")
+            return
+        if self.frame_recorder is not None and self.frame_recorder.is_recording:
+            self._send_log("⚠️ 已在錄製中")
+            return
+
+        import config
+        from core.frame_recorder import FrameRecorder
+
+        if output_dir is None:
+            output_dir = os.path.join(config.RECORDING_DIR, time.strftime('%Y%m%d_%H%M%S'))
+        self.frame_recorder = FrameRecorder(
+            self.main_window_info['screen_region'], output_dir,
+            interval=interval or config.RECORDING_INTERVAL,
+            max_frames=config.RECORDING_MAX_FRAMES,
+            log=self._send_log,
+        )
+        self.frame_recorder.start()
+
+    def _stop_recording(self):
+        if self.frame_recorder is None or not self.frame_recorder.stop():
+            self._send_log("⚠️ 目前沒有在錄製")
+
+    # 取樣剖析時除了腳本線程，也取樣各引擎模式的工作線程（管線階段、檢測線程池、非同步引擎的阻塞工作）
+    PROFILER_THREAD_PREFIXES = ('pipeline-', 'image-', 'async-engine')
+
+    def _profiler_targets(self):
+        idents = {thread.ident for thread in threading.enumerate()
+                  if thread.name.startswith(self.PROFILER_THREAD_PREFIXES)}
+        if self.script_thread is not None and self.script_thread.is_alive():
+            idents.add(self.script_thread.ident)
+        return idents
+
+    def _current_state(self):
+        """目前的腳本狀態：rune / climbing / searching / normal"""
+        components = self.main_components or {}
+        if components.get('rune_mode') is not None and components['rune_mode'].is_active:
+            return 'rune'
+        if components.get('rope_climbing') is not None and components['rope_climbing'].is_climbing:
+            return 'climbing'
+        if components.get('search') is not None and components['search'].is_searching:
+            return 'searching'
+        return 'normal'
+
+    def _start_profiling(self, duration=None):
+        """對執行中的腳本線程做 duration 秒的取樣剖析，結束時寫出火焰圖與函數列表"""
+        if not self.is_running:
+            self._send_log("⚠️ 腳本未運行，無法剖析")
+            return
+        if self.profiler is not None and self.profiler.is_running:
+            self._send_log("⚠️ 已在剖析中")
+            return
+
+        import config
+        from core.sampling_profiler import SamplingProfiler
+
+        self.profiler = SamplingProfiler(
+            self._profiler_targets, config.PROFILER_DIR,
+            duration=float(duration or config.PROFILER_DEFAULT_DURATION),
+            interval=config.PROFILER_INTERVAL,
+            state_func=self._current_state,
+            top_n=config.PROFILER_TOP_N,
+            log=self._send_log,
+        )
+        self.profiler.start()
+
+    def _stop_profiling(self):
+        if self.profiler is None or not self.profiler.is_running:
+            self._send_log("⚠️ 目前沒有在剖析")
+            return
+        self.profiler.stop()
+    
+    def _start_long_run_mode(self):
+        """ENABLE_LONG_RUN_MODE 時啟用緩衝池與記憶體監控，腳本結束時停止"""
+        import config
+        if not config.ENABLE_LONG_RUN_MODE:
+            return
+        from core.long_run import start_long_run_mode
+        self.memory_monitor = start_long_run_mode(log=self._send_log)
+
+    def _start_metrics(self):
+        """啟用指標時啟動本機端點；與控制器同生命週期，腳本未運行時 script_running 為 0"""
+        import config
+        if not config.ENABLE_METRICS:
+            return
+        from core.metrics import get_metrics, start_metrics_server
+        get_metrics().add_collector(self._collect_metrics)
+        start_metrics_server()
+
+    def _collect_metrics(self):
+        """指標端點的收集函數：腳本是否運行與命令 / 狀態隊列深度"""
+        return [
+            ('script_running', {}, int(self.is_running)),
+            ('queue_depth', {'queue': 'commands'}, self.command_queue.qsize()),
+            ('queue_depth', {'queue': 'status'}, self.status_queue.qsize()),
+        ]
+
+    def _update_config(self, config_updates: Dict[str, Any]):
+        """更新配置 - 腳本運行中交給熱重載器，於命令處理結束後一次換上"""
+        try:
+            if self.config_reloader is not None:
+                self.config_reloader.request(config_updates)
+                return
+
+            import config
+            for key, value in config_updates.items():
+                if hasattr(config, key):
+                    setattr(config, key, value)
+                    self._send_log(f"⚙️ 配置已更新: {key} = {value}")
+
+            # 重建設定快照，元件在下一次讀取時重新綁定
+            from core.config_snapshot import refresh_config_snapshot
+            refresh_config_snapshot()
+                    
+        except Exception as e:
+            self._send_log(f"❌ 更新配置錯誤: {str(e)}")
+    
+    def _update_script_stats(self):
+        """更新腳本統計"""
+        if self.script_stats['start_time']:
+            self.script_stats['total_runtime'] = time.time() - self.script_stats['start_time']
+            self.script_stats['last_activity'] = time.time()
+        
+        # 更新性能統計
+        try:
+            self.performance_stats['cpu_percent'] = self.process.cpu_percent()
+            self.performance_stats['memory_mb'] = self.process.memory_info().rss / 1024 / 1024
+            self.performance_stats['threads_count'] = self.process.num_threads()
+        except:
+            pass
+    
+    def _send_stats(self):
+        """發送統計信息到狀態隊列"""
+        try:
+            stats_data = {
+                'script_stats': self.script_stats.copy(),
+                'performance_stats': self.performance_stats.copy()
+            }
+            if self.main_engine is not None:
+                stats_data['engine_stats'] = self.main_engine.get_stats()
+            if self.pipeline_engine is not None:
+                stats_data['pipeline_stats'] = self.pipeline_engine.get_stats()
+            if self.async_engine is not None:
+                stats_data['async_engine_stats'] = self.async_engine.get_stats()
+            if self.config_reloader is not None:
+                stats_data['config_reload_stats'] = self.config_reloader.get_stats()
+            if self.frame_recorder is not None:
+                stats_data['recording_stats'] = self.frame_recorder.get_stats()
+            if self.profiler is not None:
+                stats_data['profiler_stats'] = self.profiler.get_stats()
+            if self.memory_monitor is not None:
+                stats_data['memory_stats'] = self.memory_monitor.get_stats()
+            from core.logger import get_logging_stats
+            from core.perf_stats import get_perf_stats
+            stats_data['logging_stats'] = get_logging_stats()
+            stats_data['perf_stats'] = get_perf_stats().snapshot()
+            self.status_queue.put_nowait(('stats', stats_data))
+        except queue.Full:
+            pass
+    
+    def _setup_log_capture(self):
+        """設置日誌捕獲"""
+        try:
+            self.log_capture = LogCapture(self.log_ring, echo=self.ECHO_CAPTURED_LOG)
+            sys.stdout = self.log_capture
+        except Exception as e:
+            self._send_log(f"⚠️ 設置日誌捕獲失敗: {str(e)}")
+    
+    def _cleanup_script_resources(self):
+        """清理腳本資源"""
+        try:
+            # 恢復原始輸出
+            if self.log_capture:
+                sys.stdout = self.log_capture.original_stdout
+                sys.stderr = self.log_capture.original_stderr
+                self.log_capture = None
+            
+            # 停止錄製
+            if self.frame_recorder is not None and self.frame_recorder.is_recording:
+                self.frame_recorder.stop()
+
+            # 提前結束剖析（已收集的樣本仍會寫出）
+            if self.profiler is not None and self.profiler.is_running:
+                self.profiler.stop()
+
+            # 停止記憶體監控（寫出最後一筆報告）並停用緩衝池
+            if self.memory_monitor is not None:
+                from core.long_run import stop_long_run_mode
+                stop_long_run_mode()
+
+            # 停止所有組件
+            if self.main_components:
+                if 'movement' in self.main_components:
+                    self.main_components['movement'].stop()
+                if 'rune_mode' in self.main_components:
+                    self.main_components['rune_mode'].exit()
+                if 'rope_climbing' in self.main_components:
+                    self.main_components['rope_climbing'].stop_climbing()
+                if 'red_dot_detector' in self.main_components and self.main_components['red_dot_detector']:
+                    self.main_components['red_dot_detector'].reset_detection()
+                # ★★★ 新增：儲存背景模型 ★★★
+                if self.main_components.get('background_model') is not None:
+                    self.main_components['background_model'].save()
+                if self.main_components.get('image_processor') is not None:
+                    self.main_components['image_processor'].stop()
+                # ★★★ 新增：放開按鍵執行器仍按住的按鍵 ★★★
+                from core.input_actuator import get_input_actuator
+                get_input_actuator().release_all()
+                # ★★★ 添加：清理被動技能管理器 ★★★
+                if 'passive_skills' in self.main_components and self.main_components['passive_skills']:
+                    # 被動技能管理器通常不需要特殊清理，但可以記錄最終狀態
+                    try:
+                        stats = self.main_components['passive_skills'].get_simple_stats()
+                        self._send_log(f"🎯 被動技能最終統計: 總使用{stats['total_uses']}次")
+                    except:
+                        pass
+            
+            # 尚未換上的設定更新仍寫入 config，避免遺失
+            if self.config_reloader is not None:
+                self.config_reloader.apply_pending()
+                self.config_reloader = None
+            
+            self.main_components = None
+            self.main_window_info = None
+            self.main_templates = None
+            
+            self._release_authentication()
+            
+            # 清理環境變數
+            if 'ARTALE_GUI_MODE' in os.environ:
+                del os.environ['ARTALE_GUI_MODE']
+            
+            self._send_log("🧹 腳本資源清理完成")
+            
+        except Exception as e:
+            self._send_log(f"⚠️ 清理資源時發生錯誤: {str(e)}")
+    
+    def _reset_stats(self):
+        """重置統計"""
+        self.script_stats = {
+            'start_time': None,
+            'total_runtime': 0,
+            'current_status': '正在啟動',
+            'last_activity': None,
+            'errors': 0,
+            'detections': 0
+        }
+    
+    def _send_log(self, message: str):
+        """發送日誌消息"""
+        self.log_ring.append(message)
+    
+    def _update_status(self, status: str):
+        """更新狀態"""
+        self.script_stats['current_status'] = status
+        try:
+            self.status_queue.put_nowait(('status', status))
+        except queue.Full:
+            pass
+    
+    def send_command(self, command_type: str, **kwargs):
+        """發送命令到腳本"""
+        try:
+            command = {'type': command_type, **kwargs}
+            self.command_queue.put_nowait(command)
+            return True
+        except queue.Full:
+            self._send_log("⚠️ 命令隊列已滿，命令被忽略")
+            return False
+    
+    def update_detection_interval(self, interval: float):
+        """更新檢測間隔"""
+        self.send_command('update_config', config={'DETECTION_INTERVAL': interval})
+    
+    def toggle_red_dot_detection(self, enabled: bool):
+        """切換紅點偵測"""
+        self.send_command('update_config', config={'ENABLE_RED_DOT_DETECTION': enabled})
+    
+    def toggle_enhanced_movement(self, enabled: bool):
+        """切換增強移動"""
+        self.send_command('update_config', config={'ENABLE_ENHANCED_MOVEMENT': enabled})
+
+    def start_recording(self, output_dir: Optional[str] = None, interval: Optional[float] = None):
+        """開始錄製畫面；未指定資料夾時存到 RECORDING_DIR 下以時間命名的資料夾"""
+        return self.send_command('start_recording', output_dir=output_dir, interval=interval)
+
+    def stop_recording(self):
+        """停止錄製畫面"""
+        return self.send_command('stop_recording')
+
+    def start_profiling(self, duration: Optional[float] = None):
+        """對腳本線程取樣剖析 duration 秒（未指定時為 PROFILER_DEFAULT_DURATION），結果存到 PROFILER_DIR"""
+        return self.send_command('start_profiling', duration=duration)
+
+    def stop_profiling(self):
+        """提前結束取樣剖析"""
+        return self.send_command('stop_profiling')
+    
+    def get_script_stats(self) -> Dict[str, Any]:
+        """獲取腳本統計"""
+        return {
+            'is_running': self.is_running,
+            'script_stats': self.script_stats.copy(),
+            'performance_stats': self.performance_stats.copy()
+        }
+    
+    def is_script_running(self) -> bool:
+        """檢查腳本是否在運行"""
+        return self.is_running
+    
+    def cleanup(self):
+        """清理包裝器資源"""
+        if self.is_running:
+            self.stop_script()
+
+        from core.metrics import get_metrics, stop_metrics_server
+        get_metrics().remove_collector(self._collect_metrics)
+        stop_metrics_server()
+        
+        # 清理隊列
+        while not self.command_queue.empty():
+            try:
+                self.command_queue.get_nowait()
+            except queue.Empty:
+                break
+        
+        while not self.status_queue.empty():
+            try:
+                self.status_queue.get_nowait()
+            except queue.Empty:
+                break
@@ -3,8 +3,9 @@
 """
 import time
 import random
-import pyautogui
 from config import JUMP_KEY
+from core.input_actuator import KeyTimeline, get_input_actuator, MOVEMENT_OWNER
+from core.metrics import get_metrics
 
 class Search:
     def __init__(self):
@@ -12,38 +13,30 @@ class Search:
         self.search_start_time = 0
         self.last_medal_found_time = time.time()
         self.medal_lost_count = 0
+        self.player_locator = None  # ★ 新增：小地圖定位器（可選）
+        self.sweep = None  # ★ 新增：進行中的掃描（按鍵時間軸與恢復移動所需的狀態）
+
+    def set_player_locator(self, locator):
+        """設定小地圖定位器，搜尋中的每次檢測優先使用小窗口精修"""
+        self.player_locator = locator
 
     def search_for_medal(self, client_rect, medal_template, threshold, movement):
-        """改善版搜尋 - 減少停頓感"""
+        """改善版搜尋 - 提交左右掃描的按鍵時間軸後立即返回
+
+        掃描期間主循環照常檢測角色，並以 update_search 回報結果；
+        為相容舊介面仍返回 (found, loc, screenshot)，開始掃描時一律為 (False, None, None)
+        """
         if self.is_searching:
             return False, None, None
 
-        # 導入函數（避免循環導入）
-        from core.utils import capture_screen, simple_find_medal
-
         self.is_searching = True
         self.search_start_time = time.time()
+        get_metrics().inc('search_events_total', event='start')
 
         print(f"角色遺失 {self.medal_lost_count} 次，開始搜尋...")
         
         # ★★★ 改善1：不強制停止移動，而是檢查當前移動狀態 ★★★
         current_direction = getattr(movement, 'direction', None)
-        was_moving = getattr(movement, 'is_moving', False)
-        
-        # 如果正在移動，先嘗試在當前方向檢測
-        if was_moving and current_direction:
-            print(f"當前正在移動 {current_direction}，先在移動中檢測角色...")
-            # 給移動中檢測一個短暫機會
-            time.sleep(0.2)
-            current_screenshot = capture_screen(client_rect)
-            if current_screenshot is not None:
-                found, loc, val = simple_find_medal(current_screenshot, medal_template, threshold)
-                if found:
-                    print(f"移動中找到角色 (匹配度 {val:.2f})，無需額外搜尋")
-                    self.is_searching = False
-                    self.last_medal_found_time = time.time()
-                    self.medal_lost_count = 0
-                    return True, loc, current_screenshot
 
         # ★★★ 改善2：智能搜尋順序 - 優先考慮當前移動方向的反方向 ★★★
         if current_direction:
@@ -79,39 +72,85 @@ class Search:
         # 執行柔性停止
         self._soft_stop_movement(movement)
 
-        # ★★★ 改善5：分段搜尋 - 中途檢測 ★★★
-        found_result = self._segmented_search(
-            client_rect, medal_template, threshold, 
-            first_direction, first_duration, 
-            second_direction, second_duration
-        )
+        # ★★★ 改善5：掃描交給按鍵執行器，每一幀的角色檢測都能提前結束搜尋 ★★★
+        timeline = KeyTimeline('search_sweep', channel='search')
+        timeline.hold(first_direction, first_duration)
+        timeline.hold(second_direction, second_duration)
+
+        self.sweep = {
+            'handle': get_input_actuator().submit(timeline, policy='preempt'),
+            'movement': movement,
+            'original_direction': current_direction,
+            'first_direction': first_direction,
+            'first_duration': first_duration,
+            'second_direction': second_direction,
+            'enhanced_movement_backup': enhanced_movement_backup,
+            'current_movement_type_backup': current_movement_type_backup,
+        }
+        print(f"向{first_direction}搜尋角色...")
+        return False, None, None
+
+    def update_search(self, medal_found, match_val=None):
+        """★ 每幀角色檢測後呼叫：找到角色時停止掃描並恢復移動，掃描結束仍未找到則智能恢復
+
+        返回 True 表示本次呼叫結束了搜尋
+        """
+        if not self.is_searching or self.sweep is None:
+            return False
+
+        sweep = self.sweep
+        handle = sweep['handle']
+        movement = sweep['movement']
+
+        if medal_found:
+            # 依掃描進度判斷角色是在哪個方向找到的
+            if handle.elapsed < sweep['first_duration']:
+                found_direction = sweep['first_direction']
+            else:
+                found_direction = sweep['second_direction']
+            handle.cancel()
+
+            if match_val is not None:
+                print(f"向{found_direction}移動後找到角色 (匹配度 {match_val:.2f})")
+            else:
+                print(f"向{found_direction}移動後找到角色")
 
-        if found_result[0]:  # 找到角色
-            found, loc, screenshot, found_direction, match_val = found_result  # ★★★ 修復：解包5個值 ★★★
-            print(f"向{found_direction}移動後找到角色 (匹配度 {match_val:.2f})")
-            
             # ★★★ 改善6：立即恢復流暢移動 ★★★
             self._immediate_resume_movement(
-                movement, found_direction, 
-                enhanced_movement_backup, current_movement_type_backup
+                movement, found_direction,
+                sweep['enhanced_movement_backup'], sweep['current_movement_type_backup']
             )
-            
-            self.is_searching = False
+
+            self._finish_search()
             self.last_medal_found_time = time.time()
-            self.medal_lost_count = 0
-            return True, loc, screenshot
+            get_metrics().inc('search_events_total', event='found')
+            return True
+
+        if not handle.done:
+            return False
 
         print("搜尋完成，未找到角色")
+        get_metrics().inc('search_events_total', event='failed')
         
         # ★★★ 改善7：搜尋失敗後的智能恢復 ★★★
         self._smart_recovery_after_search_failure(
-            movement, current_direction, 
-            enhanced_movement_backup, current_movement_type_backup
+            movement, sweep['original_direction'],
+            sweep['enhanced_movement_backup'], sweep['current_movement_type_backup']
         )
         
+        self._finish_search()
+        return True
+
+    def cancel_search(self):
+        """中止進行中的掃描（例如進入其他模式時）"""
+        if self.sweep is not None:
+            self.sweep['handle'].cancel()
+        self._finish_search()
+
+    def _finish_search(self):
+        self.sweep = None
         self.is_searching = False
         self.medal_lost_count = 0
-        return False, None, None
 
     def _soft_stop_movement(self, movement):
         """柔性停止移動 - 不完全清除狀態"""
@@ -125,100 +164,13 @@ class Search:
         movement.is_moving = False
         # 注意：不清除 movement.direction，保留用於恢復
 
-    def _segmented_search(self, client_rect, medal_template, threshold, 
-                         first_direction, first_duration, 
-                         second_direction, second_duration):
-        """分段搜尋 - 中途檢測角色"""
-        from core.utils import capture_screen, simple_find_medal
-        import pyautogui
-        
-        # ★★★ 本地安全按鍵函數 ★★★
-        def safe_keyDown(key):
-            if key is not None and isinstance(key, str) and len(key) > 0:
-                pyautogui.keyDown(key)
-            else:
-                print(f"⚠️ 跳過無效的 keyDown: {key}")
-        
-        def safe_keyUp(key):
-            if key is not None and isinstance(key, str) and len(key) > 0:
-                pyautogui.keyUp(key)
-            else:
-                print(f"⚠️ 跳過無效的 keyUp: {key}")
-        
-        # 第一個方向的分段搜尋
-        print(f"向{first_direction}搜尋角色...")
-        
-        safe_keyDown(first_direction)
-        
-        # 分段檢測：將搜尋時間分成2-3段
-        segments = max(2, int(first_duration / 0.4))  # 每0.4秒檢測一次
-        segment_time = first_duration / segments
-        
-        for i in range(segments):
-            time.sleep(segment_time)
-            
-            # 中途檢測
-            if i > 0:  # 第一段太短，跳過檢測
-                current_screenshot = capture_screen(client_rect)
-                if current_screenshot is not None:
-                    found, loc, val = simple_find_medal(current_screenshot, medal_template, threshold)
-                    if found:
-                        safe_keyUp(first_direction)
-                        print(f"在{first_direction}方向第{i+1}段找到角色 (匹配度 {val:.2f})")
-                        return True, loc, current_screenshot, first_direction, val
-        
-        safe_keyUp(first_direction)
-        
-        # 第一方向結束後的最終檢測
-        first_screenshot = capture_screen(client_rect)
-        if first_screenshot is not None:
-            found, loc, val = simple_find_medal(first_screenshot, medal_template, threshold)
-            if found:
-                print(f"向{first_direction}移動後找到角色 (匹配度 {val:.2f})")
-                return True, loc, first_screenshot, first_direction, val
-
-        # 第二個方向的分段搜尋
-        print(f"向{second_direction}搜尋角色...")
-        
-        safe_keyDown(second_direction)
-        
-        segments = max(2, int(second_duration / 0.4))
-        segment_time = second_duration / segments
-        
-        for i in range(segments):
-            time.sleep(segment_time)
-            
-            # 中途檢測
-            if i > 0:
-                current_screenshot = capture_screen(client_rect)
-                if current_screenshot is not None:
-                    found, loc, val = simple_find_medal(current_screenshot, medal_template, threshold)
-                    if found:
-                        safe_keyUp(second_direction)
-                        print(f"在{second_direction}方向第{i+1}段找到角色 (匹配度 {val:.2f})")
-                        return True, loc, current_screenshot, second_direction, val
-        
-        safe_keyUp(second_direction)
-        
-        # 第二方向結束後的最終檢測
-        second_screenshot = capture_screen(client_rect)
-        if second_screenshot is not None:
-            found, loc, val = simple_find_medal(second_screenshot, medal_template, threshold)
-            if found:
-                print(f"向{second_direction}移動後找到角色 (匹配度 {val:.2f})")
-                return True, loc, second_screenshot, second_direction, val
-
-        return False, None, None, None, 0.0
-
     def _immediate_resume_movement(self, movement, found_direction, 
                                  enhanced_movement_backup, current_movement_type_backup):
         """立即恢復流暢移動 - 減少停頓"""
-        import pyautogui
-        
-        # ★★★ 本地安全按鍵函數 ★★★
+        # ★★★ 本地安全按鍵函數（經由按鍵執行器，由移動模組持有，停止移動、斷層與攻擊可放開或合併）★★★
         def safe_keyDown(key):
             if key is not None and isinstance(key, str) and len(key) > 0:
-                pyautogui.keyDown(key)
+                get_input_actuator().hold_key(key, MOVEMENT_OWNER)
             else:
                 print(f"⚠️ 跳過無效的 keyDown: {key}")
         
@@ -264,11 +216,14 @@ class Search:
             except Exception as e:
                 print(f"⚠️ 恢復移動模式失敗，使用普通移動: {e}")
                 safe_keyDown(found_direction)
+                enhanced_movement_backup.current_keys_pressed = [found_direction]
                 movement.current_movement_type = 'normal'
                 movement.is_moving = True
         else:
             # 備用方案：簡單的普通移動
             safe_keyDown(found_direction)
+            if hasattr(movement, 'enhanced_movement'):
+                movement.enhanced_movement.current_keys_pressed = [found_direction]
             movement.current_movement_type = 'normal'
             movement.is_moving = True
             movement.start_time = time.time()
@@ -277,12 +232,10 @@ class Search:
     def _smart_recovery_after_search_failure(self, movement, original_direction, 
                                            enhanced_movement_backup, current_movement_type_backup):
         """搜尋失敗後的智能恢復"""
-        import pyautogui
-        
-        # ★★★ 本地安全按鍵函數 ★★★
+        # ★★★ 本地安全按鍵函數（經由按鍵執行器，由移動模組持有，停止移動、斷層與攻擊可放開或合併）★★★
         def safe_keyDown(key):
             if key is not None and isinstance(key, str) and len(key) > 0:
-                pyautogui.keyDown(key)
+                get_input_actuator().hold_key(key, MOVEMENT_OWNER)
             else:
                 print(f"⚠️ 跳過無效的 keyDown: {key}")
         
@@ -0,0 +1,158 @@
+"""
+延遲追踪模組 - 每張畫面帶一個 trace ID，從截圖經過檢測、決策一路跟到攻擊按鍵
+
+- 截圖時以 get_tracer().begin() 建立 FrameTrace，隨 Frame 傳到檢測、決策與按鍵階段，
+  各階段以 trace.mark(名稱) 記下時間點（time.perf_counter；同一名稱只記第一次）
+- 執行按鍵前以 with activate(trace) 設為目前線程的 trace，quick_attack_monster / execute_attack_key
+  不必增加參數就能以 mark_current() / mark_input() 記錄
+- 攻擊鍵按下時 trace 完成：端到端延遲拆成 截圖 / 排隊等待 / 檢測 / 決策 / 按鍵 五段，
+  記錄到 perf_stats 的 e2e.* 直方圖（GUI 效能面板、常駐模式 perf 與指標端點都讀得到）
+- 排隊等待 = 總延遲扣掉其餘四段，包含階段之間在隊列中等待與線程切換的時間
+- 沒有送出攻擊的畫面（沒有怪物、過時被捨棄）不計入
+"""
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from core.perf_stats import get_perf_stats
+
+# 各段延遲：(名稱, 開始標記, 結束標記)；'begin' 為截圖開始
+SEGMENTS = (
+    ('capture', 'begin', 'captured'),
+    ('detect', 'detect_start', 'detect_end'),
+    ('decide', 'decide_start', 'decide_end'),
+    ('actuate', 'actuate_start', 'input'),
+)
+BREAKDOWN_ORDER = ('capture', 'queue', 'detect', 'decide', 'actuate', 'total')
+SEGMENT_LABELS = {'capture': '截圖', 'queue': '排隊', 'detect': '檢測', 'decide': '決策',
+                  'actuate': '按鍵', 'total': '總計'}
+
+
+class FrameTrace:
+    """單張畫面的時間點記錄"""
+
+    __slots__ = ('trace_id', 'marks', 'finished')
+
+    def __init__(self, trace_id, begin=None):
+        self.trace_id = trace_id
+        self.marks = {'begin': time.perf_counter() if begin is None else begin}
+        self.finished = False
+
+    def mark(self, name, at=None):
+        """記錄時間點；已記錄過的名稱不覆寫（例如管線已標記決策結束，攻擊函數再標記不影響）"""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() if at is None else at
+
+    def breakdown(self):
+        """各段延遲（秒）；缺少標記的段為 0，queue 為總延遲扣掉其他段"""
+        marks = self.marks
+        end = marks.get('input', max(marks.values()))
+        total = end - marks['begin']
+        result = {}
+        for name, start_mark, end_mark in SEGMENTS:
+            if start_mark in marks and end_mark in marks:
+                result[name] = max(0.0, marks[end_mark] - marks[start_mark])
+            else:
+                result[name] = 0.0
+        result['queue'] = max(0.0, total - sum(result.values()))
+        result['total'] = total
+        return result
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'breakdown_ms': {name: round(seconds * 1000, 3) for name, seconds in self.breakdown().items()},
+        }
+
+
+class Tracer:
+    """trace ID 分配與完成的 trace 統計；最近完成的保留 keep 筆供查詢"""
+
+    def __init__(self, keep=100):
+        self._ids = itertools.count(1)
+        self.recent = deque(maxlen=keep)
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def begin(self):
+        """截圖開始時呼叫"""
+        return FrameTrace(next(self._ids))
+
+    def finish(self, trace):
+        """攻擊鍵按下時呼叫：各段延遲記錄到 perf_stats 的 e2e.* 直方圖"""
+        if trace.finished:
+            return
+        trace.finished = True
+        perf = get_perf_stats()
+        for name, seconds in trace.breakdown().items():
+            perf.record(f"e2e.{name}", seconds)
+        with self._lock:
+            self.recent.append(trace.to_dict())
+            self.completed += 1
+
+    def snapshot(self, limit=20):
+        perf = get_perf_stats()
+        with self._lock:
+            recent = list(self.recent)[-limit:] if limit else []
+            completed = self.completed
+        return {
+            'completed': completed,
+            'breakdown': {name: perf.histogram(f"e2e.{name}").snapshot() for name in BREAKDOWN_ORDER},
+            'recent': recent,
+        }
+
+    def format_summary(self, snapshot=None):
+        snapshot = snapshot or self.snapshot(limit=0)
+        breakdown = snapshot['breakdown']
+        total = breakdown['total']
+        if not total['count']:
+            return "🎯 截圖→攻擊延遲: 尚無數據"
+        parts = []
+        for name in BREAKDOWN_ORDER[:-1]:
+            stage = breakdown[name]
+            share = stage['total_ms'] / total['total_ms'] if total['total_ms'] else 0.0
+            parts.append(f"{SEGMENT_LABELS[name]} {stage['avg_ms']:.1f}ms ({share:.0%})")
+        return (f"🎯 截圖→攻擊延遲 ({total['count']} 次): p50 {total['p50_ms']:.1f}ms, "
+                f"p95 {total['p95_ms']:.1f}ms | 平均 " + ', '.join(parts))
+
+
+# 全局追踪實例與目前線程的 trace
+_tracer = Tracer()
+_local = threading.local()
+
+
+def get_tracer():
+    """獲取追踪實例"""
+    return _tracer
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def activate(trace):
+    """在此區塊內把 trace 設為目前線程的 trace（trace 為 None 時不追踪）"""
+    previous = current_trace()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+def mark_current(name):
+    """標記目前線程的 trace"""
+    trace = current_trace()
+    if trace is not None:
+        trace.mark(name)
+
+
+def mark_input():
+    """攻擊鍵按下：完成目前線程的 trace（同一張畫面只計第一次按鍵）"""
+    trace = current_trace()
+    if trace is not None and not trace.finished:
+        trace.mark('input')
+        _tracer.finish(trace)
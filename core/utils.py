@@ -7,23 +7,39 @@ import pyautogui
 import time
 import random
 from config import JUMP_KEY
+from core.config_snapshot import get_config_snapshot
+from core.input_actuator import get_input_actuator, MOVEMENT_OWNER, ATTACK_OWNER
+from core.logger import get_logger
+from core.long_run import get_buffer_pool
+from core.metrics import get_metrics
+from core.perf_stats import timed_call
+from core.tracing import mark_current, mark_input
 
+log = get_logger('attack')
 
+
+@timed_call('capture')
 def capture_screen(client_rect):
     """截取螢幕指定區域"""
     try:
         screenshot_pil = pyautogui.screenshot(region=client_rect)
-        screenshot = cv2.cvtColor(np.array(screenshot_pil), cv2.COLOR_RGB2BGR)
+        rgb = np.asarray(screenshot_pil)
+        # ★★★ 新增：長時間運行模式下 BGR 畫面寫入緩衝池中已無人使用的緩衝區 ★★★
+        screenshot = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR, dst=get_buffer_pool('frames').acquire(rgb.shape))
         return screenshot
     except Exception as e:
         print(f"截圖錯誤: {e}")
         return None
 
-def preprocess_screenshot(screenshot):
-    """預處理截圖 - 高斯模糊和邊緣檢測"""
-    blurred = cv2.GaussianBlur(screenshot, (1, 1), 0)
-    edges = cv2.Canny(blurred, 50, 150)
-    return edges
+def preprocess_screenshot(screenshot, scratch=False):
+    """預處理截圖 - 高斯模糊和邊緣檢測（scratch=True：結果只在本次檢測使用，改用暫存緩衝池）"""
+    if not scratch:
+        blurred = cv2.GaussianBlur(screenshot, (1, 1), 0)
+        edges = cv2.Canny(blurred, 50, 150)
+        return edges
+    pool = get_buffer_pool('scratch')
+    blurred = cv2.GaussianBlur(screenshot, (1, 1), 0, dst=pool.acquire(screenshot.shape, screenshot.dtype))
+    return cv2.Canny(blurred, 50, 150, edges=pool.acquire(screenshot.shape[:2]))
 
 def simple_find_medal(screenshot, template, threshold):
     """簡單的模板匹配函數 - 修改版（只搜索下半畫面）"""
@@ -56,6 +72,14 @@ def simple_find_medal(screenshot, template, threshold):
     else:
         return found, max_loc, max_val
 
+@timed_call('medal')
+def find_player_medal(screenshot, template, threshold, locator=None):
+    """角色定位入口 - 有小地圖定位器時先用小地圖推算位置，否則全畫面匹配"""
+    if locator is not None:
+        return locator.locate_medal(screenshot, template, threshold)
+    return simple_find_medal(screenshot, template, threshold)
+
+@timed_call('sign')
 def detect_sign_text(screenshot, sign_template, threshold=0.5):
     """檢測sign_text在螢幕上方區域"""
     upper_height = int(screenshot.shape[0] * 0.5)
@@ -64,28 +88,25 @@ def detect_sign_text(screenshot, sign_template, threshold=0.5):
     _, max_val, _, max_loc = cv2.minMaxLoc(result)
     return max_val >= threshold, max_loc, max_val
 
+@timed_call('rune')
+def detect_rune_text(screenshot, rune_template, threshold):
+    """檢測rune_text（全畫面模板匹配）"""
+    return simple_find_medal(screenshot, rune_template, threshold)
+
 def get_attack_key():
     """★★★ 新增：獲取攻擊按鍵（支援主要/次要攻擊按鍵選擇）★★★"""
-    try:
-        from config import (
-            ATTACK_KEY, SECONDARY_ATTACK_KEY, ENABLE_SECONDARY_ATTACK,
-            PRIMARY_ATTACK_CHANCE, SECONDARY_ATTACK_CHANCE
-        )
-        
-        # 如果沒有啟用次要攻擊，直接返回主要攻擊按鍵
-        if not ENABLE_SECONDARY_ATTACK:
-            return ATTACK_KEY
-        
-        # 根據機率選擇攻擊按鍵
-        random_value = random.random()
-        if random_value < PRIMARY_ATTACK_CHANCE:
-            return ATTACK_KEY
-        else:
-            return SECONDARY_ATTACK_KEY
-            
-    except ImportError:
-        # 如果配置載入失敗，使用預設值
-        return ATTACK_KEY
+    cfg = get_config_snapshot()
+
+    # 如果沒有啟用次要攻擊，直接返回主要攻擊按鍵
+    if not cfg.ENABLE_SECONDARY_ATTACK:
+        return cfg.ATTACK_KEY
+
+    # 根據機率選擇攻擊按鍵
+    random_value = random.random()
+    if random_value < cfg.PRIMARY_ATTACK_CHANCE:
+        return cfg.ATTACK_KEY
+    else:
+        return cfg.SECONDARY_ATTACK_KEY
 
 def execute_attack_key(attack_key=None):
     """★★★ 新增：執行攻擊按鍵按壓 ★★★"""
@@ -93,8 +114,8 @@ def execute_attack_key(attack_key=None):
         attack_key = get_attack_key()
     
     try:
-        pyautogui.keyDown(attack_key)
-        pyautogui.keyUp(attack_key)
+        mark_input()
+        get_input_actuator().tap_key(attack_key, ATTACK_OWNER)
         return True
     except Exception as e:
         print(f"❌ 攻擊按鍵 {attack_key} 執行失敗: {e}")
@@ -114,7 +135,7 @@ def sync_movement_state(movement, direction, movement_type, keys_pressed=None):
         movement.enhanced_movement.release_all_keys()
         # 實際按下需要的按鍵
         for key in keys_pressed:
-            pyautogui.keyDown(key)
+            get_input_actuator().hold_key(key, MOVEMENT_OWNER)
         # 更新列表
         movement.enhanced_movement.current_keys_pressed = keys_pressed.copy()
     
@@ -122,16 +143,18 @@ def sync_movement_state(movement, direction, movement_type, keys_pressed=None):
 
 def attack_with_key_preservation(attack_type, preserved_keys=None):
     """執行攻擊但保持指定按鍵不變 - 增強版（支援可配置攻擊按鍵）"""
+    get_metrics().inc('attacks_total', type=attack_type)
     if attack_type == 'jump':
         from config import JUMP_ATTACK_MODE, DASH_SKILL_KEY
         
         if JUMP_ATTACK_MODE == 'mage':
             print(f"🧙‍♂️ 法師跳躍攻擊")
-            pyautogui.keyDown('up')
-            pyautogui.keyDown(DASH_SKILL_KEY)
+            actuator = get_input_actuator()
+            actuator.hold_key('up', ATTACK_OWNER)
+            actuator.hold_key(DASH_SKILL_KEY, ATTACK_OWNER)
             time.sleep(0.1)
-            pyautogui.keyUp('up')
-            pyautogui.keyUp(DASH_SKILL_KEY)
+            actuator.release_key('up', ATTACK_OWNER)
+            actuator.release_key(DASH_SKILL_KEY, ATTACK_OWNER)
             time.sleep(0.05)
             # ★★★ 使用可配置的攻擊按鍵 ★★★
             attack_key = get_attack_key()
@@ -139,12 +162,12 @@ def attack_with_key_preservation(attack_type, preserved_keys=None):
             
         elif JUMP_ATTACK_MODE == 'original':
             print(f"⚔️ 跳躍攻擊")
-            pyautogui.keyDown(JUMP_KEY)
+            get_input_actuator().hold_key(JUMP_KEY, ATTACK_OWNER)
             time.sleep(0.1)
             # ★★★ 使用可配置的攻擊按鍵 ★★★
             attack_key = get_attack_key()
             execute_attack_key(attack_key)
-            pyautogui.keyUp(JUMP_KEY)
+            get_input_actuator().release_key(JUMP_KEY, ATTACK_OWNER)
     else:
         # ★★★ 普通攻擊也使用可配置的攻擊按鍵 ★★★
         attack_key = get_attack_key()
@@ -163,12 +186,12 @@ def smart_direction_switch(movement, old_direction, new_direction):
     # 安全釋放舊方向
     if old_direction and hasattr(movement, 'enhanced_movement'):
         if old_direction in movement.enhanced_movement.current_keys_pressed:
-            pyautogui.keyUp(old_direction)
+            get_input_actuator().release_key(old_direction, MOVEMENT_OWNER)
             movement.enhanced_movement.current_keys_pressed.remove(old_direction)
     
     # 按下新方向
     if new_direction:
-        pyautogui.keyDown(new_direction)
+        get_input_actuator().hold_key(new_direction, MOVEMENT_OWNER)
         if hasattr(movement, 'enhanced_movement'):
             if new_direction not in movement.enhanced_movement.current_keys_pressed:
                 movement.enhanced_movement.current_keys_pressed.append(new_direction)
@@ -178,7 +201,7 @@ def maintain_movement_type(movement, target_type, direction):
     if target_type == 'jump' and hasattr(movement, 'enhanced_movement'):
         if movement.enhanced_movement.can_jump():
             if JUMP_KEY not in movement.enhanced_movement.current_keys_pressed:
-                pyautogui.keyDown(JUMP_KEY)
+                get_input_actuator().hold_key(JUMP_KEY, MOVEMENT_OWNER)
                 movement.enhanced_movement.current_keys_pressed.append(JUMP_KEY)
             print("🦘 恢復跳躍移動")
             return True
@@ -190,7 +213,7 @@ def maintain_movement_type(movement, target_type, direction):
         if movement.enhanced_movement.can_use_dash():
             from config import DASH_SKILL_KEY
             if DASH_SKILL_KEY not in movement.enhanced_movement.current_keys_pressed:
-                pyautogui.keyDown(DASH_SKILL_KEY)
+                get_input_actuator().hold_key(DASH_SKILL_KEY, MOVEMENT_OWNER)
                 movement.enhanced_movement.current_keys_pressed.append(DASH_SKILL_KEY)
             print("⚡ 恢復位移技能移動")
             return True
@@ -202,6 +225,13 @@ def maintain_movement_type(movement, target_type, direction):
 
 def quick_attack_monster(monster_x, monster_y, player_x, player_y, movement, cliff_detection, attack_direction, attack_type):
     """★★★ 修復版智能攻擊函數 - 避免停頓 (增強版：支援可配置攻擊按鍵) ★★★"""
+    # ★★★ 新增：延遲追踪 - 決策結束、開始按鍵（攻擊鍵按下時由 execute_attack_key 完成追踪）★★★
+    mark_current('decide_end')
+    mark_current('actuate_start')
+
+    # ★★★ 新增：攻擊接管按鍵前取消進行中的斷層動作（反向鍵或跳躍），方向鍵由攻擊與移動模組重新按下 ★★★
+    get_input_actuator().cancel_channel('cliff')
+
     # 獲取當前狀態
     current_direction = getattr(movement, 'direction', None)
     current_movement_type = getattr(movement, 'current_movement_type', 'normal')
@@ -209,26 +239,27 @@ def quick_attack_monster(monster_x, monster_y, player_x, player_y, movement, cli
     
     # ★★★ 新增：顯示使用的攻擊按鍵 ★★★
     attack_key = get_attack_key()
-    print(f"🎯 攻擊: {current_direction}({current_movement_type}) -> {attack_direction}({attack_type}) [按鍵: {attack_key}]")
+    log.info("🎯 攻擊: %s(%s) -> %s(%s) [按鍵: %s]", current_direction, current_movement_type,
+             attack_direction, attack_type, attack_key, key='attack')
     
     # ★★★ 關鍵修復：避免不必要的按鍵中斷 ★★★
     
     if current_movement_type == 'normal':
         # 情況1：普通移動攻擊
         if need_direction_change:
-            print("普通移動 - 方向切換攻擊")
+            log.debug("普通移動 - 方向切換攻擊")
             smart_direction_switch(movement, current_direction, attack_direction)
             attack_with_key_preservation(attack_type, [attack_direction])
             sync_movement_state(movement, attack_direction, 'normal', [attack_direction])
         else:
-            print("普通移動 - 同方向攻擊")
+            log.debug("普通移動 - 同方向攻擊")
             attack_with_key_preservation(attack_type, [current_direction])
             # 不改變任何移動狀態
             
     elif current_movement_type == 'jump':
         # 情況2：跳躍移動攻擊
         if need_direction_change:
-            print("跳躍移動 - 方向切換攻擊")
+            log.debug("跳躍移動 - 方向切換攻擊")
             # 先切換方向
             smart_direction_switch(movement, current_direction, attack_direction)
             # 攻擊
@@ -239,11 +270,11 @@ def quick_attack_monster(monster_x, monster_y, player_x, player_y, movement, cli
             else:
                 sync_movement_state(movement, attack_direction, 'normal', [attack_direction])
         else:
-            print("跳躍移動 - 同方向攻擊")
+            log.debug("跳躍移動 - 同方向攻擊")
             # 暫停跳躍進行攻擊
             current_keys = movement.enhanced_movement.current_keys_pressed.copy()
             if JUMP_KEY in current_keys:
-                pyautogui.keyUp(JUMP_KEY)
+                get_input_actuator().release_key(JUMP_KEY, MOVEMENT_OWNER)
                 current_keys.remove(JUMP_KEY)
             
             attack_with_key_preservation(attack_type, current_keys)
@@ -251,12 +282,12 @@ def quick_attack_monster(monster_x, monster_y, player_x, player_y, movement, cli
             # 立即恢復跳躍
             if maintain_movement_type(movement, 'jump', current_direction):
                 movement.enhanced_movement.current_keys_pressed = [current_direction, JUMP_KEY]
-                print("🦘 攻擊後立即恢復跳躍")
+                log.debug("🦘 攻擊後立即恢復跳躍")
             
     elif current_movement_type == 'dash':
         # 情況3：位移技能移動攻擊
         if need_direction_change:
-            print("位移技能移動 - 方向切換攻擊")
+            log.debug("位移技能移動 - 方向切換攻擊")
             smart_direction_switch(movement, current_direction, attack_direction)
             attack_with_key_preservation(attack_type, [attack_direction])
             # 嘗試恢復位移技能移動
@@ -266,12 +297,12 @@ def quick_attack_monster(monster_x, monster_y, player_x, player_y, movement, cli
             else:
                 sync_movement_state(movement, attack_direction, 'normal', [attack_direction])
         else:
-            print("位移技能移動 - 同方向攻擊")
+            log.debug("位移技能移動 - 同方向攻擊")
             # 暫停位移技能進行攻擊
             from config import DASH_SKILL_KEY
             current_keys = movement.enhanced_movement.current_keys_pressed.copy()
             if DASH_SKILL_KEY in current_keys:
-                pyautogui.keyUp(DASH_SKILL_KEY)
+                get_input_actuator().release_key(DASH_SKILL_KEY, MOVEMENT_OWNER)
                 current_keys.remove(DASH_SKILL_KEY)
             
             attack_with_key_preservation(attack_type, current_keys)
@@ -279,13 +310,13 @@ def quick_attack_monster(monster_x, monster_y, player_x, player_y, movement, cli
             # 立即恢復位移技能
             if maintain_movement_type(movement, 'dash', current_direction):
                 #movement.enhanced_movement.current_keys_pressed = [current_direction, DASH_SKILL_KEY]
-                print("⚡ 攻擊後立即恢復位移技能")
+                log.debug("⚡ 攻擊後立即恢復位移技能")
     
     # 重置斷層檢測狀態
     cliff_detection.prev_screenshot = None
     cliff_detection.last_check_time = time.time()
     
-    print(f"✅ 攻擊完成: {movement.direction}({movement.current_movement_type})")
+    log.debug("✅ 攻擊完成: %s(%s)", movement.direction, movement.current_movement_type)
     # time.sleep(0.1) # 攻擊斷點
 
 def attack_monster_with_category(monster_x, monster_y, player_x, player_y, movement, cliff_detection, monster_category):
@@ -383,6 +414,7 @@ def recognize_direction_symbols(screenshot, direction_templates, direction_masks
 def execute_channel_change(client_rect, change_templates):
     """執行換頻道流程 - 處理change0特殊情況"""
     print("開始執行換頻道流程...")
+    get_metrics().inc('channel_changes_total')
     
     # 定義換頻道順序
     change_order = ['change0', 'change1', 'change2', 'change3', 'change4', 'change5']
@@ -434,7 +466,7 @@ def execute_channel_change(client_rect, change_templates):
             click_y = client_rect[1] + max_loc[1] + template_h // 2
             
             print(f"點擊 change0，位置: ({click_x}, {click_y})")
-            pyautogui.click(click_x, click_y)
+            get_input_actuator().click(click_x, click_y)
             time.sleep(0.5)  # 等待界面響應
             
             # 等待 change0_1 出現（如果有的話）
@@ -503,7 +535,7 @@ def execute_channel_change(client_rect, change_templates):
                 click_y = client_rect[1] + max_loc[1] + template_h // 2
                 
                 print(f"第 {click_attempts} 次點擊 {change_name}.png，位置: ({click_x}, {click_y}), 匹配度: {max_val:.3f}")
-                pyautogui.click(click_x, click_y)
+                get_input_actuator().click(click_x, click_y)
                 
                 # 點擊後短暫等待界面響應
                 time.sleep(0.3)
@@ -0,0 +1,110 @@
+"""
+視窗按鍵模組 - 按鍵執行器的送出端：直接送到指定視窗，或只記錄不送出
+
+- WindowInputSender：以 PostMessage 把按鍵 / 點擊送進指定視窗的訊息佇列，不經過鍵盤焦點，
+  多開模式下每個客戶端持續按住的移動鍵、斷層時間軸只會作用在自己的視窗
+- RecordingInputSender：重播來源使用，只記錄按鍵不送出（可在 Linux 執行）
+"""
+import threading
+from collections import Counter, deque
+
+# pyautogui 按鍵名稱 -> Windows 虛擬鍵碼（單一字元另以 VkKeyScan 查詢）
+VIRTUAL_KEYS = {
+    'left': 0x25, 'up': 0x26, 'right': 0x27, 'down': 0x28,
+    'space': 0x20, 'enter': 0x0D, 'return': 0x0D, 'esc': 0x1B, 'escape': 0x1B,
+    'tab': 0x09, 'backspace': 0x08, 'delete': 0x2E, 'del': 0x2E, 'insert': 0x2D,
+    'home': 0x24, 'end': 0x23, 'pageup': 0x21, 'pgup': 0x21, 'pagedown': 0x22, 'pgdn': 0x22,
+    'shift': 0x10, 'shiftleft': 0xA0, 'shiftright': 0xA1,
+    'ctrl': 0x11, 'ctrlleft': 0xA2, 'ctrlright': 0xA3,
+    'alt': 0x12, 'altleft': 0xA4, 'altright': 0xA5,
+}
+VIRTUAL_KEYS.update({f'f{n}': 0x6F + n for n in range(1, 13)})
+
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_SYSKEYDOWN = 0x0104
+WM_SYSKEYUP = 0x0105
+WM_LBUTTONDOWN = 0x0201
+WM_LBUTTONUP = 0x0202
+MK_LBUTTON = 0x0001
+VK_MENU = 0x12
+
+
+class WindowInputSender:
+    """送到指定視窗的按鍵 / 點擊（需要 pywin32，只在 Windows 可用）"""
+
+    def __init__(self, hwnd):
+        import win32api
+        import win32gui
+
+        self.hwnd = hwnd
+        self._win32api = win32api
+        self._win32gui = win32gui
+        self.sent = 0
+
+    def _virtual_key(self, key):
+        vk = VIRTUAL_KEYS.get(key.lower())
+        if vk is None and len(key) == 1:
+            vk = self._win32api.VkKeyScan(key) & 0xFF
+        if vk is None:
+            raise ValueError(f"不支援的按鍵: {key}")
+        return vk
+
+    def _key_message(self, vk, key_up):
+        # alt 與 F10 走系統按鍵訊息；lParam 帶掃描碼，放開時設定前次狀態與轉換位元
+        scan_code = self._win32api.MapVirtualKey(vk, 0)
+        lparam = 1 | (scan_code << 16)
+        if key_up:
+            lparam |= (1 << 30) | (1 << 31)
+        system = vk in (VK_MENU, 0xA4, 0xA5, 0x79)
+        if key_up:
+            return (WM_SYSKEYUP if system else WM_KEYUP), lparam
+        return (WM_SYSKEYDOWN if system else WM_KEYDOWN), lparam
+
+    def key_down(self, key):
+        vk = self._virtual_key(key)
+        message, lparam = self._key_message(vk, key_up=False)
+        self._win32api.PostMessage(self.hwnd, message, vk, lparam)
+        self.sent += 1
+
+    def key_up(self, key):
+        vk = self._virtual_key(key)
+        message, lparam = self._key_message(vk, key_up=True)
+        self._win32api.PostMessage(self.hwnd, message, vk, lparam)
+        self.sent += 1
+
+    def click(self, x, y):
+        """螢幕座標 (x, y) 轉為此視窗的客戶區座標後送出左鍵點擊"""
+        client_x, client_y = self._win32gui.ScreenToClient(self.hwnd, (int(x), int(y)))
+        position = (client_y << 16) | (client_x & 0xFFFF)
+        self._win32api.PostMessage(self.hwnd, WM_LBUTTONDOWN, MK_LBUTTON, position)
+        self._win32api.PostMessage(self.hwnd, WM_LBUTTONUP, 0, position)
+        self.sent += 1
+
+
+class RecordingInputSender:
+    """只記錄不送出的送出端 - 重播來源與測試使用"""
+
+    def __init__(self, history=1000):
+        self._lock = threading.Lock()
+        self.events = deque(maxlen=history)  # 最近的 (動作, 按鍵或座標)
+        self.counts = Counter()
+
+    def _record(self, action, target):
+        with self._lock:
+            self.events.append((action, target))
+            self.counts[action] += 1
+
+    def key_down(self, key):
+        self._record('down', key)
+
+    def key_up(self, key):
+        self._record('up', key)
+
+    def click(self, x, y):
+        self._record('click', (x, y))
+
+    @property
+    def sent(self):
+        with self._lock:
+            return sum(self.counts.values())
@@ -53,6 +53,14 @@ class ConfigManager:
         
         self.config_cache = config_items
     
+    def _refresh_snapshot(self):
+        """★★★ 新增：配置改變後重建設定快照，腳本元件在下一次讀取時重新綁定 ★★★"""
+        try:
+            from core.config_snapshot import refresh_config_snapshot
+            refresh_config_snapshot()
+        except Exception as e:
+            print(f"⚠️ 重建設定快照失敗: {e}")
+    
     def get_config(self, key: str, default: Any = None) -> Any:
         """獲取配置值"""
         if self.config_module and hasattr(self.config_module, key):
@@ -68,6 +76,7 @@ class ConfigManager:
                 
                 # 更新緩存
                 self.config_cache[key] = value
+                self._refresh_snapshot()
                 
                 print(f"✅ 配置已更新: {key} = {value}")
                 return True
@@ -401,6 +410,7 @@ class ConfigManager:
             if success:
                 # 更新本地緩存
                 self._update_cache()
+                self._refresh_snapshot()
                 print(f"✅ 配置已從外部文件載入")
             else:
                 print(f"❌ 載入外部配置失敗")
@@ -418,6 +428,7 @@ class ConfigManager:
             if self.config_module:
                 importlib.reload(self.config_module)
                 self._update_cache()
+                self._refresh_snapshot()
                 print("✅ 配置已重置為默認值")
                 
                 # 刪除外部配置文件
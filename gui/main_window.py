@@ -6,7 +6,9 @@ import tkinter as tk
 from tkinter import messagebox
 import threading
 import time
+import datetime
 from typing import Optional
+from core.log_ring import LogRing
 
 # 設置 CustomTkinter 主題
 ctk.set_appearance_mode("dark")
@@ -17,6 +19,17 @@ class MainWindow:
     
     def __init__(self):
         self.root = ctk.CTk()
+
+        # ★★★ 新增：日誌環形緩衝區 - 任何線程直接寫入，主線程定時批次顯示 ★★★
+        import config
+        self.log_ring = LogRing(config.LOG_RING_CAPACITY)
+        self.log_reader = self.log_ring.reader(from_start=True)
+        self.log_drain_interval = config.LOG_DRAIN_INTERVAL_MS
+        self.log_view_max_lines = config.LOG_VIEW_MAX_LINES
+        # 效能面板的更新間隔（統計每 100ms 送達一次，面板不需要每次重繪）
+        self.perf_panel_refresh = config.PERF_PANEL_REFRESH_MS / 1000
+        self.last_perf_panel_update = 0
+
         self.setup_window()
         self.create_variables()
         
@@ -33,6 +46,7 @@ class MainWindow:
         
         # 先創建界面組件
         self.create_widgets()
+        self.root.after(self.log_drain_interval, self._drain_log_ring)
         
         # 然後初始化管理器（此時日誌控件已經存在）
         self.initialize_firebase_auth()
@@ -364,6 +378,10 @@ class MainWindow:
         self.log_tab = self.tabview.add("📋 即時日誌")
         self.create_log_section(self.log_tab)
         
+        # ★★★ 新增：效能選項卡 - 各階段耗時直方圖 ★★★
+        self.perf_tab = self.tabview.add("⏱️ 效能")
+        self.create_perf_section(self.perf_tab)
+        
         # 設定選項卡
         self.settings_tab = self.tabview.add("⚙️ 進階設定")
         self.create_settings_section(self.settings_tab)
@@ -405,6 +423,86 @@ class MainWindow:
         self.auto_scroll_switch.pack(side="right", padx=10, pady=10)
         self.auto_scroll_switch.select()  # 默認開啟
         
+    def create_perf_section(self, parent):
+        """創建效能面板（各階段耗時 p50 / p95 / p99）"""
+        import config
+        
+        self.perf_text = ctk.CTkTextbox(
+            parent,
+            wrap="none",
+            font=ctk.CTkFont(family="Consolas", size=12)
+        )
+        self.perf_text.pack(fill="both", expand=True, padx=10, pady=10)
+        self.perf_text.insert("1.0", "腳本運行後顯示各階段耗時")
+        self.perf_text.configure(state="disabled")
+        
+        perf_control_frame = ctk.CTkFrame(parent)
+        perf_control_frame.pack(fill="x", padx=10, pady=(0, 10))
+        
+        self.reset_perf_button = ctk.CTkButton(
+            perf_control_frame,
+            text="🔄 重置統計",
+            command=self.reset_perf_stats,
+            width=100,
+            height=30
+        )
+        self.reset_perf_button.pack(side="left", padx=10, pady=10)
+        
+        # 取樣剖析：對執行中的腳本線程取樣 N 秒，結果寫到 PROFILER_DIR
+        self.profile_button = ctk.CTkButton(
+            perf_control_frame,
+            text="🔬 取樣剖析",
+            command=self.start_profiling,
+            width=100,
+            height=30
+        )
+        self.profile_button.pack(side="right", padx=10, pady=10)
+        
+        self.profile_duration_var = tk.StringVar(value=str(config.PROFILER_DEFAULT_DURATION))
+        ctk.CTkEntry(
+            perf_control_frame,
+            textvariable=self.profile_duration_var,
+            width=60,
+            height=30
+        ).pack(side="right", pady=10)
+        ctk.CTkLabel(perf_control_frame, text="秒數:").pack(side="right", padx=(10, 5), pady=10)
+        
+    def update_perf_panel(self, perf_snapshot):
+        """更新效能面板（主線程呼叫，依 PERF_PANEL_REFRESH_MS 節流）"""
+        now = time.time()
+        if now - self.last_perf_panel_update < self.perf_panel_refresh:
+            return
+        self.last_perf_panel_update = now
+        
+        from core.perf_stats import get_perf_stats
+        text = get_perf_stats().format_summary(perf_snapshot)
+        self.perf_text.configure(state="normal")
+        self.perf_text.delete("1.0", tk.END)
+        self.perf_text.insert("1.0", text)
+        self.perf_text.configure(state="disabled")
+        
+    def reset_perf_stats(self):
+        """清除各階段耗時統計，重新開始計算"""
+        from core.perf_stats import get_perf_stats
+        get_perf_stats().reset()
+        self.last_perf_panel_update = 0
+        self.log("⏱️ 效能統計已重置")
+        
+    def start_profiling(self):
+        """對執行中的腳本做取樣剖析（完成時結果輸出到日誌）"""
+        if not self.script_wrapper or not self.script_running:
+            self.log("⚠️ 腳本未運行，無法剖析")
+            return
+        try:
+            duration = float(self.profile_duration_var.get())
+        except ValueError:
+            self.log("❌ 剖析秒數必須是數字")
+            return
+        if duration <= 0:
+            self.log("❌ 剖析秒數必須大於 0")
+            return
+        self.script_wrapper.start_profiling(duration)
+        
     def create_settings_section(self, parent):
         """創建設定區域"""
         # 檢查登入狀態和權限
@@ -924,33 +1022,38 @@ class MainWindow:
         self.log(f"📜 自動滾動已{status}")
         
     def log(self, message):
-        """添加日誌消息"""
-        import datetime
-        
-        # 生成時間戳
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] {message}\n"
-        
-        # 在主線程中更新UI
-        if threading.current_thread() == threading.main_thread():
-            self._update_log_text(formatted_message)
-        else:
-            self.root.after(0, self._update_log_text, formatted_message)
-            
-    def _update_log_text(self, message):
-        """更新日誌文本（主線程中執行）"""
-        self.log_text.insert(tk.END, message)
-        
-        # 自動滾動到底部
-        if self.auto_scroll_switch.get():
-            self.log_text.see(tk.END)
+        """添加日誌消息（任何線程皆可呼叫，由 _drain_log_ring 批次顯示）"""
+        self.log_ring.append(message)
             
-        # 限制日誌長度，避免內存過度使用
-        lines = self.log_text.get("1.0", tk.END).split('\n')
-        if len(lines) > 1000:  # 保留最新的1000行
-            lines_to_keep = '\n'.join(lines[-1000:])
-            self.log_text.delete("1.0", tk.END)
-            self.log_text.insert("1.0", lines_to_keep)
+    def _drain_log_ring(self):
+        """定時取出新日誌，一次插入日誌視窗；視窗只保留最新的 log_view_max_lines 行"""
+        try:
+            records = self.log_reader.drain()
+            missed = self.log_reader.take_missed()
+            if records or missed:
+                # 本批超過視窗容量時，只需要插入最後能顯示的部分
+                records = records[-self.log_view_max_lines:]
+                lines = [
+                    f"[{datetime.datetime.fromtimestamp(record.time).strftime('%H:%M:%S')}] {record.message}\n"
+                    for record in records
+                ]
+                if missed:
+                    lines.insert(0, f"⚠️ 日誌顯示跟不上，略過 {missed} 則\n")
+                self.log_text.insert(tk.END, ''.join(lines))
+
+                # 刪除超出的舊行（依行號，不需要讀出整個內容）
+                line_count = int(self.log_text.index("end-1c").split('.')[0])
+                excess = line_count - self.log_view_max_lines
+                if excess > 0:
+                    self.log_text.delete("1.0", f"{excess + 1}.0")
+
+                # 自動滾動到底部
+                if self.auto_scroll_switch.get():
+                    self.log_text.see(tk.END)
+        except Exception as e:
+            print(f"更新日誌錯誤: {str(e)}")
+        finally:
+            self.root.after(self.log_drain_interval, self._drain_log_ring)
             
     def update_status(self, status):
         """更新狀態欄"""
@@ -45,10 +45,13 @@ def security_check():
             try:
                 import datetime
                 import platform
+                import config
+                from core.logger import append_capped_log
                 
                 log_entry = f"[{datetime.datetime.now()}] 未授權訪問嘗試 - {platform.node()}\n"
-                with open("security_violations.log", "a") as f:
-                    f.write(log_entry)
+                # ★★★ 新增：超過大小時輪替，重複的嘗試不會讓日誌無限增長 ★★★
+                append_capped_log("security_violations.log", log_entry,
+                                  config.LOG_FILE_MAX_BYTES, config.LOG_FILE_BACKUPS)
             except:
                 pass
             
@@ -98,6 +101,9 @@ from core.monster_detector import SimplifiedMonsterDetector
 from core.rope_climbing import RopeClimbing
 from core.rune_mode import RuneMode
 from core.red_dot_detector import RedDotDetector
+from core.minimap_locator import MinimapLocator
+from core.background_model import BackgroundModel
+from core.image_processor import ImageProcessor
 
 # 導入認證裝飾器
 from core.auth_manager import require_authentication
@@ -231,10 +237,34 @@ def initialize_components(templates, screen_region):
     components['cliff_detection'] = CliffDetection()
     components['rune_mode'] = RuneMode()
 
+    # ★★★ 新增：小地圖定位模式 ★★★
+    if PLAYER_LOCALIZATION_MODE == 'minimap':
+        components['player_locator'] = MinimapLocator()
+        components['player_locator'].configure(MINIMAP_REFINE_HALF_WIDTH, MINIMAP_REFINE_HALF_HEIGHT)
+        print("✅ 小地圖定位模式已啟用")
+    else:
+        components['player_locator'] = None
+    components['search'].set_player_locator(components['player_locator'])
+
+    # ★★★ 新增：背景模型（前景區塊內才做怪物匹配）★★★
+    if ENABLE_BACKGROUND_MODEL:
+        components['background_model'] = BackgroundModel(BACKGROUND_MODEL_MAP, BACKGROUND_MODEL_DIR)
+        components['background_model'].load()
+        print(f"✅ 背景模型已啟用 (地圖: {BACKGROUND_MODEL_MAP})")
+    else:
+        components['background_model'] = None
+
     # ★★★ 添加被動技能管理器 ★★★
     from core.passive_skills_manager import PassiveSkillsManager
     components['passive_skills'] = PassiveSkillsManager()
     
+    # ★★★ 新增：非同步檢測後端 ★★★
+    if ENABLE_ASYNC_DETECTION:
+        components['image_processor'] = ImageProcessor(IMAGE_PROCESSOR_POOL_SIZES, ASYNC_RESULT_MAX_AGE)
+        components['image_processor'].start(components, templates)
+    else:
+        components['image_processor'] = None
+
     # 初始化紅點偵測器
     if ENABLE_RED_DOT_DETECTION and templates.get('red') is not None:
         components['red_dot_detector'] = RedDotDetector()
@@ -279,226 +309,63 @@ def setup_game_window():
 
 @require_authentication()
 def main_loop(window_info, templates, components):
-    """主要遊戲循環 - 帶認證檢查"""
-    
-    # 認證管理器
-    from core.auth_manager import get_auth_manager
-    auth_manager = get_auth_manager()
-    
-    # 定期認證檢查
-    last_auth_check = time.time()
-    auth_check_interval = 300  # 每5分鐘檢查一次
-    
-    player_x = window_info['client_width'] // 2
-    player_y = window_info['client_height'] // 2
-    last_monster_detection_time = 0
-    last_rope_detection_time = 0
-    rope_detection_interval = 1.0
-    
-    # 怪物清理狀態追踪
-    no_monster_time = 0
-    required_clear_time = 1.5
-    
-    is_attacking = False
-    attack_end_time = 0
-    
-    # 性能統計
-    loop_count = 0
-    stats_print_interval = 300
-    last_stats_time = time.time()
+    """主要遊戲循環 - 帶認證檢查（邏輯由 core.engine.Engine 提供，與 GUI 共用）"""
+    from core.engine import Engine
 
+    engine = Engine(window_info, templates, components)
     print("🎮 主循環開始執行（安全版本）")
+    engine.run()
 
-    while True:
-        current_time = time.time()
-        loop_count += 1
-        
-        # ============================================================================
-        # 主循環邏輯
-        # ============================================================================
-        
-        screenshot = capture_screen(window_info['screen_region'])
-
-        if screenshot is not None:
-            # 紅點偵測檢查
-            if components.get('red_dot_detector') is not None:
-                should_change_channel = components['red_dot_detector'].handle_red_dot_detection(
-                    screenshot, window_info['client_width'], window_info['client_height']
-                )
-                
-                if should_change_channel:
-                    print("🚨 紅點偵測觸發換頻邏輯！")
-                    from core.utils import execute_channel_change
-                    
-                    components['movement'].stop()
-                    if components['rune_mode'].is_active:
-                        components['rune_mode'].exit()
-                    if components['rope_climbing'].is_climbing:
-                        components['rope_climbing'].stop_climbing()
-                    
-                    execute_channel_change(window_info['screen_region'], templates['change'])
-                    time.sleep(2)
-                    continue
-            
-            # 如果不在特殊模式中
-            if not components['rune_mode'].is_active and not components['rope_climbing'].is_climbing:
-                # 檢測 sign_text
-                sign_found, sign_loc, sign_val = detect_sign_text(screenshot, templates['sign'])
-                if sign_found:
-                    print(f"檢測到 sign_text (匹配度 {sign_val:.2f})，進入 Rune 模式")
-                    components['rune_mode'].enter()
-                    components['movement'].stop()
-                    continue
-                
-                # 直接檢測 rune_text
-                rune_found, rune_loc, rune_val = simple_find_medal(screenshot, templates['rune'], MATCH_THRESHOLD)
-                if rune_found:
-                    print(f"直接檢測到 rune_text (匹配度 {rune_val:.2f})，立即進入 Rune 模式")
-                    components['rune_mode'].enter()
-                    components['movement'].stop()
-                    continue
-
-                # 角色檢測
-                medal_found, medal_loc, match_val = simple_find_medal(screenshot, templates['medal'], MATCH_THRESHOLD)
-                if medal_found:
-                    template_height, template_width = templates['medal'].shape[:2]
-                    player_x = medal_loc[0] + template_width // 2
-                    player_y = medal_loc[1] + template_height // 2 - Y_OFFSET
-                    components['search'].last_medal_found_time = time.time()
-                    components['search'].medal_lost_count = 0
-
-                    # 怪物檢測
-                    monster_found = False
-                    if not components['search'].is_searching and current_time - last_monster_detection_time >= DETECTION_INTERVAL:
-                        monster_found = components['monster_detector'].detect_monsters(
-                            screenshot, player_x, player_y, window_info['client_width'], window_info['client_height'], 
-                            components['movement'], components['cliff_detection'], window_info['client_x'], window_info['client_y']
-                        )
-                        last_monster_detection_time = current_time
-                        
-                        if monster_found:
-                            is_attacking = True
-                            attack_end_time = current_time + 0.2  # 假設攻擊持續0.5秒
-
-                    # 更新攻擊狀態
-                    if is_attacking and current_time > attack_end_time:
-                        is_attacking = False
-                    
-                    # 怪物清理狀態追踪
-                    if monster_found:
-                        no_monster_time = current_time
-                    else:
-                        if no_monster_time == 0:
-                            no_monster_time = current_time
-                        
-                        time_without_monsters = current_time - no_monster_time
-                        
-                        # 繩索檢測
-                        if (time_without_monsters >= required_clear_time and 
-                            current_time - last_rope_detection_time >= rope_detection_interval):
-                            
-                            rope_found, rope_x, rope_y = components['rope_climbing'].detect_rope(
-                                screenshot, player_x, player_y, 
-                                window_info['client_width'], window_info['client_height']
-                            )
-                            last_rope_detection_time = current_time
-                            
-                            if rope_found:
-                                print("✅ 區域已清理乾淨，檢測到繩索，開始爬繩邏輯")
-                                components['movement'].stop()
-                                components['rope_climbing'].start_climbing(rope_x, rope_y, player_x, player_y)
-                                no_monster_time = 0
-                                continue
-
-                    # 隨機移動
-                    if not monster_found and not components['movement'].is_moving:
-                        components['movement'].start(
-                            screenshot, player_x, player_y, 
-                            window_info['client_width'], window_info['client_height'], 
-                            components['monster_detector']
-                        )
-                        
-                else:
-                    no_monster_time = 0
-                    
-                    # 搜尋角色
-                    components['search'].medal_lost_count += 1
-                    if components['search'].medal_lost_count >= 5 and not components['search'].is_searching:
-                        search_found, search_loc, search_screenshot = components['search'].search_for_medal(
-                            window_info['screen_region'], templates['medal'], MATCH_THRESHOLD, components['movement']
-                        )
-
-                # 移動中的斷層檢測
-                if components['movement'].is_moving and medal_found:
-                    components['cliff_detection'].check(
-                        current_time, screenshot, player_x, player_y, 
-                        window_info['client_width'], window_info['client_height'], 
-                        templates['medal'], components['movement'].direction, 
-                        window_info['client_x'], window_info['client_y']
-                    )
-
-            elif components['rope_climbing'].is_climbing:
-                # 爬繩邏輯
-                medal_found, medal_loc, match_val = simple_find_medal(screenshot, templates['medal'], MATCH_THRESHOLD)
-                if medal_found:
-                    template_height, template_width = templates['medal'].shape[:2]
-                    player_x = medal_loc[0] + template_width // 2
-                    player_y = medal_loc[1] + template_height // 2 - Y_OFFSET
-                
-                components['rope_climbing'].update_climbing(
-                    screenshot, player_x, player_y, 
-                    window_info['client_width'], window_info['client_height'], 
-                    templates['medal'], window_info['client_x'], window_info['client_y']
-                )
-
-            elif components['rune_mode'].is_active:
-                # rune模式邏輯
-                components['rune_mode'].handle(
-                    screenshot, window_info['screen_region'], 
-                    templates['medal'], templates['rune'], 
-                    templates['direction'], templates['direction_masks'], 
-                    window_info['client_width'], window_info['client_height'], 
-                    components['search'], components['cliff_detection'], 
-                    window_info['client_x'], window_info['client_y'], 
-                    components['movement'], templates['change']
-                )
-
-        # 移動狀態更新
-        movement_completed = components['movement'].update()
-        if (movement_completed and not components['search'].is_searching and 
-            components['search'].medal_lost_count == 0 and 
-            not components['rune_mode'].is_active and 
-            not components['rope_climbing'].is_climbing):
-            components['movement'].transition(
-                screenshot, player_x, player_y, 
-                window_info['client_width'], window_info['client_height'], 
-                components['monster_detector']
-            )
-
-        # 定期統計信息
-        if current_time - last_stats_time >= stats_print_interval:
-            print("\n" + "="*60)
-            print(f"📊 運行統計 (循環次數: {loop_count})")
-            
-            from core.utils import get_attack_key_info
-            attack_info = get_attack_key_info()
-            if attack_info['secondary_enabled']:
-                print(f"🎯 攻擊按鍵: {attack_info['primary_key']}({attack_info['primary_chance']*100:.0f}%), {attack_info['secondary_key']}({attack_info['secondary_chance']*100:.0f}%)")
-            else:
-                print(f"🎯 攻擊按鍵: {attack_info['primary_key']} (僅主要攻擊)")
-            
-            print("="*60 + "\n")
-            last_stats_time = current_time
 
-        # ★★★ 被動技能檢查 - 放在主循環的最後，不會影響核心邏輯 ★★★
-        if components.get('passive_skills'):
-            components['passive_skills'].check_and_use_skills()
+@require_authentication()
+def run_pipeline(window_info, templates, components):
+    """管線模式 - 截圖、檢測、決策、按鍵分別在獨立線程執行"""
+    from core.pipeline import PipelineEngine
+
+    engine = PipelineEngine(window_info, templates, components, PIPELINE_DETECTION_WORKERS)
+    print("🎮 管線模式開始執行（安全版本）")
+    engine.run()
+
 
-        time.sleep(DETECTION_INTERVAL)
+@require_authentication()
+def run_async_engine(window_info, templates, components):
+    """非同步模式 - 長時間行為以協程執行，紅點偵測與被動技能不會被阻塞"""
+    from core.async_engine import AsyncEngine
+
+    engine = AsyncEngine(window_info, templates, components, ASYNC_ENGINE_BLOCKING_WORKERS)
+    print("🎮 非同步模式開始執行（安全版本）")
+    engine.run()
+
+
+@require_authentication()
+def run_multi_client(templates):
+    """多開模式 - 一個程序驅動所有遊戲視窗，模板與檢測工作線程共用，按鍵各自送到自己的視窗"""
+    from core.multi_client import (TemplateBank, MultiClientSupervisor, WindowFrameSource,
+                                   ReplayFrameSource, find_game_windows)
+
+    bank = TemplateBank.load(templates)
+    supervisor = MultiClientSupervisor(bank, MULTI_CLIENT_WORKERS)
+
+    if MULTI_CLIENT_REPLAY_SOURCES:
+        for path in MULTI_CLIENT_REPLAY_SOURCES:
+            supervisor.add_client(ReplayFrameSource(path), client_id=os.path.basename(path.rstrip(os.sep)))
+    else:
+        windows = find_game_windows(WINDOW_NAME)
+        if not windows:
+            raise ValueError(f"找不到遊戲視窗: {WINDOW_NAME}")
+        for window_info in windows:
+            supervisor.add_client(WindowFrameSource(window_info), client_id=f"hwnd-{window_info['hwnd']}")
+
+    print("🎮 多開模式開始執行（安全版本）")
+    try:
+        supervisor.run()
+    finally:
+        supervisor.print_stats()
 
 
 def main():
     """主函數 - 安全增強版"""
+    components = None
     try:
         print("🔐 Artale Script 安全增強版本啟動")
         print("✅ 認證驗證已通過，開始初始化...")
@@ -515,12 +382,22 @@ def main():
         except ImportError:
             print("⚠️ 配置保護模組未找到，跳過完整性檢查")
         
+        # ★★★ 新增：本機監控指標端點（Prometheus 文字格式）★★★
+        if ENABLE_METRICS:
+            from core.metrics import start_metrics_server
+            start_metrics_server()
+
         # 驗證攻擊按鍵配置
         print("\n🔍 驗證攻擊按鍵配置...")
         from core.utils import validate_attack_key_config
         attack_warnings = validate_attack_key_config()
         for warning in attack_warnings:
             print(f"   {warning}")
+
+        # ★★★ 新增：多開模式自行列舉所有遊戲視窗，不走單一視窗流程 ★★★
+        if ENGINE_MODE == 'multi':
+            run_multi_client(load_templates())
+            return
         
         # 設置遊戲視窗
         window_info = setup_game_window()
@@ -574,11 +451,33 @@ def main():
         print("🔐 會話將定期驗證，確保持續授權")
         print("="*60)
         
+        # ★★★ 新增：長時間運行模式（緩衝池 + 定期記憶體報告）★★★
+        if ENABLE_LONG_RUN_MODE:
+            from core.long_run import start_long_run_mode
+            start_long_run_mode()
+
         # 開始主循環
-        main_loop(window_info, templates, components)
+        if ENGINE_MODE == 'pipeline':
+            run_pipeline(window_info, templates, components)
+        elif ENGINE_MODE == 'async':
+            run_async_engine(window_info, templates, components)
+        else:
+            main_loop(window_info, templates, components)
 
     except KeyboardInterrupt:
         print("\n腳本已終止")
+        # 儲存背景模型，下次啟動立即可用
+        if components and components.get('background_model') is not None:
+            components['background_model'].save()
+        if components and components.get('image_processor') is not None:
+            components['image_processor'].stop()
+        # 放開按鍵執行器仍按住的按鍵
+        from core.input_actuator import get_input_actuator
+        get_input_actuator().release_all()
+        # 寫出最後一筆記憶體報告
+        if ENABLE_LONG_RUN_MODE:
+            from core.long_run import stop_long_run_mode
+            stop_long_run_mode()
         # 清理認證令牌
         from core.auth_manager import get_auth_manager
         get_auth_manager().clear_session()
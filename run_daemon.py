@@ -0,0 +1,44 @@
+"""
+Artale Script 無介面常駐模式啟動器 - 不載入 GUI，透過本機 JSON-RPC 控制埠操作
+
+    python run_daemon.py --autostart
+    python scripts/daemon_ctl.py stats
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# 確保專案根目錄在 Python 路徑中
+project_root = Path(__file__).parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+def main():
+    import config
+    from core.daemon import DaemonController, DaemonServer
+
+    parser = argparse.ArgumentParser(description="Artale Script 無介面常駐模式")
+    parser.add_argument('--host', default=config.DAEMON_HOST, help="控制埠位址（預設只接受本機連線）")
+    parser.add_argument('--port', type=int, default=config.DAEMON_PORT)
+    parser.add_argument('--token', default=config.DAEMON_TOKEN, help="設定後每個請求都必須附上相同的 token")
+    parser.add_argument('--autostart', action='store_true', help="啟動後立即執行腳本")
+    args = parser.parse_args()
+
+    # 與 main.py 相同的工作目錄（認證會話檔案以此為準）
+    os.chdir(config.WORKING_DIR)
+
+    controller = DaemonController()
+    server = DaemonServer(controller, args.host, args.port, args.token)
+    if args.autostart:
+        controller.start_script()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n常駐模式已終止")
+
+
+if __name__ == "__main__":
+    main()
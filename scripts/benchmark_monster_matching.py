@@ -0,0 +1,174 @@
+"""
+怪物匹配基準測試工具 - 比較 ccoeff 與 chamfer 兩種模式的速度、召回率與誤判率
+
+背景分三種：noise（模糊雜訊 + 12 條線，最容易）、clutter（大量線條、方塊、圓與文字，
+邊緣密度接近實際地圖）、frames（--frames 指定錄製的畫面資料夾，隨機裁切）。
+誤判率只在 clutter / frames 上有參考價值，比較兩種模式時請以這兩種背景為準。
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 無顯示器（Linux、CI）時換上 pyautogui / keyboard 替代模組，必須在 import core.* 之前
+from tests.headless import install_headless_backends
+install_headless_backends()
+
+from core.monster_detector import SimplifiedMonsterDetector
+from core.utils import preprocess_screenshot
+from tests.synthetic_scenes import add_clutter
+
+
+def load_templates(monster_dir):
+    """載入資料夾（含子資料夾）內的所有怪物圖片"""
+    templates = []
+    for root, _, files in os.walk(monster_dir):
+        for name in sorted(files):
+            if name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.webp')):
+                template = cv2.imread(os.path.join(root, name), cv2.IMREAD_COLOR)
+                if template is not None:
+                    templates.append(template)
+    return templates
+
+
+def load_frames(frames_dir):
+    """載入錄製的畫面（FrameRecorder 輸出的資料夾）"""
+    frames = []
+    for name in sorted(os.listdir(frames_dir)):
+        if name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+            frame = cv2.imread(os.path.join(frames_dir, name), cv2.IMREAD_COLOR)
+            if frame is not None:
+                frames.append(frame)
+    return frames
+
+
+def make_background(rng, size, kind, frames=None):
+    if kind == 'frames':
+        frame = frames[int(rng.integers(0, len(frames)))]
+        y = int(rng.integers(0, frame.shape[0] - size + 1))
+        x = int(rng.integers(0, frame.shape[1] - size + 1))
+        return frame[y:y + size, x:x + size].copy()
+
+    noise = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+    scene = cv2.GaussianBlur(noise, (0, 0), 4)
+    if kind == 'clutter':
+        add_clutter(rng, scene, 150)
+        return scene
+    for _ in range(12):
+        p1 = tuple(int(v) for v in rng.integers(0, size, 2))
+        p2 = tuple(int(v) for v in rng.integers(0, size, 2))
+        color = tuple(int(v) for v in rng.integers(0, 255, 3))
+        cv2.line(scene, p1, p2, color, int(rng.integers(1, 4)))
+    return scene
+
+
+def make_scene(rng, size, template=None, kind='noise', frames=None):
+    """產生指定背景的畫面，可選擇貼上一個怪物"""
+    scene = make_background(rng, size, kind, frames)
+
+    loc = None
+    if template is not None:
+        th, tw = template.shape[:2]
+        x = int(rng.integers(0, size - tw))
+        y = int(rng.integers(0, size - th))
+        scene[y:y + th, x:x + tw] = template
+        loc = (x, y)
+    return scene, loc
+
+
+def run_mode(detector, mode, scenes, tolerance):
+    detector.match_mode = mode
+    hits = 0
+    false_alarms = 0
+    positives = 0
+    negatives = 0
+    elapsed = 0.0
+
+    for scene, template_index, loc in scenes:
+        # 與 detect_monsters 相同：每個 tick 做一次邊緣（與距離轉換），再逐一比對所有模板
+        start = time.perf_counter()
+        edges = preprocess_screenshot(scene)
+        if mode == 'chamfer':
+            distance_map = detector.compute_distance_map(edges)
+        results = []
+        for index, template_edges in enumerate(detector.monster_templates_edges):
+            if mode == 'chamfer':
+                results.append(detector._chamfer_match(distance_map, edges, index))
+            else:
+                result = cv2.matchTemplate(edges, template_edges, cv2.TM_CCOEFF_NORMED)
+                _, max_val, _, max_loc = cv2.minMaxLoc(result)
+                results.append((max_val, max_loc))
+        elapsed += time.perf_counter() - start
+
+        threshold = detector.get_match_threshold(False)
+        if loc is None:
+            # 與 detect_monsters 相同：任何一個模板超過閾值就會攻擊
+            negatives += 1
+            false_alarms += int(any(score > threshold for score, _ in results))
+        else:
+            positives += 1
+            score, found_loc = results[template_index]
+            close = abs(found_loc[0] - loc[0]) <= tolerance and abs(found_loc[1] - loc[1]) <= tolerance
+            hits += int(score > threshold and close)
+
+    return {
+        'ms_per_tick': elapsed * 1000 / max(1, len(scenes)),
+        'recall': hits / max(1, positives),
+        'false_alarm_rate': false_alarms / max(1, negatives),
+    }
+
+
+def main():
+    from config import MONSTER_BASE_PATH
+
+    parser = argparse.ArgumentParser(description="怪物匹配模式基準測試")
+    parser.add_argument('--monsters', default=MONSTER_BASE_PATH, help="怪物圖片資料夾")
+    parser.add_argument('--scenes', type=int, default=40, help="合成畫面數量")
+    parser.add_argument('--size', type=int, default=450, help="檢測區域邊長（像素）")
+    parser.add_argument('--tolerance', type=int, default=8, help="位置誤差容許值（像素）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--frames', default=None, help="錄製的畫面資料夾（另外以實際畫面為背景測試）")
+    args = parser.parse_args()
+
+    templates = [t for t in load_templates(args.monsters) if max(t.shape[:2]) < args.size]
+    if not templates:
+        print(f"❌ 找不到怪物圖片: {args.monsters}")
+        return
+
+    detector = SimplifiedMonsterDetector()
+    detector.setup_templates(templates)
+
+    kinds = ['noise', 'clutter']
+    frames = None
+    if args.frames:
+        frames = [f for f in load_frames(args.frames) if min(f.shape[:2]) >= args.size]
+        if frames:
+            kinds.append('frames')
+        else:
+            print(f"⚠️ 找不到大於 {args.size}x{args.size} 的錄製畫面: {args.frames}")
+
+    print(f"\n📊 {len(templates)} 個模板, 每種背景 {args.scenes} 張 {args.size}x{args.size} 畫面")
+    for kind in kinds:
+        rng = np.random.default_rng(args.seed)
+        scenes = []
+        for i in range(args.scenes):
+            template_index = int(rng.integers(0, len(templates)))
+            # 每 4 張畫面放一張沒有怪物的畫面，用來估計誤判率
+            with_monster = i % 4 != 3
+            scene, loc = make_scene(rng, args.size, templates[template_index] if with_monster else None,
+                                    kind, frames)
+            scenes.append((scene, template_index, loc))
+
+        for mode in ('ccoeff', 'chamfer'):
+            stats = run_mode(detector, mode, scenes, args.tolerance)
+            print(f"{kind:>8} {mode:>8}: {stats['ms_per_tick']:.1f} ms/tick, "
+                  f"召回率 {stats['recall']:.0%}, 誤判率 {stats['false_alarm_rate']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+多開模式吞吐量測試工具 - 以重播畫面模擬多個客戶端，比較不同工作線程數的總吞吐量（可在 Linux 執行）
+"""
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 無顯示器（Linux、CI）時換上 pyautogui / keyboard 替代模組，必須在 import core.* 之前
+from tests.headless import install_headless_backends
+install_headless_backends()
+
+from core.multi_client import TemplateBank, MultiClientSupervisor, ReplayFrameSource
+
+
+def load_basic_templates():
+    """載入檢測需要的基本模板（不經過 main.py 的認證流程）"""
+    from config import MEDAL_PATH, SIGN_PATH, RUNE_PATH
+
+    templates = {
+        'medal': cv2.imread(MEDAL_PATH, cv2.IMREAD_COLOR),
+        'sign': cv2.imread(SIGN_PATH, cv2.IMREAD_COLOR),
+        'rune': cv2.imread(RUNE_PATH, cv2.IMREAD_COLOR),
+        'red': None,
+        'change': {},
+        'direction': {},
+        'direction_masks': {},
+    }
+    missing = [name for name in ('medal', 'sign', 'rune') if templates[name] is None]
+    if missing:
+        raise ValueError(f"無法載入模板: {missing}")
+    return templates
+
+
+def make_frames(rng, count, width, height, medal):
+    """產生貼上角色圖示的合成畫面"""
+    frames = []
+    mh, mw = medal.shape[:2]
+    for _ in range(count):
+        noise = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        frame = cv2.GaussianBlur(noise, (0, 0), 3)
+        x = int(rng.integers(0, width - mw))
+        y = int(rng.integers(height // 2, height - mh))
+        frame[y:y + mh, x:x + mw] = medal
+        frames.append(frame)
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多開模式吞吐量測試")
+    parser.add_argument('--sources', nargs='*', default=[], help="重播來源（圖片資料夾或影片檔），未指定時使用合成畫面")
+    parser.add_argument('--clients', type=int, default=3, help="未指定來源時的合成客戶端數量")
+    parser.add_argument('--frames', type=int, default=20, help="每個合成客戶端的畫面數")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="要比較的工作線程數")
+    parser.add_argument('--duration', type=float, default=5.0, help="每組測試秒數")
+    parser.add_argument('--monsters', nargs='*', default=None, help="怪物名稱（預設為怪物資料夾下全部）")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import config
+    if args.monsters is not None:
+        config.ENABLED_MONSTERS = args.monsters
+    elif os.path.isdir(config.MONSTER_BASE_PATH):
+        config.ENABLED_MONSTERS = sorted(os.listdir(config.MONSTER_BASE_PATH))
+
+    templates = load_basic_templates()
+    bank = TemplateBank.load(templates)
+
+    rng = np.random.default_rng(args.seed)
+    if args.sources:
+        sources = [ReplayFrameSource(path) for path in args.sources]
+        frame_sets = [source.frames for source in sources]
+    else:
+        frame_sets = [make_frames(rng, args.frames, args.width, args.height, templates['medal'])
+                      for _ in range(args.clients)]
+
+    print(f"\n📊 {len(frame_sets)} 個客戶端, 每組 {args.duration:.0f} 秒")
+    for workers in args.workers:
+        supervisor = MultiClientSupervisor(bank, workers)
+        for index, frames in enumerate(frame_sets, 1):
+            supervisor.add_client(ReplayFrameSource(frames=frames), client_id=f"replay-{index}", frame_interval=0.0)
+        supervisor.run(duration=args.duration)
+        stats = supervisor.get_stats()
+        per_client = ', '.join(f"{cid} {c['tick']['count'] / stats['elapsed']:.1f}/秒"
+                               for cid, c in stats['clients'].items())
+        print(f"{workers:>2} 個工作線程: 總計 {stats['ticks_per_second']:.1f} tick/秒 ({per_client}), 錯誤 {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
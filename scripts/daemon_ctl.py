@@ -0,0 +1,98 @@
+"""
+常駐模式控制工具 - 對 run_daemon.py 的控制埠送出命令
+
+    python scripts/daemon_ctl.py start
+    python scripts/daemon_ctl.py update_config DETECTION_INTERVAL=0.05 ENABLE_RED_DOT_DETECTION=false
+    python scripts/daemon_ctl.py start_recording
+    python scripts/daemon_ctl.py logs --limit 50
+    python scripts/daemon_ctl.py perf
+    python scripts/daemon_ctl.py latency --limit 10
+    python scripts/daemon_ctl.py start_profiling --duration 15
+    python scripts/daemon_ctl.py profile
+    python scripts/daemon_ctl.py memory
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.daemon import rpc_call
+
+
+def parse_assignments(pairs):
+    """KEY=VALUE 轉成設定字典；VALUE 以 JSON 解析，失敗時視為字串"""
+    updates = {}
+    for pair in pairs:
+        key, sep, value = pair.partition('=')
+        if not sep:
+            raise ValueError(f"設定格式應為 KEY=VALUE: {pair}")
+        try:
+            updates[key] = json.loads(value)
+        except ValueError:
+            updates[key] = value
+    return updates
+
+
+def main():
+    import config
+
+    parser = argparse.ArgumentParser(description="常駐模式控制工具")
+    parser.add_argument('method', help="start / stop / status / stats / perf / latency / update_config / "
+                                       "start_recording / stop_recording / start_profiling / stop_profiling / "
+                                       "profile / memory / logs / shutdown")
+    parser.add_argument('args', nargs='*', help="update_config 的 KEY=VALUE")
+    parser.add_argument('--host', default=config.DAEMON_HOST)
+    parser.add_argument('--port', type=int, default=config.DAEMON_PORT)
+    parser.add_argument('--token', default=config.DAEMON_TOKEN)
+    parser.add_argument('--limit', type=int, default=None, help="logs 返回的行數（預設 100）/ latency 列出的 trace 數（預設 20）")
+    parser.add_argument('--output-dir', default=None, help="start_recording 的輸出資料夾")
+    parser.add_argument('--interval', type=float, default=None, help="start_recording 的截圖間隔（秒）")
+    parser.add_argument('--reset', action='store_true', help="perf 輸出後清除統計")
+    parser.add_argument('--duration', type=float, default=None, help="start_profiling 的剖析秒數")
+    args = parser.parse_args()
+
+    params = {}
+    if args.method == 'update_config':
+        params = {'config': parse_assignments(args.args)}
+    elif args.method == 'logs':
+        params = {'limit': args.limit if args.limit is not None else 100}
+    elif args.method == 'latency':
+        params = {'limit': args.limit if args.limit is not None else 20}
+    elif args.method == 'start_recording':
+        params = {'output_dir': args.output_dir, 'interval': args.interval}
+    elif args.method == 'perf':
+        params = {'reset': args.reset}
+    elif args.method == 'start_profiling':
+        params = {'duration': args.duration}
+
+    response = rpc_call(args.method, params, args.host, args.port, args.token)
+    if 'error' in response:
+        print(f"❌ {response['error']['message']} ({response['error']['code']})")
+        sys.exit(1)
+
+    result = response['result']
+    if args.method == 'logs':
+        for entry in result:
+            print(entry['message'])
+    elif args.method == 'perf':
+        print(result['summary'])
+    elif args.method == 'latency':
+        for trace in result['stats']['recent']:
+            parts = ', '.join(f"{name} {ms:.1f}" for name, ms in trace['breakdown_ms'].items())
+            print(f"   trace {trace['trace_id']}: {parts} (ms)")
+        print(result['summary'])
+    elif args.method == 'profile' and result.get('profiling'):
+        print(f"🔬 剖析中: {result['elapsed']:.1f} / {result['duration']:.0f} 秒, 已取樣 {result['samples']} 筆")
+    elif args.method == 'profile' and result.get('summary'):
+        print(result['summary'])
+    elif args.method == 'memory' and result.get('summary'):
+        print(result['summary'])
+        print(f"   報告: {result['report_path']}")
+    else:
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
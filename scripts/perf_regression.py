@@ -0,0 +1,178 @@
+"""
+效能回歸檢查工具 - 以固定畫面集量測檢測 / 決策熱路徑，與基準 JSON 比較，退化時返回碼 1（可在 Linux 執行）
+
+    python scripts/perf_regression.py                               # 合成畫面，與 perf_baseline.json 比較
+    python scripts/perf_regression.py --replay assets/game_resources/recordings/xxx
+    python scripts/perf_regression.py --update-baseline             # 以本次結果覆寫基準
+    python scripts/perf_regression.py --output result.json          # 比較結果另存為 JSON
+
+返回碼：0 = 通過, 1 = 有階段退化, 2 = 無法執行（缺少基準、模板載入或 import 失敗等）
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import traceback
+
+import cv2
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def load_templates():
+    """載入檢測需要的模板（與 main.load_templates 相同的處理，不經過認證流程）"""
+    from config import ASSETS_DIR, MEDAL_PATH, SIGN_PATH, RUNE_PATH
+
+    templates = {
+        'medal': cv2.imread(MEDAL_PATH, cv2.IMREAD_COLOR),
+        'rune': cv2.imread(RUNE_PATH, cv2.IMREAD_COLOR),
+        'red': None,
+        'change': {},
+        'direction': {},
+        'direction_masks': {},
+    }
+    sign = cv2.imread(SIGN_PATH, cv2.IMREAD_UNCHANGED)
+    if sign is not None and sign.shape[2] == 4:
+        rgb, alpha = sign[:, :, :3], sign[:, :, 3]
+        sign = np.where(alpha[:, :, np.newaxis] == 0, np.zeros_like(rgb), rgb)
+    templates['sign'] = sign
+
+    missing = [name for name in ('medal', 'sign', 'rune') if templates[name] is None]
+    if missing:
+        raise ValueError(f"無法載入模板: {missing}")
+
+    direction_folder = os.path.join(ASSETS_DIR, 'Detection')
+    if os.path.isdir(direction_folder):
+        for file_name in sorted(os.listdir(direction_folder)):
+            if file_name.endswith('.bmp'):
+                template = cv2.imread(os.path.join(direction_folder, file_name), cv2.IMREAD_COLOR)
+                if template is not None:
+                    gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+                    _, mask = cv2.threshold(gray, 254, 255, cv2.THRESH_BINARY_INV)
+                    templates['direction'][file_name.split('.')[0]] = template
+                    templates['direction_masks'][file_name.split('.')[0]] = mask
+    return templates
+
+
+def make_synthetic_frames(count, seed):
+    """固定 seed 的合成畫面：近距怪物、遠距怪物與方向符號各一部分（與 tests/ 的檢測基準相同的產生器）"""
+    from tests import synthetic_scenes as scenes
+
+    scene_list = (scenes.make_monster_scenes(count // 2, seed) +
+                  scenes.make_scan_scenes(count // 4, seed + 1) +
+                  scenes.make_direction_scenes(count - count // 2 - count // 4, seed + 2))
+    return [scene.image for scene in scene_list]
+
+
+def synthetic_window_info():
+    from tests.synthetic_scenes import FRAME_HEIGHT, FRAME_WIDTH
+
+    return {
+        'hwnd': None,
+        'client_rect': (0, 0, FRAME_WIDTH, FRAME_HEIGHT),
+        'client_width': FRAME_WIDTH,
+        'client_height': FRAME_HEIGHT,
+        'client_x': 0,
+        'client_y': 0,
+        'screen_region': (0, 0, FRAME_WIDTH, FRAME_HEIGHT),
+    }
+
+
+def run(args):
+    """量測並比較，返回 (返回碼, RegressionReport 或 None)；0 = 通過, 1 = 有階段退化, 2 = 無法執行"""
+    import config
+    from core.multi_client import TemplateBank, ReplayFrameSource
+    from core.perf_regression import (build_workloads, compare_to_baseline, environment_info, load_baseline,
+                                      make_baseline, run_workloads, save_baseline)
+
+    baseline_path = args.baseline or config.PERF_BASELINE_PATH
+    tolerance = config.PERF_REGRESSION_TOLERANCE if args.tolerance is None else args.tolerance
+    min_delta_ms = config.PERF_REGRESSION_MIN_DELTA_MS if args.min_delta_ms is None else args.min_delta_ms
+
+    # 載入怪物資料夾下全部怪物，結果不受目前 ENABLED_MONSTERS 設定影響
+    if os.path.isdir(config.MONSTER_BASE_PATH):
+        config.ENABLED_MONSTERS = sorted(os.listdir(config.MONSTER_BASE_PATH))
+    templates = load_templates()
+    bank = TemplateBank.load(templates)
+
+    frame_sets = []
+    if args.synthetic > 0:
+        frame_sets.append(('synthetic', make_synthetic_frames(args.synthetic, args.seed), synthetic_window_info()))
+    for path in args.replay:
+        source = ReplayFrameSource(path)
+        name = 'replay.' + os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+        frame_sets.append((name, source.frames[:args.max_frames], source.window_info))
+    if not frame_sets:
+        print("❌ 沒有任何畫面集（--synthetic 0 且未指定 --replay）")
+        return 2, None
+
+    workloads = []
+    for name, frames, window_info in frame_sets:
+        print(f"📊 畫面集 {name}: {len(frames)} 張 {window_info['client_width']}x{window_info['client_height']}")
+        workloads += build_workloads(name, frames, templates, bank.build_components(), window_info)
+    results = run_workloads(workloads, repeat=args.repeat)
+
+    info = environment_info()
+    info['frame_sets'] = {name: len(frames) for name, frames, _ in frame_sets}
+    info['seed'] = args.seed
+    info['repeat'] = args.repeat
+
+    if args.update_baseline:
+        save_baseline(baseline_path, make_baseline(results, info))
+        print(f"💾 基準已更新: {baseline_path}")
+        return 0, None
+
+    if not os.path.exists(baseline_path):
+        print(f"❌ 找不到基準: {baseline_path}（先以 --update-baseline 建立）")
+        return 2, None
+
+    baseline = load_baseline(baseline_path)
+    recorded = baseline.get('info', {})
+    if (recorded.get('frame_sets'), recorded.get('seed')) != (info['frame_sets'], info['seed']):
+        print(f"⚠️ 畫面集與基準不同（基準: {recorded.get('frame_sets')}, seed {recorded.get('seed')}），比較結果僅供參考")
+    report = compare_to_baseline(results, baseline, tolerance, min_delta_ms, info)
+    return (0 if report.passed else 1), report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="效能回歸檢查")
+    parser.add_argument('--replay', nargs='*', default=[], help="重播來源（圖片資料夾或影片檔），每個來源一個畫面集")
+    parser.add_argument('--synthetic', type=int, default=40, help="合成畫面數量（0 = 不使用合成畫面）")
+    parser.add_argument('--seed', type=int, default=11)
+    parser.add_argument('--max-frames', type=int, default=60, help="每個重播來源最多使用的畫面數")
+    parser.add_argument('--repeat', type=int, default=3, help="量測輪數（另有一輪暖機），取各輪中位數的最小值")
+    parser.add_argument('--baseline', help="基準 JSON 路徑（預設 config.PERF_BASELINE_PATH）")
+    parser.add_argument('--tolerance', type=float, help="容許的中位數增加比例（預設 config.PERF_REGRESSION_TOLERANCE）")
+    parser.add_argument('--min-delta-ms', type=float, help="差距小於此值不判定退化（預設 config.PERF_REGRESSION_MIN_DELTA_MS）")
+    parser.add_argument('--update-baseline', action='store_true', help="以本次結果覆寫基準")
+    parser.add_argument('--output', help="比較結果另存為 JSON")
+    parser.add_argument('--json', action='store_true', help="只輸出 JSON（供 CI 解析）")
+    args = parser.parse_args()
+
+    # 無顯示器（CI）時換上 pyautogui / keyboard 替代模組，必須在 run() import core.* 之前
+    from tests.headless import install_headless_backends
+    install_headless_backends()
+
+    # --json 時設定載入與檢測器的訊息都改寫到 stderr，stdout 只留比較結果
+    with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+        try:
+            code, report = run(args)
+        except Exception as e:
+            # 環境或設定問題不是效能退化，返回 2 讓 CI 區分
+            traceback.print_exc()
+            print(f"❌ 無法執行效能回歸檢查: {e}")
+            return 2
+
+    if report is not None:
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+        print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2) if args.json else report.format_summary())
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
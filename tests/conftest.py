@@ -0,0 +1,62 @@
+"""
+測試共用設定
+
+- 專案根目錄加入 sys.path，測試直接 import core.*
+- 無法載入 pyautogui / keyboard 時（無顯示器的 Linux、CI）改用只記錄按鍵的替代模組（tests/headless.py，scripts/ 共用），檢測模組照常 import
+- input_events：按鍵函數換成記錄用的版本，測試期間不會對真實視窗送出按鍵
+- 基準測試的吞吐量與準確率在測試結束時匯總輸出
+"""
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from tests.headless import install_headless_backends  # noqa: E402
+
+install_headless_backends()
+
+
+@pytest.fixture
+def input_events(monkeypatch):
+    """記錄所有按鍵事件 [(動作, 按鍵), ...]"""
+    import pyautogui
+
+    events = []
+    monkeypatch.setattr(pyautogui, 'PAUSE', 0.0)  # 記錄模式不需要按鍵間隔
+    monkeypatch.setattr(pyautogui, 'keyDown', lambda key, *args, **kwargs: events.append(('down', key)))
+    monkeypatch.setattr(pyautogui, 'keyUp', lambda key, *args, **kwargs: events.append(('up', key)))
+    monkeypatch.setattr(pyautogui, 'press', lambda key, *args, **kwargs: events.append(('press', key)))
+    yield events
+
+    # 放開執行器仍按住的按鍵（記錄模式下不會送出真實按鍵）
+    from core.input_actuator import get_input_actuator
+    get_input_actuator().release_all()
+
+
+def pytest_configure(config):
+    config.benchmark_results = []
+
+
+@pytest.fixture
+def benchmark_report(request):
+    """基準測試結果列表，測試結束時由 pytest_terminal_summary 輸出"""
+    return request.config.benchmark_results
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = getattr(config, 'benchmark_results', None)
+    if not results:
+        return
+    terminalreporter.section("合成場景檢測基準")
+    terminalreporter.write_line(
+        f"{'檢測器':<34}{'畫面':>6}{'幀/秒':>10}{'精確率':>10}{'召回率':>10}{'TP':>6}{'FP':>6}{'FN':>6}"
+    )
+    for result in results:
+        terminalreporter.write_line(
+            f"{result.name:<37}{result.frames:>8}{result.fps:>12.1f}{result.precision:>13.2f}{result.recall:>13.2f}"
+            f"{result.true_positives:>6}{result.false_positives:>6}{result.false_negatives:>6}"
+        )
@@ -0,0 +1,57 @@
+"""
+無顯示器環境的輸入後端替代模組 - 測試與 scripts/ 下的基準、回歸工具共用
+
+pyautogui / keyboard 無法載入時（無顯示器的 Linux、CI）換上只記錄按鍵的替代模組，
+檢測模組照常 import。必須在 import core.* 之前呼叫；已能載入真實模組時不做任何事。
+"""
+import sys
+import types
+
+
+def install_fake_input_backend():
+    """pyautogui 無法載入時換上替代模組（只提供檢測流程會呼叫到的函數）"""
+    try:
+        import pyautogui  # noqa: F401
+        return False
+    except Exception:
+        pass
+
+    fake = types.ModuleType('pyautogui')
+    fake.FAILSAFE = True
+    fake.PAUSE = 0.1
+    fake.keyDown = lambda *args, **kwargs: None
+    fake.keyUp = lambda *args, **kwargs: None
+    fake.press = lambda *args, **kwargs: None
+    fake.click = lambda *args, **kwargs: None
+    fake.position = lambda: (0, 0)
+
+    def screenshot(*args, **kwargs):
+        raise RuntimeError("測試環境沒有顯示器，無法截圖")
+
+    fake.screenshot = screenshot
+    sys.modules['pyautogui'] = fake
+    return True
+
+
+def install_fake_keyboard():
+    """keyboard 無法載入時換上替代模組（rune 模式只用到 is_pressed）"""
+    try:
+        import keyboard  # noqa: F401
+        return False
+    except Exception:
+        pass
+
+    fake = types.ModuleType('keyboard')
+    fake.is_pressed = lambda *args, **kwargs: False
+    sys.modules['keyboard'] = fake
+    return True
+
+
+def install_headless_backends():
+    """安裝兩個替代模組；返回實際換上的模組名稱列表"""
+    installed = []
+    if install_fake_input_backend():
+        installed.append('pyautogui')
+    if install_fake_keyboard():
+        installed.append('keyboard')
+    return installed
@@ -0,0 +1,298 @@
+"""
+合成場景 - 以內附素材在程序產生的背景上組合測試畫面，物件位置已知
+
+每個 make_*_scenes 函數返回 Scene 列表：一半含目標物件（positive），一半不含（negative），
+同一個 seed 產生的場景完全相同，準確率數字可在不同機器、不同版本間比較。
+"""
+import glob
+import os
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+import cv2
+import numpy as np
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'game_resources')
+
+FRAME_WIDTH = 1280
+FRAME_HEIGHT = 720
+
+DIRECTION_NAMES = {'u': 'up', 'd': 'down', 'l': 'left', 'r': 'right'}
+
+
+@dataclass
+class Scene:
+    """一張合成畫面與其標準答案"""
+    image: Any
+    positive: bool
+    target: Optional[Tuple[int, int]] = None  # 目標中心（畫面座標）
+    player: Tuple[int, int] = (FRAME_WIDTH // 2, FRAME_HEIGHT // 2)
+    expected: Any = None  # 其他標準答案（例如方向序列、掃描方向）
+
+
+# ----------------------------------------------------------------------
+# 素材
+# ----------------------------------------------------------------------
+
+def asset_path(*parts):
+    return os.path.join(ASSETS_DIR, *parts)
+
+
+def load_sprite(path):
+    """讀取素材為 (BGR, alpha 遮罩)；沒有透明通道時遮罩為全不透明"""
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise FileNotFoundError(path)
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    if image.shape[2] == 4:
+        return np.ascontiguousarray(image[:, :, :3]), image[:, :, 3]
+    return image, np.full(image.shape[:2], 255, np.uint8)
+
+
+def load_monster_sprites():
+    """{怪物名稱: [(BGR, alpha), ...]}"""
+    sprites = {}
+    for folder in sorted(glob.glob(asset_path('monsters', '*'))):
+        files = sorted(glob.glob(os.path.join(folder, '*.png')))
+        if files:
+            sprites[os.path.basename(folder)] = [load_sprite(path) for path in files]
+    return sprites
+
+
+def load_direction_sprites():
+    """{模板名稱: (BGR, 遮罩)}；遮罩與 main.load_templates 相同（白色背景為透明）"""
+    sprites = {}
+    for path in sorted(glob.glob(asset_path('Detection', '*.bmp'))):
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(gray, 254, 255, cv2.THRESH_BINARY_INV)
+        sprites[os.path.splitext(os.path.basename(path))[0]] = (image, mask)
+    return sprites
+
+
+# ----------------------------------------------------------------------
+# 組合
+# ----------------------------------------------------------------------
+
+def make_background(rng, width=FRAME_WIDTH, height=FRAME_HEIGHT):
+    """天空漸層 + 低頻雜訊 + 幾段平台，返回 (畫面, 平台列表 [(x1, x2, y)])"""
+    top = rng.integers(120, 220, 3)
+    bottom = rng.integers(40, 140, 3)
+    ramp = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+    image = top[None, None, :] * (1 - ramp) + bottom[None, None, :] * ramp
+    image = np.repeat(image, width, axis=1)
+
+    # 低頻雜訊（遠景），放大後幾乎不產生 Canny 邊緣
+    noise = rng.normal(0, 18, (height // 40 + 1, width // 40 + 1, 3)).astype(np.float32)
+    image += cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+    image = np.clip(image, 0, 255).astype(np.uint8)
+
+    platforms = []
+    for index in range(rng.integers(2, 4)):
+        y = int(height * (0.55 + 0.15 * index) + rng.integers(-10, 10))
+        x1 = int(rng.integers(0, width // 4))
+        x2 = int(rng.integers(width * 3 // 4, width))
+        color = tuple(int(c) for c in rng.integers(50, 110, 3))
+        cv2.rectangle(image, (x1, y), (x2, min(height - 1, y + 18)), color, -1)
+        cv2.line(image, (x1, y), (x2, y), tuple(min(255, c + 70) for c in color), 2)
+        platforms.append((x1, x2, y))
+    return image, platforms
+
+
+def add_clutter(rng, image, count):
+    """畫上線條、方塊、圓與文字，產生與實際地圖相近的密集邊緣"""
+    height, width = image.shape[:2]
+    for _ in range(count):
+        kind = int(rng.integers(0, 4))
+        color = tuple(int(v) for v in rng.integers(0, 255, 3))
+        p1 = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        if kind == 0:
+            p2 = (p1[0] + int(rng.integers(-80, 80)), p1[1] + int(rng.integers(-80, 80)))
+            cv2.line(image, p1, p2, color, int(rng.integers(1, 3)))
+        elif kind == 1:
+            p2 = (p1[0] + int(rng.integers(5, 60)), p1[1] + int(rng.integers(5, 60)))
+            cv2.rectangle(image, p1, p2, color, int(rng.choice([-1, 1, 2])))
+        elif kind == 2:
+            cv2.circle(image, p1, int(rng.integers(3, 30)), color, int(rng.choice([-1, 1, 2])))
+        else:
+            text = ''.join(chr(int(v)) for v in rng.integers(65, 91, 4))
+            cv2.putText(image, text, p1, cv2.FONT_HERSHEY_SIMPLEX, float(rng.uniform(0.4, 1.2)), color, 1)
+    return image
+
+
+def paste(image, sprite, mask, x, y):
+    """以遮罩把素材貼到畫面 (x, y) 左上角，超出畫面的部分裁掉"""
+    h, w = sprite.shape[:2]
+    x1, y1 = max(0, x), max(0, y)
+    x2, y2 = min(image.shape[1], x + w), min(image.shape[0], y + h)
+    if x2 <= x1 or y2 <= y1:
+        return
+    sprite_part = sprite[y1 - y:y2 - y, x1 - x:x2 - x]
+    alpha = (mask[y1 - y:y2 - y, x1 - x:x2 - x].astype(np.float32) / 255.0)[:, :, None]
+    region = image[y1:y2, x1:x2].astype(np.float32)
+    image[y1:y2, x1:x2] = (sprite_part * alpha + region * (1 - alpha)).astype(np.uint8)
+
+
+def _paste_centered(image, sprite, mask, center):
+    h, w = sprite.shape[:2]
+    paste(image, sprite, mask, center[0] - w // 2, center[1] - h // 2)
+
+
+def _player_on_platform(rng, platforms, medal):
+    """角色（名牌）放在某段平台上方，返回名牌中心"""
+    x1, x2, y = platforms[int(rng.integers(0, len(platforms)))]
+    margin = 200
+    center_x = int(rng.integers(max(margin, x1 + 40), max(margin + 1, min(FRAME_WIDTH - margin, x2 - 40))))
+    center_y = y - 10 - medal[0].shape[0] // 2
+    return center_x, center_y
+
+
+def _split(count, seed):
+    rng = np.random.default_rng(seed)
+    return rng, [index % 2 == 0 for index in range(count)]
+
+
+# ----------------------------------------------------------------------
+# 各檢測器的場景
+# ----------------------------------------------------------------------
+
+def make_template_scenes(sprite_path, count=40, seed=0, region='any'):
+    """單一模板（名牌 / rune_text / sign_text）場景；region='upper' 時只放在上半畫面"""
+    rng, labels = _split(count, seed)
+    sprite, mask = load_sprite(sprite_path)
+    h, w = sprite.shape[:2]
+    scenes = []
+    for positive in labels:
+        image, _ = make_background(rng)
+        target = None
+        if positive:
+            max_y = FRAME_HEIGHT // 2 - h if region == 'upper' else FRAME_HEIGHT - h
+            x = int(rng.integers(0, FRAME_WIDTH - w))
+            y = int(rng.integers(0, max_y))
+            paste(image, sprite, mask, x, y)
+            target = (x + w // 2, y + h // 2)
+        scenes.append(Scene(image, positive, target))
+    return scenes
+
+
+def make_monster_scenes(count=40, seed=0, clutter=0):
+    """角色附近（同一層）放一隻怪物；負樣本只有角色（clutter > 0 時背景先畫上 clutter 個雜物）"""
+    rng, labels = _split(count, seed)
+    monsters = load_monster_sprites()
+    names = sorted(monsters)
+    medal = load_sprite(asset_path('medal.png'))
+    scenes = []
+    for positive in labels:
+        image, platforms = make_background(rng)
+        if clutter:
+            add_clutter(rng, image, clutter)
+        player = _player_on_platform(rng, platforms, medal)
+        _paste_centered(image, medal[0], medal[1], player)
+        target = None
+        if positive:
+            sprite, mask = monsters[names[int(rng.integers(0, len(names)))]][int(rng.integers(0, 6))]
+            offset = int(rng.integers(60, 160)) * (1 if rng.random() < 0.5 else -1)
+            target = (player[0] + offset, player[1] + 10 - sprite.shape[0] // 2 + medal[0].shape[0] // 2)
+            _paste_centered(image, sprite, mask, target)
+        scenes.append(Scene(image, positive, target, player))
+    return scenes
+
+
+def make_scan_scenes(count=40, seed=0):
+    """遠距掃描：怪物放在角色左 / 右側 250~600 像素外，答案為方向"""
+    rng, labels = _split(count, seed)
+    monsters = load_monster_sprites()
+    names = sorted(monsters)
+    medal = load_sprite(asset_path('medal.png'))
+    scenes = []
+    for positive in labels:
+        image, _ = make_background(rng)
+        player = (FRAME_WIDTH // 2 + int(rng.integers(-40, 40)), FRAME_HEIGHT // 2 + int(rng.integers(-40, 40)))
+        _paste_centered(image, medal[0], medal[1], player)
+        target = expected = None
+        if positive:
+            sprite, mask = monsters[names[int(rng.integers(0, len(names)))]][int(rng.integers(0, 6))]
+            expected = 'left' if rng.random() < 0.5 else 'right'
+            offset = int(rng.integers(250, 600))
+            target = (player[0] + (offset if expected == 'right' else -offset), player[1] + int(rng.integers(-30, 30)))
+            _paste_centered(image, sprite, mask, target)
+        scenes.append(Scene(image, positive, target, player, expected))
+    return scenes
+
+
+def make_red_dot_scenes(count=40, seed=0):
+    """小地圖（左上角）放一個紅點；負樣本的小地圖只有其他顏色的點"""
+    rng, labels = _split(count, seed)
+    red_paths = sorted(glob.glob(asset_path('red*.png')))
+    scenes = []
+    for positive in labels:
+        image, _ = make_background(rng)
+        # 小地圖底色與邊框
+        cv2.rectangle(image, (8, 8), (260, 150), (40, 40, 40), -1)
+        cv2.rectangle(image, (8, 8), (260, 150), (200, 200, 200), 1)
+        for _ in range(3):
+            dot = (int(rng.integers(20, 250)), int(rng.integers(20, 140)))
+            cv2.circle(image, dot, 2, (0, 220, 255), -1)  # 自己（黃點）
+        target = None
+        if positive:
+            sprite, mask = load_sprite(red_paths[int(rng.integers(0, len(red_paths)))])
+            x, y = int(rng.integers(20, 240)), int(rng.integers(20, 130))
+            paste(image, sprite, mask, x, y)
+            target = (x + sprite.shape[1] // 2, y + sprite.shape[0] // 2)
+        scenes.append(Scene(image, positive, target))
+    return scenes
+
+
+def make_rope_scenes(count=40, seed=0, detection_size=200):
+    """角色上方的檢測範圍內放一條繩索（由繩索模板垂直接成）"""
+    rng, labels = _split(count, seed)
+    ropes = [load_sprite(path) for path in sorted(glob.glob(asset_path('rope', '*.*')))]
+    medal = load_sprite(asset_path('medal.png'))
+    scenes = []
+    for positive in labels:
+        image, platforms = make_background(rng)
+        player = _player_on_platform(rng, platforms, medal)
+        _paste_centered(image, medal[0], medal[1], player)
+        target = None
+        if positive:
+            sprite, mask = ropes[int(rng.integers(0, len(ropes)))]
+            rope_x = player[0] + int(rng.integers(-detection_size // 2 + 20, detection_size // 2 - 20))
+            top = player[1] - detection_size - 40
+            y = top
+            while y < player[1] + 20:
+                paste(image, sprite, mask, rope_x - sprite.shape[1] // 2, y)
+                y += sprite.shape[0]
+            target = (rope_x, player[1] - detection_size // 2)
+        scenes.append(Scene(image, positive, target, player))
+    return scenes
+
+
+def make_direction_scenes(count=40, seed=0):
+    """畫面中央 700x130 的符號區域內放四個方向箭頭；負樣本沒有箭頭"""
+    rng, labels = _split(count, seed)
+    sprites = load_direction_sprites()
+    names = sorted(sprites)
+    region_x = (FRAME_WIDTH - 700) // 2
+    region_y = (FRAME_HEIGHT - 130) // 2
+    slot_width = 700 // 4
+    scenes = []
+    for positive in labels:
+        image, _ = make_background(rng)
+        # 半透明的符號面板；帶少量紋理（純色區域在遮罩匹配下相關係數為 NaN，遊戲畫面中不會出現）
+        panel = image[region_y:region_y + 130, region_x:region_x + 700].astype(np.float32) * 0.3
+        panel += rng.normal(20, 6, panel.shape)
+        image[region_y:region_y + 130, region_x:region_x + 700] = np.clip(panel, 0, 255).astype(np.uint8)
+        expected = None
+        if positive:
+            expected = []
+            for slot in range(4):
+                name = names[int(rng.integers(0, len(names)))]
+                sprite, mask = sprites[name]
+                h, w = sprite.shape[:2]
+                x = region_x + slot * slot_width + int(rng.integers(0, slot_width - w))
+                y = region_y + int(rng.integers(0, 130 - h))
+                paste(image, sprite, mask, x, y)
+                expected.append(DIRECTION_NAMES[name[0]])
+        scenes.append(Scene(image, positive, None, expected=expected))
+    return scenes
@@ -0,0 +1,84 @@
+"""
+非同步引擎 - 換頻搶占行為時，等線程池中進行中的行為呼叫結束後才開始換頻流程
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tests import synthetic_scenes as scenes
+
+
+@pytest.fixture
+def async_engine(monkeypatch):
+    import config
+    from core.async_engine import AsyncEngine
+    from core.multi_client import TemplateBank
+    from scripts.perf_regression import load_templates, synthetic_window_info
+
+    monkeypatch.setattr(config, 'ENABLED_MONSTERS', sorted(scenes.load_monster_sprites()))
+    templates = load_templates()
+    components = TemplateBank.load(templates).build_components()
+    engine = AsyncEngine(synthetic_window_info(), templates,
+                         dict(components, red_dot_detector=None, image_processor=None))
+    yield engine
+    engine.executor.shutdown(wait=True)
+
+
+def test_channel_change_waits_for_in_flight_rune_step(async_engine, input_events, monkeypatch):
+    engine = async_engine
+    rune_mode = engine.components['rune_mode']
+    events = []
+    step_started = threading.Event()
+
+    def slow_handle(*args):
+        step_started.set()
+        time.sleep(0.3)
+        events.append('rune_step_done')
+
+    async def channel_change():
+        events.append('channel_change')
+
+    monkeypatch.setattr(rune_mode, 'handle', slow_handle)
+    monkeypatch.setattr(engine, '_channel_change_behaviour', channel_change)
+    monkeypatch.setattr('core.async_engine.asyncio.sleep', _fast_sleep(asyncio.sleep))
+
+    async def scenario():
+        from core.async_engine import FrameBus
+        from core.pipeline import Frame
+
+        engine.frames = FrameBus()
+        engine.not_changing_channel = asyncio.Event()
+        engine.not_changing_channel.set()
+        rune_mode.enter()
+        engine.behaviour_task = asyncio.ensure_future(engine._rune_behaviour())
+        await engine.frames.publish(Frame(1, time.time(), None))
+        while not step_started.is_set():
+            await asyncio.sleep(0.01)
+        await engine._change_channel()
+
+    asyncio.run(scenario())
+
+    assert events == ['rune_step_done', 'channel_change']
+    assert not rune_mode.is_active
+    assert engine.behaviour_task.cancelled()
+    assert engine.get_stats()['drained_behaviour_calls'] == 1
+
+
+def test_run_steps_stops_between_steps_when_preempted(async_engine):
+    engine = async_engine
+    ran = []
+    steps = [('first', lambda: (ran.append('first'), engine.behaviour_cancel.set())),
+             ('second', lambda: ran.append('second'))]
+
+    engine._run_steps(steps)
+
+    assert ran == ['first']
+
+
+def _fast_sleep(original):
+    """換頻後的 2 秒冷卻在測試中縮短"""
+    async def sleep(seconds, *args, **kwargs):
+        return await original(min(seconds, 0.01), *args, **kwargs)
+    return sleep
@@ -0,0 +1,117 @@
+"""
+設定熱重載 - 準備失敗時整批放棄、只載入新增的怪物、換上時等待進行中的檢測、記錄換上耗時
+"""
+import threading
+import time
+
+import pytest
+
+from core.config_reload import ConfigReloader, SwapGate
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    """只載入 blue_snail 的怪物檢測器；測試結束時還原 config 與設定快照"""
+    import config
+    from core.config_snapshot import refresh_config_snapshot
+    from core.monster_detector import SimplifiedMonsterDetector
+
+    for key in ('ENABLED_MONSTERS', 'MONSTER_BASE_PATH', 'RED_DOT_RESET_THRESHOLD'):
+        monkeypatch.setattr(config, key, getattr(config, key))
+    monkeypatch.setattr(config, 'ENABLED_MONSTERS', ['blue_snail'])
+    refresh_config_snapshot()
+
+    detector = SimplifiedMonsterDetector()
+    detector.setup_templates()
+    yield detector
+    monkeypatch.undo()
+    refresh_config_snapshot()
+
+
+def test_failed_prepare_keeps_previous_config(detector):
+    import config
+
+    reloader = ConfigReloader({'monster_detector': detector}, log=lambda *args: None)
+    entries = detector.monster_templates
+    report = reloader.apply({'ENABLED_MONSTERS': ['no_such_monster'], 'RED_DOT_RESET_THRESHOLD': 9})
+
+    assert report.error and reloader.failed_count == 1 and reloader.reload_count == 0
+    assert config.ENABLED_MONSTERS == ['blue_snail'] and config.RED_DOT_RESET_THRESHOLD == 3
+    assert list(detector.templates_by_monster) == ['blue_snail']
+    assert detector.monster_templates is entries
+
+
+def test_reload_loads_only_added_monsters(detector, monkeypatch):
+    import config
+
+    loaded = []
+    load = detector.load_monster_templates
+
+    def recording_load(names, base_path):
+        loaded.append(list(names))
+        return load(names, base_path)
+
+    monkeypatch.setattr(detector, 'load_monster_templates', recording_load)
+    kept_group = detector.templates_by_monster['blue_snail']
+
+    reloader = ConfigReloader({'monster_detector': detector}, log=lambda *args: None)
+    reloader.request({'ENABLED_MONSTERS': ['blue_snail', 'stump']})
+    time.sleep(0.02)
+    report = reloader.apply_pending()
+
+    assert loaded == [['stump']]
+    assert detector.templates_by_monster['blue_snail'] is kept_group
+    assert detector.templates_by_monster['stump']
+    assert config.ENABLED_MONSTERS == ['blue_snail', 'stump']
+    assert report.error is None and report.rebuilt[0].startswith('monster_detector')
+
+    # 換上耗時與請求到生效的延遲（含等待 tick 邊界的 20ms）
+    assert 0.0 < report.swap_ms <= report.latency_ms
+    assert report.latency_ms >= 20.0
+    stats = reloader.get_stats()
+    assert stats['reloads'] == 1 and stats['last_swap_ms'] == report.swap_ms
+    assert stats['max_latency_ms'] == report.latency_ms
+
+
+def test_swapping_waits_for_in_flight_reading():
+    gate = SwapGate()
+    events = []
+    reading = threading.Event()
+
+    def reader():
+        with gate.reading():
+            reading.set()
+            time.sleep(0.1)
+            events.append('read_done')
+
+    def swapper():
+        with gate.swapping():
+            events.append('swap')
+
+    reader_thread = threading.Thread(target=reader)
+    reader_thread.start()
+    assert reading.wait(1.0)
+    swapper_thread = threading.Thread(target=swapper)
+    swapper_thread.start()
+    reader_thread.join()
+    swapper_thread.join()
+
+    assert events == ['read_done', 'swap']
+
+
+def test_reading_waits_while_swapping():
+    gate = SwapGate()
+    events = []
+
+    def reader():
+        with gate.reading():
+            events.append('read')
+
+    with gate.swapping():
+        reader_thread = threading.Thread(target=reader)
+        reader_thread.start()
+        reader_thread.join(timeout=0.05)
+        events.append('swap_done')
+    reader_thread.join()
+
+    assert events == ['swap_done', 'read']
@@ -0,0 +1,143 @@
+"""
+常駐模式 JSON-RPC - token 驗證、未知方法、無法解析的請求、start / stats / stop 往返，且不載入 GUI
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from core.daemon import (DaemonServer, METHOD_NOT_FOUND, PARSE_ERROR, UNAUTHORIZED, rpc_call)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StubController:
+    """只記錄呼叫的控制器，介面與 DaemonController 相同"""
+
+    def __init__(self):
+        self.is_running = False
+        self.script_stats = {'current_status': '待機'}
+        self.latest_stats = None
+        self.frame_recorder = None
+        self.profiler = None
+        self.calls = []
+
+    def start_script(self):
+        self.calls.append('start')
+        self.is_running = True
+        self.script_stats['current_status'] = '運行中'
+        self.latest_stats = {'ticks': 42}
+        return True
+
+    def stop_script(self):
+        self.calls.append('stop')
+        self.is_running = False
+        self.script_stats['current_status'] = '已停止'
+        return True
+
+    def get_script_stats(self):
+        return dict(self.script_stats, running=self.is_running)
+
+    def cleanup(self):
+        self.calls.append('cleanup')
+
+
+@pytest.fixture
+def daemon():
+    """在背景線程以隨機埠啟動伺服器，測試結束時以 shutdown 關閉"""
+    controller = StubController()
+    server = DaemonServer(controller, '127.0.0.1', 0, token='secret')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    deadline = time.time() + 5.0
+    while (server.server is None or server.port == 0) and time.time() < deadline:
+        time.sleep(0.01)
+    assert server.port != 0
+
+    yield server, controller
+
+    if 'cleanup' not in controller.calls:
+        rpc_call('shutdown', port=server.port, token='secret')
+    thread.join(timeout=5.0)
+    assert not thread.is_alive()
+
+
+def _send_raw(port, payload):
+    with socket.create_connection(('127.0.0.1', port), timeout=5.0) as sock:
+        sock.sendall(payload)
+        with sock.makefile('rb') as reader:
+            return json.loads(reader.readline())
+
+
+def test_request_without_matching_token_is_rejected(daemon):
+    server, controller = daemon
+
+    response = rpc_call('start', port=server.port, token='wrong')
+    assert response['error']['code'] == UNAUTHORIZED
+    assert rpc_call('status', port=server.port)['error']['code'] == UNAUTHORIZED
+    assert controller.calls == []
+
+
+def test_unknown_method(daemon):
+    server, _ = daemon
+
+    response = rpc_call('explode', port=server.port, token='secret')
+    assert response['id'] == 1 and response['error']['code'] == METHOD_NOT_FOUND
+
+
+def test_malformed_line_does_not_close_connection(daemon):
+    server, _ = daemon
+
+    with socket.create_connection(('127.0.0.1', server.port), timeout=5.0) as sock:
+        request = {'jsonrpc': '2.0', 'id': 7, 'method': 'status', 'token': 'secret'}
+        sock.sendall(b'{"jsonrpc": "2.0", "method": \n' + json.dumps(request).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as reader:
+            parse_error = json.loads(reader.readline())
+            status = json.loads(reader.readline())
+
+    assert parse_error['id'] is None and parse_error['error']['code'] == PARSE_ERROR
+    assert status['id'] == 7 and status['result']['running'] is False
+
+
+def test_start_stats_stop_round_trip(daemon):
+    server, controller = daemon
+
+    def call(method):
+        response = rpc_call(method, port=server.port, token='secret')
+        assert 'error' not in response, response
+        return response['result']
+
+    assert call('start') == {'started': True, 'running': True}
+    stats = call('stats')
+    assert stats['running'] is True and stats['current_status'] == '運行中'
+    assert stats['latest'] == {'ticks': 42}
+    assert call('stop') == {'stopped': True, 'running': False}
+    assert call('status')['running'] is False
+
+    assert controller.calls == ['start', 'stop']
+    assert server.request_count == 4
+
+
+def test_shutdown_stops_server_and_cleans_up(daemon):
+    server, controller = daemon
+
+    assert _send_raw(server.port, b'{"jsonrpc": "2.0", "id": 3, "method": "shutdown", "token": "secret"}\n') == \
+        {'jsonrpc': '2.0', 'id': 3, 'result': {'shutdown': True}}
+    deadline = time.time() + 5.0
+    while 'cleanup' not in controller.calls and time.time() < deadline:
+        time.sleep(0.01)
+    assert controller.calls == ['cleanup']
+
+
+def test_importing_daemon_does_not_load_tkinter():
+    code = "import sys; import core.daemon; print('tkinter' in sys.modules, 'customtkinter' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == 'False False'
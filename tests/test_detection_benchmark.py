@@ -0,0 +1,278 @@
+"""
+合成場景檢測基準 - 吞吐量（幀/秒）與精確率 / 召回率
+
+每個檢測器跑同一組固定 seed 的合成畫面（一半含目標、一半不含），結果在測試結束時匯總輸出。
+準確率低於下限時測試失敗（檢測邏輯退化）；吞吐量依機器而異，只輸出不判定。
+
+    python -m pytest tests -q
+"""
+import glob
+import os
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+import pytest
+
+from tests import synthetic_scenes as scenes
+from tests.synthetic_scenes import FRAME_HEIGHT, FRAME_WIDTH
+
+SCENES_PER_DETECTOR = 40
+
+
+@dataclass
+class DetectionScore:
+    name: str
+    frames: int
+    seconds: float
+    true_positives: int = 0
+    false_positives: int = 0
+    false_negatives: int = 0
+
+    @property
+    def fps(self):
+        return self.frames / self.seconds if self.seconds else 0.0
+
+    @property
+    def precision(self):
+        detected = self.true_positives + self.false_positives
+        return self.true_positives / detected if detected else 1.0
+
+    @property
+    def recall(self):
+        expected = self.true_positives + self.false_negatives
+        return self.true_positives / expected if expected else 1.0
+
+
+def evaluate(name, scene_list, detect, judge, report):
+    """對每張畫面執行 detect(scene)，以 judge(scene, 結果) 返回 (是否有檢測結果, 結果是否正確) 計分"""
+    outputs = []
+    start = time.perf_counter()
+    for scene in scene_list:
+        outputs.append(detect(scene))
+    score = DetectionScore(name, len(scene_list), time.perf_counter() - start)
+
+    for scene, output in zip(scene_list, outputs):
+        detected, correct = judge(scene, output)
+        if detected and correct:
+            score.true_positives += 1
+        elif detected:
+            score.false_positives += 1
+            if scene.positive:
+                score.false_negatives += 1  # 檢測到錯誤位置：目標仍然漏掉
+        elif scene.positive:
+            score.false_negatives += 1
+    report.append(score)
+    return score
+
+
+def near(point, target, tolerance):
+    return (point is not None and target is not None and
+            abs(point[0] - target[0]) <= tolerance and abs(point[1] - target[1]) <= tolerance)
+
+
+# ----------------------------------------------------------------------
+# 模板與檢測器（與 main.load_templates / initialize_components 相同的載入方式）
+# ----------------------------------------------------------------------
+
+@pytest.fixture(scope='module')
+def monster_detector():
+    from core.monster_detector import SimplifiedMonsterDetector
+
+    detector = SimplifiedMonsterDetector()
+    base_path = scenes.asset_path('monsters')
+    names = sorted(os.path.basename(path) for path in glob.glob(os.path.join(base_path, '*')))
+    groups = detector.load_monster_templates(names, base_path)
+    detector.setup_templates([template for group in groups.values() for template in group])
+    return detector
+
+
+@pytest.fixture(scope='module')
+def sign_template():
+    sign = cv2.imread(scenes.asset_path('sign_text.png'), cv2.IMREAD_UNCHANGED)
+    rgb, alpha = sign[:, :, :3], sign[:, :, 3]
+    return np.where(alpha[:, :, np.newaxis] == 0, np.zeros_like(rgb), rgb)
+
+
+class _IdleMovement:
+    is_moving = False
+
+
+# ----------------------------------------------------------------------
+# 模板匹配：名牌 / rune_text / sign_text
+# ----------------------------------------------------------------------
+
+@pytest.mark.parametrize('asset', ['medal.png', 'rune_text.png'])
+def test_simple_find_medal(asset, benchmark_report):
+    from core.utils import simple_find_medal
+
+    template = cv2.imread(scenes.asset_path(asset), cv2.IMREAD_COLOR)
+    h, w = template.shape[:2]
+    scene_list = scenes.make_template_scenes(scenes.asset_path(asset), SCENES_PER_DETECTOR, seed=1)
+
+    def judge(scene, output):
+        found, loc, _ = output
+        return found, found and near((loc[0] + w // 2, loc[1] + h // 2), scene.target, 3)
+
+    score = evaluate(f"simple_find_medal[{asset}]", scene_list,
+                     lambda scene: simple_find_medal(scene.image, template, 0.7), judge, benchmark_report)
+    assert score.recall >= 0.95
+    assert score.precision >= 0.95
+
+
+def test_detect_sign_text(sign_template, benchmark_report):
+    from core.utils import detect_sign_text
+
+    h, w = sign_template.shape[:2]
+    scene_list = scenes.make_template_scenes(scenes.asset_path('sign_text.png'), SCENES_PER_DETECTOR,
+                                             seed=7, region='upper')
+
+    def judge(scene, output):
+        found, loc, _ = output
+        return found, found and near((loc[0] + w // 2, loc[1] + h // 2), scene.target, 3)
+
+    score = evaluate("detect_sign_text", scene_list,
+                     lambda scene: detect_sign_text(scene.image, sign_template), judge, benchmark_report)
+    assert score.recall >= 0.95
+    assert score.precision >= 0.95
+
+
+# ----------------------------------------------------------------------
+# 怪物：近距檢測（含攻擊）與遠距掃描
+# ----------------------------------------------------------------------
+
+def test_detect_monsters(monster_detector, input_events, benchmark_report):
+    import config
+    from core.cliff_detection import CliffDetection
+    from core.movement import Movement
+
+    scene_list = scenes.make_monster_scenes(SCENES_PER_DETECTOR, seed=2)
+    attacks = []  # (是否檢測到, 是否送出攻擊按鍵)
+
+    def detect(scene):
+        del input_events[:]
+        found = monster_detector.detect_monsters(
+            scene.image, scene.player[0], scene.player[1], FRAME_WIDTH, FRAME_HEIGHT,
+            Movement(), CliffDetection(), 0, 0
+        )
+        attacks.append((found, any(key == config.ATTACK_KEY for _, key in input_events)))
+        return found
+
+    def judge(scene, found):
+        # detect_monsters 只返回是否攻擊，位置由 locate_monster 的測試檢查
+        return found, scene.positive
+
+    score = evaluate("detect_monsters", scene_list, detect, judge, benchmark_report)
+    assert score.recall >= 0.9
+    assert score.precision >= 0.9
+    # 檢測到怪物時必須送出攻擊按鍵
+    assert all(sent for found, sent in attacks if found)
+
+
+def test_locate_monster_position(monster_detector, benchmark_report):
+    scene_list = scenes.make_monster_scenes(SCENES_PER_DETECTOR, seed=2)
+
+    def judge(scene, target):
+        if target is None:
+            return False, False
+        return True, near((target['monster_x'], target['monster_y']), scene.target, 12)
+
+    score = evaluate("locate_monster", scene_list,
+                     lambda scene: monster_detector.locate_monster(
+                         scene.image, scene.player[0], scene.player[1], FRAME_WIDTH, FRAME_HEIGHT, False),
+                     judge, benchmark_report)
+    assert score.recall >= 0.9
+    assert score.precision >= 0.9
+
+
+def test_chamfer_mode_on_cluttered_background(monster_detector, benchmark_report):
+    """倒角模式：密集雜物的背景上不能誤判（單向倒角分數在雜亂邊緣上處處都很高）"""
+    scene_list = scenes.make_monster_scenes(SCENES_PER_DETECTOR, seed=5, clutter=900)
+
+    def judge(scene, target):
+        if target is None:
+            return False, False
+        return True, near((target['monster_x'], target['monster_y']), scene.target, 12)
+
+    monster_detector.match_mode = 'chamfer'
+    try:
+        score = evaluate("locate_monster[chamfer, clutter]", scene_list,
+                         lambda scene: monster_detector.locate_monster(
+                             scene.image, scene.player[0], scene.player[1], FRAME_WIDTH, FRAME_HEIGHT, False),
+                         judge, benchmark_report)
+    finally:
+        monster_detector.match_mode = 'ccoeff'
+    assert score.precision >= 0.9
+    assert score.recall >= 0.6
+
+
+def test_scan_for_direction(monster_detector, benchmark_report):
+    scene_list = scenes.make_scan_scenes(SCENES_PER_DETECTOR, seed=3)
+
+    def judge(scene, output):
+        direction, _ = output
+        return direction is not None, direction is not None and direction == scene.expected
+
+    score = evaluate("scan_for_direction", scene_list,
+                     lambda scene: monster_detector.scan_for_direction(
+                         scene.image, scene.player[0], scene.player[1], FRAME_WIDTH, FRAME_HEIGHT, _IdleMovement),
+                     judge, benchmark_report)
+    assert score.recall >= 0.85
+    assert score.precision >= 0.9
+
+
+# ----------------------------------------------------------------------
+# 紅點、繩索、方向符號
+# ----------------------------------------------------------------------
+
+def test_detect_red_dot(benchmark_report):
+    from core.red_dot_detector import RedDotDetector
+
+    detector = RedDotDetector()
+    assert detector.load_red_template(scenes.asset_path('red.png'))
+    scene_list = scenes.make_red_dot_scenes(SCENES_PER_DETECTOR, seed=4)
+
+    score = evaluate("detect_red_dot", scene_list,
+                     lambda scene: detector.detect_red_dot(scene.image, FRAME_WIDTH, FRAME_HEIGHT),
+                     lambda scene, found: (found, scene.positive), benchmark_report)
+    assert score.recall >= 0.95
+    assert score.precision >= 0.95
+
+
+def test_detect_rope_internal(benchmark_report):
+    from core.rope_climbing import RopeClimbing
+
+    rope = RopeClimbing()
+    rope.load_rope_templates(scenes.asset_path('rope'))
+    scene_list = scenes.make_rope_scenes(SCENES_PER_DETECTOR, seed=5, detection_size=rope.detection_size)
+
+    def judge(scene, output):
+        found, rope_x, _ = output
+        return found, found and scene.positive and abs(rope_x - scene.target[0]) <= 4
+
+    score = evaluate("_detect_rope_internal", scene_list,
+                     lambda scene: rope._detect_rope_internal(
+                         scene.image, scene.player[0], scene.player[1], FRAME_WIDTH, FRAME_HEIGHT, rope.detection_size),
+                     judge, benchmark_report)
+    assert score.recall >= 0.95
+    assert score.precision >= 0.95
+
+
+def test_recognize_direction_symbols(benchmark_report):
+    from core.utils import recognize_direction_symbols
+
+    sprites = scenes.load_direction_sprites()
+    templates = {name: sprite for name, (sprite, _) in sprites.items()}
+    masks = {name: mask for name, (_, mask) in sprites.items()}
+    scene_list = scenes.make_direction_scenes(SCENES_PER_DETECTOR, seed=6)
+
+    def judge(scene, output):
+        success, symbols = output
+        return success, success and symbols == scene.expected
+
+    score = evaluate("recognize_direction_symbols", scene_list,
+                     lambda scene: recognize_direction_symbols(scene.image, templates, masks, FRAME_WIDTH, FRAME_HEIGHT),
+                     judge, benchmark_report)
+    assert score.recall >= 0.9
+    assert score.precision >= 0.9
@@ -0,0 +1,64 @@
+"""
+畫面年齡 - 過時畫面略過昂貴檢測，但檢測本身比門檻慢時不會永遠不行動
+"""
+import time
+
+import pytest
+
+from core.pipeline import Frame, FrameAgeTracker
+from tests import synthetic_scenes as scenes
+
+
+def test_tracker_forces_frame_after_consecutive_drops():
+    tracker = FrameAgeTracker(max_age=0.05, max_consecutive_drops=3)
+    stale = Frame(1, time.time() - 1.0, None)
+
+    assert [tracker.is_fresh(stale, 'monster') for _ in range(8)] == [False, False, False, True] * 2
+    assert tracker.is_fresh(Frame(2, time.time(), None), 'monster')
+    assert not tracker.is_fresh(stale, 'monster')  # 新鮮畫面重置連續計數
+
+    stats = tracker.snapshot()
+    assert stats['stale_drops'] == {'monster': 7} and stats['forced'] == {'monster': 2}
+    assert '連續過時仍處理' in tracker.format_summary()
+
+
+@pytest.fixture
+def slow_engine(monkeypatch):
+    """每個檢測函數都比畫面年齡門檻慢的主循環引擎"""
+    import config
+    import core.utils
+    from core.engine import Engine
+    from core.multi_client import TemplateBank
+    from scripts.perf_regression import load_templates, synthetic_window_info
+
+    monkeypatch.setattr(config, 'ENABLED_MONSTERS', sorted(scenes.load_monster_sprites()))
+    templates = load_templates()
+    components = TemplateBank.load(templates).build_components()
+    engine = Engine(synthetic_window_info(), templates,
+                    dict(components, red_dot_detector=None, image_processor=None))
+    engine.frame_ages.max_age = 0.02
+
+    def slow(func):
+        def wrapper(*args, **kwargs):
+            time.sleep(0.03)
+            return func(*args, **kwargs)
+        return wrapper
+
+    for name in ('detect_sign_text', 'detect_rune_text', 'find_player_medal'):
+        monkeypatch.setattr(core.utils, name, slow(getattr(core.utils, name)))
+    detector = components['monster_detector']
+    monkeypatch.setattr(detector, 'detect_monsters', slow(detector.detect_monsters))
+    return engine
+
+
+def test_engine_attacks_when_every_detector_is_slower_than_max_age(slow_engine, input_events):
+    import config
+
+    scene = next(scene for scene in scenes.make_monster_scenes(4, seed=11) if scene.positive)
+    outcomes = []
+    for seq in range(1, config.FRAME_MAX_CONSECUTIVE_DROPS + 2):
+        outcomes.append(slow_engine.step(Frame(seq, time.time(), scene.image)))
+
+    assert outcomes == ['stale'] * config.FRAME_MAX_CONSECUTIVE_DROPS + [slow_engine.TICK]
+    assert ('down', config.ATTACK_KEY) in input_events
+    assert slow_engine.frame_ages.snapshot()['forced'] == {'monster': 1}
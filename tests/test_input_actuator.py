@@ -0,0 +1,146 @@
+"""
+按鍵執行器 - 斷層時間軸與移動、攻擊共用按鍵狀態，停止移動或攻擊後不殘留按鍵、左右鍵不同時按住
+"""
+import time
+
+import pytest
+
+import config
+from core.cliff_detection import CliffDetection
+from core.input_actuator import get_input_actuator
+from core.movement import Movement
+from core.utils import quick_attack_monster
+
+
+def _replay(events):
+    """依記錄的按鍵事件重建實際按住的按鍵，並檢查左右鍵是否曾同時按住"""
+    held = set()
+    overlapped = False
+    for action, key in events:
+        if action == 'down':
+            held.add(key)
+        elif action == 'up':
+            held.discard(key)
+        overlapped = overlapped or {'left', 'right'} <= held
+    return held, overlapped
+
+
+def _wait_until(condition, timeout=1.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def moving_left(input_events, monkeypatch):
+    """普通移動向左，並讓斷層檢測固定選擇反向移動"""
+    monkeypatch.setattr('core.cliff_detection.random.random', lambda: 0.1)
+    movement = Movement()
+    movement.direction = movement.enhanced_movement.execute_movement('left', 'normal', 5.0)
+    movement.current_movement_type = 'normal'
+    movement.is_moving = True
+    movement.start_time = time.time()
+    movement.duration = 5.0
+    return movement
+
+
+def _start_cliff_reverse(movement):
+    actuator = get_input_actuator()
+    CliffDetection()._handle_cliff(movement.direction, 'test')
+    assert _wait_until(lambda: actuator.is_pressed('right'))
+    assert not actuator.is_pressed('left')
+
+
+def test_stop_during_cliff_reverse_leaves_no_keys(moving_left, input_events):
+    _start_cliff_reverse(moving_left)
+    moving_left.stop()
+
+    actuator = get_input_actuator()
+    assert not actuator.is_busy('cliff')
+    assert actuator.get_pressed_keys() == []
+    held, overlapped = _replay(input_events)
+    assert held == set() and not overlapped
+
+
+def test_attack_during_cliff_reverse_takes_over_keys(moving_left, input_events):
+    _start_cliff_reverse(moving_left)
+    quick_attack_monster(0, 0, 0, 0, moving_left, CliffDetection(), 'right', 'normal')
+
+    actuator = get_input_actuator()
+    assert not actuator.is_busy('cliff')
+    assert actuator.get_pressed_keys() == ['right']
+    assert ('down', config.ATTACK_KEY) in input_events
+    held, overlapped = _replay(input_events)
+    assert held == {'right'} and not overlapped
+
+
+def test_movement_presses_direction_again_after_cliff(moving_left, input_events, monkeypatch):
+    monkeypatch.setattr('core.cliff_detection.random.uniform', lambda low, high: 0.0)
+    _start_cliff_reverse(moving_left)
+
+    actuator = get_input_actuator()
+    assert _wait_until(lambda: not actuator.is_busy('cliff'))
+    assert actuator.get_pressed_keys() == []  # 時間軸本身不再按回方向鍵
+
+    moving_left.update()
+    assert actuator.get_pressed_keys() == ['left']
+    held, overlapped = _replay(input_events)
+    assert held == {'left'} and not overlapped
+
+
+def test_search_resume_keys_are_owned_by_movement(moving_left, input_events):
+    from core.input_actuator import MOVEMENT_OWNER
+    from core.search import Search
+
+    search = Search()
+    search.search_for_medal(None, None, 0.7, moving_left)
+    actuator = get_input_actuator()
+    assert _wait_until(lambda: actuator.is_pressed('right'))  # 反方向優先掃描
+
+    assert search.update_search(True, 0.9)
+    assert actuator.get_owned_keys(MOVEMENT_OWNER) == ['right']
+    assert moving_left.is_moving and moving_left.direction == 'right'
+
+    moving_left.stop()
+    assert actuator.get_pressed_keys() == []
+    held, overlapped = _replay(input_events)
+    assert held == set() and not overlapped
+
+
+def test_rune_symbol_retry_is_polled_without_blocking(input_events, monkeypatch):
+    """符號輸入失敗 → ESC → 重新對齊 → 再次觸發 → 成功，每次 handle 都立即返回"""
+    import numpy as np
+    from core.rune_mode import RuneMode
+
+    recognitions = iter([(True, ['left', 'up']), (True, ['left']), (True, ['right']), (False, None)])
+    monkeypatch.setattr('core.utils.recognize_direction_symbols', lambda *args: next(recognitions))
+    monkeypatch.setattr('core.utils.simple_find_medal', lambda screenshot, template, threshold: (True, (100, 100), 0.9))
+    channel_changes = []
+    monkeypatch.setattr('core.utils.execute_channel_change', lambda *args: channel_changes.append(args))
+
+    rune = RuneMode()
+    rune.arrow_interval = rune.symbol_settle_time = rune.interface_wait = 0.02
+    rune.enter()
+    rune._trigger_symbols(1)
+
+    screenshot = np.zeros((10, 10, 3), dtype=np.uint8)
+    template = np.zeros((4, 4, 3), dtype=np.uint8)
+    phases = []
+    deadline = time.time() + 3.0
+    while rune.pending_step and time.time() < deadline:
+        phase = rune.pending_step['phase']
+        if not phases or phases[-1] != phase:
+            phases.append(phase)
+        started = time.perf_counter()
+        rune.handle(screenshot, (0, 0, 10, 10), template, template, None, None, 10, 10,
+                    None, None, 0, 0, None, None)
+        assert time.perf_counter() - started < 0.05
+        time.sleep(0.005)
+
+    assert phases == ['recognize', 'verify', 'align', 'recognize', 'verify']
+    assert not rune.is_active and not channel_changes
+    assert [key for action, key in input_events if action == 'down'] == ['up', 'left', 'up', 'esc', 'up', 'right']
+    assert not _replay(input_events)[0]
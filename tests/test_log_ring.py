@@ -0,0 +1,40 @@
+"""
+日誌環形緩衝區 - 多線程寫入時 last_seq 不會回退，讀取端不會重讀或漏讀
+"""
+import threading
+
+from core.log_ring import LogRing
+
+
+class _PausingSeq(int):
+    """第一次被比較時暫停目前的寫入，讓另一個線程在「比較」與「賦值」之間寫入"""
+
+    def __new__(cls, value, on_compare):
+        seq = super().__new__(cls, value)
+        seq.on_compare = on_compare
+        return seq
+
+    def __lt__(self, other):
+        on_compare, self.on_compare = self.on_compare, None
+        if on_compare is not None:
+            on_compare()
+        return int(self) < other
+
+
+def test_last_seq_never_moves_backwards():
+    ring = LogRing(capacity=8)
+    reader = ring.reader()
+    second = threading.Thread(target=ring.append, args=('second',))
+
+    def let_second_writer_run():
+        second.start()
+        second.join(timeout=0.2)  # 有鎖時第二個寫入在這裡等待，沒有鎖時會先寫完
+
+    ring.last_seq = _PausingSeq(0, let_second_writer_run)
+    ring.append('first')
+    second.join()
+
+    assert ring.last_seq == 2
+    assert [record.message for record in reader.drain()] == ['first', 'second']
+    ring.append('third')
+    assert [record.message for record in reader.drain()] == ['third']
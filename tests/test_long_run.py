@@ -0,0 +1,63 @@
+"""
+長時間運行模式 - 緩衝池只重用沒人持有的緩衝區、記憶體報告標出持續增長的配置位置、日誌檔輪替
+"""
+import numpy as np
+
+from core.logger import append_capped_log
+from core.long_run import BufferPool, MemoryMonitor
+
+
+def test_pool_reuses_only_released_buffers():
+    pool = BufferPool('test', max_buffers=2)
+    assert pool.acquire((4, 4)) is not pool.acquire((4, 4))  # 未啟用時每次都是新配置
+    pool.enable()
+
+    first = pool.acquire((4, 4))
+    first_id = id(first)
+    second = pool.acquire((4, 4))
+    assert second is not first
+    view = first[1:]
+    del first
+    # 還有 view 引用時不重用；池滿時改為一般配置
+    third = pool.acquire((4, 4))
+    assert id(third) != first_id and third is not second
+
+    del view
+    assert id(pool.acquire((4, 4))) == first_id
+    assert pool.acquire((4, 4), np.float32).dtype == np.float32
+
+    stats = pool.get_stats()
+    assert (stats['reused'], stats['allocated'], stats['overflow']) == (1, 3, 1)
+    pool.disable()
+    assert pool.get_stats()['buffers'] == 0
+
+
+def test_monitor_flags_growing_allocation(tmp_path):
+    leaked = []
+    monitor = MemoryMonitor(str(tmp_path), interval=3600, hotspot_min_kb=256, log=lambda message: None)
+    assert monitor.start()
+    try:
+        for _ in range(2):
+            for _ in range(64):
+                leaked.append(bytearray(8192))  # 刻意增長的配置
+            result = monitor.take_snapshot()
+    finally:
+        monitor.stop()
+
+    hotspot = next(entry for entry in result['hotspots'] if entry['file'].endswith('test_long_run.py'))
+    assert hotspot['size_diff_kb'] >= 1024 and hotspot['recent_kb'] > 0
+    report = open(monitor.report_path, encoding='utf-8').read()
+    assert report.count('===') == 6  # 兩次快照 + stop() 的最後一筆
+    assert f"test_long_run.py:{hotspot['line']}  ⚠️ 持續增長" in report
+    assert len(leaked) == 128
+
+
+def test_capped_log_rotates(tmp_path):
+    path = tmp_path / 'security_violations.log'
+    for index in range(5):
+        append_capped_log(str(path), f"{index}" * 59 + "\n", max_bytes=100, backups=2)
+
+    assert path.read_text(encoding='utf-8') == "4" * 59 + "\n"
+    assert (tmp_path / 'security_violations.log.1').read_text(encoding='utf-8').startswith("3")
+    assert (tmp_path / 'security_violations.log.2').read_text(encoding='utf-8').startswith("2")
+    assert not (tmp_path / 'security_violations.log.3').exists()
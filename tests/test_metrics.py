@@ -0,0 +1,68 @@
+"""
+監控指標 - Prometheus 文字格式、收集函數與本機 HTTP 端點
+"""
+import urllib.request
+
+from core.metrics import CONTENT_TYPE, MetricsRegistry, MetricsServer
+
+
+def _lines(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+
+def test_render_counters_gauges_and_collectors():
+    registry = MetricsRegistry()
+    registry.inc('attacks_total', type='normal')
+    registry.inc('attacks_total', 2, type='jump')
+    registry.inc('attacks_total', type='normal')
+    registry.set_gauge('script_running', 1)
+    registry.add_collector(lambda: [('queue_depth', {'queue': 'pipeline.frames'}, 1)])
+    registry.add_collector(lambda: 1 / 0)
+
+    text = registry.render()
+
+    assert '# TYPE artale_attacks_total counter' in text
+    assert 'artale_attacks_total{type="jump"} 2' in text
+    assert 'artale_attacks_total{type="normal"} 2' in text
+    assert 'artale_script_running 1' in text
+    assert 'artale_queue_depth{queue="pipeline.frames"} 1' in text
+    # 失敗的收集函數不影響其他指標
+    assert _lines(text, 'artale_collector_errors{')
+    assert registry.get('attacks_total', type='normal') == 2
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    for seconds in (0.004, 0.004, 0.040, 9.0):
+        registry.observe('frame_age_seconds', seconds)
+
+    text = registry.render()
+    buckets = _lines(text, 'artale_frame_age_seconds_bucket')
+    counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+
+    assert counts == sorted(counts)
+    assert 'artale_frame_age_seconds_bucket{le="0.005"} 2' in text
+    assert 'artale_frame_age_seconds_bucket{le="0.05"} 3' in text
+    assert buckets[-1] == 'artale_frame_age_seconds_bucket{le="+Inf"} 4'
+    assert 'artale_frame_age_seconds_count 4' in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc('loop_ticks_total', engine='multi', client='a"b\\c')
+    assert 'artale_loop_ticks_total{client="a\\"b\\\\c",engine="multi"} 1' in registry.render()
+
+
+def test_server_serves_metrics_endpoint():
+    registry = MetricsRegistry()
+    registry.inc('channel_changes_total')
+    server = MetricsServer(registry, '127.0.0.1', 0)
+    assert server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+            body = response.read().decode('utf-8')
+            assert response.headers['Content-Type'] == CONTENT_TYPE
+        assert 'artale_channel_changes_total 1' in body
+    finally:
+        server.stop()
+    assert not server.is_running
@@ -0,0 +1,38 @@
+"""
+小地圖定位 - 圖像處理工作線程與主循環同時定位時逐一執行，校正狀態不會交錯更新
+"""
+import threading
+import time
+
+import numpy as np
+
+from core.minimap_locator import MinimapLocator
+
+
+def test_concurrent_locate_is_serialised(monkeypatch):
+    import core.utils
+
+    active = []
+    overlaps = []
+
+    def slow_find_medal(screenshot, template, threshold):
+        active.append(threading.get_ident())
+        overlaps.append(len(active))
+        time.sleep(0.02)
+        active.pop()
+        return True, (100, 200), 0.9
+
+    monkeypatch.setattr(core.utils, 'simple_find_medal', slow_find_medal)
+    locator = MinimapLocator()
+    screenshot = np.zeros((720, 1280, 3), np.uint8)
+    template = np.zeros((20, 40, 3), np.uint8)
+
+    threads = [threading.Thread(target=locator.locate_medal, args=(screenshot, template, 0.6)) for _ in range(4)]
+    reset = threading.Thread(target=locator.reset)
+    for thread in threads + [reset]:
+        thread.start()
+    for thread in threads + [reset]:
+        thread.join()
+
+    assert overlaps and max(overlaps) == 1
+    assert locator.full_searches == 4
@@ -0,0 +1,43 @@
+"""
+多開模式 - 多個客戶端共用模板與工作線程池，各自執行計畫，按鍵只送到自己的視窗
+"""
+import numpy as np
+
+from core.input_actuator import get_input_actuator
+from tests import synthetic_scenes as scenes
+
+
+def test_clients_execute_plans_on_their_own_windows(monkeypatch, input_events):
+    import config
+    from core.multi_client import MultiClientSupervisor, ReplayFrameSource, TemplateBank
+    from scripts.perf_regression import load_templates
+
+    monkeypatch.setattr(config, 'ENABLED_MONSTERS', sorted(scenes.load_monster_sprites()))
+    bank = TemplateBank.load(load_templates())
+    monster_frames = [scene.image for scene in scenes.make_monster_scenes(4, seed=11) if scene.positive]
+    rng = np.random.default_rng(0)
+    lost_frames = [scenes.make_background(rng)[0] for _ in range(6)]  # 沒有角色：連續 5 幀後開始搜尋
+
+    supervisor = MultiClientSupervisor(bank, workers=2)
+    attacker = supervisor.add_client(ReplayFrameSource(frames=monster_frames, loop=False),
+                                     client_id='attacker', frame_interval=0.0)
+    searcher = supervisor.add_client(ReplayFrameSource(frames=lost_frames, loop=False),
+                                     client_id='searcher', frame_interval=0.0)
+    for session in supervisor.clients:
+        session.planner.frame_ages.max_age = 60.0  # 檢測速度與本測試無關
+    supervisor.run(duration=60)
+
+    stats = supervisor.get_stats()
+    assert stats['errors'] == 0
+    assert stats['clients']['attacker']['plans'].get('attack')
+    assert stats['clients']['searcher']['plans'].get('search') == 1
+
+    # 狀態機在各自的客戶端推進，按鍵只記錄在自己的視窗
+    attacker_keys = {key for action, key in attacker.source.input_sender.events if action == 'down'}
+    searcher_keys = {key for action, key in searcher.source.input_sender.events if action == 'down'}
+    assert config.ATTACK_KEY in attacker_keys and config.ATTACK_KEY not in searcher_keys
+    assert searcher_keys and searcher_keys <= {'left', 'right'}
+
+    # 沒有經過 pyautogui（聚焦中的視窗），結束後各視窗都沒有殘留按鍵
+    assert input_events == [] and get_input_actuator().get_pressed_keys() == []
+    assert all(client['pressed_keys'] == [] for client in stats['clients'].values())
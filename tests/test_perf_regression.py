@@ -0,0 +1,112 @@
+"""
+效能回歸檢查 - 基準比較規則、基準 JSON 讀寫，以及工作負載在合成畫面上可完整執行
+
+實際的回歸判定依機器而異，由 scripts/perf_regression.py 對照該機型的基準執行。
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from core.perf_regression import (BASELINE_SCHEMA, PerfWorkload, WorkloadResult, build_workloads,
+                                  compare_to_baseline, load_baseline, make_baseline, measure_workload,
+                                  save_baseline)
+from tests import synthetic_scenes as scenes
+
+
+def _baseline(**medians):
+    return {'schema': BASELINE_SCHEMA, 'info': {'version': 'test'},
+            'workloads': {name: {'median_ms': value} for name, value in medians.items()}}
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = _baseline(monster=10.0, scan=100.0, rope=0.2, sign=20.0, medal=5.0)
+    current = {'monster': 12.0, 'scan': 140.0, 'rope': 0.6, 'sign': 10.0, 'direction': 30.0}
+
+    report = compare_to_baseline(current, baseline, tolerance=0.25, min_delta_ms=0.5, info={})
+    status = {c.name: c.status for c in report.comparisons}
+
+    assert status == {
+        'monster': 'ok',        # +20%：在容許範圍內
+        'scan': 'regressed',    # +40%
+        'rope': 'ok',           # 3 倍但只差 0.4ms：計時雜訊
+        'sign': 'improved',
+        'medal': 'missing',
+        'direction': 'new',
+    }
+    assert not report.passed
+    assert [c.name for c in report.regressions] == ['scan']
+
+
+def test_report_is_machine_readable():
+    report = compare_to_baseline({'monster': 9.0}, _baseline(monster=10.0), info={'version': 'x'})
+    data = json.loads(json.dumps(report.to_dict()))
+
+    assert data['passed'] is True
+    assert data['stages'] == [{'name': 'monster', 'status': 'ok', 'baseline_ms': 10.0,
+                               'current_ms': 9.0, 'ratio': 0.9}]
+    assert '✅' in report.format_summary()
+
+
+def test_baseline_round_trip(tmp_path):
+    result = WorkloadResult('synthetic.monster', 3, [[1.0, 3.0, 2.0], [4.0, 2.5, 3.0]])
+    path = tmp_path / 'baseline.json'
+    save_baseline(str(path), make_baseline({result.name: result}, info={'version': 'x'}))
+
+    baseline = load_baseline(str(path))
+    assert baseline['workloads']['synthetic.monster']['median_ms'] == 2.0  # 各輪中位數 2.0 / 3.0 取最小
+    assert compare_to_baseline({result.name: result}, baseline, info={}).passed
+
+    path.write_text(json.dumps(dict(baseline, schema=BASELINE_SCHEMA + 1)))
+    with pytest.raises(ValueError):
+        load_baseline(str(path))
+
+
+def test_measure_workload_excludes_warmup():
+    calls = []
+    workload = PerfWorkload('noop', [None, None], lambda i, image: calls.append(i))
+
+    result = measure_workload(workload, repeat=3, warmup=1)
+    assert len(calls) == 8
+    assert [len(samples) for samples in result.rounds_ms] == [2, 2, 2]
+
+
+def test_workloads_run_on_synthetic_frames(monkeypatch):
+    import config
+    from core.multi_client import TemplateBank
+    from scripts.perf_regression import load_templates, synthetic_window_info
+
+    monkeypatch.setattr(config, 'ENABLED_MONSTERS', sorted(scenes.load_monster_sprites()))
+    templates = load_templates()
+    bank = TemplateBank.load(templates)
+    frames = [scene.image for scene in scenes.make_monster_scenes(2, seed=11)]
+
+    workloads = build_workloads('synthetic', frames, templates, bank.build_components(), synthetic_window_info())
+    names = {workload.name for workload in workloads}
+    assert {'synthetic.medal', 'synthetic.monster', 'synthetic.scan', 'synthetic.perceive', 'synthetic.decide'} <= names
+
+    for workload in workloads:
+        result = measure_workload(workload, repeat=1, warmup=0)
+        assert len(result.samples_ms) == len(frames)
+
+
+def test_script_runs_headless_and_setup_errors_return_2(monkeypatch, tmp_path):
+    """無顯示器時腳本自行換上替代模組；設定錯誤返回 2，不被 CI 當成效能退化"""
+    from scripts import perf_regression
+
+    baseline = tmp_path / 'baseline.json'
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'perf_regression.py')
+    completed = subprocess.run([sys.executable, script, '--synthetic', '4', '--repeat', '1',
+                                '--update-baseline', '--baseline', str(baseline)],
+                               capture_output=True, text=True, timeout=300)
+    assert completed.returncode == 0, completed.stderr
+    assert load_baseline(str(baseline))['workloads']
+
+    def broken_templates():
+        raise ValueError("無法載入模板: ['medal']")
+
+    monkeypatch.setattr(perf_regression, 'load_templates', broken_templates)
+    monkeypatch.setattr(sys, 'argv', ['perf_regression.py', '--json', '--baseline', str(baseline)])
+    assert perf_regression.main() == 2
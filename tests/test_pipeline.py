@@ -0,0 +1,108 @@
+"""
+管線引擎 - 隊列只保留最新的畫面，檢測跟不上時丟棄舊畫面、決策依序處理較新的結果；
+檢測階段只讀決策階段發布的狀態快照
+"""
+import threading
+import time
+
+import pytest
+
+from core.pipeline import DecisionState, Frame, LatestQueue, PipelineEngine
+from tests import synthetic_scenes as scenes
+
+
+def test_latest_queue_keeps_only_newest_items():
+    latest = LatestQueue(maxsize=1)
+    for seq in range(1, 4):
+        latest.put(seq)
+
+    assert latest.snapshot() == {'depth': 1, 'max_depth': 1, 'dropped': 2}
+    assert latest.get(timeout=0) == 3
+    assert latest.get(timeout=0.01) is None
+
+
+@pytest.fixture
+def pipeline_engine(monkeypatch):
+    import config
+    from core.multi_client import TemplateBank
+    from scripts.perf_regression import load_templates, synthetic_window_info
+
+    monkeypatch.setattr(config, 'ENABLED_MONSTERS', sorted(scenes.load_monster_sprites()))
+    templates = load_templates()
+    components = TemplateBank.load(templates).build_components()
+    engine = PipelineEngine(synthetic_window_info(), templates,
+                            dict(components, red_dot_detector=None, image_processor=None))
+    engine.frame_ages.max_age = 60.0  # 只測隊列語意，不測畫面年齡
+    yield engine
+    engine.stop_event.set()
+    for thread in engine.threads:
+        thread.join(timeout=5.0)
+
+
+def _start_stages(engine, *targets):
+    """只啟動指定階段（不截圖、不按鍵），畫面由測試直接放入隊列"""
+    engine.stop_event.clear()
+    for target in targets:
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        engine.threads.append(thread)
+
+
+def test_slow_detection_drops_old_frames_and_decides_on_latest(pipeline_engine, monkeypatch):
+    engine = pipeline_engine
+    detected = []
+    perceive = engine._perceive
+
+    def slow_perceive(frame):
+        detected.append(frame.seq)
+        time.sleep(0.05)
+        return perceive(frame)
+
+    monkeypatch.setattr(engine, '_perceive', slow_perceive)
+    _start_stages(engine, engine._detect_stage, engine._decide_stage)
+
+    images = [scene.image for scene in scenes.make_monster_scenes(4, seed=11) if scene.positive]
+    frames = [Frame(seq, time.time(), images[seq % len(images)]) for seq in range(1, 21)]
+    for frame in frames:
+        engine.frame_queue.put(frame)
+        time.sleep(0.005)
+
+    deadline = time.time() + 30.0
+    while engine.last_perception_seq < frames[-1].seq and time.time() < deadline:
+        time.sleep(0.01)
+
+    # 最新的畫面一定會被處理；檢測中被新畫面蓋過的畫面直接丟棄
+    assert engine.last_perception_seq == frames[-1].seq
+    assert detected == sorted(detected) and detected[-1] == frames[-1].seq
+    assert len(detected) < len(frames)
+    assert engine.frame_queue.dropped == len(frames) - len(detected)
+
+    # 計畫隊列也只保留最新的一個，對應最後一張畫面
+    plan = engine.plan_queue.get(timeout=1.0)
+    assert plan is not None and plan.frame_time == frames[-1].timestamp
+    assert engine.plan_queue.get(timeout=0.01) is None
+    assert engine.get_stats()['stages']['decide']['count'] + engine.perception_queue.dropped == len(detected)
+
+
+def test_detect_reads_published_decision_state(pipeline_engine, monkeypatch):
+    engine = pipeline_engine
+    image = next(scene.image for scene in scenes.make_monster_scenes(4, seed=11) if not scene.positive)
+    ropes = []
+    monkeypatch.setattr(engine.components['rope_climbing'], 'detect_rope',
+                        lambda *args: ropes.append(args) or (False, 0, 0))
+    monkeypatch.setattr(engine.components['monster_detector'], 'locate_monster', lambda *args: None)
+    monkeypatch.setattr('core.utils.find_player_medal', lambda *args: (True, (600, 500), 0.95))
+
+    # 決策線程正在修改的欄位不影響檢測，只有發布的快照才算
+    engine.no_monster_time = time.time() - 10.0
+    engine._perceive(Frame(1, time.time(), image))
+    assert ropes == []
+
+    engine.decision_state = DecisionState(no_monster_time=time.time() - 10.0)
+    engine._perceive(Frame(2, time.time(), image))
+    assert len(ropes) == 1
+
+    # 決策後發布新的快照，並隨計畫交給按鍵階段
+    plan = engine._decide(engine._perceive(Frame(3, time.time(), image)))
+    assert plan.decision_state is engine.decision_state
+    assert plan.decision_state.medal_lost_count == 0 and plan.decision_state.no_monster_time > 0
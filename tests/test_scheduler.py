@@ -0,0 +1,92 @@
+"""
+幀預算排程器 - 至少執行一個任務、超出預算的任務順延、逾期加權避免餓死、逾期一個週期以上記為錯過期限
+"""
+import pytest
+
+from core.scheduler import FrameScheduler
+
+
+class FakeClock:
+    """取代 time.time 的假時鐘；任務執行時以 advance 模擬執行成本"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr('core.scheduler.time.time', clock)
+    return clock
+
+
+def _costly(clock, cost, runs=None, name=None):
+    def run():
+        if runs is not None:
+            runs.append(name)
+        clock.advance(cost)
+    return run
+
+
+def test_most_urgent_task_runs_even_when_over_budget(clock):
+    scheduler = FrameScheduler(frame_budget=0.001, log=lambda *args: None)
+    scheduler.register('slow', _costly(clock, 0.05), period=0.1, cost_estimate=0.05, run_immediately=True)
+
+    assert scheduler.run_due() == ['slow']
+    assert scheduler.get_stats()['over_budget_ticks'] == 1
+
+
+def test_tasks_that_do_not_fit_are_deferred(clock):
+    scheduler = FrameScheduler(frame_budget=0.01, log=lambda *args: None)
+    scheduler.register('high', _costly(clock, 0.008), period=1.0, priority=2, run_immediately=True)
+    low = scheduler.register('low', _costly(clock, 0.005), period=1.0, priority=1,
+                             cost_estimate=0.005, run_immediately=True)
+
+    assert scheduler.run_due() == ['high']
+    assert low.deferred == 1 and low.runs == 0
+
+    # 下一幀預算重新計算，順延的任務接著執行
+    clock.advance(0.01)
+    assert scheduler.run_due() == ['low']
+
+
+def test_overdue_low_priority_task_is_not_starved(clock):
+    scheduler = FrameScheduler(frame_budget=0.005, log=lambda *args: None)
+    runs = []
+    # 高優先任務每幀都到期，成本吃滿預算
+    scheduler.register('busy', _costly(clock, 0.01, runs, 'busy'), period=0.0, priority=3,
+                       cost_estimate=0.01, run_immediately=True)
+    low = scheduler.register('background', _costly(clock, 0.01, runs, 'background'), period=0.1,
+                             priority=0, cost_estimate=0.01)
+
+    for _ in range(40):
+        scheduler.run_due()
+        clock.advance(0.02)
+
+    assert low.runs >= 2 and runs.count('busy') > low.runs
+    # 優先級差 3，逾期超過 3 個週期（0.3 秒）後就會排到前面
+    assert low.max_lateness < 0.4
+    assert low.deferred > 0
+
+
+def test_deadline_miss_counts_only_when_late_by_a_full_period(clock):
+    scheduler = FrameScheduler(log=lambda *args: None)
+    task = scheduler.register('stats', _costly(clock, 0.0), period=0.1)
+
+    clock.advance(0.1 + 0.09)  # 逾期 0.09 秒，不到一個週期
+    scheduler.run_due()
+    assert task.runs == 1 and task.deadline_misses == 0
+
+    clock.advance(0.1 + 0.11)  # 逾期超過一個週期
+    scheduler.run_due()
+    assert task.runs == 2 and task.deadline_misses == 1
+
+    clock.advance(0.05)  # 尚未到期
+    assert scheduler.run_due() == []
+    assert scheduler.get_stats()['tasks']['stats']['deadline_misses'] == 1
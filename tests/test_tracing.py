@@ -0,0 +1,101 @@
+"""
+延遲追踪 - 各段延遲的拆解，以及 trace 從檢測、決策一路跟到攻擊按鍵
+"""
+import time
+
+import pytest
+
+from core.tracing import FrameTrace, Tracer, activate, get_tracer
+from tests import synthetic_scenes as scenes
+from tests.synthetic_scenes import FRAME_HEIGHT, FRAME_WIDTH
+
+
+def test_breakdown_splits_total_latency():
+    trace = FrameTrace(7, begin=10.0)
+    for name, at in (('captured', 10.010), ('detect_start', 10.015), ('detect_end', 10.045),
+                     ('decide_start', 10.050), ('decide_end', 10.052), ('actuate_start', 10.060),
+                     ('input', 10.064)):
+        trace.mark(name, at)
+    trace.mark('captured', 99.0)  # 同一標記只記第一次
+
+    breakdown = trace.breakdown()
+    assert breakdown['capture'] == pytest.approx(0.010)
+    assert breakdown['detect'] == pytest.approx(0.030)
+    assert breakdown['decide'] == pytest.approx(0.002)
+    assert breakdown['actuate'] == pytest.approx(0.004)
+    assert breakdown['queue'] == pytest.approx(0.005 + 0.005 + 0.008)
+    assert breakdown['total'] == pytest.approx(0.064)
+
+    tracer = Tracer(keep=2)
+    tracer.finish(trace)
+    tracer.finish(trace)
+    assert tracer.completed == 1
+    assert tracer.snapshot()['recent'][0]['trace_id'] == 7
+
+
+@pytest.fixture
+def pipeline_engine(monkeypatch):
+    import config
+    from core.multi_client import TemplateBank
+    from core.pipeline import PipelineEngine
+    from scripts.perf_regression import load_templates, synthetic_window_info
+
+    monkeypatch.setattr(config, 'ENABLED_MONSTERS', sorted(scenes.load_monster_sprites()))
+    templates = load_templates()
+    components = TemplateBank.load(templates).build_components()
+    engine = PipelineEngine(synthetic_window_info(), templates,
+                            dict(components, red_dot_detector=None, image_processor=None))
+    # 測試機器上檢測可能超過畫面年齡門檻，這裡只檢查追踪
+    engine.required_clear_time = float('inf')
+    engine.frame_ages.max_age = float('inf')
+    return engine
+
+
+def test_trace_follows_frame_to_attack_key(pipeline_engine, input_events):
+    import config
+    from core.pipeline import Frame
+
+    scene = next(scene for scene in scenes.make_monster_scenes(4, seed=11) if scene.positive)
+    trace = get_tracer().begin()
+    trace.mark('captured')
+
+    perception = pipeline_engine._perceive(Frame(1, time.time(), scene.image, trace))
+    plan = pipeline_engine._decide(perception)
+    assert plan.name == 'attack' and plan.trace is trace
+
+    with activate(plan.trace):
+        plan.trace.mark('actuate_start')
+        dict(plan.steps)['attack']()
+
+    assert ('down', config.ATTACK_KEY) in input_events
+    assert trace.finished
+    assert list(trace.marks) == ['begin', 'captured', 'detect_start', 'detect_end',
+                                 'decide_start', 'decide_end', 'actuate_start', 'input']
+    breakdown = trace.breakdown()
+    assert breakdown['detect'] > 0
+    assert sum(breakdown[name] for name in ('capture', 'queue', 'detect', 'decide', 'actuate')) == \
+        pytest.approx(breakdown['total'])
+
+
+def test_detect_monsters_marks_active_trace(pipeline_engine, input_events):
+    """主循環模式：檢測與攻擊在同一線程，由怪物檢測器與攻擊函數標記目前線程的 trace"""
+    from core.cliff_detection import CliffDetection
+    from core.movement import Movement
+
+    scene = next(scene for scene in scenes.make_monster_scenes(4, seed=11) if scene.positive)
+    detector = pipeline_engine.components['monster_detector']
+    completed = get_tracer().completed
+
+    # 沒有目前的 trace 時照常攻擊，不記錄延遲
+    assert detector.detect_monsters(scene.image, scene.player[0], scene.player[1],
+                                    FRAME_WIDTH, FRAME_HEIGHT, Movement(), CliffDetection(), 0, 0)
+    assert get_tracer().completed == completed
+
+    trace = get_tracer().begin()
+    with activate(trace):
+        trace.mark('detect_start')
+        assert detector.detect_monsters(scene.image, scene.player[0], scene.player[1],
+                                        FRAME_WIDTH, FRAME_HEIGHT, Movement(), CliffDetection(), 0, 0)
+
+    assert trace.finished and get_tracer().completed == completed + 1
+    assert {'detect_end', 'decide_start', 'decide_end', 'actuate_start', 'input'} <= set(trace.marks)